@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    PowerSource, Panel, CircuitBreaker, Load
+    PowerSource, Panel, CircuitBreaker, Load, LoadProfile, Tariff, TariffBand, TariffTier, Scenario
 )
 
 class BreakerInline(admin.TabularInline):
@@ -50,8 +50,8 @@ class PanelAdmin(admin.ModelAdmin):
 
 @admin.register(Load)
 class LoadAdmin(admin.ModelAdmin):
-    list_display = ('name', 'panel', 'breaker', 'voltage', 'ampacity', 'power_consumption')
-    list_filter = ('panel', 'voltage')
+    list_display = ('name', 'panel', 'breaker', 'voltage', 'ampacity', 'power_consumption', 'priority')
+    list_filter = ('panel', 'voltage', 'priority')
     search_fields = ('name',)
     
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -61,3 +61,31 @@ class LoadAdmin(admin.ModelAdmin):
             if load and load.panel:
                 kwargs["queryset"] = CircuitBreaker.objects.filter(panel=load.panel)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+@admin.register(LoadProfile)
+class LoadProfileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'load', 'load_type', 'resolution')
+    list_filter = ('resolution', 'load_type')
+    search_fields = ('name',)
+
+class TariffBandInline(admin.TabularInline):
+    model = TariffBand
+    extra = 0
+    fields = ('name', 'start_hour', 'end_hour', 'price')
+
+class TariffTierInline(admin.TabularInline):
+    model = TariffTier
+    extra = 0
+    fields = ('up_to_kwh', 'price')
+
+@admin.register(Tariff)
+class TariffAdmin(admin.ModelAdmin):
+    list_display = ('name', 'power_source', 'source_type', 'base_price')
+    list_filter = ('source_type',)
+    search_fields = ('name',)
+    inlines = [TariffBandInline, TariffTierInline]
+
+@admin.register(Scenario)
+class ScenarioAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name', 'description')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class NetworkConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'network'
+
+    def ready(self):
+        # تسجيل الإشارات التي تحدث الإجماليات المخزنة
+        from . import signals  # noqa: F401
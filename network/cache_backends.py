@@ -0,0 +1,54 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - خلفيات التخزين المؤقت (Cache backends)
+خلفية ملفات يمكن مشاركتها بين عدة عمليات مع إخلاء الأقدم استخداماً (LRU)
+"""
+
+import os
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+_MISSING = object()
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache يخلي الملفات الأقدم استخداماً بدلاً من الإخلاء العشوائي عند تجاوز MAX_ENTRIES
+    القراءة الناجحة تحدث وقت تعديل الملف (mtime) فيصبح وقت التعديل وقت آخر استخدام،
+    لكن فقط إذا مضى عليه أكثر من TOUCH_INTERVAL ثانية (الافتراضي 60): تحديث الوقت كتابة على نظام الملفات،
+    فتكلف القراءات المتكررة للمفتاح نفسه قراءة حالة الملف فقط، ودقة ترتيب الإخلاء في حدود هذه المدة
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._touch_interval = params.get('OPTIONS', {}).get('TOUCH_INTERVAL', 60)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            return default
+        fname = self._key_to_file(key, version)
+        try:
+            if time.time() - os.path.getmtime(fname) >= self._touch_interval:
+                os.utime(fname)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except FileNotFoundError:
+                return 0
+
+        filelist.sort(key=last_used)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
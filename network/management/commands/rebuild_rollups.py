@@ -0,0 +1,27 @@
+"""
+أمر إدارة لإعادة بناء المسارات المادية للوحات وإجماليات الأحمال المخزنة دفعة واحدة
+ويمسح ذاكرة نموذج القراءة بعد إعادة البناء
+الاستخدام: python manage.py rebuild_rollups
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from network.models import Panel, NetworkRevision
+from network.services import read_cache
+from network.services.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "إعادة حساب المسارات المادية للوحات وإجماليات الأحمال للوحات والقواطع من الصفر"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            paths = Panel.rebuild_tree_paths()
+            panels, breakers = rebuild_rollups()
+            NetworkRevision.bump()
+        # القيم المحفوظة في ذاكرة نموذج القراءة حسبت من البيانات قبل التصحيح
+        read_cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f"تم تصحيح المسار المادي لـ {paths} لوحة، وإجماليات {panels} لوحة و {breakers} قاطع"
+        ))
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:39
+
+from django.db import migrations, models
+
+
+def build_tree_paths(apps, schema_editor):
+    """حساب المسار المادي والعمق للوحات الموجودة من علاقة parent_panel"""
+    Panel = apps.get_model('network', 'Panel')
+    children = {}
+    for panel_id, parent_id in Panel.objects.values_list('id', 'parent_panel_id'):
+        children.setdefault(parent_id, []).append(panel_id)
+
+    panels = []
+    stack = [(panel_id, '/', 0) for panel_id in children.get(None, [])]
+    while stack:
+        panel_id, prefix, depth = stack.pop()
+        path = f"{prefix}{panel_id}/"
+        panels.append(Panel(id=panel_id, tree_path=path, tree_depth=depth))
+        stack.extend((child_id, path, depth + 1) for child_id in children.get(panel_id, []))
+    Panel.objects.bulk_update(panels, ['tree_path', 'tree_depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0010_alter_circuitbreaker_options_alter_panel_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='panel',
+            name='tree_depth',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='عمق اللوحة في الشجرة، اللوحة الجذر عمقها صفر (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='tree_path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text='مسار اللوحة في الشجرة من اللوحة الجذر (يحدث تلقائياً)', max_length=255),
+        ),
+        migrations.RunPython(build_tree_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:42
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_rollups(apps, schema_editor):
+    """حساب إجماليات الأحمال للوحات (مع لوحاتها الفرعية) وللقواطع من البيانات الموجودة"""
+    Panel = apps.get_model('network', 'Panel')
+    CircuitBreaker = apps.get_model('network', 'CircuitBreaker')
+    Load = apps.get_model('network', 'Load')
+    fields = ['rollup_ampacity', 'rollup_load_count', 'rollup_power_consumption']
+
+    def totals_by(field):
+        return Load.objects.order_by().filter(**{f'{field}__isnull': False}).values(field).annotate(
+            ampacity=Sum('ampacity'), count=Count('id'), power=Sum('power_consumption')
+        )
+
+    paths = dict(Panel.objects.values_list('id', 'tree_path'))
+    panel_totals = defaultdict(lambda: [0, 0, 0])
+    for row in totals_by('panel'):
+        ancestors = [int(i) for i in (paths.get(row['panel']) or '').strip('/').split('/') if i] or [row['panel']]
+        for panel_id in ancestors:
+            panel_totals[panel_id][0] += row['ampacity'] or 0
+            panel_totals[panel_id][1] += row['count']
+            panel_totals[panel_id][2] += row['power'] or 0
+    Panel.objects.bulk_update(
+        [Panel(id=panel_id, **dict(zip(fields, totals))) for panel_id, totals in panel_totals.items()],
+        fields, batch_size=500
+    )
+
+    breaker_totals = defaultdict(lambda: [0, 0, 0])
+    for row in totals_by('breaker'):
+        breaker_totals[row['breaker']] = [row['ampacity'] or 0, row['count'], row['power'] or 0]
+    through = CircuitBreaker.feeding_breakers.through
+    for feeder_id, fed_rated in through.objects.values_list('to_circuitbreaker_id', 'from_circuitbreaker__rated_current'):
+        breaker_totals[feeder_id][0] += fed_rated
+    CircuitBreaker.objects.bulk_update(
+        [CircuitBreaker(id=breaker_id, **dict(zip(fields, totals))) for breaker_id, totals in breaker_totals.items()],
+        fields, batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0011_panel_tree_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='circuitbreaker',
+            name='rollup_ampacity',
+            field=models.FloatField(default=0, editable=False, help_text='إجمالي الحمل على القاطع: أمبير الأحمال المباشرة + التيار المقنن للقواطع المغذاة (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='circuitbreaker',
+            name='rollup_load_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='عدد الأحمال المباشرة على القاطع (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='circuitbreaker',
+            name='rollup_power_consumption',
+            field=models.FloatField(default=0, editable=False, help_text='إجمالي استهلاك الأحمال المباشرة بالواط (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='rollup_ampacity',
+            field=models.FloatField(default=0, editable=False, help_text='إجمالي أمبير الأحمال في اللوحة ولوحاتها الفرعية (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='rollup_load_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='عدد الأحمال في اللوحة ولوحاتها الفرعية (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='rollup_power_consumption',
+            field=models.FloatField(default=0, editable=False, help_text='إجمالي استهلاك الأحمال بالواط في اللوحة ولوحاتها الفرعية (يحدث تلقائياً)'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0012_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NetworkRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.PositiveBigIntegerField(default=0, help_text='رقم المراجعة الحالي للشبكة')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, help_text='وقت آخر تعديل على الشبكة')),
+            ],
+            options={
+                'verbose_name': 'مراجعة الشبكة',
+                'verbose_name_plural': 'مراجعات الشبكة',
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:09
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def build_phase_rollups(apps, schema_editor):
+    """ضبط طور الأحمال الموجودة حسب جهدها وحساب تيارات الأطوار للوحات (مع لوحاتها الفرعية)"""
+    Panel = apps.get_model('network', 'Panel')
+    Load = apps.get_model('network', 'Load')
+    Load.objects.filter(voltage__in=['380', '11KV']).update(phase='3P')
+    Load.objects.exclude(voltage__in=['380', '11KV']).update(phase='L1')
+    fields = ['rollup_l1_ampacity', 'rollup_l2_ampacity', 'rollup_l3_ampacity']
+
+    paths = dict(Panel.objects.values_list('id', 'tree_path'))
+    panel_totals = defaultdict(lambda: [0, 0, 0])
+    rows = Load.objects.order_by().filter(panel__isnull=False).values('panel', 'phase').annotate(ampacity=Sum('ampacity'))
+    for row in rows:
+        ampacity = row['ampacity'] or 0
+        currents = [ampacity] * 3 if row['phase'] == '3P' else [ampacity if row['phase'] == name else 0 for name in ('L1', 'L2', 'L3')]
+        ancestors = [int(i) for i in (paths.get(row['panel']) or '').strip('/').split('/') if i] or [row['panel']]
+        for panel_id in ancestors:
+            for index, current in enumerate(currents):
+                panel_totals[panel_id][index] += current
+    Panel.objects.bulk_update(
+        [Panel(id=panel_id, **dict(zip(fields, totals))) for panel_id, totals in panel_totals.items()],
+        fields, batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0013_network_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='load',
+            name='phase',
+            field=models.CharField(blank=True, choices=[('L1', 'الطور L1'), ('L2', 'الطور L2'), ('L3', 'الطور L3'), ('3P', 'ثلاثي الطور')], default='', help_text='طور التوصيل (L1 أو L2 أو L3 أو ثلاثي الطور)، يضبط تلقائياً حسب الجهد إذا لم يحدد', max_length=2),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='rollup_l1_ampacity',
+            field=models.FloatField(default=0, editable=False, help_text='تيار الطور L1 من أحمال اللوحة ولوحاتها الفرعية (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='rollup_l2_ampacity',
+            field=models.FloatField(default=0, editable=False, help_text='تيار الطور L2 من أحمال اللوحة ولوحاتها الفرعية (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='rollup_l3_ampacity',
+            field=models.FloatField(default=0, editable=False, help_text='تيار الطور L3 من أحمال اللوحة ولوحاتها الفرعية (يحدث تلقائياً)'),
+        ),
+        migrations.RunPython(build_phase_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0014_load_phase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='اسم المنحنى', max_length=100)),
+                ('load_type', models.CharField(blank=True, choices=[('machine', 'آلة صناعية'), ('service_panel', 'لوحة خدمة'), ('outlet', 'بلاجة أو مخرج كهربائي'), ('lighting', 'إنارة'), ('fan', 'مراوح'), ('screen', 'شاشات'), ('exhaust', 'شفاطات هواء'), ('ac', 'تكييف'), ('heater', 'سخان'), ('refrigerator', 'ثلاجات وتبريد'), ('motor', 'محركات'), ('pump', 'مضخات'), ('other', 'أخرى')], help_text='نوع الأحمال التي يطبق عليها المنحنى (أو فارغ لمنحنى حمل واحد)', max_length=20, null=True, unique=True)),
+                ('resolution', models.PositiveIntegerField(choices=[(24, 'يومي (24 ساعة)'), (8760, 'سنوي (8760 ساعة)')], default=24, help_text='عدد القيم في المنحنى (24 أو 8760 ساعة)')),
+                ('data', models.BinaryField(help_text='قيم المنحنى كمصفوفة float32 ثنائية (little-endian)')),
+                ('load', models.OneToOneField(blank=True, help_text='الحمل الذي يخصه المنحنى (أو فارغ لمنحنى نوع حمل)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='profile', to='network.load')),
+            ],
+            options={
+                'verbose_name': 'منحنى تشغيل',
+                'verbose_name_plural': 'منحنيات التشغيل',
+            },
+        ),
+    ]
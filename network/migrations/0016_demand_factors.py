@@ -0,0 +1,74 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:18
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+# معاملات الطلب وقت إنشاء هذا الترحيل (نسخة ثابتة من Load.DEMAND_FACTORS)
+DEMAND_FACTORS = {
+    'machine': 0.75,
+    'service_panel': 1.0,
+    'outlet': 0.5,
+    'lighting': 1.0,
+    'fan': 0.8,
+    'screen': 0.7,
+    'exhaust': 0.8,
+    'ac': 0.9,
+    'heater': 0.75,
+    'refrigerator': 0.8,
+    'motor': 0.75,
+    'pump': 0.8,
+    'other': 1.0,
+}
+
+
+def build_demand_rollups(apps, schema_editor):
+    """حساب أمبير الطلب (بعد معامل الطلب لنوع كل حمل) للوحات مع لوحاتها الفرعية وللقواطع من أحمالها المباشرة"""
+    factors = {**DEMAND_FACTORS, **getattr(settings, 'NETWORK_DEMAND_FACTORS', {})}
+    Panel = apps.get_model('network', 'Panel')
+    CircuitBreaker = apps.get_model('network', 'CircuitBreaker')
+    Load = apps.get_model('network', 'Load')
+
+    paths = dict(Panel.objects.values_list('id', 'tree_path'))
+    panel_totals = defaultdict(float)
+    rows = Load.objects.order_by().filter(panel__isnull=False).values('panel', 'load_type').annotate(ampacity=Sum('ampacity'))
+    for row in rows:
+        demand = (row['ampacity'] or 0) * factors.get(row['load_type'], 1.0)
+        for panel_id in [int(i) for i in (paths.get(row['panel']) or '').strip('/').split('/') if i] or [row['panel']]:
+            panel_totals[panel_id] += demand
+    Panel.objects.bulk_update(
+        [Panel(id=panel_id, rollup_demand_ampacity=demand) for panel_id, demand in panel_totals.items()],
+        ['rollup_demand_ampacity'], batch_size=500
+    )
+
+    breaker_totals = defaultdict(float)
+    rows = Load.objects.order_by().filter(breaker__isnull=False).values('breaker', 'load_type').annotate(ampacity=Sum('ampacity'))
+    for row in rows:
+        breaker_totals[row['breaker']] += (row['ampacity'] or 0) * factors.get(row['load_type'], 1.0)
+    CircuitBreaker.objects.bulk_update(
+        [CircuitBreaker(id=breaker_id, rollup_demand_ampacity=demand) for breaker_id, demand in breaker_totals.items()],
+        ['rollup_demand_ampacity'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0015_load_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='circuitbreaker',
+            name='rollup_demand_ampacity',
+            field=models.FloatField(default=0, editable=False, help_text='طلب الأحمال المباشرة بالأمبير بعد معامل الطلب لكل نوع حمل (يحدث تلقائياً)'),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='rollup_demand_ampacity',
+            field=models.FloatField(default=0, editable=False, help_text='طلب أحمال اللوحة ولوحاتها الفرعية بالأمبير بعد معامل الطلب لكل نوع حمل (يحدث تلقائياً)'),
+        ),
+        migrations.RunPython(build_demand_rollups, migrations.RunPython.noop),
+    ]
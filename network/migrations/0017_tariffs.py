@@ -0,0 +1,57 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0016_demand_factors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tariff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='اسم التعرفة', max_length=100)),
+                ('source_type', models.CharField(blank=True, choices=[('Local Grid', 'الشبكة المحلية'), ('Generator', 'مولد')], help_text='نوع المصادر التي تطبق عليها التعرفة (أو فارغ لتعرفة مصدر واحد)', max_length=20, null=True, unique=True)),
+                ('base_price', models.FloatField(default=0.18, help_text='سعر الكيلو واط ساعة خارج فترات التعرفة الزمنية')),
+                ('power_source', models.OneToOneField(blank=True, help_text='المصدر الذي تخصه التعرفة (أو فارغ لتعرفة نوع مصدر)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tariff', to='network.powersource')),
+            ],
+            options={
+                'verbose_name': 'تعرفة طاقة',
+                'verbose_name_plural': 'تعرفات الطاقة',
+            },
+        ),
+        migrations.CreateModel(
+            name='TariffBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, default='', help_text='اسم الفترة (مثل الذروة)', max_length=50)),
+                ('start_hour', models.PositiveSmallIntegerField(help_text='ساعة بداية الفترة (0 إلى 23)')),
+                ('end_hour', models.PositiveSmallIntegerField(help_text='ساعة نهاية الفترة (1 إلى 24)')),
+                ('price', models.FloatField(help_text='سعر الكيلو واط ساعة خلال الفترة')),
+                ('tariff', models.ForeignKey(help_text='التعرفة', on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='network.tariff')),
+            ],
+            options={
+                'verbose_name': 'فترة تعرفة زمنية',
+                'verbose_name_plural': 'فترات التعرفة الزمنية',
+                'ordering': ['start_hour', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TariffTier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('up_to_kwh', models.FloatField(blank=True, help_text='الحد الأعلى للشريحة بالكيلو واط ساعة شهرياً (فارغ لآخر شريحة)', null=True)),
+                ('price', models.FloatField(help_text='سعر الكيلو واط ساعة في الشريحة')),
+                ('tariff', models.ForeignKey(help_text='التعرفة', on_delete=django.db.models.deletion.CASCADE, related_name='tiers', to='network.tariff')),
+            ],
+            options={
+                'verbose_name': 'شريحة تعرفة',
+                'verbose_name_plural': 'شرائح التعرفة',
+            },
+        ),
+    ]
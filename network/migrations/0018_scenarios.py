@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0017_tariffs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scenario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='اسم السيناريو', max_length=100, unique=True)),
+                ('description', models.TextField(blank=True, default='', help_text='وصف السيناريو')),
+                ('changes', models.JSONField(blank=True, default=list, help_text='قائمة التغييرات على الشبكة')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='وقت إنشاء السيناريو')),
+            ],
+            options={
+                'verbose_name': 'سيناريو',
+                'verbose_name_plural': 'السيناريوهات',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('network', '0018_scenarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='load',
+            name='priority',
+            field=models.CharField(choices=[('critical', 'حرج'), ('essential', 'أساسي'), ('normal', 'عادي'), ('deferrable', 'قابل للفصل')], default='normal', help_text='فئة أولوية الحمل عند التغذية من المولد', max_length=12),
+        ),
+        migrations.AddField(
+            model_name='panel',
+            name='backup_source',
+            field=models.ForeignKey(blank=True, help_text='المولد الاحتياطي للوحة (عبر مفتاح التحويل)', limit_choices_to={'source_type': 'Generator'}, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='backed_up_panels', to='network.powersource'),
+        ),
+    ]
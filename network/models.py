@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.db import models
 import math
 from django.core.exceptions import ValidationError
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
 
 # إنشاء فئة مساعدة لتخزين بيانات مقاطع الكابلات والمعاملات المشتركة
 class CableConstants:
@@ -155,8 +159,27 @@ class CableMixin:
         return base_capacity * path_factor * self.cable_quantity
 
 
+# ميكسن للنماذج التي تحتوي على حقول محسوبة تحدث باستعلامات UPDATE مباشرة (المسار المادي والإجماليات)
+class DerivedFieldsMixin:
+    DERIVED_FIELDS = ()
+    
+    def exclude_derived_fields(self, kwargs):
+        """
+        استبعاد الحقول المحسوبة من الحفظ العادي لكائن موجود
+        حتى لا يكتب كائن محمّل قبل آخر تحديث قيماً قديمة فوق القيم المخزنة
+        """
+        if self._state.adding or self.pk is None or kwargs.get('force_insert'):
+            return kwargs
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
+        return kwargs
+
+
 # تعديل نموذج CircuitBreaker ليدعم المتطلبات الجديدة
-class CircuitBreaker(models.Model):
+class CircuitBreaker(DerivedFieldsMixin, models.Model):
     """
     نموذج موحد للقواطع الكهربائية
     يمكن أن يكون قاطع رئيسي أو قاطع توزيع
@@ -253,49 +276,86 @@ class CircuitBreaker(models.Model):
         blank=True,
         help_text="القواطع التي تغذي هذا القاطع"
     )
+    
+    # إجماليات محسوبة تحدث تزايدياً عند تغير الأحمال أو علاقات التغذية (انظر services/rollups.py)
+    rollup_ampacity = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="إجمالي الحمل على القاطع: أمبير الأحمال المباشرة + التيار المقنن للقواطع المغذاة (يحدث تلقائياً)"
+    )
+    rollup_load_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="عدد الأحمال المباشرة على القاطع (يحدث تلقائياً)"
+    )
+    rollup_power_consumption = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="إجمالي استهلاك الأحمال المباشرة بالواط (يحدث تلقائياً)"
+    )
+    rollup_demand_ampacity = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="طلب الأحمال المباشرة بالأمبير بعد معامل الطلب لكل نوع حمل (يحدث تلقائياً)"
+    )
+    
+    DERIVED_FIELDS = ('rollup_ampacity', 'rollup_load_count', 'rollup_power_consumption', 'rollup_demand_ampacity')
 
     def __str__(self):
-        manufacturer_name = dict(self.MANUFACTURER_CHOICES).get(self.manufacturer, self.manufacturer)
-        role_name = dict(self.BREAKER_ROLE_CHOICES).get(self.breaker_role)
-        panel_name = f" - {self.panel.name}" if self.panel else ""
-        return f"{manufacturer_name} - {self.breaker_type} {self.rated_current}A {self.number_of_poles}P" + (f" - {self.name}" if self.name else "") + f"{panel_name} ({role_name})"
+        return self.format_label(
+            self.manufacturer, self.breaker_type, self.rated_current, self.number_of_poles,
+            self.name, self.panel.name if self.panel else None, self.breaker_role
+        )
+    
+    @classmethod
+    def format_label(cls, manufacturer, breaker_type, rated_current, number_of_poles, name, panel_name, breaker_role):
+        """
+        تنسيق الوصف النصي للقاطع من قيمه الخام
+        يستخدم في __str__ وفي المحركات التي تحمل بيانات القواطع دون إنشاء كائنات
+        """
+        manufacturer_name = dict(cls.MANUFACTURER_CHOICES).get(manufacturer, manufacturer)
+        role_name = dict(cls.BREAKER_ROLE_CHOICES).get(breaker_role)
+        panel_part = f" - {panel_name}" if panel_name else ""
+        return f"{manufacturer_name} - {breaker_type} {rated_current}A {number_of_poles}P" + (f" - {name}" if name else "") + f"{panel_part} ({role_name})"
     
     def get_full_path(self):
         """
         الحصول على المسار الكامل للقاطع من خلال تتبع القواطع المغذية
+        يستخدم رسم التغذية المحفوظ في الذاكرة لمراجعة الشبكة الحالية (انظر services/feed_graph.py)
+        ويحفظ الناتج في ذاكرة نموذج القراءة (انظر services/read_cache.py)
         """
-        path = [str(self)]
+        from .services import read_cache
+        from .services.feed_graph import get_feed_graph
         
-        # الحصول على القواطع المغذية بشكل متكرر
-        feeding_breakers = list(self.feeding_breakers.all())
-        visited = set([self.id])
+        def compute():
+            graph = get_feed_graph()
+            if self.id in graph:
+                return graph.full_path(self.id)
+            return str(self)
         
-        while feeding_breakers:
-            feeder = feeding_breakers.pop(0)
-            if feeder.id in visited:  # تجنب الدورات
-                continue
-                
-            visited.add(feeder.id)
-            path.insert(0, str(feeder))
-            
-            # إضافة المغذيات لهذا القاطع
-            for next_feeder in feeder.feeding_breakers.all():
-                if next_feeder.id not in visited:
-                    feeding_breakers.append(next_feeder)
-        
-        return " → ".join(path)
+        return read_cache.get_or_compute(read_cache.BREAKER, self.id, 'full_path', compute)
     
     def get_total_load(self):
         """
-        حساب إجمالي الحمل على هذا القاطع (مجموع الأحمال المباشرة والقواطع المغذاة)
+        إجمالي الحمل على هذا القاطع (مجموع الأحمال المباشرة والتيار المقنن للقواطع المغذاة)
+        يقرأ من الإجمالي المخزن الذي يحدث تزايدياً دون أي استعلام
         """
-        # حساب الأحمال المباشرة
-        direct_load = sum(load.ampacity for load in self.loads.all())
-        
-        # حساب أحمال القواطع المغذاة
-        fed_breakers_load = sum(breaker.rated_current for breaker in self.fed_breakers.all())
-        
-        return direct_load + fed_breakers_load
+        return self.rollup_ampacity
+    
+    def get_diversified_demand(self):
+        """
+        الطلب المُخفَّض على القاطع بالأمبير (بعد معاملات الطلب والتباين) بدلاً من جمع الأمبير الاسمي:
+        القاطع العمومي لمصدر أو الرئيسي للوحة يحمل طلبها كاملاً، والقاطع المغذي للوحة فرعية يحمل طلبها
+        إضافة إلى أحماله المباشرة. يقرأ من الإجماليات المخزنة (اللوحات المرتبطة تحمل مع القاطع في القوائم)
+        """
+        if hasattr(self, 'power_source'):
+            return self.power_source.get_diversified_demand()
+        if hasattr(self, 'panel_as_main'):
+            return self.panel_as_main.get_diversified_demand()
+        demand = self.rollup_demand_ampacity
+        if hasattr(self, 'fed_panel'):
+            demand += self.fed_panel.get_diversified_demand()
+        return demand
     
     def clean(self):
         """
@@ -312,18 +372,20 @@ class CircuitBreaker(models.Model):
         حفظ القاطع والتأكد من أن حالته متناسقة مع دوره
         """
         # التحقق من تناسق دور القاطع مع علاقاته
+        panel = None
         if self.breaker_role == 'main':
             # إذا كان قاطعًا رئيسيًا للوحة، يجب أن يكون مرتبطًا كقاطع رئيسي
             if hasattr(self, 'panel_as_main') or hasattr(self, 'power_source'):
                 pass  # القاطع مرتبط بشكل صحيح
-            elif self.panel:
-                # تعيين هذا القاطع كقاطع رئيسي للوحة المرتبطة
+            elif self.panel and not self.panel.main_breaker:
                 panel = self.panel
-                if not panel.main_breaker:
-                    panel.main_breaker = self
-                    panel.save(update_fields=['main_breaker'])
         
-        super().save(*args, **kwargs)
+        super().save(*args, **self.exclude_derived_fields(kwargs))
+        
+        # تعيين هذا القاطع كقاطع رئيسي للوحة المرتبطة بعد حفظه (القاطع الجديد يحتاج معرفاً أولاً)
+        if panel is not None:
+            panel.main_breaker = self
+            panel.save(update_fields=['main_breaker'])
     
     class Meta:
         ordering = ['position']
@@ -416,6 +478,10 @@ class PowerSource(models.Model, CableMixin):
     def __str__(self):
         return self.name
     
+    def get_diversified_demand(self):
+        """الطلب المُخفَّض على المصدر بالأمبير: مجموع طلب لوحاته الرئيسية (من اللوحات المحملة مسبقاً إن وجدت)"""
+        return sum(panel.get_diversified_demand() for panel in self.panels.all() if panel.parent_panel_id is None)
+    
     def save(self, *args, **kwargs):
         """
         حفظ نموذج مصدر الطاقة والتأكد من أن القاطع المرتبط به هو قاطع رئيسي
@@ -427,7 +493,7 @@ class PowerSource(models.Model, CableMixin):
 
 
 # تعديل نموذج Panel ليدعم الهيكلية الشجرية واللوحات الفرعية المتداخلة
-class Panel(models.Model, CableMixin):
+class Panel(DerivedFieldsMixin, models.Model, CableMixin):
     """
     نموذج موحد للوحات الكهربائية
     يدعم هيكلية شجرية حيث يمكن للوحة أن تحتوي على لوحات فرعية
@@ -506,6 +572,17 @@ class Panel(models.Model, CableMixin):
         help_text="القاطع العمومي للوحة"
     )
     
+    # مولد الاحتياط - مفتاح التحويل ينقل اللوحة وشجرتها الفرعية إليه عند انقطاع مصدرها
+    backup_source = models.ForeignKey(
+        PowerSource,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='backed_up_panels',
+        limit_choices_to={'source_type': 'Generator'},
+        help_text="المولد الاحتياطي للوحة (عبر مفتاح التحويل)"
+    )
+    
     voltage = models.CharField(
         max_length=10, 
         choices=VOLTAGE_CHOICES,
@@ -557,27 +634,168 @@ class Panel(models.Model, CableMixin):
         null=True
     )
     
+    # المسار المادي في الشجرة (Materialized Path) - يحدث تلقائياً عند الحفظ
+    # صيغته معرفات اللوحات من الجذر حتى اللوحة نفسها مثل "/1/5/12/"
+    tree_path = models.CharField(
+        max_length=255,
+        default='',
+        blank=True,
+        editable=False,
+        db_index=True,
+        help_text="مسار اللوحة في الشجرة من اللوحة الجذر (يحدث تلقائياً)"
+    )
+    tree_depth = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="عمق اللوحة في الشجرة، اللوحة الجذر عمقها صفر (يحدث تلقائياً)"
+    )
+    
+    # إجماليات الأحمال للوحة وجميع لوحاتها الفرعية - تحدث تزايدياً على سلسلة اللوحات الأم (انظر services/rollups.py)
+    rollup_ampacity = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="إجمالي أمبير الأحمال في اللوحة ولوحاتها الفرعية (يحدث تلقائياً)"
+    )
+    rollup_load_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="عدد الأحمال في اللوحة ولوحاتها الفرعية (يحدث تلقائياً)"
+    )
+    rollup_power_consumption = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="إجمالي استهلاك الأحمال بالواط في اللوحة ولوحاتها الفرعية (يحدث تلقائياً)"
+    )
+    rollup_l1_ampacity = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="تيار الطور L1 من أحمال اللوحة ولوحاتها الفرعية (يحدث تلقائياً)"
+    )
+    rollup_l2_ampacity = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="تيار الطور L2 من أحمال اللوحة ولوحاتها الفرعية (يحدث تلقائياً)"
+    )
+    rollup_l3_ampacity = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="تيار الطور L3 من أحمال اللوحة ولوحاتها الفرعية (يحدث تلقائياً)"
+    )
+    rollup_demand_ampacity = models.FloatField(
+        default=0,
+        editable=False,
+        help_text="طلب أحمال اللوحة ولوحاتها الفرعية بالأمبير بعد معامل الطلب لكل نوع حمل (يحدث تلقائياً)"
+    )
+    
+    DERIVED_FIELDS = (
+        'tree_path', 'tree_depth', 'rollup_ampacity', 'rollup_load_count', 'rollup_power_consumption',
+        'rollup_l1_ampacity', 'rollup_l2_ampacity', 'rollup_l3_ampacity', 'rollup_demand_ampacity',
+    )
+    
+    # معاملات التباين لكل مستوى في الشجرة (العمق 0 للوحات الرئيسية، والمستويات الأعمق تستخدم آخر قيمة)
+    # تطبق على طلب اللوحة عند القراءة، ويمكن تعديلها بالإعداد NETWORK_PANEL_DIVERSITY_FACTORS
+    DIVERSITY_FACTORS = (0.8, 0.9, 1.0)
+    
     def __str__(self):
         panel_type_name = dict(self.PANEL_TYPE_CHOICES).get(self.panel_type)
         parent_info = f" ← {self.parent_panel.name}" if self.parent_panel else ""
         return f"{self.name} ({panel_type_name}){parent_info}"
     
+    # ------------------- المسار المادي في الشجرة -------------------
+    
+    @staticmethod
+    def parse_tree_path(tree_path):
+        """تحويل المسار المادي "/1/5/12/" إلى قائمة معرفات [1, 5, 12]"""
+        return [int(panel_id) for panel_id in tree_path.strip('/').split('/') if panel_id]
+    
+    def get_ancestor_ids(self):
+        """معرفات اللوحات الأم من الجذر حتى الأم المباشرة دون أي استعلام"""
+        if self.tree_path:
+            return self.parse_tree_path(self.tree_path)[:-1]
+        # لوحة غير محفوظة بعد: مسارها هو مسار اللوحة الأم
+        if self.parent_panel_id:
+            return self.parent_panel.get_ancestor_ids() + [self.parent_panel_id]
+        return []
+    
+    def get_ancestors(self):
+        """جميع اللوحات الأم مرتبة من الجذر في استعلام واحد"""
+        return Panel.objects.filter(id__in=self.get_ancestor_ids()).order_by('tree_depth')
+    
+    def get_descendants(self):
+        """جميع اللوحات الفرعية المباشرة وغير المباشرة في استعلام واحد"""
+        if not self.tree_path:
+            return Panel.objects.none()
+        return Panel.objects.filter(tree_path__startswith=self.tree_path).exclude(id=self.id)
+    
+    def is_descendant_of(self, other):
+        """هل هذه اللوحة تقع تحت اللوحة other في الشجرة (دون أي استعلام)"""
+        if not other.id or self.id == other.id:
+            return False
+        return other.id in self.get_ancestor_ids()
+    
+    @classmethod
+    def rebuild_tree_paths(cls):
+        """
+        إعادة بناء المسارات المادية لجميع اللوحات من علاقة parent_panel
+        تستخدم في الترحيل ولإصلاح البيانات بعد تعديلها خارج النموذج (مثل QuerySet.update)
+        
+        Returns:
+            int: عدد اللوحات التي تم تصحيح مسارها
+        """
+        rows = list(cls.objects.values_list('id', 'parent_panel_id', 'tree_path', 'tree_depth'))
+        children = {}
+        for panel_id, parent_id, _, _ in rows:
+            children.setdefault(parent_id, []).append(panel_id)
+        
+        expected = {}
+        stack = [(panel_id, '/', 0) for panel_id in children.get(None, [])]
+        while stack:
+            panel_id, prefix, depth = stack.pop()
+            if panel_id in expected:
+                continue
+            path = f"{prefix}{panel_id}/"
+            expected[panel_id] = (path, depth)
+            stack.extend((child_id, path, depth + 1) for child_id in children.get(panel_id, []))
+        
+        changed = [
+            cls(id=panel_id, tree_path=expected[panel_id][0], tree_depth=expected[panel_id][1])
+            for panel_id, _, tree_path, tree_depth in rows
+            if panel_id in expected and expected[panel_id] != (tree_path, tree_depth)
+        ]
+        cls.objects.bulk_update(changed, ['tree_path', 'tree_depth'], batch_size=500)
+        return len(changed)
+    
     def get_full_path(self):
         """
-        الحصول على المسار الكامل للوحة من خلال تتبع اللوحات الأم
+        الحصول على المسار الكامل للوحة من خلال المسار المادي (استعلام واحد لجميع اللوحات الأم)
+        ويحفظ الناتج في ذاكرة نموذج القراءة (انظر services/read_cache.py)
         """
-        path = [self.name]
-        current_panel = self
+        from .services import read_cache
         
-        while current_panel.parent_panel:
-            current_panel = current_panel.parent_panel
-            path.insert(0, current_panel.name)
+        def compute():
+            ancestor_ids = self.get_ancestor_ids()
+            ancestors = list(self.get_ancestors().select_related('power_source')) if ancestor_ids else []
+            path = [panel.name for panel in ancestors] + [self.name]
+            root = ancestors[0] if ancestors else self
             
-        # إذا كانت لوحة رئيسية، أضف مصدر الطاقة
-        if current_panel.power_source:
-            path.insert(0, current_panel.power_source.name)
+            # إذا كانت لوحة رئيسية، أضف مصدر الطاقة
+            if root.power_source:
+                path.insert(0, root.power_source.name)
             
-        return " → ".join(path)
+            return " → ".join(path)
+        
+        return read_cache.get_or_compute(read_cache.PANEL, self.id, 'full_path', compute)
+    
+    def get_cumulative_voltage_drop(self):
+        """
+        هبوط الجهد التراكمي من كابل مصدر الطاقة عبر كابلات اللوحات الأم حتى نهاية كابل هذه اللوحة
+        يقرأ من تحليل الكابلات المجمع للمراجعة الحالية للشبكة (انظر services/cable_analysis.py)
+        
+        Returns:
+            dict: {'voltage_drop': فولت, 'voltage_drop_percentage': نسبة مئوية} أو None للوحة غير محفوظة
+        """
+        from .services.cable_analysis import analyze_cables
+        return analyze_cables().cumulative_for('panel', self.id)
     
     def get_all_child_panels(self, include_indirect=True):
         """
@@ -589,38 +807,73 @@ class Panel(models.Model, CableMixin):
         Returns:
             list: قائمة باللوحات الفرعية
         """
-        direct_children = list(self.child_panels.all())
-        
         if not include_indirect:
-            return direct_children
-            
-        all_children = direct_children.copy()
-        for child in direct_children:
-            all_children.extend(child.get_all_child_panels())
-            
-        return all_children
+            return list(self.child_panels.all())
+        
+        # جلب جميع الأحفاد في استعلام واحد ثم ترتيبهم بنفس ترتيب التتبع التكراري السابق:
+        # الأبناء المباشرون أولاً ثم أحفاد كل ابن بالتتابع
+        children = {}
+        for panel in self.get_descendants():
+            children.setdefault(panel.parent_panel_id, []).append(panel)
+        
+        def collect(parent_id):
+            direct_children = children.get(parent_id, [])
+            all_children = direct_children.copy()
+            for child in direct_children:
+                all_children.extend(collect(child.id))
+            return all_children
+        
+        return collect(self.id)
     
     def get_total_loads(self):
         """
-        حساب إجمالي الأحمال المرتبطة باللوحة وبجميع لوحاتها الفرعية
+        إجمالي الأحمال المرتبطة باللوحة وبجميع لوحاتها الفرعية
+        يقرأ من الإجماليات المخزنة التي تحدث تزايدياً دون أي استعلام
         
         Returns:
             tuple: (إجمالي الأمبير, عدد الأحمال)
         """
-        # حساب الأحمال المباشرة
-        direct_load = sum(load.ampacity for load in self.loads.all())
-        direct_count = self.loads.count()
-        
-        # حساب أحمال اللوحات الفرعية
-        child_load = 0
-        child_count = 0
-        
-        for child_panel in self.child_panels.all():
-            cl, cc = child_panel.get_total_loads()
-            child_load += cl
-            child_count += cc
-            
-        return (direct_load + child_load, direct_count + child_count)
+        return (self.rollup_ampacity, self.rollup_load_count)
+    
+    def get_utilization_percentage(self):
+        """نسبة استخدام اللوحة: إجمالي أمبير الأحمال إلى أمبير اللوحة"""
+        return (self.rollup_ampacity / self.ampacity * 100) if self.ampacity else 0
+    
+    @classmethod
+    def diversity_factor(cls, depth):
+        """معامل التباين لمستوى في الشجرة (من الإعداد NETWORK_PANEL_DIVERSITY_FACTORS أو القيم الافتراضية)"""
+        factors = getattr(settings, 'NETWORK_PANEL_DIVERSITY_FACTORS', cls.DIVERSITY_FACTORS)
+        return factors[min(depth, len(factors) - 1)] if factors else 1.0
+    
+    def get_diversified_demand(self):
+        """
+        الطلب المُخفَّض للوحة ولوحاتها الفرعية بالأمبير: مجموع أمبير الأحمال بعد معامل الطلب لنوع كل حمل
+        مضروباً بمعامل التباين لمستوى اللوحة. يقرأ من الإجمالي المخزن دون أي استعلام
+        """
+        return self.rollup_demand_ampacity * Panel.diversity_factor(self.tree_depth)
+    
+    def get_coincident_demand(self):
+        """
+        أقصى طلب متزامن للوحة ولوحاتها الفرعية من منحنيات التشغيل (بدلاً من جمع القدرات الاسمية)
+        Returns:
+            dict: مؤشرات الطلب (انظر services/demand.py) أو None للوحة غير محفوظة
+        """
+        from .services.demand import study_demand
+        rows = study_demand().rows(kinds=['panel'], ids=[self.id])
+        return rows[0] if rows else None
+    
+    def get_phase_currents(self):
+        """تيارات الأطوار الثلاثة للوحة ولوحاتها الفرعية من الإجماليات المخزنة (L1, L2, L3)"""
+        return (self.rollup_l1_ampacity, self.rollup_l2_ampacity, self.rollup_l3_ampacity)
+    
+    def get_phase_imbalance(self):
+        """نسبة عدم التوازن بين الأطوار: أكبر انحراف عن متوسط التيار إلى المتوسط (%)"""
+        return Panel.phase_imbalance(self.get_phase_currents())
+    
+    @staticmethod
+    def phase_imbalance(currents):
+        average = sum(currents) / 3
+        return max(abs(current - average) for current in currents) / average * 100 if average else 0
     
     def clean(self):
         """
@@ -634,12 +887,8 @@ class Panel(models.Model, CableMixin):
                 
             # التحقق من أن اللوحة الأم ليست فرعية من هذه اللوحة
             # فقط إذا كانت اللوحة مخزنة مسبقاً (لها معرف)
-            if self.id:
-                parent = self.parent_panel
-                while parent:
-                    if parent.parent_panel and parent.parent_panel.id == self.id:
-                        raise ValidationError("يوجد دورة في هيكل اللوحات: اللوحة الأم هي أيضًا لوحة فرعية من هذه اللوحة")
-                    parent = parent.parent_panel
+            if self.id and self.parent_panel.is_descendant_of(self):
+                raise ValidationError("يوجد دورة في هيكل اللوحات: اللوحة الأم هي أيضًا لوحة فرعية من هذه اللوحة")
                 
         # التحقق من تناسق نوع اللوحة مع علاقاتها
         if self.panel_type == 'main':
@@ -659,6 +908,10 @@ class Panel(models.Model, CableMixin):
         # فقط إذا كانت اللوحة مخزنة مسبقاً (لها معرف)
         if self.id and self.panel_type == 'sub' and self.child_panels.exists():
             raise ValidationError({"panel_type": "اللوحة الفرعية العادية لا يمكن أن تحتوي على لوحات فرعية. يجب تغيير نوعها إلى 'لوحة رئيسية فرعية'"})
+        
+        # مفتاح التحويل ينقل اللوحة إلى مولد فقط
+        if self.backup_source and self.backup_source.source_type != 'Generator':
+            raise ValidationError({"backup_source": "المصدر الاحتياطي يجب أن يكون مولداً"})
     
     def save(self, *args, **kwargs):
         """
@@ -688,7 +941,44 @@ class Panel(models.Model, CableMixin):
             elif self.parent_panel:
                 self.voltage = self.parent_panel.voltage
         
-        super().save(*args, **kwargs)
+        super().save(*args, **self.exclude_derived_fields(kwargs))
+        self.update_tree_path()
+    
+    def update_tree_path(self):
+        """
+        تحديث المسار المادي للوحة بعد الحفظ انطلاقاً من مسار اللوحة الأم
+        عند نقل اللوحة إلى لوحة أم أخرى تحدث مسارات جميع أحفادها في استعلام واحد
+        (عند الحذف تُحذف اللوحات الفرعية تلقائياً بسبب CASCADE فلا حاجة لتحديث)
+        """
+        # قراءة المسار المخزن للوحة وللوحة الأم من قاعدة البيانات لا من الذاكرة
+        # لأن الكائن في الذاكرة قد يحمل مساراً قديماً إذا نُقلت إحدى لوحاته الأم بعد تحميله
+        stored = {
+            panel_id: (tree_path, tree_depth)
+            for panel_id, tree_path, tree_depth in Panel.objects.filter(
+                id__in=[self.id, self.parent_panel_id]
+            ).values_list('id', 'tree_path', 'tree_depth')
+        }
+        old_path, old_depth = stored.get(self.id, ('', 0))
+        if self.parent_panel_id:
+            parent_path, parent_depth = stored.get(self.parent_panel_id, ('/', -1))
+            new_path, new_depth = f"{parent_path or '/'}{self.id}/", parent_depth + 1
+        else:
+            new_path, new_depth = f"/{self.id}/", 0
+        
+        self.tree_path = new_path
+        self.tree_depth = new_depth
+        if (old_path, old_depth) == (new_path, new_depth):
+            return
+        
+        Panel.objects.filter(id=self.id).update(tree_path=new_path, tree_depth=new_depth)
+        if old_path:
+            Panel.objects.filter(tree_path__startswith=old_path).exclude(id=self.id).update(
+                tree_path=Concat(Value(new_path), Substr('tree_path', len(old_path) + 1)),
+                tree_depth=F('tree_depth') + (new_depth - old_depth),
+            )
+            # نقل إجماليات أحمال الشجرة الفرعية من سلسلة اللوحات الأم القديمة إلى الجديدة
+            from .services.rollups import move_panel_rollups
+            move_panel_rollups(self.id, self.parse_tree_path(old_path)[:-1], self.parse_tree_path(new_path)[:-1])
     
     class Meta:
         ordering = ['name']
@@ -721,6 +1011,23 @@ class Load(models.Model, CableMixin):
         ('tray', 'في مجاري كابلات'),
     ]
     
+    PHASE_CHOICES = [
+        ('L1', 'الطور L1'),
+        ('L2', 'الطور L2'),
+        ('L3', 'الطور L3'),
+        ('3P', 'ثلاثي الطور'),
+    ]
+    SINGLE_PHASES = ('L1', 'L2', 'L3')
+    THREE_PHASE = '3P'
+    
+    # فئات أولوية الأحمال عند التغذية من المولد، من الأعلى إلى الأدنى (تفصل الفئات الأدنى أولاً)
+    PRIORITY_CHOICES = [
+        ('critical', 'حرج'),
+        ('essential', 'أساسي'),
+        ('normal', 'عادي'),
+        ('deferrable', 'قابل للفصل'),
+    ]
+    
     # إضافة خيارات تصنيف الأحمال
     LOAD_TYPE_CHOICES = [
         ('machine', 'آلة صناعية'),
@@ -738,6 +1045,28 @@ class Load(models.Model, CableMixin):
         ('other', 'أخرى'),
     ]
     
+    # معاملات الطلب لكل نوع حمل (نسبة أقصى طلب فعلي إلى الحمل المتصل)
+    # يمكن تعديلها بالإعداد NETWORK_DEMAND_FACTORS ثم إعادة بناء الإجماليات بالأمر rebuild_rollups
+    DEMAND_FACTORS = {
+        'machine': 0.75,
+        'service_panel': 1.0,
+        'outlet': 0.5,
+        'lighting': 1.0,
+        'fan': 0.8,
+        'screen': 0.7,
+        'exhaust': 0.8,
+        'ac': 0.9,
+        'heater': 0.75,
+        'refrigerator': 0.8,
+        'motor': 0.75,
+        'pump': 0.8,
+        'other': 1.0,
+    }
+    
+    # سعر الكيلو واط ساعة الافتراضي وعدد أيام الشهر في تقدير التكلفة الشهرية
+    DEFAULT_PRICE_PER_KWH = 0.18
+    DAYS_PER_MONTH = 30
+    
     name = models.CharField(max_length=100, unique=True, help_text="اسم الحمل")
     
     # إضافة حقل تصنيف الحمل
@@ -798,6 +1127,19 @@ class Load(models.Model, CableMixin):
         default='220'
     )
     ampacity = models.FloatField(help_text="الأمبير الكلي", default=0)
+    phase = models.CharField(
+        max_length=2,
+        choices=PHASE_CHOICES,
+        help_text="طور التوصيل (L1 أو L2 أو L3 أو ثلاثي الطور)، يضبط تلقائياً حسب الجهد إذا لم يحدد",
+        blank=True,
+        default=''
+    )
+    priority = models.CharField(
+        max_length=12,
+        choices=PRIORITY_CHOICES,
+        help_text="فئة أولوية الحمل عند التغذية من المولد",
+        default='normal'
+    )
     
     # بيانات الكابلات المغذية - حقول منفصلة
     cable_quantity = models.PositiveIntegerField(help_text="عدد الكابلات", default=1)
@@ -846,6 +1188,22 @@ class Load(models.Model, CableMixin):
                 
         return ' → '.join(path)
     
+    def get_cumulative_voltage_drop(self):
+        """
+        هبوط الجهد التراكمي من كابل مصدر الطاقة عبر كابلات جميع اللوحات في المسار حتى نهاية كابل الحمل
+        يقرأ من تحليل الكابلات المجمع للمراجعة الحالية للشبكة (انظر services/cable_analysis.py)
+        
+        Returns:
+            dict: {'voltage_drop': فولت, 'voltage_drop_percentage': نسبة مئوية} أو None لحمل غير محفوظ
+        """
+        from .services.cable_analysis import analyze_cables
+        return analyze_cables().cumulative_for('load', self.id)
+    
+    @classmethod
+    def demand_factors(cls):
+        """معاملات الطلب لجميع الأنواع (القيم الافتراضية مع ما يعدله الإعداد NETWORK_DEMAND_FACTORS)"""
+        return {**cls.DEMAND_FACTORS, **getattr(settings, 'NETWORK_DEMAND_FACTORS', {})}
+    
     def calculate_daily_consumption(self):
         """حساب الاستهلاك اليومي للحمل بالكيلو واط ساعة"""
         watts = self.power_consumption if self.power_consumption > 0 else (self.voltage_value() * self.ampacity)
@@ -859,10 +1217,13 @@ class Load(models.Model, CableMixin):
         else:
             return float(self.voltage)
     
-    def calculate_monthly_cost(self, price_per_kwh=0.18):
-        """حساب التكلفة الشهرية التقديرية للحمل"""
+    def calculate_monthly_cost(self, price_per_kwh=DEFAULT_PRICE_PER_KWH):
+        """
+        حساب التكلفة الشهرية التقديرية للحمل بسعر ثابت
+        (للتقارير المجمعة انظر services/energy.py، وللتكلفة حسب التعرفة services/tariffs.py)
+        """
         daily_kwh = self.calculate_daily_consumption()
-        monthly_kwh = daily_kwh * 30  # تقريبًا
+        monthly_kwh = daily_kwh * self.DAYS_PER_MONTH  # تقريبًا
         return monthly_kwh * price_per_kwh
 
     def __str__(self):
@@ -876,6 +1237,10 @@ class Load(models.Model, CableMixin):
         # الحصول على الجهد من اللوحة إذا لم يتم تحديده
         if not self.voltage and self.panel:
             self.voltage = self.panel.voltage
+        
+        # الطور الافتراضي: ثلاثي الطور لأحمال 380 فولت و 11 ك.ف و L1 لغيرها
+        if not self.phase:
+            self.phase = self.THREE_PHASE if self.voltage in ('380', '11KV') else 'L1'
             
         # التأكد أن القاطع المحدد ينتمي للوحة المحددة أو ضبط اللوحة تلقائياً
         if self.breaker and self.panel:
@@ -900,3 +1265,206 @@ class Load(models.Model, CableMixin):
     class Meta:
         verbose_name = "حمل كهربائي"
         verbose_name_plural = "الأحمال الكهربائية"
+
+
+class LoadProfile(models.Model):
+    """
+    منحنى تشغيل يومي (24 ساعة) أو سنوي (8760 ساعة) لحمل واحد أو لجميع أحمال نوع معين
+    القيم نسبة من استهلاك الحمل (power_consumption) لكل ساعة، من 0 إلى 1 عادةً
+    تخزن كمصفوفة float32 ثنائية واحدة (4 بايت لكل ساعة) بدلاً من سجل لكل ساعة
+    منحنى الحمل نفسه يسبق منحنى نوعه، والأحمال بدون منحنى تستخدم ساعات التشغيل المقدرة (estimated_usage_hours)
+    """
+    DAILY = 24
+    ANNUAL = 8760
+    RESOLUTION_CHOICES = [
+        (DAILY, 'يومي (24 ساعة)'),
+        (ANNUAL, 'سنوي (8760 ساعة)'),
+    ]
+    DTYPE = '<f4'
+    
+    name = models.CharField(max_length=100, help_text="اسم المنحنى")
+    load = models.OneToOneField(
+        Load,
+        on_delete=models.CASCADE,
+        related_name='profile',
+        null=True,
+        blank=True,
+        help_text="الحمل الذي يخصه المنحنى (أو فارغ لمنحنى نوع حمل)"
+    )
+    load_type = models.CharField(
+        max_length=20,
+        choices=Load.LOAD_TYPE_CHOICES,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="نوع الأحمال التي يطبق عليها المنحنى (أو فارغ لمنحنى حمل واحد)"
+    )
+    resolution = models.PositiveIntegerField(
+        choices=RESOLUTION_CHOICES,
+        default=DAILY,
+        help_text="عدد القيم في المنحنى (24 أو 8760 ساعة)"
+    )
+    data = models.BinaryField(help_text="قيم المنحنى كمصفوفة float32 ثنائية (little-endian)")
+    
+    def __str__(self):
+        return self.name
+    
+    @property
+    def values(self):
+        """قيم المنحنى كمصفوفة NumPy من نوع float32 (بدون نسخ)"""
+        import numpy as np
+        return np.frombuffer(bytes(self.data), dtype=self.DTYPE)
+    
+    @values.setter
+    def values(self, values):
+        import numpy as np
+        array = np.asarray(values, dtype=self.DTYPE)
+        self.resolution = len(array)
+        self.data = array.tobytes()
+    
+    def clean(self):
+        """التحقق من ارتباط المنحنى بحمل أو بنوع حمل (واحد فقط) ومن طول القيم"""
+        if bool(self.load_id) == bool(self.load_type):
+            raise ValidationError("يجب ربط المنحنى بحمل واحد أو بنوع حمل واحد")
+        if self.resolution not in (self.DAILY, self.ANNUAL):
+            raise ValidationError("عدد قيم المنحنى يجب أن يكون 24 أو 8760")
+        if len(bytes(self.data or b'')) != self.resolution * 4:
+            raise ValidationError("عدد قيم المنحنى لا يطابق دقته")
+    
+    class Meta:
+        verbose_name = "منحنى تشغيل"
+        verbose_name_plural = "منحنيات التشغيل"
+
+
+class Tariff(models.Model):
+    """
+    تعرفة الطاقة لمصدر واحد أو لجميع مصادر نوع معين (مثل تكلفة وقود المولد مقابل سعر الشبكة المحلية)
+    السعر لكل ساعة من فترات التعرفة الزمنية (bands) أو السعر الأساسي خارجها،
+    وإذا كانت للتعرفة شرائح (tiers) تسعّر طاقة المصدر الشهرية بالشرائح بدلاً من ذلك
+    تعرفة المصدر نفسه تسبق تعرفة نوعه، والمصادر بدون تعرفة تستخدم Load.DEFAULT_PRICE_PER_KWH
+    """
+    name = models.CharField(max_length=100, help_text="اسم التعرفة")
+    power_source = models.OneToOneField(
+        PowerSource,
+        on_delete=models.CASCADE,
+        related_name='tariff',
+        null=True,
+        blank=True,
+        help_text="المصدر الذي تخصه التعرفة (أو فارغ لتعرفة نوع مصدر)"
+    )
+    source_type = models.CharField(
+        max_length=20,
+        choices=PowerSource.SOURCE_TYPE_CHOICES,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="نوع المصادر التي تطبق عليها التعرفة (أو فارغ لتعرفة مصدر واحد)"
+    )
+    base_price = models.FloatField(
+        default=Load.DEFAULT_PRICE_PER_KWH,
+        help_text="سعر الكيلو واط ساعة خارج فترات التعرفة الزمنية"
+    )
+    
+    def __str__(self):
+        return self.name
+    
+    def clean(self):
+        """التحقق من ارتباط التعرفة بمصدر أو بنوع مصدر (واحد فقط)"""
+        if bool(self.power_source_id) == bool(self.source_type):
+            raise ValidationError("يجب ربط التعرفة بمصدر واحد أو بنوع مصدر واحد")
+    
+    class Meta:
+        verbose_name = "تعرفة طاقة"
+        verbose_name_plural = "تعرفات الطاقة"
+
+
+class TariffBand(models.Model):
+    """
+    فترة تعرفة زمنية يومية (Time-of-use): سعر الكيلو واط ساعة من ساعة البداية حتى ساعة النهاية
+    الفترة التي تنتهي قبل بدايتها تمتد عبر منتصف الليل (مثل 22 إلى 6)، والفترات اللاحقة تغطي السابقة عند التداخل
+    """
+    tariff = models.ForeignKey(Tariff, on_delete=models.CASCADE, related_name='bands', help_text="التعرفة")
+    name = models.CharField(max_length=50, blank=True, default='', help_text="اسم الفترة (مثل الذروة)")
+    start_hour = models.PositiveSmallIntegerField(help_text="ساعة بداية الفترة (0 إلى 23)")
+    end_hour = models.PositiveSmallIntegerField(help_text="ساعة نهاية الفترة (1 إلى 24)")
+    price = models.FloatField(help_text="سعر الكيلو واط ساعة خلال الفترة")
+    
+    def clean(self):
+        if not 0 <= self.start_hour <= 23 or not 1 <= self.end_hour <= 24:
+            raise ValidationError("ساعة البداية من 0 إلى 23 وساعة النهاية من 1 إلى 24")
+    
+    class Meta:
+        ordering = ['start_hour', 'id']
+        verbose_name = "فترة تعرفة زمنية"
+        verbose_name_plural = "فترات التعرفة الزمنية"
+
+
+class TariffTier(models.Model):
+    """
+    شريحة استهلاك شهرية: سعر الكيلو واط ساعة للطاقة حتى up_to_kwh (والشريحة بدون حد تشمل الباقي)
+    """
+    tariff = models.ForeignKey(Tariff, on_delete=models.CASCADE, related_name='tiers', help_text="التعرفة")
+    up_to_kwh = models.FloatField(null=True, blank=True, help_text="الحد الأعلى للشريحة بالكيلو واط ساعة شهرياً (فارغ لآخر شريحة)")
+    price = models.FloatField(help_text="سعر الكيلو واط ساعة في الشريحة")
+    
+    class Meta:
+        verbose_name = "شريحة تعرفة"
+        verbose_name_plural = "شرائح التعرفة"
+
+
+class Scenario(models.Model):
+    """
+    سيناريو "ماذا لو": قائمة تغييرات مضغوطة فوق الشبكة الحية (إضافة أو حذف أو تعديل كائنات ومعاملات كابلاتها)
+    يقيم في الذاكرة دون أي كتابة في جداول الشبكة (انظر services/scenarios.py لصيغة التغييرات)
+    """
+    name = models.CharField(max_length=100, unique=True, help_text="اسم السيناريو")
+    description = models.TextField(blank=True, default='', help_text="وصف السيناريو")
+    changes = models.JSONField(default=list, blank=True, help_text="قائمة التغييرات على الشبكة")
+    created_at = models.DateTimeField(default=timezone.now, help_text="وقت إنشاء السيناريو")
+    
+    def __str__(self):
+        return self.name
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name = "سيناريو"
+        verbose_name_plural = "السيناريوهات"
+
+
+class NetworkRevision(models.Model):
+    """
+    رقم مراجعة الشبكة: سجل واحد يزداد رقمه مع كل إنشاء أو تعديل أو حذف للمصادر أو اللوحات أو القواطع أو الأحمال
+    وعند تغيير علاقات التغذية بين القواطع (انظر signals.py)
+    يستخدم كمفتاح لذاكرة المحركات المؤقتة التي تحمل الشبكة كاملة في الذاكرة
+    """
+    SINGLETON_ID = 1
+    
+    revision = models.PositiveBigIntegerField(default=0, help_text="رقم المراجعة الحالي للشبكة")
+    updated_at = models.DateTimeField(default=timezone.now, help_text="وقت آخر تعديل على الشبكة")
+    
+    def __str__(self):
+        return f"مراجعة الشبكة {self.revision}"
+    
+    @classmethod
+    def bump(cls):
+        """زيادة رقم المراجعة باستعلام UPDATE واحد (وإنشاء السجل عند أول تعديل)"""
+        now = timezone.now()
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(revision=F('revision') + 1, updated_at=now)
+        if not updated:
+            revision, created = cls.objects.get_or_create(
+                pk=cls.SINGLETON_ID, defaults={'revision': 1, 'updated_at': now}
+            )
+            if not created:
+                cls.objects.filter(pk=cls.SINGLETON_ID).update(revision=F('revision') + 1, updated_at=now)
+    
+    @classmethod
+    def current(cls):
+        """
+        Returns:
+            tuple: (رقم المراجعة, وقت آخر تعديل أو None إذا لم تعدل الشبكة بعد)
+        """
+        return cls.objects.filter(pk=cls.SINGLETON_ID).values_list('revision', 'updated_at').first() or (0, None)
+    
+    class Meta:
+        verbose_name = "مراجعة الشبكة"
+        verbose_name_plural = "مراجعات الشبكة"
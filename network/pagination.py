@@ -0,0 +1,152 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - ترقيم الصفحات (Pagination)
+ترقيم صفحات بالمؤشر (Keyset / Cursor) بترتيب ثابت على عدة حقول
+تكلفة كل صفحة لا تزيد مع التقدم في الصفحات لأن الاستعلام يبدأ من آخر مفتاح بدلاً من OFFSET
+"""
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    ترقيم صفحات بالمؤشر على مفتاح مركب (مثل position ثم id)
+    المؤشر يحمل قيم مفتاح آخر صف في الصفحة واتجاه التصفح، ويُرمَّز بـ base64
+    يجب أن ينتهي الترتيب بحقل فريد (id) حتى يكون الترتيب ثابتاً
+    """
+    ordering = ('id',)
+    page_size = 100
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'المؤشر غير صالح'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        key, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = [f'-{field}' if reverse else field for field in self.ordering]
+        queryset = queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self.key_filter(key, reverse))
+
+        # جلب صف إضافي لمعرفة ما إذا كانت هناك صفحة تالية في نفس الاتجاه
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else key is not None
+        self.has_previous = key is not None if not reverse else has_more
+        self.first_key = self.row_key(rows[0]) if rows else None
+        self.last_key = self.row_key(rows[-1]) if rows else None
+        # صفحة فارغة بعد مؤشر: نبقي رابط الرجوع إلى المؤشر نفسه
+        if not rows and key is not None:
+            self.first_key = self.last_key = key
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def key_filter(self, key, reverse):
+        """
+        بناء شرط المقارنة المركبة (a, b) > (x, y) بصيغة يفهمها ORM:
+        a > x OR (a = x AND b > y)
+        """
+        lookup = 'lt' if reverse else 'gt'
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            branch = Q(**{f'{field}__{lookup}': key[index]})
+            for previous_field, previous_value in zip(self.ordering[:index], key[:index]):
+                branch &= Q(**{previous_field: previous_value})
+            condition |= branch
+        return condition
+
+    def row_key(self, row):
+        return [getattr(row, field) for field in self.ordering]
+
+    def decode_cursor(self, request, model=None):
+        """
+        قيم المفتاح تحول إلى نوع حقولها (to_python) حتى يكون المؤشر المعدل يدوياً 404 وليس خطأ في الاستعلام
+
+        Returns:
+            tuple: (قيم المفتاح أو None للصفحة الأولى, هل التصفح للخلف)
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            key = data['k']
+            reverse = bool(data.get('r', False))
+            if not isinstance(key, list) or len(key) != len(self.ordering):
+                raise ValueError
+            if model is not None:
+                key = [model._meta.get_field(field).to_python(value) for field, value in zip(self.ordering, key)]
+            if any(value is None for value in key):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return key, reverse
+
+    def encode_cursor(self, key, reverse):
+        data = json.dumps({'k': key, 'r': reverse} if reverse else {'k': key})
+        encoded = base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_key is None:
+            return None
+        return self.encode_cursor(self.last_key, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_key is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.first_key, True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class LoadPagination(KeysetPagination):
+    """ترقيم صفحات الأحمال حسب المعرف"""
+    ordering = ('id',)
+
+
+class CircuitBreakerPagination(KeysetPagination):
+    """ترقيم صفحات القواطع حسب موقعها في اللوحة ثم المعرف (نفس ترتيب النموذج الافتراضي)"""
+    ordering = ('position', 'id')
@@ -6,14 +6,84 @@
 
 # استيراد مكتبة serializers من Django REST framework لإنشاء فئات المُسلسلات
 from rest_framework import serializers
+from django.db.models import Prefetch
 
 # استيراد النماذج المختلفة من ملف models.py
 from .models import (
     PowerSource,        # نموذج مصادر الطاقة (الشبكة المحلية، المولدات)
     Panel,              # نموذج موحد للوحات الكهربائية (رئيسية، رئيسية فرعية، فرعية)
     Load,               # نموذج الأحمال الكهربائية
-    CircuitBreaker      # نموذج قواطع الدارة الكهربائية
+    CircuitBreaker,     # نموذج قواطع الدارة الكهربائية
+    LoadProfile,        # نموذج منحنيات التشغيل للأحمال وأنواعها
+    Tariff,             # نموذج تعرفات الطاقة للمصادر وأنواعها
+    TariffBand,         # نموذج فترات التعرفة الزمنية
+    TariffTier,         # نموذج شرائح التعرفة
+    Scenario,           # نموذج سيناريوهات "ماذا لو"
+    NetworkRevision     # رقم مراجعة الشبكة
 )
+from .services import read_cache
+from .services.feed_graph import get_feed_graph
+from .services.scenarios import ScenarioError, build_view
+from .services.tariffs import study_costs
+
+def parse_field_list(value):
+    """تحويل قيمة معامل مثل 'id,name, full_path' إلى مجموعة أسماء حقول"""
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+# ميكسن لدعم اختيار الحقول (?fields=) والتوسيع الاختياري للحقول المحسوبة (?expand=)
+class DynamicFieldsMixin:
+    """
+    ميكسن يسمح للعميل باختيار الحقول المعادة في طلبات القراءة
+    - بدون معاملات: تعاد جميع الحقول كما هي (للتوافق مع الواجهات الحالية)
+    - ?fields=a,b: تعاد الحقول المحددة فقط (بالإضافة إلى ما في expand)
+    - ?expand=x,y وحده: تعاد الحقول العادية فقط مع الحقول المحسوبة المطلوبة
+    الحقول المحسوبة والمتداخلة المكلفة تعرف في Meta.expandable_fields
+    ولا تحسب ولا يستعلم عنها إلا إذا طلبت صراحة
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        # التطبيق على المُسلسل الجذري في طلبات القراءة فقط حتى لا تتجاهل حقول الإدخال عند الكتابة
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        
+        requested_fields = parse_field_list(request.query_params.get('fields'))
+        expanded_fields = parse_field_list(request.query_params.get('expand'))
+        if not requested_fields and not expanded_fields:
+            return
+        
+        if requested_fields:
+            allowed = requested_fields | expanded_fields
+        else:
+            expandable_fields = set(getattr(self.Meta, 'expandable_fields', ()))
+            allowed = (set(self.fields) - expandable_fields) | expanded_fields
+        
+        # التمثيل أصبح جزئياً فلا يحفظ في ذاكرة نموذج القراءة (انظر CachedRepresentationMixin)
+        self._fields_filtered = True
+        for field_name in set(self.fields) - allowed:
+            self.fields.pop(field_name)
+
+
+# ميكسن لحفظ التمثيل الكامل للكائن في ذاكرة نموذج القراءة
+class CachedRepresentationMixin:
+    """
+    ميكسن يعيد التمثيل المحفوظ للكائن من ذاكرة نموذج القراءة (services/read_cache.py) أو يحسبه ويحفظه
+    يعمل فقط عندما يضع الـ ViewSet المفتاح read_cache في السياق (طلبات القراءة)
+    ولا يستخدم مع ?fields= أو ?expand= لأن التمثيل يكون جزئياً
+    الإبطال يتم في signals.py عند تغيير أي كائن يؤثر في التمثيل
+    """
+    read_cache_kind = None
+    
+    def to_representation(self, instance):
+        if (not self.context.get('read_cache') or getattr(self, '_fields_filtered', False)
+                or instance.pk is None):
+            return super().to_representation(instance)
+        compute = super().to_representation
+        return read_cache.get_or_compute(self.read_cache_kind, instance.pk, 'detail', lambda: compute(instance))
+
 
 # فئة المُسلسل الخاصة بقواطع الدارة (CircuitBreaker) - إصدار مختصر للعلاقات المتداخلة
 class CircuitBreakerBasicSerializer(serializers.ModelSerializer):
@@ -29,6 +99,13 @@ class CircuitBreakerBasicSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'label', 'manufacturer', 'breaker_type', 'breaker_role', 
                   'rated_current', 'number_of_poles', 'panel', 'panel_name', 'role_display']
     
+    @staticmethod
+    def setup_eager_loading(queryset, field_names=None):
+        """تحميل اللوحة مسبقاً لتجنب استعلام لكل قاطع عند عرض اسم اللوحة"""
+        if field_names is None or 'panel_name' in field_names:
+            queryset = queryset.select_related('panel')
+        return queryset
+    
     def get_panel_name(self, obj):
         """إرجاع اسم اللوحة التي ينتمي إليها القاطع (إن وجدت)"""
         return obj.panel.name if obj.panel else None
@@ -38,7 +115,7 @@ class CircuitBreakerBasicSerializer(serializers.ModelSerializer):
         return dict(CircuitBreaker.BREAKER_ROLE_CHOICES).get(obj.breaker_role, obj.breaker_role)
 
 # فئة المُسلسل الكاملة الخاصة بقواطع الدارة (CircuitBreaker)
-class CircuitBreakerSerializer(serializers.ModelSerializer):
+class CircuitBreakerSerializer(CachedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     مُسلسل قواطع الدارة الكهربائية
     يقوم هذا المُسلسل بتحويل بيانات قواطع الدارة من وإلى النموذج
@@ -50,11 +127,41 @@ class CircuitBreakerSerializer(serializers.ModelSerializer):
     fed_breakers_info = serializers.SerializerMethodField()
     loads_info = serializers.SerializerMethodField()
     total_load = serializers.SerializerMethodField()
+    diversified_demand = serializers.SerializerMethodField()
     full_path = serializers.SerializerMethodField()
+    
+    read_cache_kind = read_cache.BREAKER
 
     class Meta:
         model = CircuitBreaker
         fields = '__all__'
+        expandable_fields = ('feeding_breakers_info', 'fed_breakers_info', 'loads_info', 'full_path')
+    
+    @staticmethod
+    def eager_loading_lookups(prefix='', field_names=None):
+        """
+        إرجاع علاقات التحميل المسبق اللازمة لتسلسل القاطع بعدد ثابت من الاستعلامات
+        prefix يسمح باستخدامها عند تضمين القاطع داخل مُسلسل آخر (مثل 'main_breaker__')
+        field_names يقصر التحميل على العلاقات التي تحتاجها الحقول المطلوبة فقط
+        """
+        def wants(*names):
+            return field_names is None or any(name in field_names for name in names)
+        
+        lookups = []
+        if wants('feeding_breakers', 'feeding_breakers_info'):
+            lookups.append(Prefetch(f'{prefix}feeding_breakers', queryset=CircuitBreaker.objects.select_related('panel')))
+        if wants('fed_breakers_info'):
+            lookups.append(Prefetch(f'{prefix}fed_breakers', queryset=CircuitBreaker.objects.select_related('panel')))
+        if wants('loads_info'):
+            lookups.append(f'{prefix}loads')
+        return lookups
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset, field_names=None):
+        """تحميل العلاقات المستخدمة في الحقول المطلوبة مسبقاً لقائمة القواطع"""
+        if field_names is None or 'panel_name' in field_names or 'full_path' in field_names:
+            queryset = queryset.select_related('panel')
+        return queryset.prefetch_related(*cls.eager_loading_lookups(field_names=field_names))
     
     def get_panel_name(self, obj):
         """إرجاع اسم اللوحة التي ينتمي إليها القاطع (إن وجدت)"""
@@ -89,8 +196,18 @@ class CircuitBreakerSerializer(serializers.ModelSerializer):
         """إرجاع إجمالي الحمل على هذا القاطع"""
         return obj.get_total_load()
     
+    def get_diversified_demand(self, obj):
+        """إرجاع الطلب المُخفَّض على القاطع بعد معاملات الطلب والتباين"""
+        network_tree = self.context.get('network_tree')
+        if network_tree is not None:
+            return network_tree.breaker_diversified_demand(obj)
+        return obj.get_diversified_demand()
+    
     def get_full_path(self, obj):
         """إرجاع المسار الكامل للقاطع عبر سلسلة التغذية"""
+        network_tree = self.context.get('network_tree')
+        if network_tree is not None:
+            return network_tree.breaker_full_path(obj.id)
         return obj.get_full_path()
 
 # سيريلايزر لإنشاء قاطع جديد داخل لوحة
@@ -159,47 +276,25 @@ class BreakerFeedingSerializer(serializers.Serializer):
         if self.instance.id in [breaker.id for breaker in value]:
             raise serializers.ValidationError("لا يمكن أن يكون القاطع مغذيًا لنفسه")
         
-        # التحقق من عدم وجود دورات معقدة
+        # التحقق من عدم وجود دورات معقدة باستخدام رسم التغذية في الذاكرة
+        graph = get_feed_graph()
         for feeding_breaker in value:
             # تحقق مما إذا كان القاطع الحالي يغذي بشكل مباشر أو غير مباشر أحد القواطع المغذية
-            if self._is_feeding_recursively(self.instance, feeding_breaker):
+            if self._is_feeding_recursively(self.instance, feeding_breaker, graph):
                 raise serializers.ValidationError(
                     f"يوجد دورة في سلسلة التغذية: القاطع {self.instance} يغذي بالفعل القاطع {feeding_breaker}"
                 )
         
         return value
     
-    def _is_feeding_recursively(self, source_breaker, target_breaker):
+    def _is_feeding_recursively(self, source_breaker, target_breaker, graph=None):
         """التحقق مما إذا كان القاطع المصدر يغذي القاطع الهدف بشكل مباشر أو غير مباشر"""
         # تجنب الاستدعاء الذاتي إذا لم يكن لدينا معرف للقاطع المصدر (مثل عند إنشاء قاطع جديد)
         if not source_breaker.id:
             return False
         
-        # لا نحتاج إلى التحقق من القاطع نفسه
-        if source_breaker.id == target_breaker.id:
-            return True
-        
-        # استخدام مجموعة للتتبع القواطع التي تم زيارتها بالفعل لتجنب الدورات الانهائية
-        visited = set()
-        
-        def check_feeding(current_breaker):
-            if current_breaker.id in visited:
-                return False
-                
-            visited.add(current_breaker.id)
-            
-            # التحقق من القواطع المباشرة
-            if target_breaker.id in [b.id for b in current_breaker.fed_breakers.all()]:
-                return True
-                
-            # التحقق من القواطع الفرعية
-            for fed_breaker in current_breaker.fed_breakers.all():
-                if check_feeding(fed_breaker):
-                    return True
-            
-            return False
-        
-        return check_feeding(source_breaker)
+        graph = graph or get_feed_graph()
+        return graph.reaches(source_breaker.id, target_breaker.id)
     
     def update(self, instance, validated_data):
         """تحديث علاقات التغذية للقاطع"""
@@ -377,8 +472,37 @@ class BreakerLoadSerializer(serializers.ModelSerializer):
         except CircuitBreaker.DoesNotExist:
             raise serializers.ValidationError({"breaker": "القاطع المحدد غير موجود"})
 
+# مُسلسلات عناصر الإنشاء والتعديل المجمع (services/bulk.py)
+class BulkLoadSerializer(serializers.ModelSerializer):
+    """
+    عنصر واحد في الإنشاء أو التعديل المجمع للأحمال (العنصر الذي يحمل id تعديل جزئي)
+    المراجع معرفات تتحقق منها الخدمة للدفعة كاملة باستعلام واحد لكل جدول، وكذلك تفرد الاسم
+    """
+    id = serializers.IntegerField(required=False)
+    panel = serializers.IntegerField(required=False, allow_null=True)
+    breaker = serializers.IntegerField(required=False, allow_null=True)
+    
+    class Meta:
+        model = Load
+        fields = '__all__'
+        extra_kwargs = {'name': {'validators': []}}
+
+
+class BulkCircuitBreakerSerializer(serializers.ModelSerializer):
+    """
+    عنصر واحد في الإنشاء أو التعديل المجمع للقواطع (العنصر الذي يحمل id تعديل جزئي)
+    علاقات التغذية تبقى في إجراء feeding_breakers لأنها تحتاج فحص الدورات
+    """
+    id = serializers.IntegerField(required=False)
+    panel = serializers.IntegerField(required=False, allow_null=True)
+    
+    class Meta:
+        model = CircuitBreaker
+        exclude = ('feeding_breakers', *CircuitBreaker.DERIVED_FIELDS)
+
+
 # فئة المُسلسل الخاصة بمصادر الطاقة (PowerSource)
-class PowerSourceSerializer(serializers.ModelSerializer):
+class PowerSourceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     مُسلسل مصادر الطاقة
     يقوم هذا المُسلسل بتحويل بيانات مصادر الطاقة من وإلى النموذج
@@ -393,9 +517,24 @@ class PowerSourceSerializer(serializers.ModelSerializer):
     # إضافة مواصفات الكابل المُجمعة
     cable_specification = serializers.SerializerMethodField()
     
+    # الطلب المُخفَّض على المصدر من لوحاته الرئيسية
+    diversified_demand = serializers.SerializerMethodField()
+    
     class Meta:
         model = PowerSource
         fields = '__all__'
+        expandable_fields = ('main_breaker_details', 'panels')
+    
+    @staticmethod
+    def setup_eager_loading(queryset, field_names=None):
+        """تحميل القاطع الرئيسي وعلاقاته واللوحات المتصلة مسبقاً (للحقول المطلوبة فقط)"""
+        if field_names is None or 'main_breaker_details' in field_names:
+            queryset = queryset.select_related('main_breaker__panel').prefetch_related(
+                *CircuitBreakerSerializer.eager_loading_lookups('main_breaker__')
+            )
+        if field_names is None or 'panels' in field_names or 'diversified_demand' in field_names:
+            queryset = queryset.prefetch_related('panels')
+        return queryset
     
     def get_panels(self, obj):
         """إرجاع معلومات اللوحات المتصلة بمصدر الطاقة"""
@@ -412,6 +551,10 @@ class PowerSourceSerializer(serializers.ModelSerializer):
     def get_cable_specification(self, obj):
         """إرجاع مواصفات الكابل بتنسيق نصي"""
         return obj.get_cable_specification()
+    
+    def get_diversified_demand(self, obj):
+        """إرجاع الطلب المُخفَّض على المصدر (مجموع طلب لوحاته الرئيسية)"""
+        return obj.get_diversified_demand()
 
 # فئة المُسلسل الخاصة باللوحات (Panel) - إصدار مختصر للعلاقات المتداخلة
 class PanelBasicSerializer(serializers.ModelSerializer):
@@ -424,7 +567,7 @@ class PanelBasicSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'panel_type', 'ampacity', 'voltage']
 
 # فئة المُسلسل الخاصة باللوحات (Panel)
-class PanelSerializer(serializers.ModelSerializer):
+class PanelSerializer(CachedRepresentationMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     مُسلسل اللوحات الكهربائية
     يقوم هذا المُسلسل بتحويل بيانات اللوحات من وإلى النموذج
@@ -461,9 +604,51 @@ class PanelSerializer(serializers.ModelSerializer):
     # إضافة مواصفات الكابل المُجمعة
     cable_specification = serializers.SerializerMethodField()
     
+    # إضافة هبوط الجهد التراكمي من المصدر حتى نهاية كابل اللوحة
+    cumulative_voltage_drop = serializers.SerializerMethodField()
+    
+    read_cache_kind = read_cache.PANEL
+    
     class Meta:
         model = Panel
         fields = '__all__'
+        expandable_fields = (
+            'main_breaker_details', 'breakers', 'feeder_breaker_details', 'power_source_details',
+            'parent_panel_details', 'child_panels', 'loads', 'full_path', 'cumulative_voltage_drop'
+        )
+    
+    @staticmethod
+    def setup_eager_loading(queryset, field_names=None):
+        """
+        تحميل العلاقات المستخدمة في الحقول المطلوبة مسبقاً
+        بحيث يبقى عدد الاستعلامات ثابتاً مهما زاد عدد اللوحات
+        """
+        def wants(name):
+            return field_names is None or name in field_names
+        
+        related = [
+            relation for field_name, relation in (
+                ('power_source_details', 'power_source'),
+                ('parent_panel_details', 'parent_panel'),
+                ('main_breaker_details', 'main_breaker__panel'),
+                ('feeder_breaker_details', 'feeder_breaker__panel'),
+            ) if wants(field_name)
+        ]
+        prefetch = []
+        if wants('breakers'):
+            prefetch.append(Prefetch('breakers', queryset=CircuitBreaker.objects.select_related('panel')))
+        if wants('child_panels'):
+            prefetch.append('child_panels')
+        if wants('loads'):
+            prefetch.append('loads')
+        if wants('main_breaker_details'):
+            prefetch.extend(CircuitBreakerSerializer.eager_loading_lookups('main_breaker__'))
+        if wants('feeder_breaker_details'):
+            prefetch.extend(CircuitBreakerSerializer.eager_loading_lookups('feeder_breaker__'))
+        
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.prefetch_related(*prefetch)
     
     def validate(self, data):
         """
@@ -494,10 +679,14 @@ class PanelSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({"parent_panel": "لا يمكن أن تكون اللوحة أم لنفسها"})
                 
             # التحقق من عدم تعيين لوحة فرعية كأم للوحة الحالية
-            child_panels = self.instance.get_all_child_panels()
-            if parent_panel.id in [child.id for child in child_panels]:
+            if parent_panel.is_descendant_of(self.instance):
                 raise serializers.ValidationError({"parent_panel": "لا يمكن تعيين لوحة فرعية من هذه اللوحة كأم لها"})
         
+        # مفتاح التحويل ينقل اللوحة إلى مولد فقط
+        backup_source = data.get('backup_source')
+        if backup_source and backup_source.source_type != 'Generator':
+            raise serializers.ValidationError({"backup_source": "المصدر الاحتياطي يجب أن يكون مولداً"})
+        
         return data
     
     def get_breakers(self, obj):
@@ -512,13 +701,17 @@ class PanelSerializer(serializers.ModelSerializer):
         إرجاع معلومات اللوحات الفرعية المباشرة
         """
         child_panels = obj.child_panels.all()
+        network_tree = self.context.get('network_tree')
         return [
             {
                 'id': panel.id,
                 'name': panel.name,
                 'panel_type': panel.panel_type,
                 'ampacity': panel.ampacity,
-                'has_children': panel.child_panels.exists()
+                'has_children': (
+                    network_tree.panel_has_children(panel.id) if network_tree is not None
+                    else panel.child_panels.exists()
+                )
             } for panel in child_panels
         ]
     
@@ -541,17 +734,25 @@ class PanelSerializer(serializers.ModelSerializer):
         """
         إرجاع المسار الكامل للوحة
         """
+        network_tree = self.context.get('network_tree')
+        if network_tree is not None:
+            return network_tree.panel_full_path(obj.id)
         return obj.get_full_path()
     
     def get_total_loads_info(self, obj):
         """
-        إرجاع معلومات عن إجمالي الأحمال
+        إرجاع معلومات عن إجمالي الأحمال (من الإجماليات المخزنة دون أي استعلام)
         """
         total_ampacity, total_count = obj.get_total_loads()
         return {
             'total_ampacity': total_ampacity,
             'total_count': total_count,
-            'utilization_percentage': (total_ampacity / obj.ampacity * 100) if obj.ampacity else 0
+            'utilization_percentage': obj.get_utilization_percentage(),
+            'phase_currents': dict(zip(Load.SINGLE_PHASES, obj.get_phase_currents())),
+            'phase_imbalance': obj.get_phase_imbalance(),
+            'demand_ampacity': obj.rollup_demand_ampacity,
+            'diversity_factor': Panel.diversity_factor(obj.tree_depth),
+            'diversified_demand': obj.get_diversified_demand()
         }
     
     def get_cable_specification(self, obj):
@@ -560,6 +761,15 @@ class PanelSerializer(serializers.ModelSerializer):
         """
         return obj.get_cable_specification()
     
+    def get_cumulative_voltage_drop(self, obj):
+        """
+        إرجاع هبوط الجهد التراكمي من المصدر حتى نهاية كابل اللوحة
+        """
+        network_tree = self.context.get('network_tree')
+        if network_tree is not None:
+            return network_tree.cumulative_voltage_drop('panel', obj.id)
+        return obj.get_cumulative_voltage_drop()
+    
     def get_power_source_details(self, obj):
         """
         إرجاع معلومات مصدر الطاقة المرتبط باللوحة
@@ -587,7 +797,7 @@ class PanelSerializer(serializers.ModelSerializer):
         return None
 
 # فئة المُسلسل الخاصة بالأحمال (Load)
-class LoadSerializer(serializers.ModelSerializer):
+class LoadSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     مُسلسل الأحمال الكهربائية
     يقوم هذا المُسلسل بتحويل بيانات الأحمال من وإلى النموذج
@@ -609,11 +819,26 @@ class LoadSerializer(serializers.ModelSerializer):
     daily_consumption = serializers.SerializerMethodField()
     monthly_cost = serializers.SerializerMethodField()
     voltage_drop = serializers.SerializerMethodField()
+    cumulative_voltage_drop = serializers.SerializerMethodField()
     cable_specification = serializers.SerializerMethodField()
     
     class Meta:
         model = Load
         fields = '__all__'
+        expandable_fields = (
+            'panel_details', 'breaker_details', 'total_path', 'daily_consumption', 'monthly_cost', 'voltage_drop',
+            'cumulative_voltage_drop'
+        )
+    
+    @staticmethod
+    def setup_eager_loading(queryset, field_names=None):
+        """تحميل اللوحة والقاطع (ولوحته) مسبقاً لتجنب استعلام لكل حمل (للحقول المطلوبة فقط)"""
+        related = []
+        if field_names is None or 'panel_details' in field_names or 'total_path' in field_names:
+            related.append('panel')
+        if field_names is None or 'breaker_details' in field_names:
+            related.append('breaker__panel')
+        return queryset.select_related(*related) if related else queryset
     
     def get_load_type_display(self, obj):
         """
@@ -625,6 +850,9 @@ class LoadSerializer(serializers.ModelSerializer):
         """
         إرجاع المسار الكامل للحمل من المصدر
         """
+        network_tree = self.context.get('network_tree')
+        if network_tree is not None:
+            return network_tree.load_total_path(obj)
         return obj.get_total_path()
     
     def get_daily_consumption(self, obj):
@@ -635,9 +863,14 @@ class LoadSerializer(serializers.ModelSerializer):
     
     def get_monthly_cost(self, obj):
         """
-        إرجاع التكلفة الشهرية المقدرة للحمل
+        إرجاع التكلفة الشهرية المقدرة للحمل حسب التعرفة
+        من شجرة الطلب في القوائم، ومن دراسة التكلفة المحفوظة لكل مراجعة للحمل الواحد
         """
-        return obj.calculate_monthly_cost()
+        network_tree = self.context.get('network_tree')
+        if network_tree is not None:
+            return network_tree.load_monthly_cost(obj)
+        cost = study_costs().load_cost(obj.id) if obj.pk else None
+        return obj.calculate_monthly_cost() if cost is None else cost
     
     def get_voltage_drop(self, obj):
         """
@@ -645,8 +878,152 @@ class LoadSerializer(serializers.ModelSerializer):
         """
         return obj.calculate_voltage_drop()
     
+    def get_cumulative_voltage_drop(self, obj):
+        """
+        إرجاع هبوط الجهد التراكمي من المصدر حتى نهاية كابل الحمل
+        """
+        network_tree = self.context.get('network_tree')
+        if network_tree is not None:
+            return network_tree.cumulative_voltage_drop('load', obj.id)
+        return obj.get_cumulative_voltage_drop()
+    
     def get_cable_specification(self, obj):
         """
         إرجاع مواصفات الكابل بتنسيق نصي
         """
-        return obj.get_cable_specification()
\ No newline at end of file
+        return obj.get_cable_specification()
+
+
+class LoadProfileSerializer(serializers.ModelSerializer):
+    """
+    مُسلسل منحنيات التشغيل
+    يستقبل القيم ويعيدها كقائمة أرقام (values) ويخزنها كمصفوفة float32 ثنائية
+    """
+    values = serializers.ListField(child=serializers.FloatField(min_value=0))
+    
+    class Meta:
+        model = LoadProfile
+        fields = ('id', 'name', 'load', 'load_type', 'resolution', 'values')
+        read_only_fields = ('resolution',)
+    
+    def validate(self, data):
+        """التحقق من طول القيم ومن ربط المنحنى بحمل أو بنوع حمل (واحد فقط)"""
+        values = data.get('values')
+        if values is not None and len(values) not in (LoadProfile.DAILY, LoadProfile.ANNUAL):
+            raise serializers.ValidationError({"values": "عدد القيم يجب أن يكون 24 (يومي) أو 8760 (سنوي)"})
+        load = data.get('load', getattr(self.instance, 'load', None))
+        load_type = data.get('load_type', getattr(self.instance, 'load_type', None))
+        if bool(load) == bool(load_type):
+            raise serializers.ValidationError("يجب ربط المنحنى بحمل واحد أو بنوع حمل واحد")
+        return data
+    
+    def create(self, validated_data):
+        values = validated_data.pop('values')
+        profile = LoadProfile(**validated_data)
+        profile.values = values
+        profile.save()
+        return profile
+    
+    def update(self, instance, validated_data):
+        values = validated_data.pop('values', None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        if values is not None:
+            instance.values = values
+        instance.save()
+        return instance
+
+
+class TariffBandSerializer(serializers.ModelSerializer):
+    """
+    مُسلسل فترات التعرفة الزمنية
+    """
+    start_hour = serializers.IntegerField(min_value=0, max_value=23)
+    end_hour = serializers.IntegerField(min_value=1, max_value=24)
+    price = serializers.FloatField(min_value=0)
+    
+    class Meta:
+        model = TariffBand
+        fields = ('id', 'name', 'start_hour', 'end_hour', 'price')
+
+
+class TariffTierSerializer(serializers.ModelSerializer):
+    """
+    مُسلسل شرائح التعرفة
+    """
+    up_to_kwh = serializers.FloatField(min_value=0, allow_null=True, required=False)
+    price = serializers.FloatField(min_value=0)
+    
+    class Meta:
+        model = TariffTier
+        fields = ('id', 'up_to_kwh', 'price')
+
+
+class TariffSerializer(serializers.ModelSerializer):
+    """
+    مُسلسل تعرفات الطاقة مع فتراتها وشرائحها
+    إرسال bands أو tiers في التعديل يستبدل جميع الفترات أو الشرائح الحالية
+    """
+    bands = TariffBandSerializer(many=True, required=False)
+    tiers = TariffTierSerializer(many=True, required=False)
+    
+    class Meta:
+        model = Tariff
+        fields = ('id', 'name', 'power_source', 'source_type', 'base_price', 'bands', 'tiers')
+    
+    def validate(self, data):
+        """التحقق من ربط التعرفة بمصدر أو بنوع مصدر (واحد فقط) ومن وجود شريحة واحدة بدون حد على الأكثر"""
+        power_source = data.get('power_source', getattr(self.instance, 'power_source', None))
+        source_type = data.get('source_type', getattr(self.instance, 'source_type', None))
+        if bool(power_source) == bool(source_type):
+            raise serializers.ValidationError("يجب ربط التعرفة بمصدر واحد أو بنوع مصدر واحد")
+        tiers = data.get('tiers')
+        if tiers is not None and sum(1 for tier in tiers if tier.get('up_to_kwh') is None) > 1:
+            raise serializers.ValidationError({"tiers": "يسمح بشريحة واحدة فقط بدون حد أعلى"})
+        return data
+    
+    def _replace_children(self, tariff, bands, tiers):
+        if bands is not None:
+            tariff.bands.all().delete()
+            TariffBand.objects.bulk_create([TariffBand(tariff=tariff, **band) for band in bands])
+        if tiers is not None:
+            tariff.tiers.all().delete()
+            TariffTier.objects.bulk_create([TariffTier(tariff=tariff, **tier) for tier in tiers])
+        if bands is not None or tiers is not None:
+            # bulk_create لا يرسل إشارات: رفع رقم المراجعة بعد إضافة الفترات والشرائح الجديدة
+            NetworkRevision.bump()
+    
+    def create(self, validated_data):
+        bands = validated_data.pop('bands', None)
+        tiers = validated_data.pop('tiers', None)
+        tariff = Tariff.objects.create(**validated_data)
+        self._replace_children(tariff, bands, tiers)
+        return tariff
+    
+    def update(self, instance, validated_data):
+        bands = validated_data.pop('bands', None)
+        tiers = validated_data.pop('tiers', None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save()
+        self._replace_children(instance, bands, tiers)
+        return instance
+
+
+class ScenarioSerializer(serializers.ModelSerializer):
+    """
+    مُسلسل سيناريوهات "ماذا لو"
+    تتحقق التغييرات مقابل الشبكة الحالية في الذاكرة (أنواع وحقول ومراجع صحيحة) دون أي كتابة في جداول الشبكة
+    """
+    
+    class Meta:
+        model = Scenario
+        fields = ('id', 'name', 'description', 'changes', 'created_at')
+        read_only_fields = ('created_at',)
+    
+    def validate_changes(self, value):
+        try:
+            build_view(value)
+        except ScenarioError as error:
+            raise serializers.ValidationError(str(error))
+        return value
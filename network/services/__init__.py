@@ -0,0 +1,5 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - وحدة الخدمات (Services)
+تحتوي هذه الحزمة على محركات الحساب والقراءة التي تعمل على مستوى الشبكة كاملة
+بدلاً من العمل على كائن واحد في كل مرة داخل المُسلسلات
+"""
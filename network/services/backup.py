@@ -0,0 +1,210 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - خطة المولدات الاحتياطية وفصل الأحمال حسب الأولوية (Generator backup planner)
+لكل مولد (مصدر طاقة من نوع Generator) تحدد الأحمال التي يحملها عند التحويل إليه:
+- أحمال الأشجار الفرعية للوحاته الرئيسية (يغذيها دائماً)
+- أحمال اللوحات المنقولة إليه بمفتاح التحويل (Panel.backup_source) مع شجرتها الفرعية، وأقرب لوحة منقولة في مسار الحمل تحدد مولده
+
+يقارن أمبير الطلب (الأمبير × معامل الطلب لنوع الحمل كما في الإجماليات) بسعة المولد total_ampacity:
+تحمل الأحمال بترتيب فئات الأولوية (Load.PRIORITY_CHOICES) ثم الأصغر أولاً داخل الفئة حتى تمتلئ السعة،
+وترتيب الفصل عكس ترتيب التحميل: الفئة الأدنى أولاً والأكبر أولاً داخلها حتى يعود الطلب ضمن السعة
+
+الحساب دفعة واحدة لجميع المولدات: ترتيب الأحمال بـ lexsort (المولد، الأولوية، الطلب) ثم مجموع تراكمي لكل مولد،
+بثلاثة استعلامات مهما زاد عدد الأحمال، والخطة محفوظة لكل مراجعة للشبكة
+"""
+
+import threading
+
+import numpy as np
+
+from ..models import PowerSource, Panel, Load, NetworkRevision
+
+OK = 'ok'
+OVERLOADED = 'overloaded'
+UNRATED = 'unrated'
+STATUSES = (OK, OVERLOADED, UNRATED)
+
+PRIORITIES = tuple(priority for priority, _ in Load.PRIORITY_CHOICES)
+
+
+def panel_generators(panels, generator_ids):
+    """
+    المولد الذي يحمل كل لوحة عند التحويل: مصدر لوحتها الرئيسية إذا كان مولداً،
+    وإلا المولد الاحتياطي لأقرب لوحة منقولة في مسارها
+
+    Args:
+        panels: قائمة (المعرف, المسار المادي, مصدر الطاقة, المولد الاحتياطي)
+        generator_ids: معرفات المولدات
+
+    Returns:
+        dict: {معرف اللوحة: معرف المولد} للوحات التي لها مولد فقط
+    """
+    root_generator = {panel_id: source_id for panel_id, _, source_id, _ in panels if source_id in generator_ids}
+    backup = {panel_id: backup_id for panel_id, _, _, backup_id in panels if backup_id in generator_ids}
+    result = {}
+    for panel_id, tree_path, _, _ in panels:
+        chain = Panel.parse_tree_path(tree_path or '') or [panel_id]
+        generator = root_generator.get(chain[0])
+        if generator is None:
+            generator = next((backup[ancestor] for ancestor in reversed(chain) if ancestor in backup), None)
+        if generator is not None:
+            result[panel_id] = generator
+    return result
+
+
+class BackupPlan:
+    """
+    خطة جميع المولدات: مصفوفات الأحمال المنقولة (بترتيب التحميل) وإجماليات كل مولد
+    """
+
+    def __init__(self, revision=None):
+        self.revision = revision
+        generators = list(
+            PowerSource.objects.filter(source_type='Generator').order_by('id').values_list('id', 'name', 'total_ampacity')
+        )
+        panels = list(Panel.objects.values_list('id', 'tree_path', 'power_source_id', 'backup_source_id', 'name'))
+        self.generator_ids = [row[0] for row in generators]
+        self.generator_names = [row[1] for row in generators]
+        self.index = {generator_id: index for index, generator_id in enumerate(self.generator_ids)}
+        self.capacity = np.array([row[2] or 0 for row in generators], dtype=np.float64)
+        panel_generator = panel_generators([row[:4] for row in panels], set(self.index))
+        panel_names = {row[0]: row[4] for row in panels}
+
+        loads = [
+            row for row in Load.objects.filter(panel__isnull=False).values_list(
+                'id', 'name', 'panel_id', 'ampacity', 'load_type', 'priority'
+            ) if row[2] in panel_generator
+        ]
+        factors = Load.demand_factors()
+        rank = {priority: index for index, priority in enumerate(PRIORITIES)}
+        generator = np.array([self.index[panel_generator[row[2]]] for row in loads], dtype=np.int64)
+        priority = np.array([rank.get(row[5], rank['normal']) for row in loads], dtype=np.int64)
+        ampacity = np.array([row[3] or 0 for row in loads], dtype=np.float64)
+        demand = ampacity * np.array([factors.get(row[4], 1.0) for row in loads], dtype=np.float64)
+        load_ids = np.array([row[0] for row in loads], dtype=np.int64)
+
+        # ترتيب التحميل: المولد ثم الأولوية ثم الطلب الأصغر (والمعرف لثبات الترتيب)
+        order = np.lexsort((load_ids, demand, priority, generator))
+        self.loads = [loads[position] for position in order.tolist()]
+        self.panel_names = panel_names
+        self.generator = generator[order]
+        self.priority = priority[order]
+        self.ampacity = ampacity[order]
+        self.demand = demand[order]
+
+        count = len(generators)
+        self.load_count = np.bincount(self.generator, minlength=count)
+        self.starts = np.concatenate(([0], np.cumsum(self.load_count)))
+        cumulative = np.cumsum(self.demand)
+        before = np.concatenate(([0.0], cumulative))[self.starts[:-1]]
+        self.cumulative = cumulative - before[self.generator]
+
+        # المولد بدون سعة مسجلة لا يخطط له ويعتبر حاملاً لأحماله
+        self.rated = self.capacity > 0
+        limit = np.where(self.rated, self.capacity, np.inf)
+        self.carried = self.cumulative <= limit[self.generator] + 1e-9
+        self.connected_ampacity = np.bincount(self.generator, self.ampacity, minlength=count)
+        self.demand_ampacity = np.bincount(self.generator, self.demand, minlength=count)
+        self.carried_ampacity = np.bincount(self.generator, self.demand * self.carried, minlength=count)
+        self.carried_count = np.bincount(self.generator, self.carried, minlength=count)
+
+    def __len__(self):
+        return len(self.generator_ids)
+
+    def status(self, index):
+        if not self.rated[index]:
+            return UNRATED
+        return OVERLOADED if self.demand_ampacity[index] > self.capacity[index] + 1e-9 else OK
+
+    def row(self, index):
+        capacity = float(self.capacity[index])
+        demand = float(self.demand_ampacity[index])
+        return {
+            'id': self.generator_ids[index],
+            'name': self.generator_names[index],
+            'status': self.status(index),
+            'total_ampacity': capacity,
+            'connected_ampacity': float(self.connected_ampacity[index]),
+            'demand_ampacity': demand,
+            'utilization_percentage': demand / capacity * 100 if capacity > 0 else None,
+            'load_count': int(self.load_count[index]),
+            'carried_load_count': int(self.carried_count[index]),
+            'carried_ampacity': float(self.carried_ampacity[index]),
+            'shed_load_count': int(self.load_count[index] - self.carried_count[index]),
+            'shed_ampacity': demand - float(self.carried_ampacity[index]),
+        }
+
+    def rows(self, statuses=None):
+        """ملخص كل مولد، المحملة فوق سعتها أولاً"""
+        rows = [self.row(index) for index in range(len(self)) if not statuses or self.status(index) in statuses]
+        rows.sort(key=lambda row: (-(row['utilization_percentage'] or 0), row['id']))
+        return rows
+
+    def detail(self, generator_id):
+        """
+        خطة مولد واحد: الإجماليات لكل فئة أولوية وترتيب الفصل، أو None إذا لم يكن مولداً
+        """
+        index = self.index.get(generator_id)
+        if index is None:
+            return None
+        start, end = self.starts[index], self.starts[index + 1]
+        priority = self.priority[start:end]
+        demand = self.demand[start:end]
+        carried = self.carried[start:end]
+        result = self.row(index)
+        result['by_priority'] = [
+            {
+                'priority': name,
+                'load_count': int((priority == rank).sum()),
+                'demand_ampacity': float(demand[priority == rank].sum()),
+                'carried_load_count': int((carried & (priority == rank)).sum()),
+                'shed_load_count': int((~carried & (priority == rank)).sum()),
+            } for rank, name in enumerate(PRIORITIES)
+        ]
+        remaining = float(demand.sum())
+        shedding_order = []
+        for position in reversed(range(start, end)):
+            if self.carried[position]:
+                break
+            load_id, name, panel_id, _, load_type, _ = self.loads[position]
+            remaining -= float(self.demand[position])
+            shedding_order.append({
+                'step': len(shedding_order) + 1,
+                'id': load_id,
+                'name': name,
+                'panel': self.panel_names.get(panel_id),
+                'load_type': load_type,
+                'priority': PRIORITIES[self.priority[position]],
+                'demand_ampacity': float(self.demand[position]),
+                'remaining_demand_ampacity': remaining,
+            })
+        result['shedding_order'] = shedding_order
+        return result
+
+    def summary(self):
+        statuses = [self.status(index) for index in range(len(self))]
+        return {
+            'generators': len(self),
+            'overloaded': statuses.count(OVERLOADED),
+            'unrated': statuses.count(UNRATED),
+            'backed_up_loads': len(self.loads),
+            'shed_loads': int(len(self.loads) - self.carried.sum()),
+        }
+
+
+_cache = {'key': None, 'plan': None}
+_cache_lock = threading.Lock()
+
+
+def plan_generator_backup():
+    """
+    إرجاع خطة المولدات للمراجعة الحالية للشبكة (تعاد فقط عند تغير رقم المراجعة)
+    """
+    key = NetworkRevision.current()
+    with _cache_lock:
+        if _cache['key'] == key and _cache['plan'] is not None:
+            return _cache['plan']
+    plan = BackupPlan(revision=key[0])
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['plan'] = plan
+    return plan
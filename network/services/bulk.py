@@ -0,0 +1,274 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - الإنشاء والتعديل المجمع للأحمال والقواطع (Bulk create/update)
+يقبل قائمة عناصر (العنصر الذي يحمل id تعديل جزئي والباقي إنشاء) ويتحقق منها في مرور واحد:
+- حقول كل عنصر بمُسلسل خفيف (BulkLoadSerializer و BulkCircuitBreakerSerializer) دون استعلامات
+- المراجع والمعرفات وتفرد الأسماء للدفعة كاملة باستعلام واحد لكل جدول
+أي خطأ يعيد أخطاء كل عنصر بترتيب القائمة دون كتابة أي شيء
+
+آثار Load.save و CircuitBreaker.save تطبق على الدفعة في الذاكرة (الجهد والطور من اللوحة، ربط القاطع بلوحة الحمل
+أو تصحيح لوحة الحمل، القدرة الافتراضية، وتعيين القاطع الرئيسي للوحة)، ثم تكتب بـ bulk_create و bulk_update
+داخل معاملة واحدة. لأن الكتابة المجمعة لا ترسل إشارات: تعاد الإجماليات بعدد ثابت من الاستعلامات،
+وتزاد مراجعة الشبكة مرة واحدة، وتبطل ذاكرة نموذج القراءة لما يتأثر فقط (read_cache.invalidate_bulk)
+"""
+
+from collections import Counter
+
+from django.db import transaction
+
+from ..models import PowerSource, Panel, CircuitBreaker, Load, NetworkRevision
+from ..serializers import BulkLoadSerializer, BulkCircuitBreakerSerializer
+from . import read_cache
+from .rollups import rebuild_rollups
+
+# أقصى عدد عناصر في الطلب الواحد
+MAX_ITEMS = 1000
+
+# الحقول المرجعية في المُسلسلات (معرفات) وأسماؤها في النموذج
+REFERENCES = {'panel': 'panel_id', 'breaker': 'breaker_id'}
+
+
+class BulkError(ValueError):
+    """خطأ في شكل الطلب كاملاً (وليس في عنصر واحد)"""
+
+
+def _validate_items(items, serializer_class, defaults):
+    """
+    التحقق من حقول كل عنصر
+
+    Returns:
+        tuple: (البيانات الصالحة أو None لكل عنصر, أخطاء كل عنصر أو None)
+    """
+    if not isinstance(items, list) or not items:
+        raise BulkError('يجب إرسال قائمة عناصر غير فارغة')
+    if len(items) > MAX_ITEMS:
+        raise BulkError(f'أقصى عدد عناصر في الطلب الواحد {MAX_ITEMS}')
+    validated, errors = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            validated.append(None)
+            errors.append({'non_field_errors': ['العنصر يجب أن يكون قاموساً']})
+            continue
+        if 'id' not in item:
+            item = {**defaults, **item}
+        serializer = serializer_class(data=item, partial='id' in item)
+        if serializer.is_valid():
+            validated.append(dict(serializer.validated_data))
+            errors.append(None)
+        else:
+            validated.append(None)
+            errors.append(dict(serializer.errors))
+    return validated, errors
+
+
+def _add_error(errors, index, field, message):
+    errors[index] = errors[index] or {}
+    errors[index].setdefault(field, []).append(message)
+
+
+def _check_ids(model, validated, errors):
+    """
+    المعرفات المكررة أو غير الموجودة في عناصر التعديل
+
+    Returns:
+        dict: {المعرف: الكائن الحالي} (استعلام واحد)
+    """
+    counts = Counter(data['id'] for data in validated if data and 'id' in data)
+    existing = model.objects.in_bulk(list(counts))
+    for index, data in enumerate(validated):
+        if not data or 'id' not in data:
+            continue
+        if counts[data['id']] > 1:
+            _add_error(errors, index, 'id', 'المعرف مكرر في الطلب')
+        elif data['id'] not in existing:
+            _add_error(errors, index, 'id', 'العنصر غير موجود')
+    return existing
+
+
+def _build_objects(model, validated, errors, existing):
+    """
+    بناء كائنات الدفعة: الكائن الحالي مع الحقول المرسلة للتعديل أو كائن جديد
+
+    Returns:
+        tuple: (قائمة (الترتيب, الكائن, القيم المرجعية قبل التعديل), الحقول المرسلة في عناصر التعديل)
+    """
+    objects, updated_fields = [], set()
+    for index, data in enumerate(validated):
+        if errors[index] is not None:
+            continue
+        data = dict(data)
+        object_id = data.pop('id', None)
+        instance = existing[object_id] if object_id is not None else model()
+        previous = tuple(getattr(instance, attname, None) for attname in REFERENCES.values())
+        for field, value in data.items():
+            setattr(instance, REFERENCES.get(field, field), value)
+            if object_id is not None:
+                updated_fields.add(REFERENCES.get(field, field))
+        objects.append((index, instance, previous))
+    return objects, updated_fields
+
+
+def _write(model, objects, updated_fields):
+    """إنشاء الكائنات الجديدة وتعديل الحالية بطلبين مجمعين"""
+    created = [instance for _, instance, _ in objects if instance.pk is None]
+    updated = [instance for _, instance, _ in objects if instance.pk is not None]
+    if created:
+        model.objects.bulk_create(created, batch_size=500)
+    if updated and updated_fields:
+        model.objects.bulk_update(updated, sorted(updated_fields), batch_size=500)
+    return created, updated
+
+
+def _finish(panel_ids, breaker_ids):
+    """آثار الكتابة المجمعة التي ترسلها الإشارات عادة"""
+    rebuild_rollups()
+    NetworkRevision.bump()
+    read_cache.invalidate_bulk(panel_ids, breaker_ids)
+
+
+def save_loads(items, defaults=None):
+    """
+    إنشاء وتعديل مجموعة أحمال في معاملة واحدة
+
+    Args:
+        items: قائمة عناصر بحقول LoadSerializer (panel و breaker معرفات)
+        defaults: قيم افتراضية لعناصر الإنشاء (مثل breaker عند الإضافة من صفحة قاطع)
+
+    Returns:
+        tuple: (الأحمال بترتيب العناصر, None) أو (None, أخطاء كل عنصر)
+    """
+    validated, errors = _validate_items(items, BulkLoadSerializer, defaults or {})
+    existing = _check_ids(Load, validated, errors)
+
+    # تفرد الأسماء داخل الطلب ومع الأحمال الأخرى
+    names = Counter(data['name'] for data in validated if data and 'name' in data)
+    taken = dict(Load.objects.filter(name__in=list(names)).values_list('name', 'id'))
+    for index, data in enumerate(validated):
+        if data and 'name' in data:
+            if names[data['name']] > 1:
+                _add_error(errors, index, 'name', 'الاسم مكرر في الطلب')
+            elif taken.get(data['name'], data.get('id')) != data.get('id'):
+                _add_error(errors, index, 'name', 'يوجد حمل بهذا الاسم')
+
+    # المراجع: القواطع ثم اللوحات (بما فيها لوحات القواطع لضبط لوحة الحمل)
+    breaker_ids = {data['breaker'] for data in validated if data and data.get('breaker') is not None}
+    breaker_ids |= {load.breaker_id for load in existing.values() if load.breaker_id}
+    breaker_panels = dict(CircuitBreaker.objects.filter(id__in=breaker_ids).values_list('id', 'panel_id'))
+    panel_ids = {data['panel'] for data in validated if data and data.get('panel') is not None}
+    panel_ids |= {load.panel_id for load in existing.values() if load.panel_id}
+    panels = Panel.objects.in_bulk(list(panel_ids | {panel_id for panel_id in breaker_panels.values() if panel_id}))
+    for index, data in enumerate(validated):
+        if not data:
+            continue
+        if data.get('breaker') is not None and data['breaker'] not in breaker_panels:
+            _add_error(errors, index, 'breaker', 'القاطع المحدد غير موجود')
+        if data.get('panel') is not None and data['panel'] not in panels:
+            _add_error(errors, index, 'panel', 'اللوحة المحددة غير موجودة')
+    if any(errors):
+        return None, errors
+
+    objects, updated_fields = _build_objects(Load, validated, errors, existing)
+    assigned_breakers = {}
+    for _, load, _ in objects:
+        # الحمل المضاف لقاطع بدون لوحة يأخذ لوحة القاطع
+        if load.breaker_id and not load.panel_id and load.pk is None:
+            load.panel_id = breaker_panels[load.breaker_id]
+        panel = panels.get(load.panel_id)
+        # نفس ترتيب Load.save: الجهد من اللوحة، ثم الطور، ثم اتساق القاطع واللوحة، ثم القدرة
+        if not load.voltage and panel:
+            load.voltage = panel.voltage
+        if not load.phase:
+            load.phase = Load.THREE_PHASE if load.voltage in ('380', '11KV') else 'L1'
+        if load.breaker_id and load.panel_id:
+            breaker_panel = breaker_panels[load.breaker_id]
+            if breaker_panel is None:
+                breaker_panels[load.breaker_id] = assigned_breakers[load.breaker_id] = load.panel_id
+            elif breaker_panel != load.panel_id:
+                load.panel_id = breaker_panel
+        if not load.power_consumption and load.ampacity > 0:
+            load.power_consumption = load.voltage_value() * load.ampacity * load.power_factor
+    if updated_fields:
+        updated_fields |= {'panel_id', 'voltage', 'phase', 'power_consumption'}
+
+    with transaction.atomic():
+        if assigned_breakers:
+            CircuitBreaker.objects.bulk_update(
+                [CircuitBreaker(id=breaker_id, panel_id=panel_id) for breaker_id, panel_id in assigned_breakers.items()],
+                ['panel_id'], batch_size=500
+            )
+        _write(Load, objects, updated_fields)
+        _finish(
+            {load.panel_id for _, load, _ in objects} | {previous[0] for _, _, previous in objects},
+            {load.breaker_id for _, load, _ in objects} | {previous[1] for _, _, previous in objects}
+        )
+    return [load for _, load, _ in objects], None
+
+
+def save_breakers(items, defaults=None):
+    """
+    إنشاء وتعديل مجموعة قواطع في معاملة واحدة
+
+    Args:
+        items: قائمة عناصر بحقول CircuitBreakerSerializer (panel معرف، دون علاقات التغذية)
+        defaults: قيم افتراضية لعناصر الإنشاء (مثل panel عند الإضافة من صفحة لوحة)
+
+    Returns:
+        tuple: (القواطع بترتيب العناصر, None) أو (None, أخطاء كل عنصر)
+    """
+    validated, errors = _validate_items(items, BulkCircuitBreakerSerializer, defaults or {})
+    existing = _check_ids(CircuitBreaker, validated, errors)
+
+    panel_ids = {data['panel'] for data in validated if data and data.get('panel') is not None}
+    panel_ids |= {breaker.panel_id for breaker in existing.values() if breaker.panel_id}
+    panel_rows = Panel.objects.filter(id__in=panel_ids).values_list('id', 'main_breaker_id', 'feeder_breaker_id', 'parent_panel_id')
+    panel_mains = {panel_id: main_id for panel_id, main_id, _, _ in panel_rows}
+    # نفس شرط Panel.save: القاطع المغذي في اللوحة الأم يغذي القاطع الرئيسي
+    panel_feeders = {panel_id: feeder_id for panel_id, _, feeder_id, parent_id in panel_rows if feeder_id and parent_id}
+    # القواطع الحالية المرتبطة كقاطع رئيسي للوحة أو كقاطع عمومي لمصدر لا تعاد تعيينها
+    linked_mains = set(Panel.objects.filter(main_breaker_id__in=list(existing)).values_list('main_breaker_id', flat=True))
+    linked_mains.update(PowerSource.objects.filter(main_breaker_id__in=list(existing)).values_list('main_breaker_id', flat=True))
+
+    wiring = {}
+    for index, data in enumerate(validated):
+        if not data:
+            continue
+        if data.get('panel') is not None and data['panel'] not in panel_mains:
+            _add_error(errors, index, 'panel', 'اللوحة المحددة غير موجودة')
+            continue
+        if errors[index] is not None:
+            continue
+        current = existing.get(data.get('id'))
+        role = data.get('breaker_role', current.breaker_role if current else 'distribution')
+        panel_id = data['panel'] if 'panel' in data else (current.panel_id if current else None)
+        if role != 'main' or not panel_id or (current and current.pk in linked_mains):
+            continue
+        # نفس شرط PanelBreakerSerializer: لوحة واحدة لها قاطع رئيسي واحد
+        if panel_mains[panel_id] is not None or panel_id in wiring.values():
+            _add_error(errors, index, 'breaker_role', 'هذه اللوحة تحتوي بالفعل على قاطع رئيسي')
+        else:
+            wiring[index] = panel_id
+    if any(errors):
+        return None, errors
+
+    objects, updated_fields = _build_objects(CircuitBreaker, validated, errors, existing)
+    with transaction.atomic():
+        _write(CircuitBreaker, objects, updated_fields)
+        by_index = {index: breaker for index, breaker, _ in objects}
+        feeds = [
+            (by_index[index].pk, panel_feeders[panel_id]) for index, panel_id in wiring.items() if panel_id in panel_feeders
+        ]
+        if wiring:
+            Panel.objects.bulk_update(
+                [Panel(id=panel_id, main_breaker_id=by_index[index].pk) for index, panel_id in wiring.items()],
+                ['main_breaker_id'], batch_size=500
+            )
+        if feeds:
+            through = CircuitBreaker.feeding_breakers.through
+            through.objects.bulk_create(
+                [through(from_circuitbreaker_id=main_id, to_circuitbreaker_id=feeder_id) for main_id, feeder_id in feeds],
+                batch_size=500, ignore_conflicts=True
+            )
+        _finish(
+            {breaker.panel_id for _, breaker, _ in objects} | {previous[0] for _, _, previous in objects},
+            {breaker.pk for _, breaker, _ in objects} | {feeder_id for _, feeder_id in feeds}
+        )
+    return [breaker for _, breaker, _ in objects], None
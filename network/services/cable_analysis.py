@@ -0,0 +1,323 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - التحليل الكهربائي المجمع للكابلات (Cable analysis)
+يحمّل بيانات كابلات جميع المصادر واللوحات والأحمال في مصفوفات NumPy (استعلام لكل جدول)
+ويحسب هبوط الجهد ونسبته والفقد في الطاقة والسعة القصوى وهامش التيار للشبكة كاملة في تمريرة واحدة
+بنفس معادلات CableMixin (calculate_voltage_drop و calculate_power_loss و get_max_current_capacity)
+ثم يجمع هبوط الجهد من كابل المصدر عبر كابلات اللوحات حتى كابل الحمل في تمريرة واحدة من أعلى الشجرة إلى أسفلها
+يحفظ التحليل في ذاكرة العملية ويعاد بناؤه فقط عند تغير رقم مراجعة الشبكة (مثل رسم التغذية)
+"""
+
+import threading
+
+import numpy as np
+
+from ..models import CableConstants, PowerSource, Panel, Load, NetworkRevision
+
+# أنواع الكائنات التي تحمل بيانات كابل، بالترتيب المستخدم في النتائج
+KINDS = ('source', 'panel', 'load')
+
+# المواد بالترتيب المستخدم في جداول البحث، والمادة غير المعروفة تعامل كنحاس كما في CableMixin
+MATERIALS = ('copper', 'aluminum')
+
+# القيم الافتراضية في CableMixin عندما لا يكون المقطع موجوداً في الجداول
+DEFAULT_RESISTANCE_PER_KM = 0.5
+DEFAULT_CURRENT_CAPACITY = 0.0
+
+# الحقول العددية في النتائج التي يمكن الترتيب حسبها
+RESULT_FIELDS = (
+    'current', 'nominal_voltage', 'cable_length', 'voltage_drop', 'voltage_drop_percentage',
+    'power_loss', 'max_current_capacity', 'ampacity_margin', 'utilization_percentage',
+    'cumulative_voltage_drop', 'cumulative_voltage_drop_percentage',
+)
+
+
+def _lookup_table(table):
+    """
+    تحويل جدول {مادة: {مقطع: قيمة}} إلى مصفوفات مرتبة لكل مادة
+    Returns:
+        list: (مصفوفة المقاطع المرتبة, مصفوفة القيم) لكل مادة بترتيب MATERIALS
+    """
+    arrays = []
+    for material in MATERIALS:
+        sections = sorted(table[material])
+        arrays.append((
+            np.array(sections, dtype=np.float64),
+            np.array([table[material][section] for section in sections], dtype=np.float64),
+        ))
+    return arrays
+
+
+RESISTANCE_TABLES = _lookup_table(CableConstants.CABLE_RESISTIVITY)
+CAPACITY_TABLES = _lookup_table(CableConstants.CURRENT_CAPACITY)
+
+
+def _lookup(tables, material_codes, cross_sections, default):
+    """
+    بحث متجه عن قيمة كل مقطع في جدول مادته (searchsorted على المقاطع المرتبة)
+    المقاطع غير الموجودة في الجدول تأخذ القيمة الافتراضية
+    """
+    result = np.full(cross_sections.shape, default, dtype=np.float64)
+    for code, (sections, values) in enumerate(tables):
+        rows = material_codes == code
+        if not rows.any():
+            continue
+        wanted = cross_sections[rows]
+        positions = np.minimum(np.searchsorted(sections, wanted), len(sections) - 1)
+        found = sections[positions] == wanted
+        result[rows] = np.where(found, values[positions], default)
+    return result
+
+
+def _codes(values, choices, default=0):
+    """تحويل قيم نصية إلى أرقام بحسب ترتيبها في choices (القيم غير المعروفة تأخذ default)"""
+    index = {choice: code for code, choice in enumerate(choices)}
+    return np.fromiter((index.get(value, default) for value in values), dtype=np.int8, count=len(values))
+
+
+def _nominal_voltages(voltages):
+    """تحويل قيم الجهد النصية ('11KV', '380', ...) إلى فولت كما في Load.voltage_value"""
+    unique, inverse = np.unique(np.asarray(voltages, dtype=str), return_inverse=True)
+    mapped = np.array([11000.0 if value == '11KV' else float(value or 0) for value in unique], dtype=np.float64)
+    return mapped[inverse] if len(voltages) else np.zeros(0)
+
+
+# لكل نوع: حقل التيار وحقلا العنصر الأعلى في مسار التغذية (اللوحة الأم أو مصدر الطاقة أو لوحة الحمل)
+CABLE_SOURCES = (
+    ('source', PowerSource, 'total_ampacity', ()),
+    ('panel', Panel, 'ampacity', (('panel', 'parent_panel_id'), ('source', 'power_source_id'))),
+    ('load', Load, 'ampacity', (('panel', 'panel_id'),)),
+)
+
+
+def cable_rows():
+    """
+    صفوف كابلات الشبكة من قاعدة البيانات (استعلام لكل جدول)
+
+    Returns:
+        dict: {نوع: قائمة (المعرف, الاسم, الجهد, التيار, العدد, المقطع, المادة, الطول, المسار, (نوع العنصر الأعلى, معرفه) أو None)}
+    """
+    result = {}
+    for kind, model, current_field, upstream_fields in CABLE_SOURCES:
+        rows = model.objects.order_by('id').values_list(
+            'id', 'name', 'voltage', current_field, 'cable_quantity', 'cable_cross_section',
+            'cable_material', 'cable_length', 'cable_path', *(field for _, field in upstream_fields)
+        )
+        result[kind] = []
+        for row in rows:
+            # أول رابط موجود هو العنصر الأعلى (اللوحة الأم قبل مصدر الطاقة للوحات)
+            link = next(
+                ((upstream_kind, link) for (upstream_kind, _), link in zip(upstream_fields, row[9:]) if link), None
+            )
+            result[kind].append((*row[:9], link))
+    return result
+
+
+class CableAnalysis:
+    """
+    نتائج التحليل المجمع: كل خاصية مصفوفة بطول عدد الكابلات (صف لكل مصدر أو لوحة أو حمل)
+    upstream يحمل لكل صف موقع العنصر الأعلى في مسار التغذية (-1 للمصادر واللوحات غير المتصلة)
+    القيم غير المعرفة (مثل نسبة الهبوط لجهد صفري) تخزن NaN وتعاد None في الصفوف
+    rows (اختياري) صفوف بصيغة cable_rows() بدلاً من قاعدة البيانات، مثل شبكة سيناريو في الذاكرة
+    """
+
+    def __init__(self, revision=None, rows=None):
+        self.revision = revision
+        kinds, ids, names, voltages, upstream = [], [], [], [], []
+        columns = {name: [] for name in ('current', 'quantity', 'cross_section', 'material', 'length', 'path')}
+
+        rows = cable_rows() if rows is None else rows
+        for kind in KINDS:
+            for object_id, name, voltage, current, quantity, cross_section, material, length, path, link in rows[kind]:
+                upstream.append(link)
+                kinds.append(kind)
+                ids.append(object_id)
+                names.append(name)
+                voltages.append(voltage)
+                columns['current'].append(current or 0)
+                columns['quantity'].append(quantity or 0)
+                columns['cross_section'].append(cross_section or 0)
+                columns['material'].append(material)
+                columns['length'].append(length or 0)
+                columns['path'].append(path)
+
+        self.kind = np.array(kinds, dtype=object)
+        self.ids = np.array(ids, dtype=np.int64)
+        self.names = names
+        self.voltages = voltages
+        self.current = np.array(columns['current'], dtype=np.float64)
+        self.cable_length = np.array(columns['length'], dtype=np.float64)
+        self.quantity = quantity = np.array(columns['quantity'], dtype=np.float64)
+        self.cross_section = cross_section = np.array(columns['cross_section'], dtype=np.float64)
+        self.material = material = _codes(columns['material'], MATERIALS)
+        self.path_factor = path_factor = np.array(
+            [CableConstants.PATH_CORRECTION_FACTOR.get(path, 1.0) for path in columns['path']], dtype=np.float64
+        )
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            resistance_per_km = _lookup(RESISTANCE_TABLES, material, cross_section, DEFAULT_RESISTANCE_PER_KM)
+            # مقاومة الكابلات المتوازية لكل متر (عدد كابلات صفري يعطي NaN بدلاً من خطأ القسمة)
+            self.resistance = np.where(quantity > 0, resistance_per_km / 1000 / quantity, np.nan)
+            self.nominal_voltage = _nominal_voltages(self.voltages)
+            self.voltage_drop = self.current * self.resistance * self.cable_length
+            self.voltage_drop_percentage = np.where(
+                self.nominal_voltage > 0, self.voltage_drop / self.nominal_voltage * 100, np.nan
+            )
+            self.power_loss = self.current ** 2 * self.resistance * self.cable_length
+            self.max_current_capacity = (
+                _lookup(CAPACITY_TABLES, material, cross_section, DEFAULT_CURRENT_CAPACITY) * path_factor * quantity
+            )
+            self.ampacity_margin = self.max_current_capacity - self.current
+            self.utilization_percentage = np.where(
+                self.max_current_capacity > 0, self.current / self.max_current_capacity * 100, np.nan
+            )
+
+        self.index = {(kind, object_id): position for position, (kind, object_id) in enumerate(zip(kinds, ids))}
+        self.upstream = np.array(
+            [self.index.get(link, -1) if link else -1 for link in upstream], dtype=np.int64
+        )
+        self._build_levels()
+        self._accumulate_voltage_drop()
+
+    def _build_levels(self):
+        """
+        حساب عمق كل عنصر في مسار التغذية (0 للمصادر والعناصر غير المتصلة) وتجميع الصفوف حسب العمق
+        levels[d] مصفوفة مواقع العناصر في العمق d، فالعنصر الأعلى لكل صف في levels[d] موجود في levels[d - 1]
+        العمق يحسب بالقفز المتكرر على العناصر الأعلى (عدد التكرارات = عمق الشجرة، كل تكرار عملية متجهة)
+        """
+        count = len(self)
+        self.depth = np.zeros(count, dtype=np.int64)
+        ancestor = self.upstream.copy()
+        for _ in range(count):
+            has_ancestor = ancestor >= 0
+            if not has_ancestor.any():
+                break
+            self.depth[has_ancestor] += 1
+            ancestor[has_ancestor] = self.upstream[ancestor[has_ancestor]]
+
+        max_depth = int(self.depth.max()) if count else -1
+        order = np.argsort(self.depth, kind='stable')
+        boundaries = np.searchsorted(self.depth[order], np.arange(max_depth + 2))
+        self.levels = [order[boundaries[level]:boundaries[level + 1]] for level in range(max_depth + 1)]
+
+    def _accumulate_voltage_drop(self):
+        """
+        هبوط الجهد التراكمي من المصدر إلى كل عنصر: هبوط كابل العنصر + الهبوط التراكمي للعنصر الأعلى
+        تعالج المستويات من الأعلى إلى الأسفل، وكل مستوى عملية متجهة واحدة لأن عناصره الأعلى حسبت في المستوى السابق
+        النسبة التراكمية مجموع نسب المقاطع (كل مقطع بالنسبة لجهده الاسمي) فتبقى صحيحة عبر مستويات الجهد المختلفة
+        """
+        count = len(self)
+        self.cumulative_voltage_drop = np.zeros(count)
+        self.cumulative_voltage_drop_percentage = np.zeros(count)
+        for rows in self.levels:
+            parents = self.upstream[rows]
+            has_parent = parents >= 0
+            for cumulative, segment in (
+                (self.cumulative_voltage_drop, self.voltage_drop),
+                (self.cumulative_voltage_drop_percentage, self.voltage_drop_percentage),
+            ):
+                cumulative[rows] = segment[rows] + np.where(has_parent, cumulative[np.maximum(parents, 0)], 0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def cumulative_for(self, kind, object_id):
+        """هبوط الجهد التراكمي لكائن واحد (None إذا لم يكن موجوداً في التحليل)"""
+        position = self.index.get((kind, object_id))
+        if position is None:
+            return None
+        drop = float(self.cumulative_voltage_drop[position])
+        percentage = float(self.cumulative_voltage_drop_percentage[position])
+        return {
+            'voltage_drop': None if drop != drop else drop,
+            'voltage_drop_percentage': None if percentage != percentage else percentage,
+        }
+
+    def mask(self, kinds=None, min_drop_percentage=None, min_cumulative_drop_percentage=None,
+             min_utilization=None, overloaded=False):
+        """
+        بناء قناع منطقي للصفوف المطابقة لجميع الشروط المحددة
+
+        Args:
+            kinds: أنواع الكائنات المطلوبة (من KINDS) أو None للجميع
+            min_drop_percentage: أقل نسبة هبوط جهد (%)، مثل 3 للكابلات التي يتجاوز هبوطها 3%
+            min_cumulative_drop_percentage: أقل نسبة هبوط جهد تراكمي من المصدر (%)
+            min_utilization: أقل نسبة استخدام لسعة الكابل (%)
+            overloaded: الكابلات التي يتجاوز تيارها سعتها القصوى فقط (هامش سالب)
+        """
+        selected = np.ones(len(self), dtype=bool)
+        if kinds:
+            selected &= np.isin(self.kind, list(kinds))
+        with np.errstate(invalid='ignore'):
+            if min_drop_percentage is not None:
+                selected &= self.voltage_drop_percentage >= min_drop_percentage
+            if min_cumulative_drop_percentage is not None:
+                selected &= self.cumulative_voltage_drop_percentage >= min_cumulative_drop_percentage
+            if min_utilization is not None:
+                selected &= self.utilization_percentage >= min_utilization
+            if overloaded:
+                selected &= self.ampacity_margin < 0
+        return selected
+
+    def rows(self, selected=None, ordering=None):
+        """
+        تحويل الصفوف المحددة إلى قوائم قواميس (بعد التصفية فقط حتى تبقى الحلقة على النتائج المطلوبة)
+        ordering: اسم حقل من RESULT_FIELDS مع '-' اختياري للترتيب التنازلي (القيم غير المعرفة في النهاية)
+        """
+        indices = np.flatnonzero(selected) if selected is not None else np.arange(len(self))
+        if ordering:
+            field = ordering.lstrip('-')
+            values = getattr(self, field)[indices]
+            keys = -values if ordering.startswith('-') else values
+            # argsort يضع NaN في النهاية، والترتيب المستقر يحافظ على ترتيب النوع ثم المعرف عند التساوي
+            indices = indices[np.argsort(keys, kind='stable')]
+
+        columns = {field: getattr(self, field)[indices].tolist() for field in RESULT_FIELDS}
+        results = []
+        for position, index in enumerate(indices.tolist()):
+            row = {
+                'kind': self.kind[index],
+                'id': int(self.ids[index]),
+                'name': self.names[index],
+                'voltage': self.voltages[index],
+            }
+            for field in RESULT_FIELDS:
+                value = columns[field][position]
+                row[field] = None if value != value else value  # NaN → None
+            results.append(row)
+        return results
+
+    def summary(self, selected=None):
+        """إجماليات الصفوف المحددة: العدد والفقد الكلي وأعلى نسبة هبوط وعدد الكابلات المحملة فوق سعتها"""
+        selected = np.ones(len(self), dtype=bool) if selected is None else selected
+        def maximum(values):
+            values = values[selected]
+            values = values[~np.isnan(values)]
+            return float(values.max()) if values.size else None
+
+        return {
+            'count': int(selected.sum()),
+            'total_power_loss': float(np.nansum(self.power_loss[selected])),
+            'max_voltage_drop_percentage': maximum(self.voltage_drop_percentage),
+            'max_cumulative_voltage_drop_percentage': maximum(self.cumulative_voltage_drop_percentage),
+            'overloaded_count': int((self.ampacity_margin[selected] < 0).sum()),
+        }
+
+
+_cache = {'key': None, 'analysis': None}
+_cache_lock = threading.Lock()
+
+
+def analyze_cables():
+    """
+    إرجاع تحليل كابلات الشبكة للمراجعة الحالية
+    يبنى بثلاثة استعلامات وتمريرة متجهة واحدة، ثم يكلف استعلاماً واحداً ما لم تتغير الشبكة
+    """
+    key = NetworkRevision.current()
+    with _cache_lock:
+        if _cache['key'] == key and _cache['analysis'] is not None:
+            return _cache['analysis']
+    analysis = CableAnalysis(revision=key[0])
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['analysis'] = analysis
+    return analysis
@@ -0,0 +1,210 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - محرك تحديد مقاطع الكابلات (Cable sizing)
+يختار لكل مصدر ولوحة وحمل أصغر مقطع كابل (وأقل عدد كابلات متوازية) يحقق الشرطين:
+- سعة الكابل بعد معامل تصحيح المسار لا تقل عن تيار العنصر
+- نسبة هبوط الجهد في الكابل لا تتجاوز الحد المحدد
+يعمل على مصفوفات تحليل الكابلات (cable_analysis) للشبكة كاملة دفعة واحدة،
+مع جداول CableConstants مرتبة حسب المقطع ويبحث فيها بحثاً ثنائياً (searchsorted)
+"""
+
+import numpy as np
+from django.db import transaction
+
+from ..models import CableConstants, PowerSource, Panel, Load, NetworkRevision
+from . import read_cache
+from .cable_analysis import MATERIALS, analyze_cables
+
+DEFAULT_MAX_DROP_PERCENTAGE = 3.0
+DEFAULT_MAX_QUANTITY = 4
+
+SIZING_FIELDS = ('cable_cross_section', 'cable_quantity')
+MODELS = {'source': PowerSource, 'panel': Panel, 'load': Load}
+
+
+def _sizing_table(material):
+    """
+    المقاطع المتاحة لمادة مرتبة تصاعدياً مع سعة التيار (تزايدية) والمقاومة لكل كم (تناقصية) لكل مقطع
+    المقاطع المعتمدة هي الموجودة في الجدولين معاً
+    """
+    sections = sorted(set(CableConstants.CURRENT_CAPACITY[material]) & set(CableConstants.CABLE_RESISTIVITY[material]))
+    return (
+        np.array(sections, dtype=np.float64),
+        np.array([CableConstants.CURRENT_CAPACITY[material][section] for section in sections], dtype=np.float64),
+        np.array([CableConstants.CABLE_RESISTIVITY[material][section] for section in sections], dtype=np.float64),
+    )
+
+
+SIZING_TABLES = [_sizing_table(material) for material in MATERIALS]
+
+
+class CableSizing:
+    """
+    نتيجة تحديد المقاطع لجميع الكابلات: مصفوفات بنفس ترتيب صفوف تحليل الكابلات
+    العناصر بدون تيار تبقى بمقاطعها الحالية، والعناصر التي لا يكفيها أكبر مقطع بأكبر عدد كابلات تعتبر غير قابلة للحل
+    """
+
+    def __init__(self, analysis, max_drop_percentage=DEFAULT_MAX_DROP_PERCENTAGE, max_quantity=DEFAULT_MAX_QUANTITY):
+        self.analysis = analysis
+        self.max_drop_percentage = max_drop_percentage
+        self.max_quantity = max_quantity
+
+        count = len(analysis)
+        current = analysis.current
+        self.sized = current > 0
+        self.cross_section = analysis.cross_section.copy()
+        self.quantity = analysis.quantity.copy()
+        self.feasible = np.ones(count, dtype=bool)
+        self.feasible[self.sized] = False
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # أقصى مقاومة لكل كم لكابل واحد: هبوط الجهد = التيار × (المقاومة لكل كم / 1000 / العدد) × الطول
+            current_length = current * analysis.cable_length
+            allowed_drop = np.where(
+                analysis.nominal_voltage > 0, analysis.nominal_voltage * max_drop_percentage / 100, np.inf
+            )
+            max_resistance_per_cable = np.where(current_length > 0, allowed_drop * 1000 / current_length, np.inf)
+
+            pending = self.sized.copy()
+            # أقل عدد كابلات أولاً، ثم أصغر مقطع يكفي بهذا العدد
+            for quantity in range(1, max_quantity + 1):
+                if not pending.any():
+                    break
+                for code, (sections, capacities, resistances) in enumerate(SIZING_TABLES):
+                    rows = np.flatnonzero(pending & (analysis.material == code))
+                    if not rows.size:
+                        continue
+                    required_capacity = current[rows] / (analysis.path_factor[rows] * quantity)
+                    capacity_index = np.searchsorted(capacities, required_capacity, side='left')
+                    # المقاومات تناقصية، لذلك يبحث في سالبها (تزايدي) عن أول مقطع مقاومته ضمن الحد
+                    drop_index = np.searchsorted(-resistances, -max_resistance_per_cable[rows] * quantity, side='left')
+                    index = np.maximum(capacity_index, drop_index)
+                    found = index < len(sections)
+                    chosen = rows[found]
+                    self.cross_section[chosen] = sections[index[found]]
+                    self.quantity[chosen] = quantity
+                    self.feasible[chosen] = True
+                    pending[chosen] = False
+
+            resistance_per_km = np.full(count, np.nan)
+            capacity = np.zeros(count)
+            for code, (sections, capacities, resistances) in enumerate(SIZING_TABLES):
+                rows = np.flatnonzero(analysis.material == code)
+                positions = np.minimum(np.searchsorted(sections, self.cross_section[rows]), len(sections) - 1)
+                exact = sections[positions] == self.cross_section[rows]
+                resistance_per_km[rows] = np.where(exact, resistances[positions], np.nan)
+                capacity[rows] = np.where(exact, capacities[positions], 0)
+            self.voltage_drop_percentage = np.where(
+                analysis.nominal_voltage > 0,
+                current_length * resistance_per_km / 1000 / self.quantity / analysis.nominal_voltage * 100,
+                np.nan
+            )
+            self.max_current_capacity = capacity * analysis.path_factor * self.quantity
+
+        self.changed = self.sized & self.feasible & (
+            (self.cross_section != analysis.cross_section) | (self.quantity != analysis.quantity)
+        )
+
+    def recommendations(self, selected=None):
+        """
+        الفرق بين المقاطع الحالية والمقترحة للصفوف المحددة (قناع من CableAnalysis.mask)
+        Returns:
+            dict: {'changes': [...], 'infeasible': [...]}
+        """
+        analysis = self.analysis
+        selected = np.ones(len(analysis), dtype=bool) if selected is None else selected
+
+        def value(array, index):
+            number = float(array[index])
+            return None if number != number else number
+
+        changes = []
+        for index in np.flatnonzero(selected & self.changed).tolist():
+            old_area = analysis.cross_section[index] * analysis.quantity[index]
+            new_area = self.cross_section[index] * self.quantity[index]
+            changes.append({
+                'kind': analysis.kind[index],
+                'id': int(analysis.ids[index]),
+                'name': analysis.names[index],
+                'current': value(analysis.current, index),
+                'cable_material': MATERIALS[analysis.material[index]],
+                'change': 'upsize' if new_area > old_area else 'downsize',
+                'existing': {
+                    'cable_cross_section': value(analysis.cross_section, index),
+                    'cable_quantity': int(analysis.quantity[index]),
+                    'voltage_drop_percentage': value(analysis.voltage_drop_percentage, index),
+                    'max_current_capacity': value(analysis.max_current_capacity, index),
+                },
+                'recommended': {
+                    'cable_cross_section': value(self.cross_section, index),
+                    'cable_quantity': int(self.quantity[index]),
+                    'voltage_drop_percentage': value(self.voltage_drop_percentage, index),
+                    'max_current_capacity': value(self.max_current_capacity, index),
+                },
+            })
+        infeasible = [
+            {
+                'kind': analysis.kind[index],
+                'id': int(analysis.ids[index]),
+                'name': analysis.names[index],
+                'current': value(analysis.current, index),
+                'cable_length': value(analysis.cable_length, index),
+            }
+            for index in np.flatnonzero(selected & ~self.feasible).tolist()
+        ]
+        return {'changes': changes, 'infeasible': infeasible}
+
+
+def size_cables(max_drop_percentage=DEFAULT_MAX_DROP_PERCENTAGE, max_quantity=DEFAULT_MAX_QUANTITY, kinds=None):
+    """
+    حساب المقاطع المقترحة لجميع كابلات الشبكة
+    Returns:
+        dict: {'changes', 'infeasible', 'summary'}
+    """
+    analysis = analyze_cables()
+    sizing = CableSizing(analysis, max_drop_percentage, max_quantity)
+    selected = analysis.mask(kinds=kinds)
+    result = sizing.recommendations(selected)
+    result['summary'] = {
+        'max_drop_percentage': max_drop_percentage,
+        'max_quantity': max_quantity,
+        'checked': int((selected & sizing.sized).sum()),
+        'changes': len(result['changes']),
+        'upsize': sum(1 for change in result['changes'] if change['change'] == 'upsize'),
+        'infeasible': len(result['infeasible']),
+    }
+    return result
+
+
+def apply_cable_sizing(items=None, **options):
+    """
+    تطبيق المقاطع المقترحة دفعة واحدة (bulk_update لكل جدول داخل معاملة واحدة)
+    تعاد حسابات الاقتراحات على الخادم ولا تقبل قيم من العميل، ويمكن قصر التطبيق على عناصر محددة
+
+    Args:
+        items: قائمة (kind, id) للعناصر المطلوب تطبيقها أو None لتطبيق جميع الاقتراحات
+        options: نفس معاملات size_cables
+
+    Returns:
+        list: التغييرات المطبقة
+    """
+    with transaction.atomic():
+        changes = size_cables(**options)['changes']
+        if items is not None:
+            wanted = set(items)
+            changes = [change for change in changes if (change['kind'], change['id']) in wanted]
+        for kind, model in MODELS.items():
+            objects = [
+                model(id=change['id'], **{field: change['recommended'][field] for field in SIZING_FIELDS})
+                for change in changes if change['kind'] == kind
+            ]
+            if objects:
+                model.objects.bulk_update(objects, SIZING_FIELDS, batch_size=500)
+        if changes:
+            # bulk_update لا يرسل إشارات، لذلك تزاد المراجعة وتبطل اللوحات المتأثرة هنا
+            # (كابلات اللوحات والمصادر تدخل في هبوط الجهد التراكمي لجميع اللوحات التابعة لها)
+            NetworkRevision.bump()
+            read_cache.invalidate_panel_subtrees(change['id'] for change in changes if change['kind'] == 'panel')
+            for change in changes:
+                if change['kind'] == 'source':
+                    read_cache.invalidate_power_source(change['id'])
+    return changes
@@ -0,0 +1,305 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - دراسة الطوارئ N-1 (Contingency analysis)
+تفصل كل قاطع (وكل مصدر طاقة) على حدة وتحدد الأحمال التي تفقد التغذية والأمبير المفقود،
+مع احتساب التغذية البديلة: القاطع الذي له عدة قواطع مغذية (feeding_breakers) يبقى موصولاً إذا بقي أحدها موصولاً
+
+الرسم (services/supply_graph.py) يبنى بخمسة استعلامات من علاقات التغذية وشجرة اللوحات:
+- المصدر ← قاطعه العمومي ← مدخل كل لوحة رئيسية له
+- مدخل اللوحة الفرعية من قاطعها المغذي (feeder_breaker) أو من قضيب لوحتها الأم
+- قضيب اللوحة من قاطعها الرئيسي إن وجد أو من مدخلها مباشرة
+- القاطع من قواطعه المغذية إن وجدت، وإلا من مدخل لوحته (القاطع الرئيسي) أو من قضيب لوحته
+- الحمل من قاطعه أو من قضيب لوحته
+الرسم وحالة التغذية الطبيعية (SupplyNetwork) يبنيان مرة واحدة لكل مراجعة ويتشاركهما فهرس التأثير (services/impact.py)
+الحالات توزع على عمليات متوازية (ProcessPoolExecutor) تتشارك نسخة واحدة للقراءة فقط من الرسم المضغوط
+عدد العمليات من الإعداد NETWORK_CONTINGENCY_WORKERS (عدد المعالجات افتراضياً)
+"""
+
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+
+from ..models import PowerSource, Panel, CircuitBreaker, Load, NetworkRevision
+from .supply_graph import SOURCE, BREAKER, INCOMING, BUS, LOAD, SupplyGraph, init_worker, trip_many
+
+KINDS = ('breaker', 'source')
+
+# أقل عدد حالات لاستخدام العمليات المتوازية (بدء العمليات أغلى من حساب الحالات القليلة)
+PARALLEL_MIN_CONTINGENCIES = 500
+
+# عدد الحالات في كل دفعة عمل ترسل إلى عملية
+CHUNK_SIZE = 64
+
+
+def worker_count():
+    """عدد العمليات المتوازية (الإعداد NETWORK_CONTINGENCY_WORKERS أو عدد المعالجات)"""
+    return getattr(settings, 'NETWORK_CONTINGENCY_WORKERS', None) or os.cpu_count() or 1
+
+
+def build_supply_graph():
+    """
+    بناء رسم التغذية المضغوط من قاعدة البيانات
+
+    Returns:
+        tuple: (SupplyGraph, {نوع: (المعرفات, الأسماء, مصفوفة العقد)} للمصادر والقواطع واللوحات والأحمال,
+                أنواع الأحمال بترتيب أحمال القاموس)
+    """
+    sources = list(PowerSource.objects.order_by('id').values_list('id', 'name', 'main_breaker_id'))
+    breakers = list(CircuitBreaker.objects.order_by('id').values_list('id', 'name', 'panel_id'))
+    panels = list(Panel.objects.order_by('id').values_list(
+        'id', 'name', 'parent_panel_id', 'power_source_id', 'feeder_breaker_id', 'main_breaker_id'
+    ))
+    loads = list(Load.objects.order_by('id').values_list('id', 'name', 'panel_id', 'breaker_id', 'ampacity', 'load_type'))
+    feeders = defaultdict(list)
+    through = CircuitBreaker.feeding_breakers.through
+    for fed_id, feeder_id in through.objects.values_list('from_circuitbreaker_id', 'to_circuitbreaker_id'):
+        feeders[fed_id].append(feeder_id)
+
+    # ترتيب العقد: المصادر، القواطع، مداخل اللوحات، قضبان اللوحات، الأحمال
+    source_node = {row[0]: index for index, row in enumerate(sources)}
+    offset = len(sources)
+    breaker_node = {row[0]: offset + index for index, row in enumerate(breakers)}
+    offset += len(breakers)
+    incoming_node = {row[0]: offset + index for index, row in enumerate(panels)}
+    offset += len(panels)
+    bus_node = {row[0]: offset + index for index, row in enumerate(panels)}
+    offset += len(panels)
+    load_node = {row[0]: offset + index for index, row in enumerate(loads)}
+
+    edges = []
+    source_output = {}
+    for source_id, _, main_breaker_id in sources:
+        source_output[source_id] = source_node[source_id]
+        if main_breaker_id in breaker_node:
+            edges.append((source_node[source_id], breaker_node[main_breaker_id]))
+            source_output[source_id] = breaker_node[main_breaker_id]
+
+    panel_of_main = {}
+    for panel_id, _, parent_id, source_id, feeder_id, main_id in panels:
+        if parent_id is None:
+            if source_id in source_output:
+                edges.append((source_output[source_id], incoming_node[panel_id]))
+        elif feeder_id in breaker_node:
+            edges.append((breaker_node[feeder_id], incoming_node[panel_id]))
+        elif parent_id in bus_node:
+            edges.append((bus_node[parent_id], incoming_node[panel_id]))
+        if main_id in breaker_node:
+            panel_of_main[main_id] = panel_id
+            edges.append((breaker_node[main_id], bus_node[panel_id]))
+        else:
+            edges.append((incoming_node[panel_id], bus_node[panel_id]))
+
+    for breaker_id, _, panel_id in breakers:
+        breaker_feeders = [feeder_id for feeder_id in feeders.get(breaker_id, ()) if feeder_id in breaker_node]
+        if breaker_feeders:
+            edges.extend((breaker_node[feeder_id], breaker_node[breaker_id]) for feeder_id in breaker_feeders)
+        elif breaker_id in panel_of_main:
+            edges.append((incoming_node[panel_of_main[breaker_id]], breaker_node[breaker_id]))
+        elif panel_id in bus_node:
+            edges.append((bus_node[panel_id], breaker_node[breaker_id]))
+
+    for load_id, _, panel_id, breaker_id, _, _ in loads:
+        if breaker_id in breaker_node:
+            edges.append((breaker_node[breaker_id], load_node[load_id]))
+        elif panel_id in bus_node:
+            edges.append((bus_node[panel_id], load_node[load_id]))
+
+    kinds = (
+        [SOURCE] * len(sources) + [BREAKER] * len(breakers)
+        + [INCOMING] * len(panels) + [BUS] * len(panels) + [LOAD] * len(loads)
+    )
+    ampacity = np.zeros(len(kinds))
+    ampacity[[load_node[row[0]] for row in loads]] = [row[4] or 0 for row in loads]
+    graph = SupplyGraph(kinds, ampacity, edges)
+
+    def nodes(rows, index):
+        return [row[0] for row in rows], [row[1] for row in rows], np.array([index[row[0]] for row in rows], dtype=np.int64)
+
+    return graph, {
+        'source': nodes(sources, source_node),
+        'breaker': nodes(breakers, breaker_node),
+        'panel': nodes(panels, bus_node),
+        'load': nodes(loads, load_node),
+    }, [row[5] for row in loads]
+
+
+def run_trips(graph, live, elements, workers=1, min_parallel=PARALLEL_MIN_CONTINGENCIES):
+    """
+    فصل كل عقدة من elements على حدة، على عمليات متوازية عندما يكفي عدد الحالات
+
+    Returns:
+        list: نتائج trip_many بنفس ترتيب elements
+    """
+    if workers <= 1 or len(elements) < max(min_parallel, 1):
+        return trip_many(elements, graph, live)
+    chunks = [elements[start:start + CHUNK_SIZE] for start in range(0, len(elements), CHUNK_SIZE)]
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=init_worker, initargs=(graph,)) as pool:
+        for chunk_results in pool.map(trip_many, chunks):
+            results.extend(chunk_results)
+    return results
+
+
+class SupplyNetwork:
+    """
+    رسم التغذية لمراجعة واحدة مع حالة التغذية الطبيعية والتحويل بين العقد ومعرفات الكائنات
+    """
+
+    def __init__(self, revision=None):
+        self.revision = revision
+        self.graph, self.nodes, self.load_types = build_supply_graph()
+        self.live = self.graph.energized()
+        # {نوع: {المعرف: العقدة}} و {نوع: {العقدة: الترتيب في nodes}}
+        self.node_of = {kind: dict(zip(ids, element_nodes.tolist())) for kind, (ids, _, element_nodes) in self.nodes.items()}
+        self.position = {
+            kind: {node: index for index, node in enumerate(element_nodes.tolist())}
+            for kind, (_, _, element_nodes) in self.nodes.items()
+        }
+
+    def trip_node(self, kind, object_id):
+        """
+        العقدة التي يمثل فصلها فصل العنصر أو None: القاطع أو المصدر نفسه،
+        ومدخل اللوحة (يسبق قضيبها بعدد اللوحات في ترتيب العقد) حتى يشمل فصلها قاطعها الرئيسي وكل ما عليها
+        """
+        node = self.node_of[kind].get(object_id)
+        if node is None or kind != 'panel':
+            return node
+        return node - len(self.nodes['panel'][0])
+
+
+class ContingencyStudy:
+    """
+    نتائج فصل كل قاطع وكل مصدر: مصفوفات بطول عدد الحالات (القواطع ثم المصادر)
+    """
+
+    def __init__(self, network=None, workers=1, min_parallel=PARALLEL_MIN_CONTINGENCIES):
+        self.network = network = network or SupplyNetwork()
+        self.revision = network.revision
+        self.graph, self.nodes = network.graph, network.nodes
+        self.workers = workers
+        live = network.live
+        load_ids, load_names, load_nodes = self.nodes['load']
+        self.load_position = network.position['load']
+        self.load_ids, self.load_names = load_ids, load_names
+        self.supplied_loads = int(live[load_nodes].sum()) if len(load_nodes) else 0
+        self.supplied_ampacity = float(self.graph.ampacity[load_nodes][live[load_nodes]].sum()) if len(load_nodes) else 0.0
+
+        self.kind, self.ids, self.names, elements = [], [], [], []
+        for kind in KINDS:
+            ids, names, element_nodes = self.nodes[kind]
+            self.kind.extend([kind] * len(ids))
+            self.ids.extend(ids)
+            self.names.extend(names)
+            elements.extend(element_nodes.tolist())
+        self.index = {(kind, object_id): position for position, (kind, object_id) in enumerate(zip(self.kind, self.ids))}
+
+        results = run_trips(self.graph, live, elements, workers, min_parallel)
+        kinds, ampacity = self.graph.kinds, self.graph.ampacity
+        count = len(elements)
+        self.lost = [None] * count
+        self.lost_load_count = np.zeros(count, dtype=np.int64)
+        self.shed_ampacity = np.zeros(count)
+        self.rerouted_load_count = np.zeros(count, dtype=np.int64)
+        self.lost_breaker_count = np.zeros(count, dtype=np.int64)
+        self.lost_panel_count = np.zeros(count, dtype=np.int64)
+        for position, (_, lost, rescued) in enumerate(results):
+            lost_kinds = kinds[lost]
+            lost_loads = lost[lost_kinds == LOAD]
+            self.lost[position] = lost_loads
+            self.lost_load_count[position] = len(lost_loads)
+            self.shed_ampacity[position] = ampacity[lost_loads].sum()
+            self.rerouted_load_count[position] = int((kinds[rescued] == LOAD).sum())
+            self.lost_breaker_count[position] = int((lost_kinds == BREAKER).sum())
+            self.lost_panel_count[position] = int((lost_kinds == BUS).sum())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, position, detail=False):
+        result = {
+            'kind': self.kind[position],
+            'id': self.ids[position],
+            'name': self.names[position],
+            'lost_load_count': int(self.lost_load_count[position]),
+            'shed_ampacity': float(self.shed_ampacity[position]),
+            'rerouted_load_count': int(self.rerouted_load_count[position]),
+            'lost_breaker_count': int(self.lost_breaker_count[position]),
+            'lost_panel_count': int(self.lost_panel_count[position]),
+        }
+        if detail:
+            result['lost_loads'] = [
+                {
+                    'id': self.load_ids[self.load_position[node]],
+                    'name': self.load_names[self.load_position[node]],
+                    'ampacity': float(self.graph.ampacity[node]),
+                } for node in self.lost[position].tolist()
+            ]
+        return result
+
+    def rows(self, kinds=None, min_shed_ampacity=None):
+        """نتائج الحالات المطلوبة مرتبة من الأكبر في الأمبير المفقود"""
+        positions = [
+            position for position in range(len(self))
+            if (not kinds or self.kind[position] in kinds)
+            and (min_shed_ampacity is None or self.shed_ampacity[position] >= min_shed_ampacity)
+        ]
+        positions.sort(key=lambda position: (-self.shed_ampacity[position], self.kind[position], self.ids[position]))
+        return [self.row(position) for position in positions]
+
+    def detail(self, kind, object_id):
+        """نتيجة حالة واحدة مع قائمة الأحمال التي تفقد التغذية، أو None"""
+        position = self.index.get((kind, object_id))
+        return None if position is None else self.row(position, detail=True)
+
+    def summary(self):
+        with_loss = self.lost_load_count > 0
+        worst = int(np.argmax(self.shed_ampacity)) if len(self) else None
+        return {
+            'contingencies': len(self),
+            'with_load_loss': int(with_loss.sum()),
+            'supplied_loads': self.supplied_loads,
+            'supplied_ampacity': self.supplied_ampacity,
+            'max_shed_ampacity': float(self.shed_ampacity[worst]) if worst is not None else 0.0,
+            'worst': {'kind': self.kind[worst], 'id': self.ids[worst], 'name': self.names[worst]}
+            if worst is not None and with_loss[worst] else None,
+            'workers': self.workers,
+        }
+
+
+_cache = {'key': None, 'network': None, 'study': None}
+_cache_lock = threading.Lock()
+
+
+def get_supply_network():
+    """
+    إرجاع رسم التغذية للمراجعة الحالية للشبكة (يعاد بناؤه فقط عند تغير رقم المراجعة)
+    """
+    key = NetworkRevision.current()
+    with _cache_lock:
+        if _cache['key'] == key and _cache['network'] is not None:
+            return _cache['network']
+    network = SupplyNetwork(revision=key[0])
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['network'] = network
+        _cache['study'] = None
+    return network
+
+
+def study_contingencies():
+    """
+    إرجاع دراسة الطوارئ للمراجعة الحالية للشبكة (تعاد فقط عند إعادة بناء رسم التغذية)
+    """
+    network = get_supply_network()
+    with _cache_lock:
+        study = _cache['study']
+        if study is not None and study.network is network:
+            return study
+    study = ContingencyStudy(network, workers=worker_count())
+    with _cache_lock:
+        if _cache['network'] is network:
+            _cache['study'] = study
+    return study
@@ -0,0 +1,254 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - الطلب المتزامن من منحنيات التشغيل (Coincident demand)
+بدلاً من جمع القدرة الاسمية للأحمال، يجمع منحنيات التشغيل الساعية ليعطي لكل لوحة وقاطع ومصدر
+أقصى طلب متزامن (ذروة مجموع المنحنيات) ومنحنى مدة الحمل (Load duration curve)
+
+الأحمال تجمع في مجموعات حسب منحناها: منحنى الحمل نفسه، ثم منحنى نوعه، ثم منحنى بديل من ساعات التشغيل المقدرة
+فيكون الحساب ضرب مصفوفتين: أوزان (عقد × مجموعات) بالواط × منحنيات (مجموعات × ساعات)
+دون أي حلقة على الساعات أو مصفوفة ساعية لكل حمل
+- أوزان اللوحة: أحمالها المباشرة ثم تضاف كل لوحة إلى أمها من أعمق مستوى إلى الأعلى
+- أوزان القاطع: أحماله المباشرة + اللوحات التي يغذيها (feeder_breaker)، والقاطع الرئيسي للوحة يحمل اللوحة كاملة
+- أوزان المصدر: لوحاته الرئيسية، وقاطعه العمومي يحمل المصدر كاملاً
+المنحنيات اليومية تكرر 365 مرة عند وجود أي منحنى سنوي
+"""
+
+import threading
+
+import numpy as np
+
+from ..models import PowerSource, Panel, CircuitBreaker, Load, LoadProfile, NetworkRevision
+
+KINDS = ('source', 'panel', 'breaker')
+
+# بداية ساعات التشغيل في المنحنى البديل (الساعة 8 صباحاً)
+DEFAULT_USAGE_START_HOUR = 8
+
+
+def usage_profiles(hours, start=DEFAULT_USAGE_START_HOUR):
+    """
+    منحنيات يومية بديلة لمجموعة قيم ساعات تشغيل: 1 خلال ساعات التشغيل المتتالية من ساعة البداية
+    وجزء الساعة الأخيرة للساعات الكسرية (مثل 7.5 ساعة)
+
+    Returns:
+        مصفوفة (عدد القيم, 24)
+    """
+    hours = np.clip(np.asarray(hours, dtype=np.float64), 0, 24)
+    offset = (np.arange(24) - start) % 24
+    return np.clip(hours[:, None] - offset[None, :], 0, 1)
+
+
+class DemandStudy:
+    """
+    أوزان الطلب لكل عقدة (مصدر ولوحة وقاطع) ومنحنيات المجموعات
+    الحسابات الساعية تتم عند الطلب لمجموعات العقد المطلوبة فقط وعلى دفعات
+    """
+
+    CHUNK = 512
+
+    def __init__(self, revision=None):
+        self.revision = revision
+        profiles = list(LoadProfile.objects.values_list('load_id', 'load_type', 'resolution', 'data'))
+        load_profiles = {load_id: index for index, (load_id, _, _, _) in enumerate(profiles) if load_id}
+        type_profiles = {
+            load_type: index for index, (load_id, load_type, _, _) in enumerate(profiles) if not load_id and load_type
+        }
+        annual = any(resolution == LoadProfile.ANNUAL for _, _, resolution, _ in profiles)
+        self.horizon = LoadProfile.ANNUAL if annual else LoadProfile.DAILY
+
+        loads = list(Load.objects.values_list(
+            'id', 'panel_id', 'breaker_id', 'load_type', 'power_consumption', 'estimated_usage_hours'
+        ))
+
+        # مجموعة كل حمل: منحنى الحمل، ثم منحنى النوع، ثم ساعات التشغيل
+        groups, group_index, load_groups = [], {}, []
+        for load_id, _, _, load_type, _, usage_hours in loads:
+            if load_id in load_profiles:
+                key = ('profile', load_profiles[load_id])
+            elif load_type in type_profiles:
+                key = ('profile', type_profiles[load_type])
+            else:
+                key = ('usage', float(usage_hours or 0))
+            if key not in group_index:
+                group_index[key] = len(groups)
+                groups.append(key)
+            load_groups.append(group_index[key])
+
+        self.profiles = np.zeros((len(groups), self.horizon), dtype=np.float32)
+        usage_rows = [index for index, (source, _) in enumerate(groups) if source == 'usage']
+        if usage_rows:
+            daily = usage_profiles([groups[index][1] for index in usage_rows])
+            self.profiles[usage_rows] = np.tile(daily, self.horizon // LoadProfile.DAILY)
+        for index, (source, value) in enumerate(groups):
+            if source == 'profile':
+                _, _, resolution, data = profiles[value]
+                curve = np.frombuffer(bytes(data), dtype=LoadProfile.DTYPE)
+                if len(curve) != resolution:
+                    continue
+                self.profiles[index] = np.tile(curve, self.horizon // len(curve))
+        self.group_peaks = self.profiles.max(axis=1) if len(groups) else np.zeros(0)
+
+        # أوزان اللوحات (شجرة فرعية كاملة)
+        panels = list(Panel.objects.values_list(
+            'id', 'name', 'parent_panel_id', 'power_source_id', 'feeder_breaker_id', 'main_breaker_id', 'tree_depth'
+        ))
+        panel_index = {row[0]: index for index, row in enumerate(panels)}
+        group_count = len(groups)
+        load_group = np.array(load_groups, dtype=np.int64)
+        load_power = np.array([power or 0 for _, _, _, _, power, _ in loads], dtype=np.float64)
+
+        load_panel = np.array([panel_index.get(panel_id, -1) for _, panel_id, *_ in loads], dtype=np.int64)
+        on_panel = load_panel >= 0
+        depth = np.array([row[6] for row in panels], dtype=np.int64)
+        parent = np.array([panel_index.get(row[2], -1) for row in panels], dtype=np.int64)
+
+        # المصادر والمصدر المغذي لكل لوحة (مصدر لوحتها الرئيسية) من أعلى الشجرة إلى أسفلها
+        sources = list(PowerSource.objects.values_list('id', 'name', 'main_breaker_id'))
+        source_index = {row[0]: index for index, row in enumerate(sources)}
+        panel_source = np.array([
+            source_index.get(row[3], -1) if row[2] is None else -1 for row in panels
+        ], dtype=np.int64)
+        for level in range(1, int(depth.max()) + 1 if len(panels) else 0):
+            rows = np.flatnonzero((depth == level) & (parent >= 0))
+            panel_source[rows] = panel_source[parent[rows]]
+
+        # بيانات كل حمل (تستخدمها الحسابات المبنية على نفس المنحنيات مثل محرك التعرفة)
+        self.load_ids = np.array([row[0] for row in loads], dtype=np.int64)
+        self.load_types = [row[3] for row in loads]
+        self.load_group = load_group
+        self.load_power = load_power
+        self.load_panel = load_panel
+        self.load_source = np.full(len(loads), -1, dtype=np.int64)
+        self.load_source[on_panel] = panel_source[load_panel[on_panel]]
+        self.panel_parent = parent
+        self.panel_depth = depth
+        self.panel_source = panel_source
+
+        panel_weights = self.subtree_sum(
+            np.zeros((len(panels), group_count)), (load_panel[on_panel], load_group[on_panel]), load_power[on_panel]
+        )
+
+        # أوزان المصادر (لوحاتها الرئيسية)
+        source_weights = np.zeros((len(sources), group_count))
+        roots = [
+            (source_index[row[3]], index) for index, row in enumerate(panels)
+            if row[2] is None and row[3] in source_index
+        ]
+        if roots:
+            np.add.at(source_weights, [source for source, _ in roots], panel_weights[[panel for _, panel in roots]])
+
+        # أوزان القواطع
+        breakers = list(CircuitBreaker.objects.values_list('id', 'name'))
+        breaker_index = {row[0]: index for index, row in enumerate(breakers)}
+        breaker_weights = np.zeros((len(breakers), group_count))
+        load_breaker = np.array([breaker_index.get(breaker_id, -1) for _, _, breaker_id, *_ in loads], dtype=np.int64)
+        on_breaker = load_breaker >= 0
+        np.add.at(breaker_weights, (load_breaker[on_breaker], load_group[on_breaker]), load_power[on_breaker])
+        fed = [(breaker_index[row[4]], index) for index, row in enumerate(panels) if row[4] in breaker_index]
+        if fed:
+            np.add.at(breaker_weights, [breaker for breaker, _ in fed], panel_weights[[panel for _, panel in fed]])
+        for index, row in enumerate(panels):
+            if row[5] in breaker_index:
+                breaker_weights[breaker_index[row[5]]] = panel_weights[index]
+        for index, row in enumerate(sources):
+            if row[2] in breaker_index:
+                breaker_weights[breaker_index[row[2]]] = source_weights[index]
+
+        self.nodes = {
+            'source': ([row[0] for row in sources], [row[1] for row in sources], source_weights),
+            'panel': ([row[0] for row in panels], [row[1] for row in panels], panel_weights),
+            'breaker': ([row[0] for row in breakers], [row[1] for row in breakers], breaker_weights),
+        }
+        self.index = {
+            'source': source_index,
+            'panel': panel_index,
+            'breaker': breaker_index,
+        }
+
+    def subtree_sum(self, totals, positions, values):
+        """
+        إضافة قيم إلى لوحاتها ثم جمع كل لوحة إلى أمها من أعمق مستوى إلى الأعلى (إجماليات الأشجار الفرعية)
+
+        Args:
+            totals: مصفوفة اللوحات (عدد اللوحات, ...) تضاف إليها القيم
+            positions: فهارس اللوحات (أو صف فهارس لمصفوفة متعددة الأبعاد) كما في np.add.at
+            values: القيم المضافة
+        """
+        np.add.at(totals, positions, values)
+        depth, parent = self.panel_depth, self.panel_parent
+        for level in range(int(depth.max()) if len(depth) else 0, 0, -1):
+            rows = np.flatnonzero((depth == level) & (parent >= 0))
+            np.add.at(totals, parent[rows], totals[rows])
+        return totals
+
+    def demand(self, kind, object_id):
+        """منحنى الطلب الساعي (واط) لعقدة واحدة أو None"""
+        position = self.index[kind].get(object_id)
+        if position is None:
+            return None
+        return self.nodes[kind][2][position] @ self.profiles
+
+    def rows(self, kinds=None, ids=None, duration_points=0):
+        """
+        مؤشرات الطلب للعقد المطلوبة (القدرات بالواط): أقصى طلب متزامن وساعته، ومجموع ذروات الأحمال منفردة ومعامل التباين،
+        والقدرة المتصلة، والطاقة خلال أفق المنحنيات (كيلو واط ساعة)، ومعامل الحمل، ومنحنى مدة الحمل (duration_points نقطة)
+        """
+        results = []
+        for kind in kinds or KINDS:
+            object_ids, names, weights = self.nodes[kind]
+            positions = np.arange(len(object_ids))
+            if ids is not None:
+                positions = np.array(
+                    [self.index[kind][object_id] for object_id in ids if object_id in self.index[kind]], dtype=np.int64
+                )
+            for start in range(0, len(positions), self.CHUNK):
+                chunk = positions[start:start + self.CHUNK]
+                demand = weights[chunk] @ self.profiles
+                peak = demand.max(axis=1)
+                peak_hour = demand.argmax(axis=1)
+                energy = demand.sum(axis=1) / 1000
+                connected = weights[chunk].sum(axis=1)
+                individual_peaks = weights[chunk] @ self.group_peaks
+                if duration_points:
+                    curve = -np.sort(-demand, axis=1)
+                    samples = np.linspace(0, self.horizon - 1, duration_points).round().astype(np.int64)
+                    curves = curve[:, samples].tolist()
+                for offset, position in enumerate(chunk.tolist()):
+                    row = {
+                        'kind': kind,
+                        'id': object_ids[position],
+                        'name': names[position],
+                        'connected_load': float(connected[offset]),
+                        'coincident_peak': float(peak[offset]),
+                        'peak_hour': int(peak_hour[offset]),
+                        'sum_of_individual_peaks': float(individual_peaks[offset]),
+                        'diversity_factor': (
+                            float(individual_peaks[offset] / peak[offset]) if peak[offset] > 0 else None
+                        ),
+                        'energy_kwh': float(energy[offset]),
+                        'load_factor': (
+                            float(energy[offset] * 1000 / (peak[offset] * self.horizon)) if peak[offset] > 0 else None
+                        ),
+                    }
+                    if duration_points:
+                        row['duration_curve'] = curves[offset]
+                    results.append(row)
+        return results
+
+
+_cache = {'key': None, 'study': None}
+_cache_lock = threading.Lock()
+
+
+def study_demand():
+    """
+    إرجاع دراسة الطلب للمراجعة الحالية للشبكة (تعاد فقط عند تغير رقم المراجعة)
+    """
+    key = NetworkRevision.current()
+    with _cache_lock:
+        if _cache['key'] == key and _cache['study'] is not None:
+            return _cache['study']
+    study = DemandStudy(revision=key[0])
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['study'] = study
+    return study
@@ -0,0 +1,125 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - تقارير الطاقة والتكلفة من قاعدة البيانات (Energy reports)
+يحسب الاستهلاك اليومي (كيلو واط ساعة) والتكلفة الشهرية بنفس معادلات Load.calculate_daily_consumption
+و Load.calculate_monthly_cost لكن كتعابير ORM مجمعة في قاعدة البيانات بدلاً من تقييمها لكل حمل في بايثون:
+- القدرة: power_consumption إذا كانت أكبر من صفر، وإلا الجهد (11 ك.ف = 11000) × الأمبير
+- الاستهلاك اليومي: القدرة × ساعات التشغيل اليومية / 1000، والتكلفة الشهرية: الاستهلاك اليومي × 30 × سعر الكيلو واط ساعة
+التقرير الكامل للموقع أربعة استعلامات: تجميع حسب نوع الحمل، وتجميع حسب اللوحة، واللوحات، والمصادر؛
+ثم تجمع نتائج اللوحات على مساراتها المادية لتعطي كل لوحة مع شجرتها الفرعية وكل مصدر مع لوحاته
+"""
+
+from collections import defaultdict
+
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+
+from ..models import PowerSource, Panel, Load
+
+GROUPS = ('load_type', 'source', 'panel')
+
+TOTAL_FIELDS = ('load_count', 'connected_power', 'daily_kwh')
+
+
+def voltage_expression():
+    """الجهد الرقمي للحمل كما في Load.voltage_value"""
+    return Case(
+        When(voltage='11KV', then=Value(11000.0)),
+        default=Cast('voltage', FloatField()),
+        output_field=FloatField(),
+    )
+
+
+def power_expression():
+    """قدرة الحمل بالواط: power_consumption أو الجهد × الأمبير عند عدم تحديدها"""
+    return Case(
+        When(power_consumption__gt=0, then=F('power_consumption')),
+        default=voltage_expression() * F('ampacity'),
+        output_field=FloatField(),
+    )
+
+
+def daily_kwh_expression():
+    """الاستهلاك اليومي للحمل بالكيلو واط ساعة (نفس Load.calculate_daily_consumption)"""
+    return power_expression() * F('estimated_usage_hours') / Value(1000.0)
+
+
+def _aggregate(queryset, *group_by):
+    """تجميع عدد الأحمال وقدرتها المتصلة واستهلاكها اليومي حسب الحقول المطلوبة (استعلام واحد)"""
+    return queryset.order_by().values(*group_by).annotate(
+        load_count=Count('id'),
+        connected_power=Sum(power_expression()),
+        daily_kwh=Sum(daily_kwh_expression()),
+    )
+
+
+def _row(totals, price, **identity):
+    load_count, connected_power, daily_kwh = totals
+    monthly_kwh = daily_kwh * Load.DAYS_PER_MONTH
+    return {
+        **identity,
+        'load_count': load_count,
+        'connected_power': connected_power,
+        'daily_kwh': daily_kwh,
+        'monthly_kwh': monthly_kwh,
+        'monthly_cost': monthly_kwh * price,
+    }
+
+
+def energy_report(groups=None, price_per_kwh=Load.DEFAULT_PRICE_PER_KWH):
+    """
+    تقرير الاستهلاك اليومي والتكلفة الشهرية للموقع
+
+    Args:
+        groups: التجميعات المطلوبة من GROUPS (جميعها افتراضياً)
+        price_per_kwh: سعر الكيلو واط ساعة
+
+    Returns:
+        dict: {'summary': إجماليات الموقع, 'by_load_type', 'by_source', 'by_panel' (المطلوب منها)}
+              إجماليات اللوحة تشمل شجرتها الفرعية، وإجماليات المصدر تشمل جميع لوحاته
+    """
+    groups = groups or GROUPS
+    report = {}
+
+    type_rows = list(_aggregate(Load.objects.all(), 'load_type'))
+    site = [sum(row[field] or 0 for row in type_rows) for field in TOTAL_FIELDS]
+    report['summary'] = _row(site, price_per_kwh, price_per_kwh=price_per_kwh)
+
+    if 'load_type' in groups:
+        labels = dict(Load.LOAD_TYPE_CHOICES)
+        report['by_load_type'] = sorted((
+            _row(
+                [row[field] or 0 for field in TOTAL_FIELDS], price_per_kwh,
+                load_type=row['load_type'], load_type_display=labels.get(row['load_type'], row['load_type'])
+            ) for row in type_rows
+        ), key=lambda row: -row['daily_kwh'])
+
+    if 'source' not in groups and 'panel' not in groups:
+        return report
+
+    # أحمال كل لوحة مباشرة ثم جمعها على جميع لوحات مسارها المادي
+    panel_rows = list(Panel.objects.order_by('id').values_list('id', 'name', 'tree_path', 'parent_panel_id', 'power_source_id'))
+    paths = {panel_id: tree_path for panel_id, _, tree_path, _, _ in panel_rows}
+    subtree_totals = defaultdict(lambda: [0, 0, 0])
+    for row in _aggregate(Load.objects.filter(panel__isnull=False), 'panel'):
+        for ancestor_id in Panel.parse_tree_path(paths.get(row['panel']) or '') or [row['panel']]:
+            totals = subtree_totals[ancestor_id]
+            for index, field in enumerate(TOTAL_FIELDS):
+                totals[index] += row[field] or 0
+
+    if 'panel' in groups:
+        report['by_panel'] = [
+            _row(subtree_totals[panel_id], price_per_kwh, id=panel_id, name=name, parent_panel=parent_id)
+            for panel_id, name, _, parent_id, _ in panel_rows
+        ]
+
+    if 'source' in groups:
+        source_totals = defaultdict(lambda: [0, 0, 0])
+        for panel_id, _, _, parent_id, source_id in panel_rows:
+            if parent_id is None and source_id:
+                for index, value in enumerate(subtree_totals[panel_id]):
+                    source_totals[source_id][index] += value
+        report['by_source'] = [
+            _row(source_totals[source_id], price_per_kwh, id=source_id, name=name, source_type=source_type)
+            for source_id, name, source_type in PowerSource.objects.order_by('id').values_list('id', 'name', 'source_type')
+        ]
+    return report
@@ -0,0 +1,142 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - محرك رسم التغذية بين القواطع (Feed Graph)
+يحمّل بيانات القواطع وجدول علاقات التغذية مرة واحدة ويبني قوائم تجاور في الذاكرة
+للإجابة عن المسارات الصاعدة والإغلاقات الهابطة وقابلية الوصول والترتيب الطوبولوجي دون أي استعلام إضافي
+يحفظ الرسم في ذاكرة العملية ويعاد بناؤه فقط عند تغير رقم مراجعة الشبكة
+"""
+
+import threading
+from collections import deque
+
+from ..models import CircuitBreaker, NetworkRevision
+
+
+class FeedGraph:
+    """
+    رسم موجه للقواطع: الحافة feeder → fed تعني أن القاطع feeder يغذي القاطع fed
+    القواطع مفهرسة بأرقام متتالية (index) مرتبة حسب (position, id) كترتيب النموذج الافتراضي
+    """
+
+    def __init__(self, revision=None):
+        self.revision = revision
+
+        rows = CircuitBreaker.objects.order_by('position', 'id').values_list(
+            'id', 'manufacturer', 'breaker_type', 'rated_current', 'number_of_poles',
+            'name', 'panel__name', 'breaker_role'
+        )
+        self.ids = []
+        self.labels = []
+        self.index = {}
+        for row in rows:
+            self.index[row[0]] = len(self.ids)
+            self.ids.append(row[0])
+            self.labels.append(CircuitBreaker.format_label(*row[1:]))
+
+        # قوائم التجاور في الاتجاهين، كل قائمة مرتبة حسب فهرس القاطع (أي حسب position ثم id)
+        self.feeders = [[] for _ in self.ids]
+        self.fed = [[] for _ in self.ids]
+        through = CircuitBreaker.feeding_breakers.through
+        for fed_id, feeder_id in through.objects.values_list('from_circuitbreaker_id', 'to_circuitbreaker_id'):
+            fed_index, feeder_index = self.index.get(fed_id), self.index.get(feeder_id)
+            if fed_index is None or feeder_index is None:
+                continue
+            self.feeders[fed_index].append(feeder_index)
+            self.fed[feeder_index].append(fed_index)
+        for adjacency in (self.feeders, self.fed):
+            for neighbours in adjacency:
+                neighbours.sort()
+
+    def __contains__(self, breaker_id):
+        return breaker_id in self.index
+
+    def _closure(self, breaker_id, adjacency):
+        """جميع القواطع التي يمكن الوصول إليها من القاطع عبر قوائم التجاور المحددة (بترتيب BFS)"""
+        start = self.index.get(breaker_id)
+        if start is None:
+            return []
+        order = []
+        visited = {start}
+        queue = deque(adjacency[start])
+        while queue:
+            current = queue.popleft()
+            if current in visited:
+                continue
+            visited.add(current)
+            order.append(current)
+            queue.extend(neighbour for neighbour in adjacency[current] if neighbour not in visited)
+        return order
+
+    def upstream_ids(self, breaker_id):
+        """معرفات جميع القواطع المغذية المباشرة وغير المباشرة (بترتيب الاكتشاف من الأقرب)"""
+        return [self.ids[i] for i in self._closure(breaker_id, self.feeders)]
+
+    def downstream_ids(self, breaker_id):
+        """معرفات جميع القواطع المغذاة المباشرة وغير المباشرة (الإغلاق الهابط)"""
+        return [self.ids[i] for i in self._closure(breaker_id, self.fed)]
+
+    def feeder_ids(self, breaker_id):
+        """معرفات القواطع المغذية المباشرة"""
+        return [self.ids[i] for i in self.feeders[self.index[breaker_id]]] if breaker_id in self.index else []
+
+    def fed_ids(self, breaker_id):
+        """معرفات القواطع المغذاة المباشرة"""
+        return [self.ids[i] for i in self.fed[self.index[breaker_id]]] if breaker_id in self.index else []
+
+    def full_path(self, breaker_id):
+        """المسار الكامل للقاطع بنفس تنسيق CircuitBreaker.get_full_path"""
+        path = [self.labels[i] for i in reversed(self._closure(breaker_id, self.feeders))]
+        path.append(self.labels[self.index[breaker_id]])
+        return " → ".join(path)
+
+    def reaches(self, source_id, target_id):
+        """هل القاطع source يغذي القاطع target بشكل مباشر أو غير مباشر"""
+        if source_id == target_id:
+            return True
+        target = self.index.get(target_id)
+        return target is not None and target in set(self._closure(source_id, self.fed))
+
+    def creates_cycle(self, breaker_id, feeder_ids):
+        """هل تعيين القواطع feeder_ids كمغذيات للقاطع breaker_id يكوّن دورة في التغذية"""
+        downstream = set(self._closure(breaker_id, self.fed))
+        downstream.add(self.index.get(breaker_id))
+        return any(self.index.get(feeder_id) in downstream for feeder_id in feeder_ids)
+
+    def topological_order(self):
+        """
+        ترتيب القواطع بحيث يأتي كل قاطع مغذٍ قبل القواطع التي يغذيها (خوارزمية Kahn)
+        القواطع الواقعة في دورة (إن وجدت بسبب بيانات قديمة) توضع في النهاية
+        """
+        in_degree = [len(feeders) for feeders in self.feeders]
+        queue = deque(i for i, degree in enumerate(in_degree) if degree == 0)
+        order = []
+        while queue:
+            current = queue.popleft()
+            order.append(current)
+            for fed_index in self.fed[current]:
+                in_degree[fed_index] -= 1
+                if in_degree[fed_index] == 0:
+                    queue.append(fed_index)
+        if len(order) < len(self.ids):
+            placed = set(order)
+            order.extend(i for i in range(len(self.ids)) if i not in placed)
+        return [self.ids[i] for i in order]
+
+
+_cache = {'key': None, 'graph': None}
+_cache_lock = threading.Lock()
+
+
+def get_feed_graph():
+    """
+    إرجاع رسم التغذية للمراجعة الحالية للشبكة
+    يكلف استعلاماً واحداً لقراءة رقم المراجعة ما لم تتغير الشبكة منذ آخر بناء
+    """
+    key = NetworkRevision.current()
+    with _cache_lock:
+        if _cache['key'] == key and _cache['graph'] is not None:
+            return _cache['graph']
+    graph = FeedGraph(revision=key[0])
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['graph'] = graph
+    return graph
@@ -0,0 +1,111 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - فهرس التأثير (Downstream impact index)
+يجيب عن "ما الذي يفقد التغذية إذا فُصل هذا القاطع أو هذه اللوحة؟" دون تحميل الشبكة أو تتبع المسارات عند كل سؤال:
+اللوحات والأحمال التي تفقد التغذية وإجمالي الأمبير المفقود وتوزيعه حسب نوع الحمل
+
+القيمة تحسب من رسم التغذية (services/contingency.py) بنفس طريقة دراسة الطوارئ، فالأحمال التي تبقى موصولة
+عبر تغذية بديلة لا تحسب ضمن المفقود. فصل اللوحة يعني فقد مدخلها (قاطعها الرئيسي وكل ما عليها وما تحتها)
+
+القيم تحفظ في ذاكرة نموذج القراءة (النوع IMPACT) فتكون القراءة مفتاحاً واحداً،
+ولا تبطل بتغير رقم المراجعة بل تبطل الإشارات قيم العناصر التي تقع فوق العنصر المتغير
+(read_cache.invalidate_supply_chain)، وعند تغير تغذية عنصر قيم كل ما فوق العناصر التي تحته
+(read_cache.invalidate_supply_change)، وتبقى قيم باقي الشبكة صالحة حتى تحسب عند الحاجة
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+from . import read_cache
+from .contingency import get_supply_network
+from .supply_graph import BREAKER, BUS, LOAD
+
+KINDS = (read_cache.BREAKER, read_cache.PANEL)
+
+# حقول القوائم التي تحذف من الفهرس الكامل (تعاد مع العنصر الواحد)
+DETAIL_FIELDS = ('panels', 'loads')
+
+
+def impact_entry(network, kind, object_id):
+    """
+    ما يفقد التغذية عند فصل عنصر واحد
+
+    Args:
+        network: SupplyNetwork للمراجعة الحالية
+        kind: breaker أو panel
+
+    Returns:
+        dict أو None إذا لم يكن العنصر موجوداً
+    """
+    node = network.trip_node(kind, object_id)
+    if node is None:
+        return None
+    name = network.nodes[kind][1][network.position[kind][network.node_of[kind][object_id]]]
+    graph = network.graph
+    lost, rescued = graph.trip(node, network.live)
+    lost = np.asarray(lost, dtype=np.int64)
+    lost_kinds = graph.kinds[lost]
+
+    panel_ids, panel_names, _ = network.nodes['panel']
+    panel_position = network.position['panel']
+    panels = [
+        {'id': panel_ids[panel_position[bus]], 'name': panel_names[panel_position[bus]]}
+        for bus in lost[lost_kinds == BUS].tolist()
+    ]
+
+    load_ids, load_names, _ = network.nodes['load']
+    load_position = network.position['load']
+    loads = []
+    by_type = defaultdict(lambda: {'count': 0, 'ampacity': 0.0})
+    for load_node in lost[lost_kinds == LOAD].tolist():
+        position = load_position[load_node]
+        load_type = network.load_types[position]
+        ampacity = float(graph.ampacity[load_node])
+        loads.append({'id': load_ids[position], 'name': load_names[position], 'load_type': load_type, 'ampacity': ampacity})
+        by_type[load_type]['count'] += 1
+        by_type[load_type]['ampacity'] += ampacity
+
+    return {
+        'kind': kind,
+        'id': object_id,
+        'name': name,
+        'energized': bool(network.live[node]),
+        'panel_count': len(panels),
+        'breaker_count': int(((lost_kinds == BREAKER) & (lost != node)).sum()),
+        'load_count': len(loads),
+        'total_ampacity': sum(load['ampacity'] for load in loads),
+        'rerouted_load_count': int((graph.kinds[rescued] == LOAD).sum()) if rescued else 0,
+        'load_types': sorted((
+            {'load_type': load_type, **totals} for load_type, totals in by_type.items()
+        ), key=lambda row: (-row['ampacity'], row['load_type'])),
+        'panels': panels,
+        'loads': loads,
+    }
+
+
+def get_impact(kind, object_id):
+    """
+    قيمة الفهرس لعنصر واحد: قراءة مفتاح واحد من الذاكرة، ورسم التغذية يبنى فقط عند غياب القيمة
+    """
+    return read_cache.get_or_compute(
+        kind, object_id, read_cache.IMPACT, lambda: impact_entry(get_supply_network(), kind, object_id)
+    )
+
+
+def impact_index(kind, min_ampacity=None):
+    """
+    الفهرس الكامل لنوع واحد (دون قوائم اللوحات والأحمال) مرتباً من الأكبر في الأمبير المفقود
+    القيم المحفوظة تقرأ دفعة واحدة والناقصة تحسب من رسم واحد وتحفظ، فيملأ الطلب الأول الفهرس كاملاً
+    """
+    network = get_supply_network()
+    entries = read_cache.get_or_compute_many(
+        kind, network.nodes[kind][0], read_cache.IMPACT,
+        lambda missing: {object_id: impact_entry(network, kind, object_id) for object_id in missing}
+    )
+    rows = [
+        {field: value for field, value in entry.items() if field not in DETAIL_FIELDS}
+        for entry in entries.values()
+        if entry is not None and (min_ampacity is None or entry['total_ampacity'] >= min_ampacity)
+    ]
+    rows.sort(key=lambda row: (-row['total_ampacity'], row['id']))
+    return rows
@@ -0,0 +1,224 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - حل سريان الأحمال (Load flow) للشبكة الشعاعية
+يحل الشبكة PowerSource → Panel → Load بطريقة المسح الخلفي/الأمامي (Backward/Forward sweep):
+- كل صف في تحليل الكابلات (cable_analysis) عقدة، وكابل العنصر هو الفرع الواصل بينه وبين العنصر الأعلى
+- مقاومة الفرع من CableMixin (المقاومة لكل كم للمقطع والمادة ÷ عدد الكابلات × الطول)
+  وبنفس اصطلاح calculate_voltage_drop (موصل واحد بدون معامل طور)
+- الأحمال قدرة ثابتة: P من power_consumption (أو V × I × PF) و Q = P × tan(acos(PF))
+- القيم بنظام الوحدة النسبية (per-unit) بجهد كل عقدة الاسمي كأساس، فتغير الجهد بين اللوحات
+  يعامل كمحول مثالي، وتكون المصادر متصلة بقضيب مرجعي (slack) جهده 1.0
+المسح الخلفي يجمع تيارات الفروع من أعمق مستوى إلى المصادر، والأمامي يحسب الجهود من المصادر إلى الأحمال،
+وكل مستوى عملية متجهة واحدة على مستويات الشجرة المحسوبة في CableAnalysis
+"""
+
+import threading
+
+import numpy as np
+
+from ..models import Load
+from .cable_analysis import analyze_cables
+
+# القدرة الأساسية لنظام الوحدة النسبية (فولت أمبير)
+BASE_POWER = 1e6
+
+DEFAULT_TOLERANCE = 1e-8
+DEFAULT_MAX_ITERATIONS = 50
+
+# الحقول العددية في النتائج التي يمكن الترتيب حسبها
+RESULT_FIELDS = (
+    'nominal_voltage', 'voltage', 'voltage_pu', 'voltage_angle', 'voltage_drop_percentage',
+    'branch_current', 'branch_losses', 'active_power', 'reactive_power',
+)
+
+
+class LoadFlow:
+    """
+    نتيجة حل سريان الأحمال: مصفوفات بنفس ترتيب صفوف تحليل الكابلات
+    العقد غير المتصلة بمصدر (أو التي ليس لها جهد اسمي في مسارها) غير مغذاة وتعاد قيمها None
+    """
+
+    def __init__(self, analysis, tolerance=DEFAULT_TOLERANCE, max_iterations=DEFAULT_MAX_ITERATIONS):
+        self.analysis = analysis
+        count = len(analysis)
+        upstream = analysis.upstream
+
+        # العقد المغذاة: جذرها مصدر طاقة ولكل عقدة في مسارها جهد اسمي
+        self.energized = np.zeros(count, dtype=bool)
+        for level, rows in enumerate(analysis.levels):
+            valid = analysis.nominal_voltage[rows] > 0
+            if level == 0:
+                self.energized[rows] = valid & (analysis.kind[rows] == 'source')
+            else:
+                self.energized[rows] = valid & self.energized[upstream[rows]]
+
+        base_voltage = np.where(self.energized, analysis.nominal_voltage, 1.0)
+        self.base_current = BASE_POWER / base_voltage
+
+        # مقاومة الفرع بالأوم وبالوحدة النسبية (الكابلات بدون عدد أو طول معرف تعامل كوصلة مثالية)
+        self.branch_resistance = np.nan_to_num(analysis.resistance * analysis.cable_length)
+        impedance = self.branch_resistance * BASE_POWER / base_voltage ** 2
+
+        # قدرة الأحمال بالوحدة النسبية
+        self.active_power = np.zeros(count)
+        self.reactive_power = np.zeros(count)
+        positions, active, reactive = load_powers(analysis)
+        self.active_power[positions] = active
+        self.reactive_power[positions] = reactive
+        power = np.where(self.energized, (self.active_power + 1j * self.reactive_power) / BASE_POWER, 0)
+
+        voltage = np.where(self.energized, 1.0 + 0j, 0j)
+        current = np.zeros(count, dtype=np.complex128)
+        parent_voltage = np.ones(count, dtype=np.complex128)
+        has_parent = upstream >= 0
+        self.converged = False
+        self.iterations = 0
+        for self.iterations in range(1, max_iterations + 1):
+            # المسح الخلفي: تيار كل فرع = تيار حمل العقدة + تيارات فروع العقد التابعة
+            with np.errstate(divide='ignore', invalid='ignore'):
+                current = np.where(self.energized, np.conj(power / voltage), 0)
+            for rows in reversed(analysis.levels[1:]):
+                np.add.at(current, upstream[rows], current[rows])
+
+            # المسح الأمامي: جهد العقدة = جهد العقدة الأعلى - هبوط الجهد في فرعها
+            previous = voltage
+            voltage = voltage.copy()
+            for rows in analysis.levels:
+                parents = upstream[rows]
+                parent_voltage[rows] = np.where(has_parent[rows], voltage[np.maximum(parents, 0)], 1.0)
+                voltage[rows] = np.where(self.energized[rows], parent_voltage[rows] - impedance[rows] * current[rows], 0)
+
+            mismatch = np.abs(voltage - previous)
+            if not np.isfinite(mismatch).all():
+                break
+            if not mismatch.size or mismatch.max() < tolerance:
+                self.converged = True
+                break
+
+        self.voltage_complex = voltage
+        self.current_complex = current
+        self.nominal_voltage = analysis.nominal_voltage
+        with np.errstate(invalid='ignore'):
+            self.voltage_pu = np.where(self.energized, np.abs(voltage), np.nan)
+            self.voltage = self.voltage_pu * base_voltage
+            self.voltage_angle = np.where(self.energized, np.degrees(np.angle(voltage)), np.nan)
+            # هبوط الجهد من القضيب المرجعي حتى العقدة (%)
+            self.voltage_drop_percentage = (1 - self.voltage_pu) * 100
+            self.branch_current = np.where(self.energized, np.abs(current) * self.base_current, np.nan)
+            self.branch_losses = self.branch_current ** 2 * self.branch_resistance
+
+    def __len__(self):
+        return len(self.analysis)
+
+    def mask(self, kinds=None, max_voltage_pu=None):
+        """
+        قناع منطقي للصفوف المطابقة
+
+        Args:
+            kinds: أنواع الكائنات المطلوبة (من KINDS) أو None للجميع
+            max_voltage_pu: العقد التي يقل جهدها النسبي عن هذا الحد أو يساويه، مثل 0.95
+        """
+        selected = self.analysis.mask(kinds=kinds)
+        if max_voltage_pu is not None:
+            with np.errstate(invalid='ignore'):
+                selected &= self.voltage_pu <= max_voltage_pu
+        return selected
+
+    def rows(self, selected=None, ordering=None):
+        """
+        تحويل الصفوف المحددة إلى قوائم قواميس
+        ordering: اسم حقل من RESULT_FIELDS مع '-' اختياري للترتيب التنازلي (القيم غير المعرفة في النهاية)
+        """
+        analysis = self.analysis
+        indices = np.flatnonzero(selected) if selected is not None else np.arange(len(self))
+        if ordering:
+            values = getattr(self, ordering.lstrip('-'))[indices]
+            keys = -values if ordering.startswith('-') else values
+            indices = indices[np.argsort(keys, kind='stable')]
+
+        columns = {field: getattr(self, field)[indices].tolist() for field in RESULT_FIELDS}
+        energized = self.energized[indices].tolist()
+        results = []
+        for position, index in enumerate(indices.tolist()):
+            row = {
+                'kind': analysis.kind[index],
+                'id': int(analysis.ids[index]),
+                'name': analysis.names[index],
+                'energized': energized[position],
+            }
+            for field in RESULT_FIELDS:
+                value = columns[field][position]
+                row[field] = None if value != value else value  # NaN → None
+            results.append(row)
+        return results
+
+    def summary(self, selected=None):
+        """إجماليات الحل: التقارب والأحمال والفقد الكلي وأدنى جهد للصفوف المحددة"""
+        selected = np.ones(len(self), dtype=bool) if selected is None else selected
+        energized = selected & self.energized
+        voltages = self.voltage_pu[energized]
+        lowest = int(np.flatnonzero(energized)[np.argmin(voltages)]) if voltages.size else None
+        return {
+            'converged': self.converged,
+            'iterations': self.iterations,
+            'count': int(selected.sum()),
+            'energized_count': int(energized.sum()),
+            'total_active_power': float(self.active_power[energized].sum()),
+            'total_reactive_power': float(self.reactive_power[energized].sum()),
+            'total_losses': float(np.nansum(self.branch_losses[energized])),
+            'min_voltage_pu': float(voltages.min()) if voltages.size else None,
+            'min_voltage_node': None if lowest is None else {
+                'kind': self.analysis.kind[lowest],
+                'id': int(self.analysis.ids[lowest]),
+                'name': self.analysis.names[lowest],
+            },
+        }
+
+
+def load_powers(analysis):
+    """
+    القدرة الفعالة (واط) وغير الفعالة (فار) لأحمال التحليل باستعلام واحد
+    استهلاك الطاقة المسجل أولاً، وإلا V × I × PF كما في Load.save
+    معامل القدرة خارج المدى (0, 1] يعامل كـ 1
+
+    Returns:
+        tuple: (مواقع الأحمال في التحليل, القدرة الفعالة, القدرة غير الفعالة)
+    """
+    rows = Load.objects.values_list('id', 'power_consumption', 'power_factor')
+    positions, consumption, factors = [], [], []
+    for load_id, power_consumption, power_factor in rows:
+        position = analysis.index.get(('load', load_id))
+        if position is not None:
+            positions.append(position)
+            consumption.append(power_consumption or 0)
+            factors.append(power_factor or 0)
+    positions = np.array(positions, dtype=np.int64)
+    consumption = np.array(consumption, dtype=np.float64)
+    factors = np.array(factors, dtype=np.float64)
+    factors = np.where((factors > 0) & (factors <= 1), factors, 1.0)
+
+    active = np.where(
+        consumption > 0, consumption,
+        analysis.nominal_voltage[positions] * analysis.current[positions] * factors
+    )
+    reactive = active * np.tan(np.arccos(factors))
+    return positions, active, reactive
+
+
+_cache = {'analysis': None, 'result': None}
+_cache_lock = threading.Lock()
+
+
+def solve_load_flow():
+    """
+    إرجاع حل سريان الأحمال للمراجعة الحالية للشبكة
+    يعاد الحل فقط عند إعادة بناء تحليل الكابلات (أي عند تغير رقم المراجعة)
+    """
+    analysis = analyze_cables()
+    with _cache_lock:
+        if _cache['analysis'] is analysis and _cache['result'] is not None:
+            return _cache['result']
+    result = LoadFlow(analysis)
+    with _cache_lock:
+        _cache['analysis'] = analysis
+        _cache['result'] = result
+    return result
@@ -0,0 +1,207 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - موازنة الأطوار (Phase balancing)
+يقترح إعادة توزيع الأحمال أحادية الطور على الأطوار L1 و L2 و L3 في كل لوحة لتقليل عدم التوازن،
+ويعالج الشجرة من أعمق اللوحات إلى اللوحات الرئيسية: لكل لوحة تعتبر الأحمال ثلاثية الطور وتيارات اللوحات الفرعية
+(بعد موازنتها) أحمالاً ثابتة، وتوزع الأحمال أحادية الطور المباشرة عليها بطريقة الجشع (الأكبر أولاً إلى الطور الأقل)
+ثم تحسين محلي بنقل أحمال من الطور الأعلى إلى الأقل، ثم تعاد تسمية الأطوار بالتبديل الذي يطابق أكثر الأحمال الحالية
+حتى يبقى عدد النقلات أقل ما يمكن. لا يقترح أي نقل في لوحة لا يتحسن توازنها
+يحمل البيانات باستعلامين (اللوحات والأحمال) ويطبق التغييرات دفعة واحدة
+"""
+
+from collections import defaultdict
+from itertools import permutations
+
+from django.db import transaction
+
+from ..models import Panel, Load, NetworkRevision
+from . import read_cache
+from .rollups import phase_currents, rebuild_rollups
+
+PHASES = Load.SINGLE_PHASES
+
+# أقل تحسن في نسبة عدم التوازن (%) لاقتراح نقل الأحمال في لوحة
+MIN_IMPROVEMENT = 0.5
+
+# أقصى عدد لتكرارات التحسين المحلي لكل لوحة
+MAX_LOCAL_STEPS = 1000
+
+
+def imbalance(currents):
+    """نسبة عدم التوازن: أكبر انحراف عن المتوسط إلى المتوسط (%) كما في Panel.phase_imbalance"""
+    return Panel.phase_imbalance(currents)
+
+
+def balance_panel(fixed, loads):
+    """
+    توزيع أحمال أحادية الطور على الأطوار الثلاثة فوق أحمال ثابتة
+
+    Args:
+        fixed: تيارات الأطوار الثابتة [L1, L2, L3]
+        loads: قائمة (معرف الحمل, التيار, الطور الحالي)
+
+    Returns:
+        dict: {معرف الحمل: الطور المقترح}
+    """
+    currents = list(fixed)
+    assignment = {}
+    # الجشع: الأكبر أولاً إلى الطور الأقل تياراً (عند التساوي يفضل الطور الحالي للحمل)
+    for load_id, ampacity, phase in sorted(loads, key=lambda load: (-load[1], load[0])):
+        index = min(range(3), key=lambda i: (currents[i], PHASES[i] != phase))
+        assignment[load_id] = index
+        currents[index] += ampacity
+
+    # التحسين المحلي: نقل حمل من الطور الأعلى إلى الأقل إذا قلّ الفرق بينهما
+    ampacities = {load_id: ampacity for load_id, ampacity, _ in loads}
+    for _ in range(MAX_LOCAL_STEPS):
+        high = max(range(3), key=currents.__getitem__)
+        low = min(range(3), key=currents.__getitem__)
+        gap = currents[high] - currents[low]
+        candidates = [
+            (abs(gap - 2 * ampacities[load_id]), load_id)
+            for load_id, index in assignment.items()
+            if index == high and 0 < ampacities[load_id] < gap
+        ]
+        if not candidates:
+            break
+        _, load_id = min(candidates)
+        assignment[load_id] = low
+        currents[high] -= ampacities[load_id]
+        currents[low] += ampacities[load_id]
+
+    # إعادة تسمية الأطوار بالتبديل الذي يبقي أكثر الأحمال في أطوارها الحالية (التوازن لا يتغير بالتبديل)
+    # الأحمال الثابتة تمنع التبديل إلا بين الأطوار المتساوية في التيار الثابت
+    current_phase = {load_id: phase for load_id, _, phase in loads}
+    best, best_kept = tuple(range(3)), -1
+    for order in permutations(range(3)):
+        if any(abs(fixed[index] - fixed[order[index]]) > 1e-9 for index in range(3)):
+            continue
+        kept = sum(1 for load_id, index in assignment.items() if PHASES[order[index]] == current_phase[load_id])
+        if kept > best_kept:
+            best, best_kept = order, kept
+    return {load_id: PHASES[best[index]] for load_id, index in assignment.items()}
+
+
+def plan_phase_balancing(panel_id=None, min_improvement=MIN_IMPROVEMENT):
+    """
+    حساب النقلات المقترحة لجميع اللوحات (أو لشجرة لوحة واحدة)
+
+    Returns:
+        dict: {'summary', 'panels': نتيجة كل لوحة تغير توازنها, 'moves': قائمة نقلات الأحمال}
+    """
+    panels = list(Panel.objects.values_list('id', 'name', 'parent_panel_id', 'tree_path', 'tree_depth'))
+    scope = None
+    if panel_id is not None:
+        root_path = next((tree_path for pk, _, _, tree_path, _ in panels if pk == panel_id), None)
+        if root_path is None:
+            return None
+        scope = {pk for pk, _, _, tree_path, _ in panels if tree_path.startswith(root_path)} if root_path else {panel_id}
+
+    direct = defaultdict(list)
+    for load_id, name, load_panel_id, phase, ampacity in Load.objects.filter(panel__isnull=False).values_list(
+        'id', 'name', 'panel_id', 'phase', 'ampacity'
+    ):
+        direct[load_panel_id].append((load_id, name, phase, ampacity or 0))
+
+    children = defaultdict(list)
+    for pk, _, parent_id, _, _ in panels:
+        if parent_id:
+            children[parent_id].append(pk)
+
+    # تيارات الشجرة الفرعية قبل الموازنة وبعدها لكل لوحة
+    before, after = {}, {}
+    panel_results, moves = [], []
+    for pk, name, _, _, _ in sorted(panels, key=lambda panel: -panel[4]):
+        own_fixed = [0.0, 0.0, 0.0]
+        own_before = [0.0, 0.0, 0.0]
+        movable = []
+        for load_id, load_name, phase, ampacity in direct[pk]:
+            for index, current in enumerate(phase_currents(phase, ampacity)):
+                own_before[index] += current
+            if phase in PHASES:
+                movable.append((load_id, ampacity, phase))
+            else:
+                for index, current in enumerate(phase_currents(phase, ampacity)):
+                    own_fixed[index] += current
+        child_before = [sum(before[child][i] for child in children[pk]) for i in range(3)]
+        child_after = [sum(after[child][i] for child in children[pk]) for i in range(3)]
+        before[pk] = [own_before[i] + child_before[i] for i in range(3)]
+
+        fixed = [own_fixed[i] + child_after[i] for i in range(3)]
+        current_currents = [own_before[i] - own_fixed[i] + fixed[i] for i in range(3)]
+        proposal = {}
+        if movable and (scope is None or pk in scope):
+            proposal = balance_panel(fixed, movable)
+            proposed_currents = list(fixed)
+            for load_id, ampacity, _ in movable:
+                proposed_currents[PHASES.index(proposal[load_id])] += ampacity
+            if imbalance(current_currents) - imbalance(proposed_currents) < min_improvement:
+                proposal = {}
+
+        after[pk] = list(fixed)
+        names = {load_id: load_name for load_id, load_name, _, _ in direct[pk]}
+        panel_moves = []
+        for load_id, ampacity, phase in movable:
+            new_phase = proposal.get(load_id, phase)
+            after[pk][PHASES.index(new_phase)] += ampacity
+            if new_phase != phase:
+                panel_moves.append({
+                    'load': load_id, 'name': names[load_id], 'panel': pk,
+                    'ampacity': ampacity, 'from_phase': phase, 'to_phase': new_phase,
+                })
+
+        if scope is not None and pk not in scope:
+            continue
+        if panel_moves or before[pk] != after[pk]:
+            panel_results.append({
+                'id': pk,
+                'name': name,
+                'phase_currents_before': before[pk],
+                'phase_currents_after': after[pk],
+                'imbalance_before': imbalance(before[pk]),
+                'imbalance_after': imbalance(after[pk]),
+                'moves': len(panel_moves),
+            })
+        moves.extend(panel_moves)
+
+    panel_results.sort(key=lambda panel: panel['id'])
+    return {
+        'summary': {
+            'panels': len(scope) if scope is not None else len(panels),
+            'panels_improved': sum(1 for panel in panel_results if panel['moves']),
+            'moves': len(moves),
+            'max_imbalance_before': max((imbalance(before[pk]) for pk in (scope or before)), default=0),
+            'max_imbalance_after': max((imbalance(after[pk]) for pk in (scope or after)), default=0),
+        },
+        'panels': panel_results,
+        'moves': moves,
+    }
+
+
+def apply_phase_balancing(load_ids=None, **options):
+    """
+    تطبيق النقلات المقترحة دفعة واحدة (bulk_update لطور الأحمال داخل معاملة واحدة)
+    تعاد حساب الاقتراحات على الخادم، ويمكن قصر التطبيق على أحمال محددة
+
+    Returns:
+        list: النقلات المطبقة أو None إذا لم توجد اللوحة المحددة
+    """
+    with transaction.atomic():
+        plan = plan_phase_balancing(**options)
+        if plan is None:
+            return None
+        moves = plan['moves']
+        if load_ids is not None:
+            wanted = set(load_ids)
+            moves = [move for move in moves if move['load'] in wanted]
+        if moves:
+            Load.objects.bulk_update(
+                [Load(id=move['load'], phase=move['to_phase']) for move in moves], ['phase'], batch_size=500
+            )
+            # bulk_update لا يرسل إشارات: تعاد الإجماليات بعدد ثابت من الاستعلامات وتبطل سلاسل اللوحات المتأثرة
+            rebuild_rollups()
+            NetworkRevision.bump()
+            paths = Panel.objects.filter(id__in={move['panel'] for move in moves}).values_list('tree_path', flat=True)
+            read_cache.invalidate(read_cache.PANEL, {
+                panel_id for tree_path in paths for panel_id in Panel.parse_tree_path(tree_path)
+            } | {move['panel'] for move in moves})
+    return moves
@@ -0,0 +1,405 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - ذاكرة نموذج القراءة (Read-model cache)
+تحفظ التمثيلات المُسلسلة للوحات والقواطع والقيم المحسوبة لها (مثل المسار الكامل)
+في ذاكرة تخزين مؤقت من Django (انظر CACHES و NETWORK_READ_CACHE في الإعدادات)
+
+الإبطال دقيق وليس شاملاً: كل تغيير يحدد الكائنات التي يتغير تمثيلها فقط ويحذف مفاتيحها
+- تغيير حمل: قاطعه ولوحته وسلسلة اللوحات الأم والقواطع التي تحمل طلب هذه اللوحات
+- تغيير قاطع أو علاقة تغذية: القاطع والقواطع المغذية له مباشرة وجميع القواطع المغذاة منه (مساراتها تتضمنه)
+- تغيير لوحة: شجرتها الفرعية وسلسلتا اللوحات الأم القديمة والجديدة وقواطع اللوحة
+- تغيير مصدر طاقة: الأشجار الفرعية للوحاته الرئيسية
+مع كل قاطع متأثر تبطل اللوحات التي تتضمن تمثيله الكامل (القاطع الرئيسي أو المغذي للوحة)
+
+فهرس التأثير (IMPACT، انظر services/impact.py) يحفظ لكل لوحة وقاطع ما يقع تحته في مسار التغذية،
+لذلك يبطل بشكل منفصل: تغيير محتوى عنصر (حمل مثلاً) يبطل قيم العناصر التي تقع فوقه (invalidate_supply_chain)،
+وتغيير تغذية عنصر (لوحة أو قاطع أو علاقة تغذية أو مصدر) يبطل أيضاً كل ما فوق العناصر التي تحته (invalidate_supply_change)
+"""
+
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+
+from ..models import Panel, CircuitBreaker
+
+PANEL = 'panel'
+BREAKER = 'breaker'
+
+# أنواع القيم المحفوظة لكل كائن، وتحذف جميعها عند إبطال الكائن
+VARIANTS = ('detail', 'full_path')
+
+# فهرس التأثير لا يتغير بتغيير تمثيل الكائن نفسه بل بتغيير ما تحته، ويبطل عبر invalidate_impact فقط
+IMPACT = 'impact'
+
+_MISSING = object()
+
+
+def cache_alias():
+    return getattr(settings, 'NETWORK_READ_CACHE', 'default')
+
+
+def get_cache():
+    return caches[cache_alias()]
+
+
+def cache_key(kind, object_id, variant):
+    return f'network:{kind}:{object_id}:{variant}'
+
+
+# ------------------- عدادات الإصابة والإخفاق -------------------
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_invalidated = {'keys': 0}
+
+
+def _count(kind, variant, outcome):
+    with _stats_lock:
+        _stats[f'{kind}:{variant}'][outcome] += 1
+
+
+def stats():
+    """عدادات العملية الحالية منذ بدء تشغيلها أو منذ آخر reset_stats"""
+    with _stats_lock:
+        by_variant = {name: dict(counters) for name, counters in sorted(_stats.items())}
+        invalidated = _invalidated['keys']
+    hits = sum(counters['hits'] for counters in by_variant.values())
+    misses = sum(counters['misses'] for counters in by_variant.values())
+    return {
+        'backend': cache_alias(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        'invalidated_keys': invalidated,
+        'by_variant': by_variant,
+    }
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+        _invalidated['keys'] = 0
+
+
+def clear():
+    """حذف جميع القيم المحفوظة (يستخدم في الاختبارات وبعد تعديل البيانات خارج النماذج)"""
+    get_cache().clear()
+
+
+# ------------------- القراءة والإبطال -------------------
+
+def get_or_compute(kind, object_id, variant, compute):
+    """
+    إرجاع القيمة المحفوظة للكائن أو حسابها وحفظها
+    الكائنات غير المحفوظة (بدون معرف) تحسب دائماً دون المرور بالذاكرة
+    """
+    if object_id is None:
+        return compute()
+    cache = get_cache()
+    key = cache_key(kind, object_id, variant)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _count(kind, variant, 'hits')
+        return value
+    _count(kind, variant, 'misses')
+    value = compute()
+    cache.set(key, value)
+    return value
+
+
+def get_or_compute_many(kind, object_ids, variant, compute_many):
+    """
+    إرجاع القيم المحفوظة لمجموعة كائنات بقراءة واحدة، وحساب الناقصة منها دفعة واحدة وحفظها
+
+    Args:
+        compute_many: دالة تستقبل المعرفات الناقصة وتعيد {المعرف: القيمة}
+
+    Returns:
+        dict: {المعرف: القيمة}
+    """
+    cache = get_cache()
+    keys = {cache_key(kind, object_id, variant): object_id for object_id in object_ids}
+    found = cache.get_many(keys)
+    values = {keys[key]: value for key, value in found.items()}
+    missing = [object_id for key, object_id in keys.items() if key not in found]
+    with _stats_lock:
+        _stats[f'{kind}:{variant}']['hits'] += len(values)
+        _stats[f'{kind}:{variant}']['misses'] += len(missing)
+    if missing:
+        computed = compute_many(missing)
+        cache.set_many({cache_key(kind, object_id, variant): value for object_id, value in computed.items()})
+        values.update(computed)
+    return values
+
+
+def invalidate(kind, object_ids, variants=VARIANTS):
+    """
+    حذف القيم المحفوظة (جميع VARIANTS افتراضياً) لمجموعة كائنات من نوع واحد
+    يعاد الحذف بعد تأكيد المعاملة حتى لا تبقى قيمة حسبها طلب متزامن قبل التأكيد
+    """
+    keys = [
+        cache_key(kind, object_id, variant)
+        for object_id in {object_id for object_id in object_ids if object_id is not None}
+        for variant in variants
+    ]
+    if not keys:
+        return
+    cache = get_cache()
+    cache.delete_many(keys)
+    with _stats_lock:
+        _invalidated['keys'] += len(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_breakers(breaker_ids):
+    """إبطال القواطع واللوحات التي تتضمن تمثيلها الكامل (كقاطع رئيسي أو مغذٍ)"""
+    breaker_ids = {breaker_id for breaker_id in breaker_ids if breaker_id is not None}
+    if not breaker_ids:
+        return
+    invalidate(BREAKER, breaker_ids)
+    invalidate(PANEL, Panel.objects.filter(
+        Q(main_breaker_id__in=breaker_ids) | Q(feeder_breaker_id__in=breaker_ids)
+    ).values_list('id', flat=True))
+
+
+# ------------------- تحديد الكائنات المتأثرة -------------------
+
+def feed_closure_ids(breaker_ids):
+    """
+    القواطع التي يتغير تمثيلها عند تغيير مجموعة قواطع:
+    القواطع نفسها والقواطع المغذية لها مباشرة (fed_breakers_info والحمل الإجمالي)
+    وجميع القواطع المغذاة منها مباشرة أو بشكل غير مباشر (feeding_breakers_info والمسار الكامل)
+    يستخدم جدول علاقات التغذية مباشرة (استعلام لكل مستوى) بدلاً من إعادة بناء رسم التغذية بعد كل كتابة
+    """
+    breaker_ids = {breaker_id for breaker_id in breaker_ids if breaker_id is not None}
+    if not breaker_ids:
+        return set()
+    through = CircuitBreaker.feeding_breakers.through
+    affected = set(breaker_ids)
+    affected.update(through.objects.filter(from_circuitbreaker_id__in=breaker_ids).values_list(
+        'to_circuitbreaker_id', flat=True
+    ))
+    frontier = set(breaker_ids)
+    while frontier:
+        fed_ids = set(through.objects.filter(to_circuitbreaker_id__in=frontier).values_list(
+            'from_circuitbreaker_id', flat=True
+        ))
+        frontier = fed_ids - affected
+        affected |= frontier
+    return affected
+
+
+def invalidate_load(previous, current):
+    """
+    إبطال ما يتأثر بتغيير حمل: قاطعه ولوحته وسلسلة اللوحات الأم (القديمة والجديدة عند النقل)
+
+    Args:
+        previous / current: (panel_id, breaker_id, ...) قبل التغيير وبعده أو None
+    """
+    from .rollups import panel_chain_ids
+    panel_ids, breaker_ids = set(), set()
+    for values in (previous, current):
+        if values:
+            panel_ids.update(panel_chain_ids(values[0]))
+            breaker_ids.add(values[1])
+    invalidate(PANEL, panel_ids)
+    invalidate_breakers(breaker_ids)
+    invalidate_supplying_breakers(panel_ids)
+
+
+def invalidate_supplying_breakers(panel_ids):
+    """
+    إبطال القواطع التي يتضمن تمثيلها الطلب المُخفَّض للوحات (القاطع الرئيسي والمغذي لكل لوحة والقاطع العمومي لمصدرها)
+    لا تحتاج اللوحات التي تتضمن تمثيل هذه القواطع إبطالاً إضافياً لأنها اللوحات نفسها
+    """
+    panel_ids = {panel_id for panel_id in panel_ids if panel_id is not None}
+    if not panel_ids:
+        return
+    rows = Panel.objects.filter(id__in=panel_ids).values_list(
+        'main_breaker_id', 'feeder_breaker_id', 'power_source__main_breaker_id'
+    )
+    invalidate(BREAKER, {breaker_id for row in rows for breaker_id in row})
+
+
+def invalidate_breaker(breaker_id, panel_ids=()):
+    """إبطال ما يتأثر بتغيير قاطع: إغلاق التغذية الخاص به واللوحات التي ينتمي إليها (قبل التغيير وبعده)"""
+    invalidate(PANEL, panel_ids)
+    invalidate_breakers(feed_closure_ids([breaker_id]))
+
+
+def panel_change_ids(panel_id, parent_panel_id):
+    """
+    اللوحات التي يتغير تمثيلها عند تغيير لوحة: اللوحة وشجرتها الفرعية (المسار الكامل وتفاصيل اللوحة الأم)
+    وسلسلة اللوحات الأم المخزنة (القديمة) وسلسلة اللوحة الأم الجديدة (اللوحات الفرعية والإجماليات)
+    تستدعى قبل تحديث المسار المادي للشجرة الفرعية
+    """
+    paths = dict(Panel.objects.filter(id__in=[panel_id, parent_panel_id]).values_list('id', 'tree_path'))
+    old_path = paths.get(panel_id) or ''
+    panel_ids = {panel_id}
+    panel_ids.update(Panel.parse_tree_path(old_path))
+    panel_ids.update(Panel.parse_tree_path(paths.get(parent_panel_id) or ''))
+    if old_path:
+        panel_ids.update(Panel.objects.filter(tree_path__startswith=old_path).values_list('id', flat=True))
+    return panel_ids
+
+
+def invalidate_panel(panel_id, panel_ids):
+    """
+    إبطال اللوحات المتأثرة بتغيير لوحة (من panel_change_ids) مع قواطع اللوحة
+    لأن اسم اللوحة جزء من وصف القاطع ومساره
+    """
+    invalidate(PANEL, panel_ids)
+    invalidate_breakers(feed_closure_ids(
+        CircuitBreaker.objects.filter(panel_id=panel_id).values_list('id', flat=True)
+    ))
+    invalidate_supplying_breakers(panel_ids)
+
+
+def invalidate_panel_subtrees(panel_ids):
+    """
+    إبطال مجموعة لوحات مع جميع اللوحات التابعة لها (للتعديلات المجمعة التي لا ترسل إشارات)
+    تطابق المسارات في الذاكرة بدلاً من شرط OR لكل لوحة حتى يبقى الاستعلام بسيطاً مهما زاد عدد اللوحات
+    """
+    panel_ids = set(panel_ids)
+    if not panel_ids:
+        return
+    prefixes = tuple(
+        tree_path for tree_path in Panel.objects.filter(id__in=panel_ids).values_list('tree_path', flat=True) if tree_path
+    )
+    subtree_ids = [
+        panel_id for panel_id, tree_path in Panel.objects.values_list('id', 'tree_path')
+        if prefixes and tree_path.startswith(prefixes)
+    ]
+    invalidate(PANEL, panel_ids.union(subtree_ids))
+
+
+def invalidate_power_source(power_source_id):
+    """إبطال الأشجار الفرعية للوحات الرئيسية للمصدر (اسم المصدر جزء من مساراتها)"""
+    root_paths = Panel.objects.filter(power_source_id=power_source_id).values_list('tree_path', flat=True)
+    condition = Q(power_source_id=power_source_id)
+    for tree_path in root_paths:
+        if tree_path:
+            condition |= Q(tree_path__startswith=tree_path)
+    invalidate(PANEL, Panel.objects.filter(condition).values_list('id', flat=True))
+
+
+
+def invalidate_bulk(panel_ids=(), breaker_ids=()):
+    """
+    إبطال ما يتأثر بتعديل مجمع لا يرسل إشارات (services/bulk.py) دفعة واحدة:
+    سلاسل اللوحات الأم للوحات، وإغلاق التغذية للقواطع، والقواطع التي تحمل طلب اللوحات، وفهرس التأثير فوقها
+
+    Args:
+        panel_ids / breaker_ids: اللوحات والقواطع المرتبطة بالعناصر المعدلة قبل التعديل وبعده
+    """
+    panel_ids = {panel_id for panel_id in panel_ids if panel_id is not None}
+    breaker_ids = {breaker_id for breaker_id in breaker_ids if breaker_id is not None}
+    chain_ids = set(panel_ids)
+    for tree_path in Panel.objects.filter(id__in=panel_ids).values_list('tree_path', flat=True):
+        chain_ids.update(Panel.parse_tree_path(tree_path or ''))
+    invalidate(PANEL, chain_ids)
+    invalidate_breakers(feed_closure_ids(breaker_ids))
+    invalidate_supplying_breakers(chain_ids)
+    # القواطع المعدلة قد تنقل أو تصبح رئيسية فتتغير تغذية ما تحتها
+    invalidate_supply_chain(chain_ids)
+    invalidate_supply_change(breaker_ids=breaker_ids)
+
+# ------------------- فهرس التأثير -------------------
+
+def supply_chain_ids(panel_ids=(), breaker_ids=()):
+    """
+    اللوحات والقواطع التي تقع فوق مجموعة عناصر في مسار التغذية (مع العناصر نفسها)،
+    أي التي قد يتغير ما يفقد التغذية عند فصلها إذا تغيرت هذه العناصر:
+    - القاطع: لوحته وقواطعه المغذية
+    - اللوحة: سلسلة لوحاتها الأم وقاطعها الرئيسي والمغذي والقاطع العمومي لمصدرها
+    تتكرر الخطوتان حتى لا يضاف عنصر جديد (استعلامان لكل مستوى)
+
+    Returns:
+        tuple: (معرفات اللوحات, معرفات القواطع)
+    """
+    through = CircuitBreaker.feeding_breakers.through
+    panels = {panel_id for panel_id in panel_ids if panel_id is not None}
+    breakers = {breaker_id for breaker_id in breaker_ids if breaker_id is not None}
+    panel_frontier, breaker_frontier = set(panels), set(breakers)
+    while panel_frontier or breaker_frontier:
+        new_panels, new_breakers = set(), set()
+        if breaker_frontier:
+            new_panels.update(CircuitBreaker.objects.filter(id__in=breaker_frontier).values_list('panel_id', flat=True))
+            new_breakers.update(through.objects.filter(from_circuitbreaker_id__in=breaker_frontier).values_list(
+                'to_circuitbreaker_id', flat=True
+            ))
+        if panel_frontier:
+            for tree_path, *supplying in Panel.objects.filter(id__in=panel_frontier).values_list(
+                'tree_path', 'main_breaker_id', 'feeder_breaker_id', 'power_source__main_breaker_id'
+            ):
+                new_panels.update(Panel.parse_tree_path(tree_path or ''))
+                new_breakers.update(supplying)
+        new_panels.discard(None)
+        new_breakers.discard(None)
+        panel_frontier, breaker_frontier = new_panels - panels, new_breakers - breakers
+        panels |= panel_frontier
+        breakers |= breaker_frontier
+    return panels, breakers
+
+
+def invalidate_impact(panel_ids=(), breaker_ids=()):
+    """حذف قيم فهرس التأثير لمجموعة لوحات وقواطع (دون العناصر التي فوقها)"""
+    invalidate(PANEL, panel_ids, (IMPACT,))
+    invalidate(BREAKER, breaker_ids, (IMPACT,))
+
+
+def invalidate_supply_chain(panel_ids=(), breaker_ids=()):
+    """إبطال فهرس التأثير للعناصر المتغيرة وجميع العناصر التي فوقها في مسار التغذية"""
+    invalidate_impact(*supply_chain_ids(panel_ids, breaker_ids))
+
+
+def supply_subtree_ids(panel_ids=(), breaker_ids=()):
+    """
+    اللوحات والقواطع التي تقع تحت مجموعة عناصر في مسار التغذية (مع العناصر نفسها)،
+    أي التي قد تتغير حالة تغذيتها إذا تغيرت هذه العناصر:
+    - اللوحة: لوحاتها الفرعية وقواطعها
+    - القاطع: القواطع التي يغذيها واللوحات التي هو قاطعها المغذي أو الرئيسي أو القاطع العمومي لمصدرها
+    تتكرر الخطوتان حتى لا يضاف عنصر جديد (أربعة استعلامات لكل مستوى على الأكثر)
+
+    Returns:
+        tuple: (معرفات اللوحات, معرفات القواطع)
+    """
+    through = CircuitBreaker.feeding_breakers.through
+    panels = {panel_id for panel_id in panel_ids if panel_id is not None}
+    breakers = {breaker_id for breaker_id in breaker_ids if breaker_id is not None}
+    panel_frontier, breaker_frontier = set(panels), set(breakers)
+    while panel_frontier or breaker_frontier:
+        new_panels, new_breakers = set(), set()
+        if breaker_frontier:
+            new_breakers.update(through.objects.filter(to_circuitbreaker_id__in=breaker_frontier).values_list(
+                'from_circuitbreaker_id', flat=True
+            ))
+            new_panels.update(Panel.objects.filter(
+                Q(feeder_breaker_id__in=breaker_frontier) | Q(main_breaker_id__in=breaker_frontier)
+                | Q(parent_panel__isnull=True, power_source__main_breaker_id__in=breaker_frontier)
+            ).values_list('id', flat=True))
+        if panel_frontier:
+            new_panels.update(Panel.objects.filter(parent_panel_id__in=panel_frontier).values_list('id', flat=True))
+            new_breakers.update(CircuitBreaker.objects.filter(panel_id__in=panel_frontier).values_list('id', flat=True))
+        panel_frontier, breaker_frontier = new_panels - panels, new_breakers - breakers
+        panels |= panel_frontier
+        breakers |= breaker_frontier
+    return panels, breakers
+
+
+def supply_change_ids(panel_ids=(), breaker_ids=()):
+    """
+    قيم فهرس التأثير التي تعتمد على حالة تغذية عناصر متغيرة: كل ما فوق أي عنصر تحتها.
+    قيمة العنصر تعتمد على التغذية (والتغذية البديلة) لما تحته، فإذا تقاطع ما تحته مع ما تحت العنصر المتغير
+    كان فوق أحد عناصر هذا التقاطع، ومنها المغذيات الأخرى للقواطع التي يغذيها العنصر المتغير
+    """
+    return supply_chain_ids(*supply_subtree_ids(panel_ids, breaker_ids))
+
+
+def invalidate_supply_change(panel_ids=(), breaker_ids=()):
+    """إبطال فهرس التأثير عند تغير تغذية عناصر (وليس محتواها فقط): ما تحتها وكل ما فوق ذلك"""
+    invalidate_impact(*supply_change_ids(panel_ids, breaker_ids))
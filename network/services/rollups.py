@@ -0,0 +1,216 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - إجماليات الأحمال المخزنة (Roll-ups)
+يحدث هذا الملف إجماليات الأحمال المخزنة في اللوحات والقواطع بشكل تزايدي:
+كل تغيير في حمل أو لوحة أو علاقة تغذية يطبق فرقاً (delta) على السلسلة المتأثرة فقط باستعلام UPDATE واحد
+بدلاً من إعادة حساب الشجرة كاملة عند كل قراءة
+"""
+
+from collections import defaultdict
+
+from django.db.models import F, Sum, Count
+
+from ..models import Panel, CircuitBreaker, Load
+
+# حقول الإجماليات المشتركة بين اللوحات والقواطع (الطلب: أمبير الأحمال بعد معامل الطلب لنوع كل حمل)
+ROLLUP_FIELDS = ('rollup_ampacity', 'rollup_load_count', 'rollup_power_consumption', 'rollup_demand_ampacity')
+
+# تيارات الأطوار الثلاثة للوحات (الحمل أحادي الطور على طوره فقط، والحمل ثلاثي الطور بتياره على كل طور)
+PHASE_ROLLUP_FIELDS = ('rollup_l1_ampacity', 'rollup_l2_ampacity', 'rollup_l3_ampacity')
+NO_PHASES = (0, 0, 0)
+
+
+def phase_currents(phase, ampacity):
+    """توزيع تيار حمل على الأطوار الثلاثة حسب طوره (L1 أو L2 أو L3 أو 3P)"""
+    ampacity = ampacity or 0
+    if phase == Load.THREE_PHASE:
+        return (ampacity, ampacity, ampacity)
+    return tuple(ampacity if phase == name else 0 for name in Load.SINGLE_PHASES)
+
+
+def demand_ampacity(load_type, ampacity, factors=None):
+    """أمبير الطلب لحمل: أمبيره مضروباً بمعامل الطلب لنوعه (1 للأنواع غير المعرفة)"""
+    factors = Load.demand_factors() if factors is None else factors
+    return (ampacity or 0) * factors.get(load_type, 1.0)
+
+
+def _increments(ampacity=0, count=0, power=0, demand=0, phases=NO_PHASES):
+    """بناء تعابير F لإضافة الفروق إلى حقول الإجماليات (مع تجاهل الفروق الصفرية)"""
+    deltas = dict(zip(ROLLUP_FIELDS, (ampacity, count, power, demand)))
+    deltas.update(zip(PHASE_ROLLUP_FIELDS, phases))
+    return {field: F(field) + delta for field, delta in deltas.items() if delta}
+
+
+def panel_chain_ids(panel_id):
+    """معرفات اللوحة وجميع لوحاتها الأم من مسارها المادي (استعلام واحد)"""
+    if panel_id is None:
+        return []
+    tree_path = Panel.objects.filter(id=panel_id).values_list('tree_path', flat=True).first()
+    if tree_path is None:
+        return []
+    return Panel.parse_tree_path(tree_path) or [panel_id]
+
+
+def adjust_panel_chain(panel_ids, ampacity=0, count=0, power=0, demand=0, phases=NO_PHASES):
+    """إضافة الفروق إلى إجماليات مجموعة لوحات (عادةً اللوحة وسلسلة لوحاتها الأم) بما فيها تيارات الأطوار"""
+    increments = _increments(ampacity, count, power, demand, phases)
+    if panel_ids and increments:
+        Panel.objects.filter(id__in=panel_ids).update(**increments)
+
+
+def adjust_breaker(breaker_id, ampacity=0, count=0, power=0, demand=0):
+    """إضافة الفروق إلى إجماليات قاطع واحد"""
+    increments = _increments(ampacity, count, power, demand)
+    if breaker_id is not None and increments:
+        CircuitBreaker.objects.filter(id=breaker_id).update(**increments)
+
+
+def apply_load_change(previous, current):
+    """
+    تطبيق تغيير حمل على الإجماليات
+
+    Args:
+        previous: (panel_id, breaker_id, ampacity, power_consumption, phase, load_type) قبل التغيير أو None لحمل جديد
+        current: نفس الصيغة بعد التغيير أو None لحمل محذوف
+    """
+    if previous == current:
+        return
+    old_panel, old_breaker, old_ampacity, old_power, old_phase, old_type = previous or (None, None, 0, 0, None, None)
+    new_panel, new_breaker, new_ampacity, new_power, new_phase, new_type = current or (None, None, 0, 0, None, None)
+    old_count = 1 if previous else 0
+    new_count = 1 if current else 0
+    old_phases = phase_currents(old_phase, old_ampacity)
+    new_phases = phase_currents(new_phase, new_ampacity)
+    factors = Load.demand_factors()
+    old_demand = demand_ampacity(old_type, old_ampacity, factors)
+    new_demand = demand_ampacity(new_type, new_ampacity, factors)
+
+    if old_panel == new_panel:
+        adjust_panel_chain(
+            panel_chain_ids(new_panel),
+            new_ampacity - old_ampacity, new_count - old_count, new_power - old_power, new_demand - old_demand,
+            tuple(new - old for new, old in zip(new_phases, old_phases))
+        )
+    else:
+        adjust_panel_chain(
+            panel_chain_ids(old_panel), -old_ampacity, -old_count, -old_power, -old_demand,
+            tuple(-old for old in old_phases)
+        )
+        adjust_panel_chain(panel_chain_ids(new_panel), new_ampacity, new_count, new_power, new_demand, new_phases)
+
+    if old_breaker == new_breaker:
+        adjust_breaker(
+            new_breaker, new_ampacity - old_ampacity, new_count - old_count, new_power - old_power,
+            new_demand - old_demand
+        )
+    else:
+        adjust_breaker(old_breaker, -old_ampacity, -old_count, -old_power, -old_demand)
+        adjust_breaker(new_breaker, new_ampacity, new_count, new_power, new_demand)
+
+
+def move_panel_rollups(panel_id, old_ancestor_ids, new_ancestor_ids):
+    """نقل إجماليات الشجرة الفرعية للوحة من سلسلة لوحاتها الأم القديمة إلى الجديدة"""
+    totals = Panel.objects.filter(id=panel_id).values_list(*ROLLUP_FIELDS, *PHASE_ROLLUP_FIELDS).first()
+    if not totals or not any(totals):
+        return
+    ampacity, count, power, demand, *phases = totals
+    adjust_panel_chain(
+        [i for i in old_ancestor_ids if i not in new_ancestor_ids],
+        -ampacity, -count, -power, -demand, [-i for i in phases]
+    )
+    adjust_panel_chain(
+        [i for i in new_ancestor_ids if i not in old_ancestor_ids], ampacity, count, power, demand, phases
+    )
+
+
+def adjust_feeding_pairs(pairs, sign=1):
+    """
+    تحديث الحمل على القواطع المغذية عند إضافة أو إزالة علاقات تغذية
+    كل قاطع مغذٍ يحمل التيار المقنن للقواطع التي يغذيها
+
+    Args:
+        pairs: قائمة (معرف القاطع المغذي, معرف القاطع المغذى)
+        sign: 1 للإضافة و -1 للإزالة
+    """
+    if not pairs:
+        return
+    rated = dict(CircuitBreaker.objects.filter(id__in={fed for _, fed in pairs}).values_list('id', 'rated_current'))
+    per_feeder = defaultdict(float)
+    for feeder_id, fed_id in pairs:
+        per_feeder[feeder_id] += rated.get(fed_id, 0)
+    for feeder_id, ampacity in per_feeder.items():
+        adjust_breaker(feeder_id, sign * ampacity)
+
+
+def adjust_feeders_of(breaker_id, ampacity):
+    """إضافة فرق في التيار المقنن لقاطع إلى جميع القواطع التي تغذيه (استعلام واحد)"""
+    if not ampacity:
+        return
+    through = CircuitBreaker.feeding_breakers.through
+    feeder_ids = through.objects.filter(from_circuitbreaker_id=breaker_id).values('to_circuitbreaker_id')
+    CircuitBreaker.objects.filter(id__in=feeder_ids).update(rollup_ampacity=F('rollup_ampacity') + ampacity)
+
+
+def rebuild_rollups():
+    """
+    إعادة حساب جميع الإجماليات من الصفر بعدد ثابت من الاستعلامات
+    تستخدم في أمر الإدارة rebuild_rollups لإصلاح البيانات بعد أي تعديل يتجاوز النماذج
+
+    Returns:
+        tuple: (عدد اللوحات المصححة, عدد القواطع المصححة)
+    """
+    factors = Load.demand_factors()
+
+    def totals_by(field):
+        # التجميع حسب نوع الحمل أيضاً لتطبيق معامل الطلب على مجموع كل نوع
+        totals = defaultdict(lambda: [0, 0, 0, 0])
+        for row in Load.objects.order_by().filter(**{f'{field}__isnull': False}).values(field, 'load_type').annotate(
+            ampacity=Sum('ampacity'), count=Count('id'), power=Sum('power_consumption')
+        ):
+            total = totals[row[field]]
+            total[0] += row['ampacity'] or 0
+            total[1] += row['count']
+            total[2] += row['power'] or 0
+            total[3] += demand_ampacity(row['load_type'], row['ampacity'], factors)
+        return totals
+
+    # اللوحات: إضافة أحمال كل لوحة (مع تيارات أطوارها) إلى جميع لوحات مسارها المادي
+    panel_fields = ROLLUP_FIELDS + PHASE_ROLLUP_FIELDS
+    empty = (0,) * len(panel_fields)
+    panel_rows = list(Panel.objects.values_list('id', 'tree_path', *panel_fields))
+    panel_totals = defaultdict(lambda: [0] * len(panel_fields))
+    paths = {panel_id: tree_path for panel_id, tree_path, *_ in panel_rows}
+    phase_rows = Load.objects.order_by().filter(panel__isnull=False).values('panel', 'phase').annotate(
+        ampacity=Sum('ampacity')
+    )
+    own_phases = defaultdict(lambda: [0, 0, 0])
+    for row in phase_rows:
+        for index, current in enumerate(phase_currents(row['phase'], row['ampacity'])):
+            own_phases[row['panel']][index] += current
+    for panel_id, own_totals in totals_by('panel').items():
+        for ancestor_id in Panel.parse_tree_path(paths.get(panel_id) or '') or [panel_id]:
+            totals = panel_totals[ancestor_id]
+            for index, value in enumerate((*own_totals, *own_phases[panel_id])):
+                totals[index] += value
+    changed_panels = [
+        Panel(id=panel_id, **dict(zip(panel_fields, panel_totals.get(panel_id, empty))))
+        for panel_id, _, *stored in panel_rows
+        if tuple(stored) != tuple(panel_totals.get(panel_id, empty))
+    ]
+    Panel.objects.bulk_update(changed_panels, panel_fields, batch_size=500)
+
+    # القواطع: الأحمال المباشرة + التيار المقنن للقواطع المغذاة
+    empty = (0,) * len(ROLLUP_FIELDS)
+    breaker_totals = defaultdict(lambda: list(empty))
+    for breaker_id, totals in totals_by('breaker').items():
+        breaker_totals[breaker_id] = list(totals)
+    through = CircuitBreaker.feeding_breakers.through
+    for feeder_id, fed_rated in through.objects.values_list('to_circuitbreaker_id', 'from_circuitbreaker__rated_current'):
+        breaker_totals[feeder_id][0] += fed_rated
+    changed_breakers = [
+        CircuitBreaker(id=breaker_id, **dict(zip(ROLLUP_FIELDS, breaker_totals.get(breaker_id, empty))))
+        for breaker_id, *stored in CircuitBreaker.objects.values_list('id', *ROLLUP_FIELDS)
+        if tuple(stored) != tuple(breaker_totals.get(breaker_id, empty))
+    ]
+    CircuitBreaker.objects.bulk_update(changed_breakers, ROLLUP_FIELDS, batch_size=500)
+
+    return len(changed_panels), len(changed_breakers)
@@ -0,0 +1,471 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - سيناريوهات "ماذا لو" (What-if scenarios)
+السيناريو قائمة تغييرات مضغوطة فوق الشبكة الحية (إضافة أو حذف أو تعديل مصادر ولوحات وقواطع وأحمال ومعاملات كابلاتها)
+تقيم على نسخة في الذاكرة بنظام النسخ عند الكتابة (Copy-on-write) دون أي كتابة في جداول الشبكة:
+- حالة الشبكة (NetworkState) تحمل مرة واحدة لكل مراجعة للشبكة ولا تعدل أبداً
+- عرض السيناريو (ScenarioView) ينسخ فقط الصفوف التي يغيرها ويسجل المحذوفة، وباقي الصفوف مشتركة مع الحالة
+- الحذف يتبع قواعد on_delete في النماذج عند التقييم: حذف لوحة أو مصدر يحذف شجرته، وحذف قاطع يفصل أحماله
+
+صيغة التغيير:
+    {"action": "add", "kind": "load", "key": "line-1", "fields": {"panel": 5, "ampacity": 32, ...}}
+    {"action": "modify", "kind": "panel", "id": 5, "fields": {"cable_length": 80}}
+    {"action": "remove", "kind": "breaker", "id": 12}
+المراجع في fields (مثل panel و parent_panel و feeding_breakers) معرفات كائنات حية أو مفاتيح كائنات أضافها السيناريو
+
+التقييم يعيد حساب الإجماليات (بنفس قواعد services/rollups.py) ونسب الاستخدام وهبوط الجهد (CableAnalysis على صفوف العرض)
+ويقارنها بتقييم الشبكة الحية، ويعيد فقط الكائنات التي تغيرت نتائجها
+"""
+
+import threading
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+
+from ..models import PowerSource, Panel, CircuitBreaker, Load, NetworkRevision
+from .cable_analysis import CableAnalysis
+from .rollups import demand_ampacity, phase_currents
+
+ADD = 'add'
+REMOVE = 'remove'
+MODIFY = 'modify'
+ACTIONS = (ADD, REMOVE, MODIFY)
+
+CABLE_FIELDS = ('cable_quantity', 'cable_cross_section', 'cable_material', 'cable_length', 'cable_path')
+
+# علاقة التغذية بين القواطع: قائمة القواطع المغذية لكل قاطع
+FEEDING = 'feeding_breakers'
+
+# لكل نوع: النموذج، والحقول المحملة في الذاكرة (وهي الحقول التي يمكن للسيناريو تعديلها)، والمراجع إلى الأنواع الأخرى
+KINDS = {
+    'source': (PowerSource, ('name', 'voltage', 'total_ampacity', *CABLE_FIELDS), {}),
+    'panel': (
+        Panel,
+        ('name', 'voltage', 'ampacity', 'parent_panel', 'power_source', 'feeder_breaker', 'main_breaker', *CABLE_FIELDS),
+        {'parent_panel': 'panel', 'power_source': 'source', 'feeder_breaker': 'breaker', 'main_breaker': 'breaker'},
+    ),
+    'breaker': (CircuitBreaker, ('name', 'panel', 'rated_current', FEEDING), {'panel': 'panel', FEEDING: 'breaker'}),
+    'load': (
+        Load,
+        ('name', 'panel', 'breaker', 'voltage', 'ampacity', 'power_consumption', 'power_factor', 'phase', 'load_type',
+         *CABLE_FIELDS),
+        {'panel': 'panel', 'breaker': 'breaker'},
+    ),
+}
+
+# النتائج المقارنة لكل نوع
+METRICS = {
+    'source': ('load_ampacity', 'utilization_percentage', 'voltage_drop_percentage'),
+    'panel': (
+        'rollup_ampacity', 'rollup_load_count', 'rollup_power_consumption', 'rollup_demand_ampacity',
+        'utilization_percentage', 'cumulative_voltage_drop_percentage',
+    ),
+    'breaker': ('rollup_ampacity', 'rollup_load_count', 'rollup_demand_ampacity', 'utilization_percentage'),
+    'load': ('ampacity', 'cable_utilization_percentage', 'cumulative_voltage_drop_percentage'),
+}
+
+
+class ScenarioError(ValueError):
+    """تغيير غير صالح في السيناريو (نوع أو إجراء أو حقل غير معروف، أو مرجع لكائن غير موجود)"""
+
+
+class NetworkState:
+    """
+    نسخة للقراءة فقط من الشبكة الحية: {نوع: {معرف: قاموس الحقول}} بخمسة استعلامات
+    لا تعدل صفوفها أبداً، والسيناريوهات تنسخ الصفوف التي تغيرها
+    """
+
+    def __init__(self, revision=None):
+        self.revision = revision
+        self.rows = {}
+        for kind, (model, fields, _) in KINDS.items():
+            columns = [field for field in fields if field != FEEDING]
+            self.rows[kind] = {row['id']: row for row in model.objects.order_by('id').values('id', *columns)}
+        feeders = defaultdict(list)
+        through = CircuitBreaker.feeding_breakers.through
+        for fed_id, feeder_id in through.objects.values_list('from_circuitbreaker_id', 'to_circuitbreaker_id'):
+            feeders[fed_id].append(feeder_id)
+        for breaker_id, row in self.rows['breaker'].items():
+            row[FEEDING] = tuple(feeders.get(breaker_id, ()))
+        self._baseline = None
+        self._lock = threading.Lock()
+
+    def baseline(self):
+        """تقييم الشبكة الحية (يحسب مرة واحدة لكل حالة)"""
+        with self._lock:
+            if self._baseline is None:
+                self._baseline = evaluate(ScenarioView(self))
+            return self._baseline
+
+
+class ScenarioView:
+    """
+    عرض الشبكة بعد تطبيق تغييرات السيناريو فوق حالة الشبكة (نسخ عند الكتابة)
+    الكائنات المضافة تأخذ معرفات سالبة في الذاكرة، ومفاتيحها في السيناريو تستخدم في المراجع وفي النتائج
+    """
+
+    def __init__(self, state):
+        self.state = state
+        self.changed = {kind: {} for kind in KINDS}
+        self.removed = {kind: set() for kind in KINDS}
+        self.keys = {}
+        self.labels = {}
+
+    def get(self, kind, object_id):
+        if object_id in self.removed[kind]:
+            return None
+        row = self.changed[kind].get(object_id)
+        return row if row is not None else self.state.rows[kind].get(object_id)
+
+    def rows(self, kind):
+        """جميع صفوف النوع بعد التغييرات (الصفوف غير المعدلة مشتركة مع حالة الشبكة)"""
+        base, changed, removed = self.state.rows[kind], self.changed[kind], self.removed[kind]
+        for object_id, row in base.items():
+            if object_id not in removed:
+                yield changed.get(object_id, row)
+        for object_id, row in changed.items():
+            if object_id not in base and object_id not in removed:
+                yield row
+
+    def label(self, kind, object_id):
+        """معرف الكائن في النتائج: معرفه الحي أو مفتاحه في السيناريو"""
+        return self.labels.get((kind, object_id), object_id)
+
+    def resolve(self, kind, reference):
+        """تحويل مرجع (معرف حي أو مفتاح كائن مضاف) إلى معرف في الذاكرة"""
+        if reference is None:
+            return None
+        if isinstance(reference, str) and reference in self.keys:
+            key_kind, object_id = self.keys[reference]
+            if key_kind != kind:
+                raise ScenarioError(f"المفتاح {reference} ليس من النوع {kind}")
+        elif isinstance(reference, int) and not isinstance(reference, bool):
+            object_id = reference
+        else:
+            raise ScenarioError(f"مرجع غير معروف: {reference}")
+        if self.get(kind, object_id) is None:
+            raise ScenarioError(f"{kind} {reference} غير موجود")
+        return object_id
+
+    def _clean_fields(self, kind, fields):
+        model, allowed, references = KINDS[kind]
+        if not isinstance(fields, dict):
+            raise ScenarioError("fields يجب أن يكون قاموساً")
+        unknown = [name for name in fields if name not in allowed]
+        if unknown:
+            raise ScenarioError(f"حقول غير معروفة للنوع {kind}: {', '.join(unknown)}")
+        cleaned = {}
+        for name, value in fields.items():
+            if name == FEEDING:
+                if not isinstance(value, list):
+                    raise ScenarioError(f"{FEEDING} يجب أن يكون قائمة")
+                cleaned[name] = tuple(self.resolve('breaker', reference) for reference in value)
+            elif name in references:
+                cleaned[name] = self.resolve(references[name], value)
+            else:
+                # نفس تحقق النموذج: النوع والقيم الفارغة للحقول الإلزامية والاختيارات (choices) والمدقّقات
+                try:
+                    cleaned[name] = model._meta.get_field(name).clean(value, None)
+                except ValidationError as error:
+                    raise ScenarioError(f"{name}: {' '.join(error.messages)}")
+        return cleaned
+
+    def _complete_load(self, row):
+        """القيم التي يضبطها Load.save: الجهد من اللوحة، والطور الافتراضي، والقدرة من الجهد × الأمبير × معامل القدرة"""
+        if not row['voltage'] and row['panel'] is not None:
+            row['voltage'] = self.get('panel', row['panel'])['voltage']
+        if not row['phase']:
+            row['phase'] = Load.THREE_PHASE if row['voltage'] in ('380', '11KV') else 'L1'
+        if not row['power_consumption'] and (row['ampacity'] or 0) > 0:
+            voltage = 11000.0 if row['voltage'] == '11KV' else float(row['voltage'] or 0)
+            row['power_consumption'] = voltage * row['ampacity'] * row['power_factor']
+
+    def apply(self, change):
+        """تطبيق تغيير واحد على العرض"""
+        if not isinstance(change, dict):
+            raise ScenarioError("كل تغيير يجب أن يكون قاموساً")
+        action, kind = change.get('action'), change.get('kind')
+        if action not in ACTIONS:
+            raise ScenarioError(f"إجراء غير معروف: {action} (الإجراءات المتاحة: {', '.join(ACTIONS)})")
+        if kind not in KINDS:
+            raise ScenarioError(f"نوع غير معروف: {kind} (الأنواع المتاحة: {', '.join(KINDS)})")
+
+        if action == ADD:
+            key = change.get('key')
+            if not isinstance(key, str) or not key or key in self.keys:
+                raise ScenarioError("الإضافة تتطلب مفتاحاً نصياً غير مكرر (key)")
+            model, fields, references = KINDS[kind]
+            object_id = -(len(self.keys) + 1)
+            row = {'id': object_id}
+            for name in fields:
+                row[name] = () if name == FEEDING else None if name in references else model._meta.get_field(name).get_default()
+            row['name'] = key
+            row.update(self._clean_fields(kind, change.get('fields', {})))
+            self.keys[key] = (kind, object_id)
+            self.labels[(kind, object_id)] = key
+        else:
+            object_id = self.resolve(kind, change.get('id'))
+            if action == REMOVE:
+                self.removed[kind].add(object_id)
+                self.changed[kind].pop(object_id, None)
+                return
+            row = dict(self.get(kind, object_id))
+            row.update(self._clean_fields(kind, change.get('fields', {})))
+        if kind == 'load':
+            self._complete_load(row)
+        self.changed[kind][object_id] = row
+
+
+class ScenarioResult:
+    """نتائج تقييم عرض: {نوع: {معرف: {مقياس: قيمة}}} مع الأسماء"""
+
+    def __init__(self, metrics, names):
+        self.metrics = metrics
+        self.names = names
+
+    def overloaded(self, kind):
+        return sum(1 for values in self.metrics[kind].values() if values['utilization_percentage'] > 100)
+
+    def max_voltage_drop(self):
+        values = [
+            values['cumulative_voltage_drop_percentage'] for values in self.metrics['load'].values()
+            if values['cumulative_voltage_drop_percentage'] is not None
+        ]
+        return max(values, default=None)
+
+
+def _percentage(value, rating):
+    return (value / rating * 100) if rating else 0
+
+
+def _number(value):
+    value = float(value)
+    return None if value != value else value
+
+
+def evaluate(view):
+    """
+    تقييم عرض سيناريو: الإجماليات ونسب الاستخدام وهبوط الجهد لجميع الكائنات
+
+    Returns:
+        ScenarioResult
+    """
+    sources = {row['id']: row for row in view.rows('source')}
+    all_panels = {row['id']: row for row in view.rows('panel')}
+
+    # اللوحات الحية وعمقها: تحذف لوحة أمها أو مصدرها محذوف (CASCADE) وتتجاهل الحلقات
+    depth = {}
+    for panel_id in all_panels:
+        chain, seen, current = [], set(), panel_id
+        while True:
+            if current in depth:
+                base = depth[current]
+                break
+            row = all_panels.get(current)
+            if row is None or current in seen or (row['power_source'] is not None and row['power_source'] not in sources):
+                base = None
+                break
+            chain.append(current)
+            seen.add(current)
+            if row['parent_panel'] is None:
+                base = -1
+                break
+            current = row['parent_panel']
+        for offset, chain_id in enumerate(reversed(chain)):
+            depth[chain_id] = None if base is None else base + 1 + offset
+    panels = {panel_id: row for panel_id, row in all_panels.items() if depth.get(panel_id) is not None}
+    breakers = {
+        row['id']: row for row in view.rows('breaker') if row['panel'] is None or row['panel'] in panels
+    }
+    loads = [row for row in view.rows('load') if row['panel'] is None or row['panel'] in panels]
+
+    # الإجماليات: الأمبير، العدد، القدرة، الطلب، ثم تيارات الأطوار للوحات
+    factors = Load.demand_factors()
+    panel_totals = {panel_id: [0.0] * 7 for panel_id in panels}
+    breaker_totals = {breaker_id: [0.0] * 4 for breaker_id in breakers}
+    for load in loads:
+        ampacity = load['ampacity'] or 0
+        values = (
+            ampacity, 1, load['power_consumption'] or 0, demand_ampacity(load['load_type'], ampacity, factors),
+            *phase_currents(load['phase'], ampacity),
+        )
+        if load['panel'] is not None:
+            totals = panel_totals[load['panel']]
+            for index, value in enumerate(values):
+                totals[index] += value
+        if load['breaker'] in breakers:
+            totals = breaker_totals[load['breaker']]
+            for index in range(4):
+                totals[index] += values[index]
+    for panel_id in sorted(panels, key=lambda panel_id: -depth[panel_id]):
+        parent_id = panels[panel_id]['parent_panel']
+        if parent_id is not None:
+            for index, value in enumerate(panel_totals[panel_id]):
+                panel_totals[parent_id][index] += value
+    for breaker in breakers.values():
+        for feeder_id in breaker[FEEDING]:
+            if feeder_id in breaker_totals:
+                breaker_totals[feeder_id][0] += breaker['rated_current'] or 0
+
+    # الكابلات: نفس التحليل المجمع على صفوف العرض
+    cable_rows = {
+        'source': [
+            (source_id, row['name'], row['voltage'], row['total_ampacity'], *(row[field] for field in CABLE_FIELDS), None)
+            for source_id, row in sources.items()
+        ],
+        'panel': [
+            (panel_id, row['name'], row['voltage'], row['ampacity'], *(row[field] for field in CABLE_FIELDS),
+             ('panel', row['parent_panel']) if row['parent_panel'] is not None
+             else ('source', row['power_source']) if row['power_source'] is not None else None)
+            for panel_id, row in panels.items()
+        ],
+        'load': [
+            (row['id'], row['name'], row['voltage'], row['ampacity'], *(row[field] for field in CABLE_FIELDS),
+             ('panel', row['panel']) if row['panel'] is not None else None)
+            for row in loads
+        ],
+    }
+    cables = CableAnalysis(rows=cable_rows)
+
+    def cable(kind, object_id, field):
+        return _number(getattr(cables, field)[cables.index[(kind, object_id)]])
+
+    source_load = defaultdict(float)
+    for panel_id, row in panels.items():
+        if row['parent_panel'] is None and row['power_source'] is not None:
+            source_load[row['power_source']] += panel_totals[panel_id][0]
+
+    metrics = {
+        'source': {
+            source_id: {
+                'load_ampacity': source_load[source_id],
+                'utilization_percentage': _percentage(source_load[source_id], row['total_ampacity']),
+                'voltage_drop_percentage': cable('source', source_id, 'voltage_drop_percentage'),
+            } for source_id, row in sources.items()
+        },
+        'panel': {
+            panel_id: {
+                'rollup_ampacity': panel_totals[panel_id][0],
+                'rollup_load_count': int(panel_totals[panel_id][1]),
+                'rollup_power_consumption': panel_totals[panel_id][2],
+                'rollup_demand_ampacity': panel_totals[panel_id][3],
+                'phase_currents': panel_totals[panel_id][4:],
+                'utilization_percentage': _percentage(panel_totals[panel_id][0], row['ampacity']),
+                'cumulative_voltage_drop_percentage': cable('panel', panel_id, 'cumulative_voltage_drop_percentage'),
+            } for panel_id, row in panels.items()
+        },
+        'breaker': {
+            breaker_id: {
+                'rollup_ampacity': breaker_totals[breaker_id][0],
+                'rollup_load_count': int(breaker_totals[breaker_id][1]),
+                'rollup_demand_ampacity': breaker_totals[breaker_id][3],
+                'utilization_percentage': _percentage(breaker_totals[breaker_id][0], row['rated_current']),
+            } for breaker_id, row in breakers.items()
+        },
+        'load': {
+            row['id']: {
+                'ampacity': row['ampacity'] or 0,
+                'cable_utilization_percentage': cable('load', row['id'], 'utilization_percentage'),
+                'cumulative_voltage_drop_percentage': cable('load', row['id'], 'cumulative_voltage_drop_percentage'),
+            } for row in loads
+        },
+    }
+    names = {
+        kind: {object_id: row['name'] for object_id, row in rows.items()}
+        for kind, rows in (('source', sources), ('panel', panels), ('breaker', breakers),
+                           ('load', {row['id']: row for row in loads}))
+    }
+    return ScenarioResult(metrics, names)
+
+
+def _differs(before, after, fields):
+    for field in fields:
+        old, new = before[field], after[field]
+        if (old is None) != (new is None) or (old is not None and abs(old - new) > 1e-9):
+            return True
+    return False
+
+
+def compare(baseline, result, view):
+    """
+    مقارنة تقييم السيناريو بتقييم الشبكة الحية
+
+    Returns:
+        dict: {'summary', 'sources', 'panels', 'breakers', 'loads'}: الكائنات المضافة والمحذوفة والتي تغيرت نتائجها
+              مع قيمها قبل السيناريو وبعده
+    """
+    report = {}
+    counts = defaultdict(int)
+    for kind, fields in METRICS.items():
+        before, after = baseline.metrics[kind], result.metrics[kind]
+        rows = []
+        for object_id in sorted(before.keys() | after.keys(), key=lambda object_id: (object_id < 0, abs(object_id))):
+            old, new = before.get(object_id), after.get(object_id)
+            if old is None:
+                status = 'added'
+            elif new is None:
+                status = 'removed'
+            elif object_id in view.changed[kind] or _differs(old, new, fields):
+                status = 'changed'
+            else:
+                continue
+            counts[status] += 1
+            rows.append({
+                'id': view.label(kind, object_id),
+                'name': (result if new is not None else baseline).names[kind][object_id],
+                'status': status,
+                'before': old,
+                'after': new,
+            })
+        report[f'{kind}s'] = rows
+
+    report['summary'] = {
+        'changes': sum(len(view.changed[kind]) + len(view.removed[kind]) for kind in KINDS),
+        'added': counts['added'],
+        'removed': counts['removed'],
+        'changed': counts['changed'],
+        **{
+            f'overloaded_{kind}s': {'before': baseline.overloaded(kind), 'after': result.overloaded(kind)}
+            for kind in ('source', 'panel', 'breaker')
+        },
+        'max_cumulative_voltage_drop_percentage': {
+            'before': baseline.max_voltage_drop(), 'after': result.max_voltage_drop(),
+        },
+    }
+    return report
+
+
+_cache = {'key': None, 'state': None}
+_cache_lock = threading.Lock()
+
+
+def network_state():
+    """إرجاع حالة الشبكة للمراجعة الحالية (تحمل فقط عند تغير رقم المراجعة)"""
+    key = NetworkRevision.current()
+    with _cache_lock:
+        if _cache['key'] == key and _cache['state'] is not None:
+            return _cache['state']
+    state = NetworkState(revision=key[0])
+    with _cache_lock:
+        _cache['key'] = key
+        _cache['state'] = state
+    return state
+
+
+def build_view(changes, state=None):
+    """بناء عرض السيناريو من قائمة التغييرات (يرفع ScenarioError عند أول تغيير غير صالح مع رقمه)"""
+    if not isinstance(changes, list):
+        raise ScenarioError("التغييرات يجب أن تكون قائمة")
+    view = ScenarioView(state or network_state())
+    for index, change in enumerate(changes):
+        try:
+            view.apply(change)
+        except ScenarioError as error:
+            raise ScenarioError(f"التغيير {index + 1}: {error}")
+    return view
+
+
+def evaluate_scenario(changes):
+    """تقييم قائمة تغييرات مقابل الشبكة الحية دون أي كتابة في قاعدة البيانات"""
+    state = network_state()
+    view = build_view(changes, state)
+    return compare(state.baseline(), evaluate(view), view)
@@ -0,0 +1,166 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - فحص الانتقائية (التنسيق) بين القواطع
+الزوج (قاطع أعلى، قاطع أسفل) انتقائي إذا كان أقل زمن فصل للقاطع الأعلى أكبر من أقصى زمن فصل للقاطع الأسفل
+عند كل تيار يفصله القاطع الأسفل حتى تيار القصر المتوقع في موقعه (من دراسة القصر، أو حتى نهاية الشبكة إن لم يعرف)
+الأزواج من مصدرين:
+- علاقات التغذية feeding_breakers (القاطع المغذي أعلى والقاطع المغذى أسفل)
+- القاطع المغذي للوحة (Panel.feeder_breaker) أعلى القاطع الرئيسي للوحة نفسها (Panel.main_breaker)
+جميع المنحنيات تقيم مرة واحدة على شبكة تيارات مشتركة، ثم تفحص جميع الأزواج بعملية مصفوفات واحدة
+"""
+
+import threading
+
+import numpy as np
+
+from ..models import CircuitBreaker, Panel
+from .short_circuit import study_short_circuit
+from .trip_curves import curve_parameters, current_grid, trip_times
+
+SELECTIVE = 'selective'
+NOT_SELECTIVE = 'not_selective'
+NOT_APPLICABLE = 'not_applicable'
+STATUSES = (SELECTIVE, NOT_SELECTIVE, NOT_APPLICABLE)
+
+
+def breaker_pairs():
+    """
+    جميع أزواج (القاطع الأعلى، القاطع الأسفل) بدون تكرار، باستعلامين
+    """
+    through = CircuitBreaker.feeding_breakers.through
+    pairs = set(through.objects.values_list('to_circuitbreaker_id', 'from_circuitbreaker_id'))
+    pairs.update(
+        Panel.objects.filter(feeder_breaker__isnull=False, main_breaker__isnull=False)
+        .values_list('feeder_breaker_id', 'main_breaker_id')
+    )
+    return sorted(
+        (upstream, downstream) for upstream, downstream in pairs if upstream and downstream and upstream != downstream
+    )
+
+
+def check_selectivity(upstream_times, downstream_times, grid, fault_limit):
+    """
+    فحص مجموعة أزواج دفعة واحدة
+
+    Args:
+        upstream_times: (أقل زمن, أقصى زمن) للقواطع العليا، كل منهما (p, g)
+        downstream_times: نفس الشكل للقواطع السفلى
+        grid: شبكة التيارات (g,)
+        fault_limit: أقصى تيار يفحص لكل زوج (p,) بالأمبير، inf لكامل الشبكة
+
+    Returns:
+        tuple: (قناع الأزواج غير الانتقائية, حد الانتقائية بالأمبير أو NaN للأزواج الانتقائية)
+    """
+    upstream_minimum, _ = upstream_times
+    _, downstream_maximum = downstream_times
+    # التيارات التي يفصلها القاطع الأسفل ضمن تيار القصر في موقعه، ويفصل عندها القاطع الأعلى قبله أو معه
+    overlap = (
+        np.isfinite(downstream_maximum)
+        & (grid[None, :] <= fault_limit[:, None])
+        & (upstream_minimum <= downstream_maximum)
+    )
+    not_selective = overlap.any(axis=1)
+    limit = np.where(not_selective, grid[np.argmax(overlap, axis=1)], np.nan)
+    return not_selective, limit
+
+
+class SelectivityStudy:
+    """
+    نتيجة فحص الانتقائية لجميع الأزواج: مصفوفات بطول عدد الأزواج
+    الأزواج التي ليس لأحد قاطعيها منحنى (تيار مقنن صفري أو قاطع تسرب أرضي) حالتها not_applicable
+    """
+
+    def __init__(self, short_circuit, grid=None):
+        self.grid = current_grid() if grid is None else grid
+        pairs = breaker_pairs()
+        breaker_ids = sorted({breaker_id for pair in pairs for breaker_id in pair})
+        rows = CircuitBreaker.objects.filter(id__in=breaker_ids).order_by('id').values_list(
+            'id', 'name', 'breaker_type', 'trip_curve', 'rated_current'
+        )
+        self.breakers = {}
+        parameters, rated, positions = [], [], {}
+        for breaker_id, name, breaker_type, trip_curve, rated_current in rows:
+            self.breakers[breaker_id] = {
+                'id': breaker_id, 'name': name, 'breaker_type': breaker_type,
+                'trip_curve': trip_curve, 'rated_current': rated_current,
+            }
+            curve = curve_parameters(breaker_type, trip_curve)
+            if curve is not None and rated_current and rated_current > 0:
+                positions[breaker_id] = len(rated)
+                parameters.append(curve)
+                rated.append(rated_current)
+
+        # منحنيات كل قاطع تحسب مرة واحدة مهما تكرر في الأزواج
+        minimum, maximum = trip_times(
+            np.array(rated, dtype=np.float64), np.array(parameters, dtype=np.float64).reshape(-1, 8), self.grid
+        )
+
+        self.pairs = [
+            (upstream, downstream) for upstream, downstream in pairs
+            if upstream in self.breakers and downstream in self.breakers
+        ]
+        applicable = np.array(
+            [upstream in positions and downstream in positions for upstream, downstream in self.pairs], dtype=bool
+        )
+        upstream_rows = np.array([positions.get(upstream, 0) for upstream, _ in self.pairs], dtype=np.int64)[applicable]
+        downstream_rows = np.array([positions.get(downstream, 0) for _, downstream in self.pairs], dtype=np.int64)[applicable]
+
+        # تيار القصر في موقع القاطع الأسفل (كيلو أمبير → أمبير)
+        fault_by_breaker = dict(zip(short_circuit.breaker_ids.tolist(), short_circuit.breaker_fault_current.tolist()))
+        self.fault_current = np.array(
+            [fault_by_breaker.get(downstream, np.nan) for _, downstream in self.pairs], dtype=np.float64
+        )
+        fault_limit = np.where(np.isnan(self.fault_current), np.inf, self.fault_current * 1000)[applicable]
+
+        self.status = np.full(len(self.pairs), NOT_APPLICABLE, dtype=object)
+        self.limit = np.full(len(self.pairs), np.nan)
+        not_selective, limit = check_selectivity(
+            (minimum[upstream_rows], maximum[upstream_rows]),
+            (minimum[downstream_rows], maximum[downstream_rows]),
+            self.grid, fault_limit
+        )
+        self.status[applicable] = np.where(not_selective, NOT_SELECTIVE, SELECTIVE)
+        self.limit[applicable] = limit
+
+    def rows(self, statuses=None):
+        """نتائج الأزواج بالحالات المطلوبة (جميع الحالات افتراضياً)"""
+        results = []
+        for index, (upstream, downstream) in enumerate(self.pairs):
+            if statuses and self.status[index] not in statuses:
+                continue
+            limit = float(self.limit[index])
+            fault = float(self.fault_current[index])
+            results.append({
+                'upstream': self.breakers[upstream],
+                'downstream': self.breakers[downstream],
+                'status': self.status[index],
+                'selectivity_limit': None if limit != limit else limit,
+                'fault_current': None if fault != fault else fault,
+            })
+        return results
+
+    def summary(self):
+        statuses = self.status.tolist()
+        return {
+            'pairs': len(statuses),
+            **{status: statuses.count(status) for status in STATUSES},
+        }
+
+
+_cache = {'short_circuit': None, 'result': None}
+_cache_lock = threading.Lock()
+
+
+def study_selectivity():
+    """
+    إرجاع فحص الانتقائية للمراجعة الحالية للشبكة
+    يعاد الفحص فقط عند إعادة دراسة القصر (أي عند تغير رقم المراجعة)
+    """
+    short_circuit = study_short_circuit()
+    with _cache_lock:
+        if _cache['short_circuit'] is short_circuit and _cache['result'] is not None:
+            return _cache['result']
+    result = SelectivityStudy(short_circuit)
+    with _cache_lock:
+        _cache['short_circuit'] = short_circuit
+        _cache['result'] = result
+    return result
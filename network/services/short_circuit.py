@@ -0,0 +1,220 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - حساب تيار القصر المتوقع (Prospective short-circuit current)
+يحسب تيار القصر عند أطراف كل مصدر وقضيب كل لوحة وأطراف كل حمل من:
+- معاوقة المصدر: مفاعلة مستنتجة من تياره المقنن (total_ampacity) ونسبة معاوقته حسب نوعه (SOURCE_IMPEDANCE)
+- معاوقة الكابلات التراكمية: مقاومات CableMixin من كابل المصدر عبر كابلات اللوحات حتى كابل الحمل
+ثم يقارن قدرة القطع لكل قاطع (short_circuit_current بالكيلو أمبير) بتيار القصر في موقعه:
+قواطع اللوحة (الرئيسي والمغذيات والتوزيع) عند قضيب اللوحة، والقاطع العمومي للمصدر عند أطراف المصدر
+
+الحساب بالأوم على طول المسار (لا يوجد محول في النموذج: لوحات 220 ف دوائر أحادية الطور من نفس نظام 380 ف)
+ويجمع المعاوقات مستوى بعد مستوى على مستويات الشجرة في CableAnalysis كعمليات متجهة، مع معامل الجهد c = 1.1:
+- العقد ثلاثية الطور (380 و 11 ك.ف): قصر ثلاثي الطور Ik = c × U / (√3 × |Zk|)
+- العقد أحادية الطور: قصر طور مع المحايد Ik = c × U0 / |Zk|، حيث U0 جهد الطور لأقرب نظام ثلاثي الطور فوقها
+  (U / √3) وكابلات العقد أحادية الطور حلقة طور ومحايد (ضعف مقاومة الموصل)
+"""
+
+import threading
+
+import numpy as np
+
+from ..models import PowerSource, CircuitBreaker
+from .cable_analysis import analyze_cables
+
+# معامل الجهد لأقصى تيار قصر
+VOLTAGE_FACTOR = 1.1
+
+# معاوقة المصدر كنسبة من معاوقته المقننة (محول التغذية للشبكة، المفاعلة دون العابرة للمولد)
+SOURCE_IMPEDANCE = {'Local Grid': 0.05, 'Generator': 0.15}
+DEFAULT_SOURCE_IMPEDANCE = 0.05
+
+# أقل جهد اسمي يعامل كنظام ثلاثي الطور
+THREE_PHASE_VOLTAGE = 380
+
+# حالات القواطع
+OK = 'ok'
+INSUFFICIENT = 'insufficient'
+UNRATED = 'unrated'
+UNKNOWN = 'unknown'
+
+
+class ShortCircuitStudy:
+    """
+    نتائج دراسة القصر: fault_current (كيلو أمبير) لكل صف من صفوف تحليل الكابلات بنفس ترتيبها
+    ومصفوفات للقواطع (المعرف والموقع وقدرة القطع وتيار القصر في الموقع والحالة)
+    العقد غير المتصلة بمصدر معروف التيار المقنن قيمها NaN وقواطعها بحالة unknown
+    """
+
+    def __init__(self, analysis):
+        self.analysis = analysis
+        count = len(analysis)
+        upstream = analysis.upstream
+        nominal = analysis.nominal_voltage
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            three_phase = nominal >= THREE_PHASE_VOLTAGE
+            voltage = np.where(nominal > 0, nominal, np.nan)
+            # جهد الطور الذي يغذي القصر عند كل عقدة
+            phase_voltage = np.where(three_phase, voltage / np.sqrt(3), voltage)
+
+            # معاوقة المصدر (مفاعلة خالصة بالأوم): Zk عند أطراف المصدر تعطي Ik = c × In / z
+            sources = np.flatnonzero(analysis.kind == 'source')
+            source_types, main_breakers = source_details(analysis, sources)
+            ratio = np.array([SOURCE_IMPEDANCE.get(source_type, DEFAULT_SOURCE_IMPEDANCE) for source_type in source_types])
+            rated = analysis.current[sources]
+            source_reactance = np.where(rated > 0, ratio * phase_voltage[sources] / rated, np.nan)
+
+            # مقاومة كابل كل عقدة بالأوم: الموصل في الأنظمة ثلاثية الطور، وحلقة الطور والمحايد في أحادية الطور
+            cable_resistance = np.nan_to_num(analysis.resistance * analysis.cable_length) * np.where(three_phase, 1.0, 2.0)
+
+            resistance = np.full(count, np.nan)
+            reactance = np.full(count, np.nan)
+            resistance[sources] = 0.0
+            reactance[sources] = source_reactance
+            for level, rows in enumerate(analysis.levels):
+                if level:
+                    parents = upstream[rows]
+                    resistance[rows] = resistance[parents]
+                    reactance[rows] = reactance[parents]
+                    # العقدة أحادية الطور تأخذ جهد طور النظام الذي يغذيها
+                    inherited = phase_voltage[parents]
+                    phase_voltage[rows] = np.where(
+                        ~three_phase[rows] & ~np.isnan(inherited), inherited, phase_voltage[rows]
+                    )
+                resistance[rows] += cable_resistance[rows]
+
+            self.resistance = resistance
+            self.reactance = reactance
+            self.phase_voltage = phase_voltage
+            self.fault_current = VOLTAGE_FACTOR * phase_voltage / np.hypot(resistance, reactance) / 1000
+            self.terminal_fault_current = np.full(count, np.nan)
+            self.terminal_fault_current[sources] = VOLTAGE_FACTOR * phase_voltage[sources] / source_reactance / 1000
+
+        self._check_breakers(sources, main_breakers)
+
+    def _check_breakers(self, sources, main_breakers):
+        """تحديد موقع كل قاطع وتيار القصر فيه ومقارنته بقدرة القطع (استعلام واحد للقواطع)"""
+        analysis = self.analysis
+        rows = list(CircuitBreaker.objects.order_by('id').values_list('id', 'name', 'panel_id', 'short_circuit_current'))
+        source_of_breaker = {
+            breaker_id: position for position, breaker_id in zip(sources.tolist(), main_breakers) if breaker_id
+        }
+
+        self.breaker_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.breaker_names = [row[1] for row in rows]
+        self.breaking_capacity = np.array([row[3] or 0 for row in rows], dtype=np.float64)
+        fault_at_location = np.full(len(rows), np.nan)
+        self.breaker_location = []
+        for position, (breaker_id, _, panel_id, _) in enumerate(rows):
+            node = analysis.index.get(('panel', panel_id), -1) if panel_id else -1
+            if node >= 0:
+                fault_at_location[position] = self.fault_current[node]
+                self.breaker_location.append(('panel', panel_id))
+            elif breaker_id in source_of_breaker:
+                node = source_of_breaker[breaker_id]
+                fault_at_location[position] = self.terminal_fault_current[node]
+                self.breaker_location.append(('source', int(analysis.ids[node])))
+            else:
+                self.breaker_location.append(None)
+        self.breaker_fault_current = fault_at_location
+
+        known = ~np.isnan(fault_at_location)
+        rated = self.breaking_capacity > 0
+        self.breaker_status = np.full(len(rows), UNKNOWN, dtype=object)
+        self.breaker_status[known & ~rated] = UNRATED
+        with np.errstate(invalid='ignore'):
+            self.breaker_status[known & rated & (self.breaking_capacity >= fault_at_location)] = OK
+            self.breaker_status[known & rated & (self.breaking_capacity < fault_at_location)] = INSUFFICIENT
+
+    def fault_for(self, kind, object_id):
+        """تيار القصر المتوقع (كيلو أمبير) عند عقدة واحدة أو None"""
+        position = self.analysis.index.get((kind, object_id))
+        if position is None:
+            return None
+        value = float(self.fault_current[position])
+        return None if value != value else value
+
+    def buses(self, kinds=None):
+        """تيار القصر عند كل عقدة من الأنواع المحددة"""
+        analysis = self.analysis
+        indices = np.flatnonzero(analysis.mask(kinds=kinds))
+        values = self.fault_current[indices].tolist()
+        terminal = self.terminal_fault_current[indices].tolist()
+        results = []
+        for position, index in enumerate(indices.tolist()):
+            row = {
+                'kind': analysis.kind[index],
+                'id': int(analysis.ids[index]),
+                'name': analysis.names[index],
+                'voltage': analysis.voltages[index],
+                'fault_current': None if values[position] != values[position] else values[position],
+            }
+            if analysis.kind[index] == 'source':
+                value = terminal[position]
+                row['terminal_fault_current'] = None if value != value else value
+            results.append(row)
+        return results
+
+    def breakers(self, statuses=None):
+        """
+        نتيجة فحص القواطع، مرتبة من الأسوأ هامشاً (قدرة القطع - تيار القصر) إلى الأفضل
+        statuses: الحالات المطلوبة (ok, insufficient, unrated, unknown) أو None للجميع
+        """
+        selected = np.ones(len(self.breaker_ids), dtype=bool)
+        if statuses:
+            selected &= np.isin(self.breaker_status, list(statuses))
+        indices = np.flatnonzero(selected)
+        margin = self.breaking_capacity - self.breaker_fault_current
+        indices = indices[np.argsort(margin[indices], kind='stable')]
+        results = []
+        for index in indices.tolist():
+            fault = float(self.breaker_fault_current[index])
+            location = self.breaker_location[index]
+            results.append({
+                'id': int(self.breaker_ids[index]),
+                'name': self.breaker_names[index],
+                'location': None if location is None else {'kind': location[0], 'id': location[1]},
+                'short_circuit_current': float(self.breaking_capacity[index]),
+                'fault_current': None if fault != fault else fault,
+                'margin': None if fault != fault else float(margin[index]),
+                'status': self.breaker_status[index],
+            })
+        return results
+
+    def summary(self):
+        statuses = self.breaker_status.tolist()
+        fault = self.fault_current[~np.isnan(self.fault_current)]
+        return {
+            'max_fault_current': float(fault.max()) if fault.size else None,
+            'breakers': len(statuses),
+            **{status: statuses.count(status) for status in (OK, INSUFFICIENT, UNRATED, UNKNOWN)},
+        }
+
+
+def source_details(analysis, sources):
+    """نوع المصدر وقاطعه العمومي لكل صف مصدر في التحليل (استعلام واحد)"""
+    details = {
+        source_id: (source_type, main_breaker_id)
+        for source_id, source_type, main_breaker_id
+        in PowerSource.objects.values_list('id', 'source_type', 'main_breaker_id')
+    }
+    rows = [details.get(int(source_id), (None, None)) for source_id in analysis.ids[sources]]
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+_cache = {'analysis': None, 'result': None}
+_cache_lock = threading.Lock()
+
+
+def study_short_circuit():
+    """
+    إرجاع دراسة القصر للمراجعة الحالية للشبكة (تعاد فقط عند إعادة بناء تحليل الكابلات)
+    """
+    analysis = analyze_cables()
+    with _cache_lock:
+        if _cache['analysis'] is analysis and _cache['result'] is not None:
+            return _cache['result']
+    result = ShortCircuitStudy(analysis)
+    with _cache_lock:
+        _cache['analysis'] = analysis
+        _cache['result'] = result
+    return result
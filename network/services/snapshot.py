@@ -0,0 +1,37 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - لقطة الشبكة (Network Snapshot)
+يبني هذا الملف تمثيلاً مسطحاً ومُطبّعاً للشبكة كاملة (مصادر، لوحات، قواطع، أحمال، روابط تغذية)
+بعدد ثابت من الاستعلامات مهما كان حجم الشبكة، ليستخدمه المخطط التفاعلي
+"""
+
+from ..models import PowerSource, Panel, CircuitBreaker, Load
+
+
+def _concrete_field_names(model):
+    """إرجاع أسماء الحقول المخزنة فعلياً في جدول النموذج (بدون العلاقات العكسية و M2M)"""
+    return [field.name for field in model._meta.concrete_fields]
+
+
+def build_network_snapshot():
+    """
+    بناء لقطة كاملة للشبكة باستخدام خمسة استعلامات فقط
+
+    Returns:
+        dict: قوائم مسطحة للمصادر واللوحات والقواطع والأحمال وروابط التغذية بين القواطع
+              حيث تحتوي حقول العلاقات على المعرفات فقط
+    """
+    feeding_through = CircuitBreaker.feeding_breakers.through
+
+    return {
+        'sources': list(PowerSource.objects.order_by('id').values(*_concrete_field_names(PowerSource))),
+        'panels': list(Panel.objects.order_by('id').values(*_concrete_field_names(Panel))),
+        'breakers': list(CircuitBreaker.objects.order_by('position', 'id').values(*_concrete_field_names(CircuitBreaker))),
+        'loads': list(Load.objects.order_by('id').values(*_concrete_field_names(Load))),
+        # كل رابط يمثل علاقة "القاطع feeder يغذي القاطع fed"
+        'feeds': [
+            {'feeder': feeder_id, 'fed': fed_id}
+            for fed_id, feeder_id in feeding_through.objects.order_by('id').values_list(
+                'from_circuitbreaker_id', 'to_circuitbreaker_id'
+            )
+        ],
+    }
@@ -0,0 +1,140 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - رسم التغذية المضغوط لدراسة الطوارئ (Supply graph)
+رسم موجه لكل عناصر التغذية (مصادر، قواطع، مداخل اللوحات وقضبانها، أحمال) مخزن كمصفوفات CSR من NumPy
+الحافة u → v تعني أن العنصر u يغذي v، والعنصر موصول إذا أمكن الوصول إليه من أي مصدر (أي تغذية بديلة تكفي)
+
+لا يعتمد هذا الملف على Django حتى تستطيع عمليات التوازي (ProcessPoolExecutor) تحميله وتشغيل الحسابات
+على نسخة واحدة للقراءة فقط من الرسم (تورث بالنسخ عند الكتابة عند fork أو تنقل مرة واحدة لكل عملية)
+
+فصل عنصر x لا يؤثر إلا على العناصر التي يمكن الوصول إليها منه D: تبدأ إعادة التغذية من عناصر D الموصولة
+بعنصر حي خارج D، ثم تنتشر داخل D فقط، والباقي يفقد التغذية. التكلفة متناسبة مع حجم D وليس مع حجم الشبكة
+"""
+
+from collections import deque
+
+import numpy as np
+
+SOURCE = 0
+BREAKER = 1
+INCOMING = 2
+BUS = 3
+LOAD = 4
+
+
+def csr(count, edges):
+    """تحويل قائمة حواف (u, v) إلى (offsets, targets) مرتبة حسب u"""
+    edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+    order = np.argsort(edges[:, 0], kind='stable')
+    targets = edges[order, 1]
+    offsets = np.zeros(count + 1, dtype=np.int32)
+    np.cumsum(np.bincount(edges[:, 0], minlength=count), out=offsets[1:])
+    return offsets, targets
+
+
+class SupplyGraph:
+    """
+    الرسم المضغوط: نوع كل عقدة وتيار الأحمال وحواف الاتجاهين بصيغة CSR
+    """
+
+    def __init__(self, kinds, ampacity, edges):
+        self.kinds = np.asarray(kinds, dtype=np.int8)
+        self.ampacity = np.asarray(ampacity, dtype=np.float64)
+        count = len(self.kinds)
+        edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        self.out_offsets, self.out_targets = csr(count, edges)
+        self.in_offsets, self.in_targets = csr(count, edges[:, ::-1])
+        self._adjacency = None
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getstate__(self):
+        # قوائم التجاور تبنى في كل عملية، وتنقل مصفوفات CSR فقط
+        return {**self.__dict__, '_adjacency': None}
+
+    def adjacency(self):
+        """قوائم التجاور في الاتجاهين (تبنى مرة واحدة لكل عملية من مصفوفات CSR)"""
+        if self._adjacency is None:
+            def lists(offsets, targets):
+                targets = targets.tolist()
+                offsets = offsets.tolist()
+                return [targets[offsets[node]:offsets[node + 1]] for node in range(len(self.kinds))]
+            self._adjacency = (
+                lists(self.out_offsets, self.out_targets), lists(self.in_offsets, self.in_targets)
+            )
+        return self._adjacency
+
+    def energized(self):
+        """قناع العقد الموصولة بأي مصدر في الحالة الطبيعية"""
+        out_edges, _ = self.adjacency()
+        live = np.zeros(len(self), dtype=bool)
+        queue = deque(np.flatnonzero(self.kinds == SOURCE).tolist())
+        live[list(queue)] = True
+        while queue:
+            for target in out_edges[queue.popleft()]:
+                if not live[target]:
+                    live[target] = True
+                    queue.append(target)
+        return live
+
+    def trip(self, node, live):
+        """
+        العقد التي تفقد التغذية عند فصل عقدة واحدة
+
+        Args:
+            node: العقدة المفصولة (مصدر أو قاطع)
+            live: قناع العقد الموصولة في الحالة الطبيعية (من energized)
+
+        Returns:
+            tuple: (العقد التي تفقد التغذية, العقد المتأثرة التي بقيت موصولة عبر تغذية بديلة)
+        """
+        if not live[node]:
+            return [], []
+        out_edges, in_edges = self.adjacency()
+        affected = {node}
+        queue = deque([node])
+        while queue:
+            for target in out_edges[queue.popleft()]:
+                if target not in affected and live[target]:
+                    affected.add(target)
+                    queue.append(target)
+        affected.discard(node)
+
+        rescued = {
+            target for target in affected
+            if any(live[source] and source != node and source not in affected for source in in_edges[target])
+        }
+        queue = deque(rescued)
+        while queue:
+            for target in out_edges[queue.popleft()]:
+                if target in affected and target not in rescued:
+                    rescued.add(target)
+                    queue.append(target)
+        return sorted(affected - rescued | {node}), sorted(rescued)
+
+
+# ------------------- عمليات التوازي -------------------
+
+_worker = {}
+
+
+def init_worker(graph):
+    """تهيئة عملية: حفظ الرسم المشترك وحالة التغذية الطبيعية مرة واحدة"""
+    _worker['graph'] = graph
+    _worker['live'] = graph.energized()
+
+
+def trip_many(nodes, graph=None, live=None):
+    """
+    فصل مجموعة عقد كل منها على حدة (دفعة عمل لعملية واحدة)
+
+    Returns:
+        list: (العقدة, العقد التي تفقد التغذية, العقد التي بقيت موصولة عبر تغذية بديلة) لكل عقدة
+    """
+    graph = _worker['graph'] if graph is None else graph
+    live = _worker['live'] if live is None else live
+    results = []
+    for node in nodes:
+        lost, rescued = graph.trip(node, live)
+        results.append((node, np.asarray(lost, dtype=np.int32), np.asarray(rescued, dtype=np.int32)))
+    return results
@@ -0,0 +1,197 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - محرك تكلفة الطاقة حسب التعرفة (Tariff cost engine)
+يطبق تعرفة مصدر كل حمل على منحنى تشغيله بدلاً من سعر ثابت للكيلو واط ساعة:
+- تعرفة الحمل: تعرفة مصدره (مصدر لوحته الرئيسية)، ثم تعرفة نوع المصدر، ثم السعر الافتراضي Load.DEFAULT_PRICE_PER_KWH
+- التعرفة الزمنية: سعر لكل ساعة من فترات التعرفة (أو السعر الأساسي خارجها)
+- التعرفة بالشرائح: تسعّر طاقة المصدر الشهرية بالشرائح ويوزع الناتج على أحماله بمتوسط السعر
+
+الحساب يعيد استخدام مجموعات المنحنيات في دراسة الطلب (services/demand.py): تكلفة الواط الواحد لكل (مجموعة، تعرفة)
+ضرب مصفوفتين: منحنيات (مجموعات × ساعات) × أسعار (ساعات × تعرفات)، ثم تكلفة كل حمل = قدرته × قيمة مجموعته وتعرفته
+دون أي حلقة على الأحمال. الشهر DAYS_PER_MONTH يوماً من متوسط اليوم في أفق المنحنيات
+قدرة الحمل كما في Load.calculate_daily_consumption (الجهد × الأمبير عند عدم تحديد power_consumption)،
+فيساوي السعر الافتراضي بدون منحنيات Load.calculate_monthly_cost بالسعر الثابت
+"""
+
+import threading
+
+import numpy as np
+
+from ..models import PowerSource, Load, Tariff, TariffBand, TariffTier
+from .demand import study_demand
+from .energy import power_expression
+
+GROUPS = ('source', 'panel', 'load_type')
+
+
+def hourly_prices(base_price, bands):
+    """
+    سعر كل ساعة من ساعات اليوم (24,) لتعرفة واحدة
+
+    Args:
+        base_price: السعر خارج الفترات
+        bands: قائمة (ساعة البداية, ساعة النهاية, السعر)، الفترات اللاحقة تغطي السابقة
+    """
+    prices = np.full(24, base_price, dtype=np.float64)
+    hours = np.arange(24)
+    for start, end, price in bands:
+        if end > start:
+            prices[(hours >= start) & (hours < end)] = price
+        else:
+            prices[(hours >= start) | (hours < end)] = price
+    return prices
+
+
+def tiered_cost(energy, tiers):
+    """
+    تكلفة طاقة شهرية بالشرائح لمجموعة عدادات دفعة واحدة
+
+    Args:
+        energy: الطاقة الشهرية (n,) بالكيلو واط ساعة
+        tiers: قائمة (الحد الأعلى أو None, السعر)؛ الطاقة بعد آخر حد تسعر بسعر آخر شريحة
+    """
+    tiers = sorted(tiers, key=lambda tier: (tier[0] is None, tier[0] or 0))
+    cost = np.zeros_like(energy, dtype=np.float64)
+    lower = 0.0
+    for index, (up_to, price) in enumerate(tiers):
+        upper = np.inf if up_to is None or index == len(tiers) - 1 else up_to
+        cost += np.clip(energy - lower, 0, upper - lower) * price
+        lower = upper
+    return cost
+
+
+class CostStudy:
+    """
+    الطاقة والتكلفة الشهرية لكل حمل (مصفوفات بترتيب أحمال دراسة الطلب) وإجمالياتها حسب المصدر واللوحة ونوع الحمل
+    """
+
+    def __init__(self, demand):
+        self.demand = demand
+        days = demand.horizon / 24
+
+        # التعرفة 0 هي السعر الافتراضي الثابت
+        tariffs = list(Tariff.objects.order_by('id').values_list('id', 'name', 'power_source_id', 'source_type', 'base_price'))
+        bands = {tariff_id: [] for tariff_id, *_ in tariffs}
+        for tariff_id, start, end, price in TariffBand.objects.values_list('tariff_id', 'start_hour', 'end_hour', 'price'):
+            bands[tariff_id].append((start, end, price))
+        tiers = {tariff_id: [] for tariff_id, *_ in tariffs}
+        for tariff_id, up_to, price in TariffTier.objects.values_list('tariff_id', 'up_to_kwh', 'price'):
+            tiers[tariff_id].append((up_to, price))
+        self.tariff_names = [None] + [name for _, name, *_ in tariffs]
+        self.tariff_tiers = [[]] + [tiers[tariff_id] for tariff_id, *_ in tariffs]
+        prices = np.array(
+            [hourly_prices(Load.DEFAULT_PRICE_PER_KWH, [])]
+            + [hourly_prices(base_price, bands[tariff_id]) for tariff_id, _, _, _, base_price in tariffs]
+        )
+        prices = np.tile(prices, demand.horizon // 24)
+
+        # تعرفة كل مصدر: تعرفته ثم تعرفة نوعه
+        by_source = {source_id: index + 1 for index, (_, _, source_id, _, _) in enumerate(tariffs) if source_id}
+        by_type = {source_type: index + 1 for index, (_, _, _, source_type, _) in enumerate(tariffs) if source_type}
+        source_ids = demand.nodes['source'][0]
+        source_types = dict(PowerSource.objects.values_list('id', 'source_type'))
+        self.source_tariff = np.array([
+            by_source.get(source_id, by_type.get(source_types.get(source_id), 0)) for source_id in source_ids
+        ], dtype=np.int64)
+
+        load_source = demand.load_source
+        has_source = load_source >= 0
+        self.load_tariff = np.zeros(len(load_source), dtype=np.int64)
+        self.load_tariff[has_source] = self.source_tariff[load_source[has_source]]
+
+        # طاقة وتكلفة الواط الواحد لكل مجموعة منحنى (وتعرفة) خلال الشهر
+        scale = Load.DAYS_PER_MONTH / days / 1000
+        group_energy = demand.profiles.sum(axis=1, dtype=np.float64) * scale
+        group_cost = (demand.profiles @ prices.T) * scale
+        power_by_load = dict(Load.objects.annotate(power=power_expression()).values_list('id', 'power'))
+        load_power = np.array([power_by_load.get(load_id) or 0 for load_id in demand.load_ids.tolist()], dtype=np.float64)
+        group = demand.load_group
+        self.monthly_kwh = load_power * group_energy[group] if len(group) else np.zeros(0)
+        self.monthly_cost = load_power * group_cost[group, self.load_tariff] if len(group) else np.zeros(0)
+
+        # التعرفات بالشرائح: تسعير طاقة كل مصدر ثم توزيعها على أحماله بمتوسط السعر
+        self.source_kwh = np.bincount(load_source[has_source], self.monthly_kwh[has_source], minlength=len(source_ids))
+        for tariff, tariff_tiers in enumerate(self.tariff_tiers):
+            if not tariff_tiers:
+                continue
+            sources = np.flatnonzero(self.source_tariff == tariff)
+            energy = self.source_kwh[sources]
+            average = np.zeros(len(source_ids))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                average[sources] = np.where(energy > 0, tiered_cost(energy, tariff_tiers) / energy, 0)
+            loads = np.flatnonzero(has_source & (self.load_tariff == tariff))
+            self.monthly_cost[loads] = self.monthly_kwh[loads] * average[load_source[loads]]
+        self.source_cost = np.bincount(load_source[has_source], self.monthly_cost[has_source], minlength=len(source_ids))
+        self._positions = None
+
+    def load_cost(self, load_id):
+        """التكلفة الشهرية لحمل واحد أو None إذا لم يكن ضمن الدراسة"""
+        if self._positions is None:
+            self._positions = {load_id: index for index, load_id in enumerate(self.demand.load_ids.tolist())}
+        position = self._positions.get(load_id)
+        return None if position is None else float(self.monthly_cost[position])
+
+    @staticmethod
+    def _row(energy, cost, **identity):
+        energy, cost = float(energy), float(cost)
+        return {
+            **identity,
+            'monthly_kwh': energy,
+            'monthly_cost': cost,
+            'average_price': cost / energy if energy > 0 else None,
+        }
+
+    def rows(self, groups=None):
+        """إجماليات الموقع والتجميعات المطلوبة من GROUPS (جميعها افتراضياً)"""
+        groups = groups or GROUPS
+        demand = self.demand
+        report = {'summary': self._row(self.monthly_kwh.sum(), self.monthly_cost.sum(), load_count=len(self.monthly_kwh))}
+
+        if 'source' in groups:
+            source_ids, names, _ = demand.nodes['source']
+            report['by_source'] = [
+                self._row(
+                    self.source_kwh[index], self.source_cost[index], id=source_id, name=names[index],
+                    tariff=self.tariff_names[self.source_tariff[index]]
+                ) for index, source_id in enumerate(source_ids)
+            ]
+
+        if 'panel' in groups:
+            panel_ids, names, _ = demand.nodes['panel']
+            on_panel = demand.load_panel >= 0
+            totals = demand.subtree_sum(
+                np.zeros((len(panel_ids), 2)), demand.load_panel[on_panel],
+                np.column_stack([self.monthly_kwh[on_panel], self.monthly_cost[on_panel]])
+            )
+            report['by_panel'] = [
+                self._row(totals[index, 0], totals[index, 1], id=panel_id, name=names[index])
+                for index, panel_id in enumerate(panel_ids)
+            ]
+
+        if 'load_type' in groups:
+            types = sorted(set(demand.load_types))
+            type_index = np.array([types.index(load_type) for load_type in demand.load_types], dtype=np.int64)
+            energy = np.bincount(type_index, self.monthly_kwh, minlength=len(types))
+            cost = np.bincount(type_index, self.monthly_cost, minlength=len(types))
+            report['by_load_type'] = sorted((
+                self._row(energy[index], cost[index], load_type=load_type) for index, load_type in enumerate(types)
+            ), key=lambda row: -row['monthly_cost'])
+        return report
+
+
+_cache = {'demand': None, 'result': None}
+_cache_lock = threading.Lock()
+
+
+def study_costs():
+    """
+    إرجاع دراسة التكلفة للمراجعة الحالية للشبكة (تعاد فقط عند إعادة دراسة الطلب، والتعرفات جزء من المراجعة)
+    """
+    demand = study_demand()
+    with _cache_lock:
+        if _cache['demand'] is demand and _cache['result'] is not None:
+            return _cache['result']
+    result = CostStudy(demand)
+    with _cache_lock:
+        _cache['demand'] = demand
+        _cache['result'] = result
+    return result
@@ -0,0 +1,134 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - الشجرة المحسوبة مسبقاً لكل طلب (Network Tree)
+يحمّل هذا الملف هيكل اللوحات وعلاقات تغذية القواطع مرة واحدة لكل طلب
+حتى تجيب المُسلسلات عن المسارات الكاملة دون استعلام لكل صف
+"""
+
+from ..models import Panel, PowerSource
+from .cable_analysis import analyze_cables
+from .feed_graph import get_feed_graph
+from .tariffs import study_costs
+
+
+class NetworkTree:
+    """
+    تمثيل في الذاكرة لهيكل الشبكة يبنى بشكل كسول عند أول استخدام
+    يوضع في سياق المُسلسل (context) عند تسلسل القوائم فقط
+    """
+
+    def __init__(self):
+        self._panels = None
+        self._children = None
+        self._feed_graph = None
+        self._cable_analysis = None
+        self._supplied = None
+        self._cost_study = None
+
+    # ------------------- اللوحات -------------------
+
+    def _load_panels(self):
+        """تحميل جميع اللوحات بحقولها الأساسية في استعلام واحد"""
+        if self._panels is not None:
+            return
+        self._panels = {}
+        self._children = {}
+        rows = Panel.objects.values_list('id', 'name', 'panel_type', 'parent_panel_id', 'power_source__name')
+        for panel_id, name, panel_type, parent_id, source_name in rows:
+            self._panels[panel_id] = (name, panel_type, parent_id, source_name)
+            self._children.setdefault(parent_id, []).append(panel_id)
+
+    def panel_full_path(self, panel_id):
+        """المسار الكامل للوحة بنفس تنسيق Panel.get_full_path"""
+        self._load_panels()
+        path = []
+        current = panel_id
+        root = None
+        visited = set()
+        while current is not None and current in self._panels and current not in visited:
+            visited.add(current)
+            name, _, parent_id, _ = self._panels[current]
+            path.insert(0, name)
+            root = current
+            current = parent_id
+        if root is not None and self._panels[root][3]:
+            path.insert(0, self._panels[root][3])
+        return " → ".join(path)
+
+    def panel_has_children(self, panel_id):
+        """هل للوحة لوحات فرعية مباشرة"""
+        self._load_panels()
+        return bool(self._children.get(panel_id))
+
+    def load_total_path(self, load):
+        """المسار الكامل للحمل بنفس منطق Load.get_total_path"""
+        self._load_panels()
+        path = [load.name]
+        current = load.panel_id
+        while current is not None and current in self._panels:
+            name, panel_type, parent_id, source_name = self._panels[current]
+            path.insert(0, name)
+            if panel_type == 'sub' and parent_id:
+                current = parent_id
+            elif panel_type == 'main' and source_name:
+                path.insert(0, source_name)
+                break
+            else:
+                break
+        return ' → '.join(path)
+
+    # ------------------- القواطع -------------------
+
+    def breaker_full_path(self, breaker_id):
+        """المسار الكامل للقاطع من رسم التغذية المحفوظ لمراجعة الشبكة الحالية"""
+        if self._feed_graph is None:
+            self._feed_graph = get_feed_graph()
+        return self._feed_graph.full_path(breaker_id)
+
+    def _load_supplied_demand(self):
+        """
+        تحميل الطلب المُخفَّض لكل لوحة ولكل مصدر، والقواطع التي تحمل طلب لوحة أو مصدر كاملاً، في استعلامين
+        """
+        if self._supplied is not None:
+            return
+        self._supplied = {'main': {}, 'feeder': {}}
+        source_demand = {}
+        rows = Panel.objects.values_list(
+            'parent_panel_id', 'power_source_id', 'main_breaker_id', 'feeder_breaker_id',
+            'tree_depth', 'rollup_demand_ampacity'
+        )
+        for parent_id, source_id, main_breaker_id, feeder_breaker_id, tree_depth, demand in rows:
+            demand *= Panel.diversity_factor(tree_depth)
+            if main_breaker_id:
+                self._supplied['main'][main_breaker_id] = demand
+            if feeder_breaker_id:
+                self._supplied['feeder'][feeder_breaker_id] = demand
+            if parent_id is None and source_id:
+                source_demand[source_id] = source_demand.get(source_id, 0) + demand
+        for source_id, main_breaker_id in PowerSource.objects.filter(main_breaker__isnull=False).values_list(
+            'id', 'main_breaker_id'
+        ):
+            self._supplied['main'][main_breaker_id] = source_demand.get(source_id, 0)
+
+    def breaker_diversified_demand(self, breaker):
+        """الطلب المُخفَّض على القاطع (نفس قيمة CircuitBreaker.get_diversified_demand)"""
+        self._load_supplied_demand()
+        if breaker.id in self._supplied['main']:
+            return self._supplied['main'][breaker.id]
+        return breaker.rollup_demand_ampacity + self._supplied['feeder'].get(breaker.id, 0)
+
+    # ------------------- الكابلات -------------------
+
+    def cumulative_voltage_drop(self, kind, object_id):
+        """هبوط الجهد التراكمي من المصدر (نفس قيمة get_cumulative_voltage_drop في النماذج)"""
+        if self._cable_analysis is None:
+            self._cable_analysis = analyze_cables()
+        return self._cable_analysis.cumulative_for(kind, object_id)
+
+    # ------------------- التكلفة -------------------
+
+    def load_monthly_cost(self, load):
+        """التكلفة الشهرية للحمل حسب التعرفة (أو Load.calculate_monthly_cost بالسعر الثابت لحمل خارج الدراسة)"""
+        if self._cost_study is None:
+            self._cost_study = study_costs()
+        cost = self._cost_study.load_cost(load.id)
+        return load.calculate_monthly_cost() if cost is None else cost
@@ -0,0 +1,384 @@
+"""
+نظام إدارة شبكة الطاقة الكهربائية - الإشارات (Signals)
+يربط هذا الملف تغييرات النماذج بتحديث الإجماليات المخزنة في اللوحات والقواطع وبزيادة رقم مراجعة الشبكة
+وبإبطال القيم المتأثرة فقط في ذاكرة نموذج القراءة
+يتم تسجيله في NetworkConfig.ready
+"""
+
+from django.db import models
+from django.db.models import Q, QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .models import PowerSource, Panel, CircuitBreaker, Load, LoadProfile, Tariff, TariffBand, TariffTier, NetworkRevision
+from .services import read_cache, rollups
+
+LOAD_ROLLUP_VALUES = ('panel_id', 'breaker_id', 'ampacity', 'power_consumption', 'phase', 'load_type')
+
+
+def _origin_model(origin):
+    """نوع الكائن الذي بدأ عملية الحذف (كائن واحد أو QuerySet)"""
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+# ------------------- الأحمال -------------------
+
+@receiver(pre_save, sender=Load)
+def remember_previous_load(sender, instance, raw=False, **kwargs):
+    """حفظ قيم الحمل المخزنة قبل التعديل لحساب الفرق بعد الحفظ"""
+    instance._rollup_previous = None
+    if raw or instance.pk is None:
+        return
+    instance._rollup_previous = Load.objects.filter(pk=instance.pk).values_list(*LOAD_ROLLUP_VALUES).first()
+
+
+@receiver(post_save, sender=Load)
+def update_rollups_on_load_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    current = tuple(getattr(instance, field) for field in LOAD_ROLLUP_VALUES)
+    if previous and update_fields is not None:
+        # الحقول غير المحفوظة تبقى بقيمها المخزنة
+        saved = {Load._meta.get_field(name).attname for name in update_fields}
+        current = tuple(
+            value if field in saved else old_value
+            for field, value, old_value in zip(LOAD_ROLLUP_VALUES, current, previous)
+        )
+    rollups.apply_load_change(previous, current)
+
+
+@receiver(pre_delete, sender=Load)
+def remember_deleted_load_chain(sender, instance, origin=None, **kwargs):
+    """
+    تحديد سلسلة اللوحات التي يجب إنقاص الحمل منها قبل حذف الحمل (ولوحته ربما)
+    عند حذف لوحة واحدة أو مصدر طاقة تُنقص إجماليات الشجرة كاملة دفعة واحدة في معالج حذف اللوحة
+    """
+    if isinstance(origin, Panel) or _origin_model(origin) is PowerSource:
+        instance._rollup_panel_ids = []
+    else:
+        instance._rollup_panel_ids = rollups.panel_chain_ids(instance.panel_id)
+
+
+@receiver(post_delete, sender=Load)
+def update_rollups_on_load_delete(sender, instance, **kwargs):
+    ampacity, power = instance.ampacity, instance.power_consumption
+    demand = rollups.demand_ampacity(instance.load_type, ampacity)
+    phases = tuple(-current for current in rollups.phase_currents(instance.phase, ampacity))
+    rollups.adjust_panel_chain(getattr(instance, '_rollup_panel_ids', []), -ampacity, -1, -power, -demand, phases)
+    rollups.adjust_breaker(instance.breaker_id, -ampacity, -1, -power, -demand)
+
+
+# ------------------- اللوحات -------------------
+
+@receiver(pre_delete, sender=Panel)
+def subtract_deleted_panel_subtree(sender, instance, origin=None, **kwargs):
+    """إنقاص إجماليات الشجرة الفرعية المحذوفة من اللوحات الأم الباقية"""
+    if origin is not instance:
+        return
+    row = Panel.objects.filter(pk=instance.pk).values_list(
+        'tree_path', *rollups.ROLLUP_FIELDS, *rollups.PHASE_ROLLUP_FIELDS
+    ).first()
+    if not row:
+        return
+    tree_path, ampacity, count, power, demand, *phases = row
+    rollups.adjust_panel_chain(
+        Panel.parse_tree_path(tree_path)[:-1], -ampacity, -count, -power, -demand,
+        tuple(-current for current in phases)
+    )
+
+
+# ------------------- القواطع -------------------
+
+@receiver(pre_save, sender=CircuitBreaker)
+def remember_previous_rated_current(sender, instance, raw=False, **kwargs):
+    """حفظ التيار المقنن (للإجماليات) واللوحة (لإبطال ذاكرة القراءة) المخزنين قبل التعديل"""
+    instance._rollup_previous_rated = None
+    instance._previous_panel_id = None
+    if raw or instance.pk is None:
+        return
+    previous = CircuitBreaker.objects.filter(pk=instance.pk).values_list('rated_current', 'panel_id').first()
+    if previous:
+        instance._rollup_previous_rated, instance._previous_panel_id = previous
+
+
+@receiver(post_save, sender=CircuitBreaker)
+def update_feeders_on_rated_current_change(sender, instance, raw=False, **kwargs):
+    """القواطع المغذية تحمل التيار المقنن للقاطع، لذلك يُطبق فرقه عليها عند تغييره"""
+    previous = getattr(instance, '_rollup_previous_rated', None)
+    if raw or previous is None:
+        return
+    rollups.adjust_feeders_of(instance.pk, instance.rated_current - previous)
+
+
+@receiver(pre_delete, sender=CircuitBreaker)
+def subtract_deleted_breaker_from_feeders(sender, instance, **kwargs):
+    """حذف القاطع يحذف علاقات تغذيته دون إشارة m2m_changed، لذلك تُحدث القواطع المغذية هنا"""
+    rated_current = CircuitBreaker.objects.filter(pk=instance.pk).values_list('rated_current', flat=True).first()
+    if rated_current:
+        rollups.adjust_feeders_of(instance.pk, -rated_current)
+
+
+@receiver(m2m_changed, sender=CircuitBreaker.feeding_breakers.through)
+def update_rollups_on_feeding_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    تحديث الحمل على القواطع المغذية عند تغيير علاقات التغذية
+    reverse=False: instance هو القاطع المغذى و pk_set القواطع المغذية (feeding_breakers)
+    reverse=True: instance هو القاطع المغذي و pk_set القواطع المغذاة (fed_breakers)
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        # نحفظ العلاقات الموجودة فعلاً قبل إزالتها
+        if reverse:
+            links = sender.objects.filter(to_circuitbreaker_id=instance.pk)
+            if action == 'pre_remove':
+                links = links.filter(from_circuitbreaker_id__in=pk_set)
+        else:
+            links = sender.objects.filter(from_circuitbreaker_id=instance.pk)
+            if action == 'pre_remove':
+                links = links.filter(to_circuitbreaker_id__in=pk_set)
+        instance._rollup_removed_links = list(links.values_list('to_circuitbreaker_id', 'from_circuitbreaker_id'))
+    elif action in ('post_remove', 'post_clear'):
+        rollups.adjust_feeding_pairs(getattr(instance, '_rollup_removed_links', []), sign=-1)
+        instance._rollup_removed_links = []
+    elif action == 'post_add' and pk_set:
+        if reverse:
+            pairs = [(instance.pk, fed_id) for fed_id in pk_set]
+        else:
+            pairs = [(feeder_id, instance.pk) for feeder_id in pk_set]
+        rollups.adjust_feeding_pairs(pairs)
+
+
+# ------------------- مراجعة الشبكة -------------------
+
+NETWORK_MODELS = (PowerSource, Panel, CircuitBreaker, Load, LoadProfile, Tariff, TariffBand, TariffTier)
+
+
+def bump_revision_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        NetworkRevision.bump()
+
+
+def bump_revision_on_delete(sender, instance, origin=None, **kwargs):
+    # الكائنات المحذوفة تتابعياً مع كائن واحد تكتفي بزيادة المراجعة عند حذف ذلك الكائن
+    if isinstance(origin, models.Model) and origin is not instance:
+        return
+    NetworkRevision.bump()
+
+
+for network_model in NETWORK_MODELS:
+    post_save.connect(bump_revision_on_save, sender=network_model, dispatch_uid=f'revision_save_{network_model.__name__}')
+    post_delete.connect(bump_revision_on_delete, sender=network_model, dispatch_uid=f'revision_delete_{network_model.__name__}')
+
+
+@receiver(m2m_changed, sender=CircuitBreaker.feeding_breakers.through)
+def bump_revision_on_feeding_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        NetworkRevision.bump()
+
+
+# ------------------- ذاكرة نموذج القراءة -------------------
+# تسجل بعد زيادة رقم المراجعة وبعد تحديث الإجماليات حتى يعاد حساب القيم من البيانات المحدثة
+
+@receiver(post_save, sender=Load)
+def invalidate_read_cache_on_load_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    read_cache.invalidate_load(
+        getattr(instance, '_rollup_previous', None),
+        (instance.panel_id, instance.breaker_id)
+    )
+
+
+@receiver(post_delete, sender=Load)
+def invalidate_read_cache_on_load_delete(sender, instance, **kwargs):
+    panel_ids = getattr(instance, '_rollup_panel_ids', [])
+    read_cache.invalidate(read_cache.PANEL, panel_ids)
+    read_cache.invalidate_breakers([instance.breaker_id])
+    read_cache.invalidate_supplying_breakers(panel_ids)
+
+
+@receiver(pre_save, sender=Panel)
+def remember_read_cache_panels(sender, instance, raw=False, **kwargs):
+    """تحديد اللوحات المتأثرة قبل الحفظ لأن المسار المخزن (القديم) يحدد الشجرة الفرعية وسلسلة اللوحات الأم القديمة"""
+    instance._read_cache_panels = None
+    if raw or instance.pk is None:
+        return
+    instance._read_cache_panels = read_cache.panel_change_ids(instance.pk, instance.parent_panel_id)
+
+
+@receiver(post_save, sender=Panel)
+def invalidate_read_cache_on_panel_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    panel_ids = getattr(instance, '_read_cache_panels', None)
+    if panel_ids is None:
+        panel_ids = read_cache.panel_change_ids(instance.pk, instance.parent_panel_id)
+    read_cache.invalidate_panel(instance.pk, panel_ids)
+
+
+@receiver(pre_delete, sender=Panel)
+def invalidate_read_cache_on_panel_delete(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        read_cache.invalidate_panel(instance.pk, read_cache.panel_change_ids(instance.pk, None))
+
+
+@receiver(post_save, sender=CircuitBreaker)
+def invalidate_read_cache_on_breaker_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    read_cache.invalidate_breaker(
+        instance.pk, {instance.panel_id, getattr(instance, '_previous_panel_id', None)}
+    )
+
+
+@receiver(pre_delete, sender=CircuitBreaker)
+def invalidate_read_cache_on_breaker_delete(sender, instance, **kwargs):
+    # قبل الحذف لأن علاقات التغذية تحذف معه
+    read_cache.invalidate_breaker(instance.pk, {instance.panel_id})
+
+
+@receiver(m2m_changed, sender=CircuitBreaker.feeding_breakers.through)
+def invalidate_read_cache_on_feeding_change(sender, instance, action, pk_set, **kwargs):
+    """
+    يحدد الإغلاق قبل الإزالة (حين تكون العلاقات ما زالت موجودة) وبعد الإضافة
+    pre_clear لا يحمل pk_set لذلك يشمل الإغلاق جميع القواطع المرتبطة بالقاطع في الاتجاهين
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        instance._read_cache_breakers = read_cache.feed_closure_ids({instance.pk, *(pk_set or ())})
+        if action == 'pre_clear':
+            through = CircuitBreaker.feeding_breakers.through
+            linked = through.objects.filter(
+                Q(from_circuitbreaker_id=instance.pk) | Q(to_circuitbreaker_id=instance.pk)
+            ).values_list('from_circuitbreaker_id', 'to_circuitbreaker_id')
+            instance._read_cache_breakers |= read_cache.feed_closure_ids({i for link in linked for i in link})
+    elif action in ('post_remove', 'post_clear'):
+        read_cache.invalidate_breakers(getattr(instance, '_read_cache_breakers', ()))
+        instance._read_cache_breakers = set()
+    elif action == 'post_add' and pk_set:
+        read_cache.invalidate_breakers(read_cache.feed_closure_ids({instance.pk, *pk_set}))
+
+
+@receiver(post_save, sender=PowerSource)
+def invalidate_read_cache_on_power_source_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        read_cache.invalidate_power_source(instance.pk)
+
+
+@receiver(pre_delete, sender=PowerSource)
+def invalidate_read_cache_on_power_source_delete(sender, instance, **kwargs):
+    read_cache.invalidate_power_source(instance.pk)
+
+
+# ------------------- فهرس التأثير -------------------
+# تغيير الحمل يبطل قيم العناصر التي تقع فوقه في مسار التغذية (read_cache.supply_chain_ids)، وتغيير تغذية لوحة
+# أو قاطع أو مصدر يبطل كل ما فوق العناصر التي تحته قبل التغيير وبعده (read_cache.supply_change_ids)
+
+def _removed_by_cascade(origin):
+    """الحذف التتابعي مع لوحة أو مصدر: يبطل معالج اللوحة أو المصدر العناصر التي فوقه"""
+    return isinstance(origin, Panel) or _origin_model(origin) is PowerSource
+
+
+@receiver(post_save, sender=Load)
+def invalidate_impact_on_load_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None) or (None, None)
+    read_cache.invalidate_supply_chain(
+        {previous[0], instance.panel_id}, {previous[1], instance.breaker_id}
+    )
+
+
+@receiver(post_delete, sender=Load)
+def invalidate_impact_on_load_delete(sender, instance, origin=None, **kwargs):
+    if not _removed_by_cascade(origin):
+        read_cache.invalidate_supply_chain([instance.panel_id], [instance.breaker_id])
+
+
+@receiver(pre_save, sender=Panel)
+def remember_impact_chain(sender, instance, raw=False, **kwargs):
+    """العناصر المعتمدة على تغذية اللوحة قبل الحفظ (سلسلة اللوحات الأم والقاطع المغذي القديمان وما تحتها)"""
+    instance._impact_chain = None
+    if not raw and instance.pk is not None:
+        instance._impact_chain = read_cache.supply_change_ids([instance.pk])
+
+
+@receiver(post_save, sender=Panel)
+def invalidate_impact_on_panel_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    panel_ids, breaker_ids = read_cache.supply_change_ids([instance.pk])
+    previous_panels, previous_breakers = getattr(instance, '_impact_chain', None) or (set(), set())
+    read_cache.invalidate_impact(panel_ids | previous_panels, breaker_ids | previous_breakers)
+
+
+@receiver(pre_delete, sender=Panel)
+def invalidate_impact_on_panel_delete(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        read_cache.invalidate_supply_change([instance.pk])
+    else:
+        read_cache.invalidate_impact([instance.pk])
+
+
+@receiver(post_save, sender=CircuitBreaker)
+def invalidate_impact_on_breaker_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        read_cache.invalidate_supply_change(
+            {instance.panel_id, getattr(instance, '_previous_panel_id', None)}, [instance.pk]
+        )
+
+
+@receiver(pre_delete, sender=CircuitBreaker)
+def invalidate_impact_on_breaker_delete(sender, instance, origin=None, **kwargs):
+    """
+    حذف القاطع يحذف علاقات تغذيته دون إشارة m2m_changed: ما تحته (ومنه القواطع التي كان يغذيها)
+    يفقد تغذيته، فتبطل قيم كل ما فوقه ومنها المغذيات الأخرى لتلك القواطع
+    """
+    if not _removed_by_cascade(origin):
+        read_cache.invalidate_supply_change([instance.panel_id], [instance.pk])
+
+
+@receiver(m2m_changed, sender=CircuitBreaker.feeding_breakers.through)
+def invalidate_impact_on_feeding_change(sender, instance, action, pk_set, **kwargs):
+    """
+    القواطع على طرفي العلاقة وما تحتها وما فوق ذلك: قبل الإزالة (حين تكون العلاقات ما زالت موجودة) وبعد الإضافة
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        breaker_ids = {instance.pk, *(pk_set or ())}
+        if action == 'pre_clear':
+            through = CircuitBreaker.feeding_breakers.through
+            linked = through.objects.filter(
+                Q(from_circuitbreaker_id=instance.pk) | Q(to_circuitbreaker_id=instance.pk)
+            ).values_list('from_circuitbreaker_id', 'to_circuitbreaker_id')
+            breaker_ids.update(i for link in linked for i in link)
+        instance._impact_chain = read_cache.supply_change_ids(breaker_ids=breaker_ids)
+    elif action in ('post_remove', 'post_clear'):
+        read_cache.invalidate_impact(*(getattr(instance, '_impact_chain', None) or ((), ())))
+        instance._impact_chain = None
+    elif action == 'post_add' and pk_set:
+        read_cache.invalidate_supply_change(breaker_ids={instance.pk, *pk_set})
+
+
+@receiver(pre_save, sender=PowerSource)
+def remember_previous_source_main_breaker(sender, instance, raw=False, **kwargs):
+    instance._previous_main_breaker_id = None
+    if not raw and instance.pk is not None:
+        instance._previous_main_breaker_id = PowerSource.objects.filter(pk=instance.pk).values_list(
+            'main_breaker_id', flat=True
+        ).first()
+
+
+def _root_panel_ids(power_source_id):
+    return Panel.objects.filter(power_source_id=power_source_id, parent_panel__isnull=True).values_list('id', flat=True)
+
+
+@receiver(post_save, sender=PowerSource)
+def invalidate_impact_on_power_source_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        read_cache.invalidate_supply_change(_root_panel_ids(instance.pk), {
+            instance.main_breaker_id, getattr(instance, '_previous_main_breaker_id', None)
+        })
+
+
+@receiver(pre_delete, sender=PowerSource)
+def invalidate_impact_on_power_source_delete(sender, instance, **kwargs):
+    read_cache.invalidate_supply_change(_root_panel_ids(instance.pk), [instance.main_breaker_id])
@@ -1,3 +1,1702 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
 
-# Create your tests here.
+import numpy as np
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import CableConstants, PowerSource, Panel, CircuitBreaker, Load, LoadProfile, Tariff, TariffTier, NetworkRevision
+from .cache_backends import LRUFileBasedCache
+from .services import read_cache
+from .services.backup import BackupPlan
+from .services.bulk import save_breakers
+from .services.cable_analysis import CableAnalysis, analyze_cables
+from .services.contingency import ContingencyStudy, SupplyNetwork
+from .services.impact import get_impact, impact_entry
+from .services.feed_graph import get_feed_graph
+from .services.rollups import rebuild_rollups
+from .services.short_circuit import study_short_circuit
+from .services.snapshot import build_network_snapshot
+from .services.tariffs import study_costs
+from .services.trip_curves import INSTANTANEOUS_TIME, curve_parameters, trip_times
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    settings.NETWORK_READ_CACHE: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'network-read-model-tests',
+        'TIMEOUT': None,
+    },
+})
+class NetworkTestCase(TestCase):
+    """
+    أساس الاختبارات: ذاكرة نموذج القراءة في ذاكرة العملية (وليس المجلد المشترك لخادم التطوير)
+    وتفرغ قبل كل اختبار لأن قاعدة الاختبار تعيد استخدام المعرفات بعد التراجع
+    """
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        read_cache.clear()
+
+
+def build_network(size):
+    """
+    بناء شبكة اختبار يتناسب حجمها مع size
+    كل مصدر يغذي لوحات رئيسية، لكل منها لوحات فرعية بقواطع وأحمال
+    """
+    source = PowerSource.objects.create(name=f'Grid-{size}', voltage='380', total_ampacity=400)
+    for i in range(size):
+        panel = Panel.objects.create(
+            name=f'MDB-{size}-{i}', panel_type='main', power_source=source, ampacity=250, voltage='380'
+        )
+        main_breaker = CircuitBreaker.objects.create(name=f'MB-{size}-{i}', panel=panel, rated_current=250)
+        panel.main_breaker = main_breaker
+        panel.save()
+        for j in range(size):
+            feeder = CircuitBreaker.objects.create(name=f'F-{size}-{i}-{j}', panel=panel, rated_current=63, position=j)
+            feeder.feeding_breakers.add(main_breaker)
+            sub_panel = Panel.objects.create(
+                name=f'SDB-{size}-{i}-{j}', panel_type='sub', parent_panel=panel,
+                feeder_breaker=feeder, ampacity=63, voltage='220'
+            )
+            for k in range(size):
+                breaker = CircuitBreaker.objects.create(
+                    name=f'B-{size}-{i}-{j}-{k}', panel=sub_panel, rated_current=16, position=k
+                )
+                breaker.feeding_breakers.add(feeder)
+                Load.objects.create(
+                    name=f'L-{size}-{i}-{j}-{k}', panel=sub_panel, breaker=breaker, ampacity=10, voltage='220'
+                )
+    return source
+
+
+class NetworkSnapshotTests(NetworkTestCase):
+    """
+    التحقق من لقطة الشبكة: جداول مسطحة بمعرفات العلاقات وروابط التغذية، بعدد ثابت من الاستعلامات
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(2)
+
+    def test_normalized_shape(self):
+        with self.assertNumQueries(5):
+            snapshot = build_network_snapshot()
+        self.assertEqual(set(snapshot), {'sources', 'panels', 'breakers', 'loads', 'feeds'})
+        self.assertEqual(
+            [len(snapshot[table]) for table in ('sources', 'panels', 'breakers', 'loads')],
+            [PowerSource.objects.count(), Panel.objects.count(), CircuitBreaker.objects.count(), Load.objects.count()]
+        )
+        # حقول العلاقات معرفات فقط
+        sub_panel = Panel.objects.get(name='SDB-2-0-0')
+        row = next(row for row in snapshot['panels'] if row['id'] == sub_panel.id)
+        self.assertEqual((row['parent_panel'], row['feeder_breaker']), (sub_panel.parent_panel_id, sub_panel.feeder_breaker_id))
+        load = next(row for row in snapshot['loads'] if row['name'] == 'L-2-0-0-0')
+        self.assertIsInstance(load['breaker'], int)
+
+        expected = {
+            (feeder.id, breaker.id)
+            for breaker in CircuitBreaker.objects.prefetch_related('feeding_breakers')
+            for feeder in breaker.feeding_breakers.all()
+        }
+        feeds = {(link['feeder'], link['fed']) for link in snapshot['feeds']}
+        self.assertEqual(len(snapshot['feeds']), len(feeds))
+        self.assertEqual(feeds, expected)
+
+    def test_query_count_does_not_grow_with_network(self):
+        def count():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get('/api/network/snapshot/')
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+        small = count()
+        build_network(4)
+        self.assertEqual(count(), small)
+
+
+class ListQueryBudgetTests(NetworkTestCase):
+    """
+    التحقق من أن عدد الاستعلامات في مسارات القوائم ثابت ولا يزيد مع زيادة عدد الصفوف
+    """
+    # الحد الأقصى لعدد الاستعلامات المسموح به لكل نقطة نهاية
+    QUERY_BUDGETS = {
+        '/api/powersources/': 8,
+        '/api/panels/': 16,
+        '/api/circuitbreakers/': 8,
+        # الأحمال: استعلام إضافي للتحقق من مراجعة دراسة التكلفة (التكلفة الشهرية حسب التعرفة)
+        '/api/loads/': 5,
+        '/api/circuitbreakers/by_role/?role=distribution': 8,
+        '/api/loads/by_type/?load_type=other': 5,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def count_queries(self, url):
+        # رسم التغذية وتحليل الكابلات ودراسة التكلفة تبنى مرة واحدة لكل مراجعة للشبكة، لذلك لا يحسب بناؤها ضمن تكلفة الطلب
+        get_feed_graph()
+        analyze_cables()
+        study_costs()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context.captured_queries)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        build_network(1)
+        small = {url: self.count_queries(url) for url in self.QUERY_BUDGETS}
+
+        build_network(3)
+        for url, budget in self.QUERY_BUDGETS.items():
+            with self.subTest(url=url):
+                large = self.count_queries(url)
+                self.assertEqual(large, small[url])
+                self.assertLessEqual(large, budget)
+
+    def nested_list_urls(self, source):
+        panel = source.panels.first()
+        return [
+            f'/api/powersources/{source.id}/panels/',
+            f'/api/panels/{panel.id}/breakers/',
+            f'/api/panels/{panel.id}/child_panels/',
+            f'/api/circuitbreakers/by_panel/?panel_id={panel.id}',
+            f'/api/loads/by_panel/?panel_id={panel.child_panels.first().id}',
+        ]
+
+    def test_nested_list_actions_do_not_grow_with_rows(self):
+        small_urls = self.nested_list_urls(build_network(2))
+        large_urls = self.nested_list_urls(build_network(4))
+        for small_url, large_url in zip(small_urls, large_urls):
+            with self.subTest(url=large_url):
+                self.assertEqual(self.count_queries(large_url), self.count_queries(small_url))
+
+    def test_list_matches_model_methods(self):
+        build_network(2)
+        response = self.client.get('/api/panels/')
+        for row in response.json():
+            panel = Panel.objects.get(id=row['id'])
+            total_ampacity, total_count = panel.get_total_loads()
+            self.assertEqual(row['full_path'], panel.get_full_path())
+            self.assertEqual(row['total_loads_info']['total_ampacity'], total_ampacity)
+            self.assertEqual(row['total_loads_info']['total_count'], total_count)
+
+        response = self.client.get('/api/circuitbreakers/')
+        for row in response.json()['results']:
+            breaker = CircuitBreaker.objects.get(id=row['id'])
+            self.assertEqual(row['full_path'], breaker.get_full_path())
+            self.assertEqual(row['total_load'], breaker.get_total_load())
+
+
+class SparseFieldsetTests(NetworkTestCase):
+    """
+    التحقق من معاملي الاستعلام fields و expand
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(2)
+
+    def test_fields_limits_keys_and_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/loads/?fields=id,name,ampacity')
+        # استعلام لرقم مراجعة الشبكة (ETag) واستعلام للأحمال
+        self.assertEqual(len(context.captured_queries), 2)
+        for row in response.json()['results']:
+            self.assertEqual(set(row), {'id', 'name', 'ampacity'})
+
+    def test_expand_drops_other_expandable_fields(self):
+        response = self.client.get('/api/loads/?expand=panel_details')
+        row = response.json()['results'][0]
+        self.assertIn('panel_details', row)
+        self.assertIn('ampacity', row)
+        self.assertNotIn('total_path', row)
+        self.assertNotIn('breaker_details', row)
+
+    def test_default_response_is_unchanged(self):
+        row = self.client.get('/api/circuitbreakers/').json()['results'][0]
+        for field in ('full_path', 'total_load', 'loads_info', 'feeding_breakers_info'):
+            self.assertIn(field, row)
+
+
+class KeysetPaginationTests(NetworkTestCase):
+    """
+    التحقق من ترقيم الصفحات بالمؤشر للأحمال والقواطع
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(3)
+
+    def collect_pages(self, url):
+        """تتبع روابط next حتى النهاية وإرجاع معرفات جميع الصفوف بالترتيب"""
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            data = response.json()
+            ids.extend(row['id'] for row in data['results'])
+            url = data['next']
+            pages += 1
+        return ids, pages
+
+    def test_pages_cover_all_rows_in_stable_order(self):
+        expected = list(CircuitBreaker.objects.order_by('position', 'id').values_list('id', flat=True))
+        ids, pages = self.collect_pages('/api/circuitbreakers/?page_size=4&fields=id')
+        self.assertEqual(ids, expected)
+        self.assertGreater(pages, 1)
+
+        expected = list(Load.objects.order_by('id').values_list('id', flat=True))
+        ids, _ = self.collect_pages('/api/loads/by_type/?load_type=other&page_size=5&fields=id')
+        self.assertEqual(ids, expected)
+
+    def test_previous_link_returns_previous_page(self):
+        first = self.client.get('/api/loads/?page_size=5&fields=id').json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_page_queries_do_not_grow_with_offset(self):
+        url = '/api/circuitbreakers/?page_size=4'
+        get_feed_graph()
+        with CaptureQueriesContext(connection) as context:
+            data = self.client.get(url).json()
+        first_page_queries = len(context.captured_queries)
+        while data['next']:
+            url = data['next']
+            data = self.client.get(url).json()
+        # قياس الصفحة الأخيرة دون ذاكرة نموذج القراءة حتى تقارن بالصفحة الأولى في نفس الظروف
+        read_cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        self.assertEqual(len(context.captured_queries), first_page_queries)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get('/api/loads/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+        # مؤشر صحيح الصيغة بقيم مفتاح من غير نوع حقولها
+        for key in (['abc', 1], [{'a': 1}, 1], [None, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'k': key}).encode('utf-8')).decode('ascii')
+            response = self.client.get(f'/api/circuitbreakers/?cursor={cursor}')
+            self.assertEqual(response.status_code, 404)
+
+
+class PanelTreePathTests(NetworkTestCase):
+    """
+    التحقق من تحديث المسار المادي للوحات عند الإنشاء والنقل
+    """
+
+    def setUp(self):
+        source = PowerSource.objects.create(name='Grid', voltage='380', total_ampacity=400)
+        self.root_a = Panel.objects.create(name='A', panel_type='main', power_source=source)
+        self.root_b = Panel.objects.create(name='B', panel_type='main', power_source=source)
+        self.middle = Panel.objects.create(name='A1', panel_type='sub_main', parent_panel=self.root_a)
+        self.leaf = Panel.objects.create(name='A1a', panel_type='sub', parent_panel=self.middle)
+        Load.objects.create(name='L1', panel=self.leaf, ampacity=10)
+
+    def test_paths_and_depths_on_create(self):
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.tree_path, f'/{self.root_a.id}/{self.middle.id}/{self.leaf.id}/')
+        self.assertEqual(self.leaf.tree_depth, 2)
+        self.assertTrue(self.leaf.is_descendant_of(self.root_a))
+        self.assertFalse(self.root_a.is_descendant_of(self.leaf))
+        self.assertEqual(set(self.root_a.get_descendants()), {self.middle, self.leaf})
+        self.assertEqual(list(self.leaf.get_ancestors()), [self.root_a, self.middle])
+
+    def test_reparent_moves_whole_subtree(self):
+        self.middle.parent_panel = self.root_b
+        self.middle.save()
+        self.leaf.refresh_from_db()
+        self.assertEqual(self.leaf.tree_path, f'/{self.root_b.id}/{self.middle.id}/{self.leaf.id}/')
+        self.assertEqual(self.leaf.get_full_path(), 'Grid → B → A1 → A1a')
+        self.root_a.refresh_from_db()
+        self.root_b.refresh_from_db()
+        self.assertEqual(self.root_b.get_total_loads(), (10, 1))
+        self.assertEqual(self.root_a.get_total_loads(), (0, 0))
+
+    def test_rebuild_fixes_paths_changed_outside_model(self):
+        Panel.objects.filter(id=self.middle.id).update(parent_panel=self.root_b)
+        self.assertEqual(Panel.rebuild_tree_paths(), 2)
+        self.leaf.refresh_from_db()
+        self.assertTrue(self.leaf.is_descendant_of(self.root_b))
+
+    def test_descendant_cannot_become_parent(self):
+        response = APIClient().patch(
+            f'/api/panels/{self.middle.id}/', {'parent_panel': self.leaf.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent_panel', response.json())
+
+
+class RollupTests(NetworkTestCase):
+    """
+    التحقق من أن الإجماليات المخزنة تبقى مطابقة لإعادة الحساب الكاملة بعد كل نوع من التغييرات
+    """
+
+    def setUp(self):
+        self.source = build_network(2)
+        self.assertEqual(rebuild_rollups(), (0, 0))
+
+    def assertRollupsConsistent(self):
+        # إعادة البناء لا تجد ما تصححه إذا كانت التحديثات التزايدية صحيحة
+        self.assertEqual(rebuild_rollups(), (0, 0))
+
+    def test_load_changes(self):
+        load = Load.objects.filter(name='L-2-0-0-0').get()
+        load.ampacity = 25
+        load.save()
+        self.assertRollupsConsistent()
+
+        other_breaker = CircuitBreaker.objects.get(name='B-2-1-1-1')
+        load.breaker = other_breaker
+        load.panel = other_breaker.panel
+        load.save()
+        self.assertRollupsConsistent()
+
+        load.phase = 'L3'
+        load.save()
+        self.assertRollupsConsistent()
+        self.assertEqual(Panel.objects.get(id=other_breaker.panel.parent_panel_id).rollup_l3_ampacity, 25)
+
+        load.delete()
+        Load.objects.filter(panel__name='SDB-2-1-0').delete()
+        self.assertRollupsConsistent()
+
+    def test_panel_changes(self):
+        sub_panel = Panel.objects.get(name='SDB-2-0-0')
+        sub_panel.parent_panel = Panel.objects.get(name='MDB-2-1')
+        sub_panel.save()
+        self.assertRollupsConsistent()
+
+        Panel.objects.get(name='SDB-2-1-1').delete()
+        self.assertRollupsConsistent()
+
+        self.source.delete()
+        self.assertRollupsConsistent()
+
+    def test_breaker_changes(self):
+        feeder = CircuitBreaker.objects.get(name='F-2-0-0')
+        feeder.rated_current = 100
+        feeder.save()
+        self.assertRollupsConsistent()
+
+        breaker = CircuitBreaker.objects.get(name='B-2-0-0-0')
+        breaker.feeding_breakers.remove(feeder)
+        breaker.feeding_breakers.add(CircuitBreaker.objects.get(name='F-2-0-1'))
+        self.assertRollupsConsistent()
+
+        feeder.fed_breakers.clear()
+        breaker.rated_current = 32
+        breaker.save()
+        self.assertRollupsConsistent()
+
+        CircuitBreaker.objects.get(name='B-2-0-1-0').delete()
+        self.assertRollupsConsistent()
+
+    def test_stale_instance_does_not_overwrite_rollups(self):
+        panel = Panel.objects.get(name='MDB-2-0')
+        Load.objects.create(name='extra', panel=Panel.objects.get(name='SDB-2-0-0'), ampacity=5)
+        panel.location = 'Basement'
+        panel.save()
+        self.assertRollupsConsistent()
+
+    def test_by_utilization_filter(self):
+        response = APIClient().get('/api/panels/by_utilization/?min_percentage=60')
+        # كل لوحة فرعية عليها حملان بـ 10 أمبير من أصل 63 أمبير (32%) واللوحات الرئيسية 40 من 250
+        self.assertEqual(response.json(), [])
+        response = APIClient().get('/api/panels/by_utilization/?min_percentage=30')
+        names = sorted(row['name'] for row in response.json())
+        self.assertEqual(names, ['SDB-2-0-0', 'SDB-2-0-1', 'SDB-2-1-0', 'SDB-2-1-1'])
+
+    def test_rebuild_command_fixes_drift(self):
+        Panel.objects.update(rollup_ampacity=0)
+        out = StringIO()
+        call_command('rebuild_rollups', stdout=out)
+        self.assertRollupsConsistent()
+
+
+class FeedGraphTests(NetworkTestCase):
+    """
+    التحقق من محرك رسم التغذية بين القواطع
+    """
+
+    def setUp(self):
+        build_network(2)
+        self.main = CircuitBreaker.objects.get(name='MB-2-0')
+        self.feeder = CircuitBreaker.objects.get(name='F-2-0-0')
+        self.breaker = CircuitBreaker.objects.get(name='B-2-0-0-0')
+
+    def test_paths_and_closures(self):
+        graph = get_feed_graph()
+        self.assertEqual(
+            self.breaker.get_full_path(),
+            " → ".join(str(breaker) for breaker in (self.main, self.feeder, self.breaker))
+        )
+        self.assertEqual(graph.upstream_ids(self.breaker.id), [self.feeder.id, self.main.id])
+        self.assertEqual(
+            set(graph.downstream_ids(self.main.id)),
+            set(CircuitBreaker.objects.filter(name__startswith='B-2-0-').values_list('id', flat=True))
+            | set(CircuitBreaker.objects.filter(name__startswith='F-2-0-').values_list('id', flat=True))
+        )
+        self.assertTrue(graph.reaches(self.main.id, self.breaker.id))
+        self.assertFalse(graph.reaches(self.breaker.id, self.main.id))
+
+        order = graph.topological_order()
+        for fed_id, feeder_id in CircuitBreaker.feeding_breakers.through.objects.values_list(
+            'from_circuitbreaker_id', 'to_circuitbreaker_id'
+        ):
+            self.assertLess(order.index(feeder_id), order.index(fed_id))
+
+    def test_graph_follows_network_revision(self):
+        graph = get_feed_graph()
+        self.assertIs(get_feed_graph(), graph)
+        other_feeder = CircuitBreaker.objects.get(name='F-2-0-1')
+        self.breaker.feeding_breakers.add(other_feeder)
+        self.assertIsNot(get_feed_graph(), graph)
+        self.assertIn(other_feeder.id, get_feed_graph().feeder_ids(self.breaker.id))
+
+    def test_cycle_is_rejected(self):
+        client = APIClient()
+        response = client.put(
+            f'/api/circuitbreakers/{self.main.id}/feeding_breakers/',
+            {'feeding_breakers': [self.breaker.id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get(f'/api/circuitbreakers/{self.main.id}/fed_breakers/?include_indirect=true')
+        self.assertEqual(len(response.json()), 6)
+
+
+class ConditionalGetTests(NetworkTestCase):
+    """
+    التحقق من ETag و Last-Modified والإجابة بـ 304 على طلبات القراءة
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(1)
+
+    def test_not_modified_before_serialization(self):
+        first = self.client.get('/api/panels/')
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('ETag', first.headers)
+        self.assertIn('Last-Modified', first.headers)
+
+        with CaptureQueriesContext(connection) as context:
+            second = self.client.get('/api/panels/', HTTP_IF_NONE_MATCH=first.headers['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_any_change_invalidates_etag(self):
+        url = f'/api/circuitbreakers/{CircuitBreaker.objects.first().id}/'
+        etag = self.client.get(url).headers['ETag']
+        Load.objects.update(ampacity=1)  # تعديل لا يمر عبر النماذج لا يغير المراجعة
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        breaker = CircuitBreaker.objects.get(name='B-1-0-0-0')
+        breaker.feeding_breakers.clear()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get('/api/network/snapshot/').headers['ETag']
+        Load.objects.first().delete()
+        self.assertEqual(self.client.get('/api/network/snapshot/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_writes_are_not_conditional(self):
+        etag = self.client.get('/api/loads/').headers['ETag']
+        response = self.client.post(
+            '/api/loads/', {'name': 'new', 'ampacity': 5, 'voltage': '220'}, format='json',
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class ReadModelCacheTests(NetworkTestCase):
+    """
+    التحقق من ذاكرة نموذج القراءة: الإصابة والإخفاق والإبطال الدقيق وإخلاء الأقدم استخداماً
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        read_cache.clear()
+        read_cache.reset_stats()
+        source = PowerSource.objects.create(name='Grid', voltage='380', total_ampacity=400)
+        self.root = Panel.objects.create(name='MDB', panel_type='main', power_source=source, ampacity=250, voltage='380')
+        self.feeder = CircuitBreaker.objects.create(name='F1', panel=self.root, rated_current=63)
+        self.sub = Panel.objects.create(
+            name='SDB', panel_type='sub', parent_panel=self.root, feeder_breaker=self.feeder, ampacity=63, voltage='220'
+        )
+        self.leaf = Panel.objects.create(name='DB', panel_type='sub', parent_panel=self.sub, ampacity=32, voltage='220')
+        self.breaker = CircuitBreaker.objects.create(name='B1', panel=self.leaf, rated_current=16)
+        self.breaker.feeding_breakers.add(self.feeder)
+        self.load = Load.objects.create(name='L1', panel=self.leaf, breaker=self.breaker, ampacity=10, voltage='220')
+        self.other = Panel.objects.create(name='MDB-2', panel_type='main', power_source=source, ampacity=100, voltage='380')
+        self.other_breaker = CircuitBreaker.objects.create(name='B2', panel=self.other, rated_current=16)
+        get_feed_graph()
+
+    def is_cached(self, kind, object_id):
+        return read_cache.get_cache().get(read_cache.cache_key(kind, object_id, 'detail')) is not None
+
+    def warm(self):
+        self.client.get('/api/panels/')
+        self.client.get('/api/circuitbreakers/')
+
+    def test_detail_is_served_from_cache(self):
+        url = f'/api/panels/{self.leaf.id}/'
+        with CaptureQueriesContext(connection) as cold:
+            first = self.client.get(url)
+        with CaptureQueriesContext(connection) as warm:
+            second = self.client.get(url)
+        self.assertEqual(first.json(), second.json())
+        self.assertLess(len(warm.captured_queries), len(cold.captured_queries))
+
+        stats = self.client.get('/api/network/cache_stats/').json()
+        self.assertEqual(stats['by_variant']['panel:detail'], {'hits': 1, 'misses': 1})
+
+    def test_load_change_invalidates_only_its_chain(self):
+        self.warm()
+        self.load.ampacity = 20
+        self.load.save()
+
+        for panel in (self.leaf, self.sub, self.root):
+            self.assertFalse(self.is_cached(read_cache.PANEL, panel.id), panel.name)
+        self.assertFalse(self.is_cached(read_cache.BREAKER, self.breaker.id))
+        self.assertTrue(self.is_cached(read_cache.PANEL, self.other.id))
+        self.assertTrue(self.is_cached(read_cache.BREAKER, self.other_breaker.id))
+        # القاطع المغذي يتضمن الطلب المُخفَّض للوحة التي يغذيها
+        self.assertFalse(self.is_cached(read_cache.BREAKER, self.feeder.id))
+
+        data = self.client.get(f'/api/panels/{self.root.id}/').json()
+        self.assertEqual(data['rollup_ampacity'], 20)
+        data = self.client.get(f'/api/circuitbreakers/{self.feeder.id}/').json()
+        self.assertAlmostEqual(data['diversified_demand'], 20 * Panel.diversity_factor(1))
+
+    def test_structure_changes_refresh_cached_paths(self):
+        self.warm()
+        self.root.name = 'MDB-A'
+        self.root.save()
+        self.assertEqual(self.client.get(f'/api/panels/{self.leaf.id}/').json()['full_path'], 'Grid → MDB-A → SDB → DB')
+        self.assertIn('MDB-A', self.client.get(f'/api/circuitbreakers/{self.breaker.id}/').json()['full_path'])
+        self.assertTrue(self.is_cached(read_cache.PANEL, self.other.id))
+
+        self.breaker.feeding_breakers.clear()
+        data = self.client.get(f'/api/circuitbreakers/{self.feeder.id}/').json()
+        self.assertEqual(data['fed_breakers_info'], [])
+
+    def test_file_backend_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as location:
+            cache = LRUFileBasedCache(location, {'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}})
+            for index, key in enumerate(('a', 'b', 'c')):
+                cache.set(key, key)
+                os.utime(cache._key_to_file(key), (index, index))
+            self.assertEqual(cache.get('a'), 'a')  # a أصبح الأحدث استخداماً
+            mtime = os.path.getmtime(cache._key_to_file('a'))
+            cache.get('a')  # قراءة خلال TOUCH_INTERVAL لا تكتب على الملف
+            self.assertEqual(os.path.getmtime(cache._key_to_file('a')), mtime)
+            cache.set('d', 'd')
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual([cache.get(key) for key in ('a', 'c', 'd')], ['a', 'c', 'd'])
+
+
+class CableAnalysisTests(NetworkTestCase):
+    """
+    التحقق من أن التحليل المتجه للكابلات يطابق حسابات النماذج وأن التصفية تعمل بعدد ثابت من الاستعلامات
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(2)
+        Load.objects.filter(name__endswith='-0').update(cable_length=400, cable_cross_section=1.5)
+        Panel.objects.filter(panel_type='sub').update(cable_material='aluminum', cable_cross_section=16, cable_length=30)
+        PowerSource.objects.update(cable_cross_section=999, cable_path='buried', cable_length=10, cable_quantity=2)
+
+    def test_matches_model_methods(self):
+        data = self.client.get('/api/network/cable_analysis/').json()
+        results = {(row['kind'], row['id']): row for row in data['results']}
+        objects = [('source', PowerSource), ('panel', Panel), ('load', Load)]
+        for kind, model in objects:
+            for obj in model.objects.all():
+                row = results[(kind, obj.id)]
+                self.assertAlmostEqual(row['voltage_drop'], obj.calculate_voltage_drop())
+                self.assertAlmostEqual(row['power_loss'], obj.calculate_power_loss())
+                self.assertAlmostEqual(row['max_current_capacity'], obj.get_max_current_capacity())
+        self.assertEqual(data['summary']['count'], len(results))
+
+    def test_filter_by_voltage_drop(self):
+        data = self.client.get('/api/network/cable_analysis/?min_drop_percentage=3&ordering=-voltage_drop_percentage').json()
+        drops = [row['voltage_drop_percentage'] for row in data['results']]
+        self.assertTrue(drops)
+        self.assertTrue(all(drop >= 3 for drop in drops))
+        self.assertEqual(drops, sorted(drops, reverse=True))
+        self.assertEqual({row['kind'] for row in data['results']}, {'load'})
+
+        overloaded = self.client.get('/api/network/cable_analysis/?kind=panel&overloaded=true').json()
+        expected = {panel.id for panel in Panel.objects.all() if panel.ampacity > panel.get_max_current_capacity()}
+        self.assertEqual({row['id'] for row in overloaded['results']}, expected)
+        self.assertTrue(all(row['kind'] == 'panel' and row['ampacity_margin'] < 0 for row in overloaded['results']))
+        self.assertEqual(self.client.get('/api/network/cable_analysis/?kind=motor').status_code, 400)
+        self.assertEqual(self.client.get('/api/network/cable_analysis/?ordering=name').status_code, 400)
+
+    def test_queries_do_not_grow_with_rows(self):
+        def count():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get('/api/network/cable_analysis/')
+            return len(context.captured_queries)
+        small = count()
+        build_network(3)
+        self.assertEqual(count(), small)
+        # استعلام واحد لكل نوع (المصادر واللوحات والأحمال)
+        with self.assertNumQueries(3):
+            CableAnalysis()
+
+    def test_cumulative_drop_follows_feed_path(self):
+        load = Load.objects.get(name='L-2-1-1-0')
+        chain = [load, load.panel, load.panel.parent_panel, load.panel.parent_panel.power_source]
+        expected = sum(obj.calculate_voltage_drop() for obj in chain)
+
+        data = self.client.get('/api/network/cable_analysis/?kind=load,panel&min_cumulative_drop_percentage=0').json()
+        row = next(row for row in data['results'] if row['kind'] == 'load' and row['id'] == load.id)
+        self.assertAlmostEqual(row['cumulative_voltage_drop'], expected)
+        self.assertEqual(data['summary']['count'], Load.objects.count() + Panel.objects.count())
+
+        detail = self.client.get(f'/api/loads/{load.id}/').json()
+        self.assertAlmostEqual(detail['cumulative_voltage_drop']['voltage_drop'], expected)
+        panel = self.client.get(f'/api/panels/{load.panel_id}/').json()
+        self.assertAlmostEqual(
+            panel['cumulative_voltage_drop']['voltage_drop'], expected - load.calculate_voltage_drop()
+        )
+        self.assertAlmostEqual(
+            load.get_cumulative_voltage_drop()['voltage_drop_percentage'],
+            sum(obj.calculate_voltage_drop() / 220 * 100 for obj in chain[:2])
+            + sum(obj.calculate_voltage_drop() / 380 * 100 for obj in chain[2:])
+        )
+
+
+class CableSizingTests(NetworkTestCase):
+    """
+    التحقق من أن المقاطع المقترحة هي الأصغر التي تحقق التيار وحد هبوط الجهد، ومن تطبيقها دفعة واحدة
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(2)
+        Load.objects.filter(name__endswith='-0').update(cable_length=120, cable_path='conduit')
+        Load.objects.filter(name__endswith='-1').update(cable_cross_section=95, cable_length=5)
+        Panel.objects.filter(panel_type='sub').update(cable_material='aluminum', cable_cross_section=16, cable_length=80)
+
+    @staticmethod
+    def brute_force(obj, current, limit=3.0, max_quantity=4):
+        """أول (مقطع، عدد) يحقق الشرطين بالبحث الخطي المباشر في CableConstants"""
+        capacities = CableConstants.CURRENT_CAPACITY[obj.cable_material]
+        resistances = CableConstants.CABLE_RESISTIVITY[obj.cable_material]
+        voltage = 11000 if obj.voltage == '11KV' else float(obj.voltage)
+        for quantity in range(1, max_quantity + 1):
+            for section in sorted(capacities):
+                capacity = capacities[section] * CableConstants.PATH_CORRECTION_FACTOR[obj.cable_path] * quantity
+                drop = current * resistances[section] / 1000 / quantity * obj.cable_length / voltage * 100
+                if capacity >= current and drop <= limit:
+                    return section, quantity
+        return None
+
+    def test_recommendations_are_minimal(self):
+        data = self.client.get('/api/network/cable_sizing/?kind=load,panel').json()
+        changes = {(change['kind'], change['id']): change for change in data['changes']}
+        self.assertTrue(changes)
+        for kind, model in (('load', Load), ('panel', Panel)):
+            for obj in model.objects.all():
+                expected = self.brute_force(obj, obj.ampacity)
+                change = changes.get((kind, obj.id))
+                if change is None:
+                    self.assertEqual(expected, (obj.cable_cross_section, obj.cable_quantity), obj.name)
+                else:
+                    recommended = change['recommended']
+                    self.assertEqual(expected, (recommended['cable_cross_section'], recommended['cable_quantity']))
+                    self.assertLessEqual(recommended['voltage_drop_percentage'], 3.0)
+                    self.assertGreaterEqual(recommended['max_current_capacity'], obj.ampacity)
+
+        default = self.client.get('/api/network/cable_sizing/?kind=load').json()
+        strict = self.client.get('/api/network/cable_sizing/?kind=load&max_drop_percentage=0.5').json()
+        def areas(result):
+            return {
+                change['id']: change['recommended']['cable_cross_section'] * change['recommended']['cable_quantity']
+                for change in result['changes']
+            }
+        default_areas, strict_areas = areas(default), areas(strict)
+        long_loads = Load.objects.filter(name__endswith='-0').values_list('id', flat=True)
+        for load_id in long_loads:
+            self.assertGreater(strict_areas[load_id], default_areas[load_id])
+
+    def test_apply_selected_recommendations(self):
+        changes = self.client.get('/api/network/cable_sizing/?kind=load').json()['changes']
+        target = changes[0]
+        panel_url = f"/api/panels/{Load.objects.get(id=target['id']).panel_id}/"
+        self.client.get(panel_url)  # تعبئة ذاكرة نموذج القراءة
+
+        response = self.client.post(
+            '/api/network/cable_sizing/', {'items': [{'kind': 'load', 'id': target['id']}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['applied'], 1)
+
+        load = Load.objects.get(id=target['id'])
+        self.assertEqual(load.cable_cross_section, target['recommended']['cable_cross_section'])
+        self.assertEqual(load.cable_quantity, target['recommended']['cable_quantity'])
+        remaining = self.client.get('/api/network/cable_sizing/?kind=load').json()['changes']
+        self.assertEqual(len(remaining), len(changes) - 1)
+
+        self.client.post('/api/network/cable_sizing/', {'kind': 'panel'}, format='json')
+        self.assertEqual(self.client.get('/api/network/cable_sizing/?kind=panel').json()['changes'], [])
+        self.assertFalse(read_cache.get_cache().get(read_cache.cache_key(read_cache.PANEL, load.panel_id, 'detail')))
+
+
+class LoadFlowTests(NetworkTestCase):
+    """
+    التحقق من حل سريان الأحمال: مطابقة الحل التحليلي لفرع واحد وتوازن القدرة في شبكة متعددة المستويات
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_single_branch_matches_closed_form(self):
+        source = PowerSource.objects.create(name='Grid', voltage='380', total_ampacity=100)
+        panel = Panel.objects.create(
+            name='MDB', panel_type='main', power_source=source, voltage='380', ampacity=60,
+            cable_cross_section=16, cable_length=100
+        )
+        load = Load.objects.create(
+            name='Heater', panel=panel, voltage='380', power_consumption=20000, power_factor=1.0, cable_length=0
+        )
+        resistance = CableConstants.CABLE_RESISTIVITY['copper'][16] / 1000 * 100
+        # V² - 380 V + P R = 0 (حمل قدرة ثابتة بمعامل قدرة 1 عبر مقاومة واحدة)
+        expected = (380 + (380 ** 2 - 4 * 20000 * resistance) ** 0.5) / 2
+
+        data = self.client.get('/api/network/load_flow/').json()
+        self.assertTrue(data['summary']['converged'])
+        rows = {(row['kind'], row['id']): row for row in data['results']}
+        self.assertAlmostEqual(rows[('panel', panel.id)]['voltage'], expected, places=6)
+        self.assertAlmostEqual(rows[('load', load.id)]['voltage'], expected, places=6)
+        self.assertAlmostEqual(rows[('panel', panel.id)]['branch_current'], 20000 / expected, places=6)
+        self.assertAlmostEqual(data['summary']['total_losses'], (20000 / expected) ** 2 * resistance, places=4)
+        self.assertEqual(data['summary']['min_voltage_node']['kind'], 'panel')
+
+    def test_power_balance_across_levels(self):
+        build_network(2)
+        Load.objects.update(cable_length=40, power_factor=0.8)
+        Load.objects.filter(name__endswith='-1').update(power_consumption=0, ampacity=12)
+        Panel.objects.update(cable_length=60, cable_cross_section=10)
+        Panel.objects.create(name='Orphan', panel_type='main', voltage='380')
+
+        solution = self.client.get('/api/network/load_flow/').json()
+        summary = solution['summary']
+        self.assertTrue(summary['converged'])
+        self.assertEqual(summary['energized_count'], summary['count'] - 1)
+        orphan = next(row for row in solution['results'] if row['name'] == 'Orphan')
+        self.assertFalse(orphan['energized'])
+        self.assertIsNone(orphan['voltage'])
+
+        from .services.load_flow import BASE_POWER, solve_load_flow
+        result = solve_load_flow()
+        sources = np.flatnonzero(result.analysis.kind == 'source')
+        # القدرة الداخلة من القضيب المرجعي = الأحمال + الفقد في جميع الكابلات
+        supplied = (np.conj(result.current_complex[sources]).sum() * BASE_POWER).real
+        self.assertAlmostEqual(supplied, summary['total_active_power'] + summary['total_losses'], places=3)
+
+        loads = [row for row in solution['results'] if row['kind'] == 'load']
+        for row in loads:
+            panel = Panel.objects.get(loads__id=row['id'])
+            self.assertLess(row['voltage_pu'], 1.0)
+            self.assertLess(row['voltage_pu'], next(
+                other['voltage_pu'] for other in solution['results'] if other['kind'] == 'panel' and other['id'] == panel.id
+            ))
+
+        low = self.client.get('/api/network/load_flow/?kind=load&max_voltage_pu=0.999&ordering=voltage_pu').json()
+        voltages = [row['voltage_pu'] for row in low['results']]
+        self.assertEqual(voltages, sorted(voltages))
+        self.assertTrue(all(voltage <= 0.999 for voltage in voltages))
+        self.assertEqual(self.client.get('/api/network/load_flow/?ordering=name').status_code, 400)
+
+
+class ShortCircuitTests(NetworkTestCase):
+    """
+    التحقق من تيار القصر المتوقع بالحساب اليدوي ومن تصنيف القواطع حسب قدرة القطع
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.source_breaker = CircuitBreaker.objects.create(name='SRC-MB', short_circuit_current=10, breaker_role='main')
+        self.source = PowerSource.objects.create(
+            name='Grid', voltage='380', total_ampacity=1000, main_breaker=self.source_breaker,
+            cable_cross_section=240, cable_length=20
+        )
+        self.panel = Panel.objects.create(
+            name='MDB', panel_type='main', power_source=self.source, voltage='380', ampacity=400,
+            cable_cross_section=185, cable_length=50
+        )
+        self.main = CircuitBreaker.objects.create(name='MDB-MB', panel=self.panel, short_circuit_current=50)
+        self.feeder = CircuitBreaker.objects.create(name='MDB-F1', panel=self.panel, short_circuit_current=6)
+        self.spare = CircuitBreaker.objects.create(name='MDB-F2', panel=self.panel)
+        self.sub = Panel.objects.create(
+            name='SDB', panel_type='sub', parent_panel=self.panel, feeder_breaker=self.feeder, voltage='220',
+            ampacity=63, cable_cross_section=16, cable_length=40
+        )
+        self.load = Load.objects.create(name='Pump', panel=self.sub, voltage='220', ampacity=10, cable_length=25)
+
+    def expected(self, chain, voltage):
+        """Ik بالكيلو أمبير من مقاومات الكابلات بالأوم (حلقة طور ومحايد للعقد أحادية الطور) ومفاعلة المصدر"""
+        reactance = 0.05 * 380 / (3 ** 0.5 * 1000)
+        resistance = 0
+        for obj in chain:
+            loop = 1 if float(obj.voltage) >= 380 else 2
+            resistance += obj.get_cable_resistance() * obj.cable_length * loop
+        # عقد 220 ف أحادية الطور من نفس نظام 380 ف: قصر طور مع المحايد بجهد الطور
+        return 1.1 * 380 / 3 ** 0.5 / (resistance ** 2 + reactance ** 2) ** 0.5 / 1000
+
+    def test_fault_levels_and_breaker_status(self):
+        data = self.client.get('/api/network/short_circuit/').json()
+        buses = {(row['kind'], row['id']): row for row in data['buses']}
+        self.assertAlmostEqual(buses[('source', self.source.id)]['terminal_fault_current'], 22.0)
+        self.assertAlmostEqual(
+            buses[('panel', self.panel.id)]['fault_current'], self.expected([self.source, self.panel], 380)
+        )
+        self.assertAlmostEqual(
+            buses[('load', self.load.id)]['fault_current'],
+            self.expected([self.source, self.panel, self.sub, self.load], 220)
+        )
+        self.assertGreater(buses[('panel', self.panel.id)]['fault_current'], buses[('panel', self.sub.id)]['fault_current'])
+
+        breakers = {row['id']: row for row in data['breakers']}
+        self.assertEqual(breakers[self.source_breaker.id]['status'], 'insufficient')
+        self.assertEqual(breakers[self.source_breaker.id]['location'], {'kind': 'source', 'id': self.source.id})
+        self.assertEqual(breakers[self.main.id]['status'], 'ok')
+        self.assertEqual(breakers[self.feeder.id]['status'], 'insufficient')
+        self.assertEqual(breakers[self.spare.id]['status'], 'unrated')
+        self.assertEqual(data['summary']['insufficient'], 2)
+
+        flagged = self.client.get('/api/network/short_circuit/?status=insufficient').json()['breakers']
+        margins = [row['margin'] for row in flagged]
+        self.assertEqual({row['id'] for row in flagged}, {self.source_breaker.id, self.feeder.id})
+        self.assertEqual(margins, sorted(margins))
+        self.assertEqual(self.client.get('/api/network/short_circuit/?status=broken').status_code, 400)
+
+    def test_fault_current_never_increases_downstream(self):
+        build_network(2)
+        # لوحة 220 ف بكابل قصير جداً تحت لوحة 380 ف
+        sub_panel = Panel.objects.get(name='SDB-2-0-0')
+        sub_panel.cable_length = 0.1
+        sub_panel.save()
+        study = study_short_circuit()
+        analysis = study.analysis
+        rows = np.flatnonzero(analysis.upstream >= 0)
+        parents = analysis.upstream[rows]
+        known = ~np.isnan(study.fault_current[rows]) & ~np.isnan(study.fault_current[parents])
+        self.assertTrue(known.any())
+        self.assertTrue(np.all(study.fault_current[rows][known] <= study.fault_current[parents][known] + 1e-12))
+
+        feeder = CircuitBreaker.objects.get(id=self.feeder.id)
+        feeder.short_circuit_current = 25
+        feeder.save()
+        data = self.client.get('/api/network/short_circuit/?status=insufficient').json()
+        self.assertEqual([row['id'] for row in data['breakers']], [self.source_breaker.id])
+
+
+class SelectivityTests(NetworkTestCase):
+    """
+    التحقق من منحنيات الفصل ومن فحص الانتقائية لأزواج علاقات التغذية والقاطع المغذي مع القاطع الرئيسي
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_trip_curve_bands(self):
+        grid = np.array([10.0, 16.0 * 4, 16.0 * 7, 16.0 * 12])
+        parameters = np.array([curve_parameters('MCB', 'B'), curve_parameters('MCB', 'c')])
+        minimum, maximum = trip_times(np.array([16.0, 16.0]), parameters, grid)
+        self.assertTrue(np.isinf(minimum[:, 0]).all() and np.isinf(maximum[:, 0]).all())
+        # منحنى B يفصل لحظياً عند 7 أضعاف، ومنحنى C يبقى في المنطقة الحرارية حتى 10 أضعاف
+        self.assertEqual(maximum[0, 2], INSTANTANEOUS_TIME)
+        self.assertGreater(maximum[1, 2], 1)
+        self.assertEqual(minimum[1, 3], 0)
+        self.assertTrue((minimum <= maximum).all())
+        self.assertIsNone(curve_parameters('RCD', 'C'))
+
+    def test_pairs_from_feeding_and_panel_chain(self):
+        source = PowerSource.objects.create(name='Grid', voltage='380', total_ampacity=1000)
+        panel = Panel.objects.create(name='MDB', panel_type='main', power_source=source, voltage='380', ampacity=800)
+        acb = CircuitBreaker.objects.create(name='MDB-MB', panel=panel, breaker_type='ACB', rated_current=800)
+        mccb = CircuitBreaker.objects.create(name='MDB-F1', panel=panel, breaker_type='MCCB', rated_current=160)
+        twin = CircuitBreaker.objects.create(name='MDB-F2', panel=panel, breaker_type='MCCB', rated_current=160)
+        rcd = CircuitBreaker.objects.create(name='MDB-RCD', panel=panel, breaker_type='RCD', rated_current=40)
+        mccb.feeding_breakers.add(acb)
+        twin.feeding_breakers.add(mccb)
+        rcd.feeding_breakers.add(acb)
+        sub = Panel.objects.create(
+            name='SDB', panel_type='sub', parent_panel=panel, feeder_breaker=mccb, voltage='380', ampacity=160,
+            cable_cross_section=4, cable_length=200
+        )
+        sub_main = CircuitBreaker.objects.create(name='SDB-MB', breaker_type='MCB', trip_curve='B', rated_current=16)
+        sub.main_breaker = sub_main
+        sub.save()
+
+        data = self.client.get('/api/network/selectivity/').json()
+        pairs = {(row['upstream']['id'], row['downstream']['id']): row for row in data['pairs']}
+        self.assertEqual(set(pairs), {(acb.id, mccb.id), (mccb.id, twin.id), (acb.id, rcd.id), (mccb.id, sub_main.id)})
+        self.assertEqual(pairs[(acb.id, mccb.id)]['status'], 'selective')
+        self.assertEqual(pairs[(mccb.id, twin.id)]['status'], 'not_selective')
+        self.assertEqual(pairs[(acb.id, rcd.id)]['status'], 'not_applicable')
+
+        # تيار القصر في اللوحة الفرعية (كابل طويل ورفيع) أقل من عتبة الفصل اللحظي للقاطع المغذي فيبقى الزوج انتقائياً
+        feeder_pair = pairs[(mccb.id, sub_main.id)]
+        self.assertLess(feeder_pair['fault_current'] * 1000, 8 * 160)
+        self.assertEqual(feeder_pair['status'], 'selective')
+
+        Panel.objects.filter(id=sub.id).update(cable_length=2)
+        sub.refresh_from_db()
+        sub.save()
+        feeder_pair = next(
+            row for row in self.client.get('/api/network/selectivity/?status=not_selective').json()['pairs']
+            if row['downstream']['id'] == sub_main.id
+        )
+        self.assertGreaterEqual(feeder_pair['selectivity_limit'], 8 * 160 * 0.95)
+        self.assertEqual(data['summary']['pairs'], 4)
+        self.assertEqual(self.client.get('/api/network/selectivity/?status=maybe').status_code, 400)
+
+
+class PhaseBalancingTests(NetworkTestCase):
+    """
+    التحقق من اقتراحات موازنة الأطوار وتطبيقها دفعة واحدة مع بقاء إجماليات الأطوار صحيحة
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        source = PowerSource.objects.create(name='Grid', voltage='380', total_ampacity=400)
+        self.panel = Panel.objects.create(name='MDB', panel_type='main', power_source=source, voltage='380', ampacity=250)
+        self.sub = Panel.objects.create(name='SDB', panel_type='sub', parent_panel=self.panel, voltage='220', ampacity=63)
+        for index, ampacity in enumerate([20, 16, 10, 10, 8, 6, 6, 4]):
+            Load.objects.create(name=f'S-{index}', panel=self.sub, voltage='220', ampacity=ampacity)
+        Load.objects.create(name='Motor', panel=self.panel, voltage='380', ampacity=30)
+        Load.objects.create(name='Heater', panel=self.panel, voltage='220', ampacity=12, phase='L2')
+
+    def test_default_phases_and_rollups(self):
+        self.assertEqual(Load.objects.get(name='Motor').phase, '3P')
+        self.assertEqual(Load.objects.get(name='S-0').phase, 'L1')
+        panel = Panel.objects.get(id=self.panel.id)
+        self.assertEqual(panel.get_phase_currents(), (110, 42, 30))
+        data = self.client.get(f'/api/panels/{self.panel.id}/').json()
+        self.assertEqual(data['total_loads_info']['phase_currents'], {'L1': 110, 'L2': 42, 'L3': 30})
+        self.assertGreater(data['total_loads_info']['phase_imbalance'], 50)
+
+    def test_plan_and_apply(self):
+        plan = self.client.get('/api/network/phase_balancing/').json()
+        panels = {panel['id']: panel for panel in plan['panels']}
+        sub = panels[self.sub.id]
+        self.assertEqual(sum(sub['phase_currents_after']), 80)
+        self.assertLess(max(sub['phase_currents_after']) - min(sub['phase_currents_after']), 4.01)
+        self.assertLess(panels[self.panel.id]['imbalance_after'], panels[self.panel.id]['imbalance_before'])
+        # إعادة تسمية الأطوار تبقي أكبر مجموعة أحمال في طورها الحالي L1
+        sub_moves = [move['to_phase'] for move in plan['moves'] if move['panel'] == self.sub.id]
+        kept = 8 - len(sub_moves)
+        self.assertGreaterEqual(kept, max(sub_moves.count('L2'), sub_moves.count('L3')))
+        self.assertNotIn(Load.objects.get(name='Motor').id, {move['load'] for move in plan['moves']})
+
+        response = self.client.post('/api/network/phase_balancing/', {}, format='json')
+        self.assertEqual(response.json()['applied'], len(plan['moves']))
+        self.assertEqual(rebuild_rollups(), (0, 0))
+        panel = Panel.objects.get(id=self.panel.id)
+        self.assertEqual(list(panel.get_phase_currents()), panels[self.panel.id]['phase_currents_after'])
+        cached = self.client.get(f'/api/panels/{self.panel.id}/').json()['total_loads_info']
+        self.assertEqual(list(cached['phase_currents'].values()), panels[self.panel.id]['phase_currents_after'])
+        self.assertEqual(self.client.get('/api/network/phase_balancing/').json()['moves'], [])
+
+    def test_panel_scope_and_selected_loads(self):
+        plan = self.client.get(f'/api/network/phase_balancing/?panel={self.sub.id}').json()
+        self.assertEqual({move['panel'] for move in plan['moves']}, {self.sub.id})
+        self.assertEqual(self.client.get('/api/network/phase_balancing/?panel=9999').status_code, 404)
+
+        target = plan['moves'][0]
+        response = self.client.post(
+            '/api/network/phase_balancing/', {'panel': self.sub.id, 'loads': [target['load']]}, format='json'
+        )
+        self.assertEqual(response.json()['applied'], 1)
+        self.assertEqual(Load.objects.get(id=target['load']).phase, target['to_phase'])
+
+
+class DemandTests(NetworkTestCase):
+    """
+    التحقق من أقصى طلب متزامن من منحنيات التشغيل: منحنى الحمل ثم منحنى النوع ثم ساعات التشغيل
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        source = PowerSource.objects.create(name='Grid', voltage='380', total_ampacity=400)
+        self.panel = Panel.objects.create(name='MDB', panel_type='main', power_source=source, voltage='380', ampacity=250)
+        self.sub = Panel.objects.create(name='SDB', panel_type='sub', parent_panel=self.panel, voltage='220', ampacity=63)
+        self.breaker = CircuitBreaker.objects.create(name='F1', panel=self.panel, rated_current=63)
+        self.sub.feeder_breaker = self.breaker
+        self.sub.save()
+        # حملان بساعات تشغيل 8 و 4 (الساعة 8 إلى 16 و 8 إلى 12)
+        Load.objects.create(name='Office', panel=self.sub, voltage='220', power_consumption=1000, estimated_usage_hours=8)
+        Load.objects.create(name='Pump', panel=self.sub, voltage='220', power_consumption=500, estimated_usage_hours=4)
+        # حمل إنارة ليلي من منحنى نوعه، وحمل تكييف بمنحنى خاص يسبق منحنى نوعه
+        Load.objects.create(
+            name='Lamp', panel=self.panel, voltage='220', power_consumption=2000, load_type='lighting'
+        )
+        self.ac = Load.objects.create(
+            name='AC', panel=self.panel, voltage='220', power_consumption=3000, load_type='ac'
+        )
+        night = [1.0 if hour >= 18 or hour < 6 else 0.0 for hour in range(24)]
+        self.create_profile('Lighting', night, load_type='lighting')
+        self.create_profile('AC-type', [1.0] * 24, load_type='ac')
+        self.create_profile('AC-own', [0.5 if 12 <= hour < 16 else 0.0 for hour in range(24)], load=self.ac)
+
+    def create_profile(self, name, values, **target):
+        profile = LoadProfile(name=name, **target)
+        profile.values = values
+        profile.save()
+        return profile
+
+    def test_profile_blob_round_trip(self):
+        profile = LoadProfile.objects.get(name='Lighting')
+        self.assertEqual(profile.resolution, 24)
+        self.assertEqual(len(bytes(profile.data)), 24 * 4)
+        self.assertEqual(profile.values.dtype, np.float32)
+        self.assertEqual(profile.values[20], 1.0)
+
+        response = self.client.post('/api/loadprofiles/', {
+            'name': 'Pumps', 'load_type': 'pump', 'values': [0.25] * 8760,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['resolution'], 8760)
+        invalid = self.client.post('/api/loadprofiles/', {'name': 'Bad', 'load_type': 'fan', 'values': [1] * 10}, format='json')
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_coincident_peak(self):
+        sub = self.client.get(f'/api/network/demand/?kind=panel&id={self.sub.id}').json()['results'][0]
+        self.assertEqual(sub['connected_load'], 1500)
+        self.assertAlmostEqual(sub['coincident_peak'], 1500)
+        self.assertEqual(sub['peak_hour'], 8)
+        self.assertAlmostEqual(sub['energy_kwh'], 10)
+
+        # ذروة التكييف (1500 واط من منحناه الخاص) ظهراً والإنارة ليلاً: الطلب المتزامن أقل من مجموع الذروات
+        main = Panel.objects.get(id=self.panel.id).get_coincident_demand()
+        self.assertEqual(main['connected_load'], 6500)
+        self.assertAlmostEqual(main['sum_of_individual_peaks'], 5000)
+        self.assertAlmostEqual(main['coincident_peak'], 2500)
+        self.assertEqual(main['peak_hour'], 12)
+        self.assertAlmostEqual(main['diversity_factor'], 2)
+
+        results = self.client.get('/api/network/demand/?kind=source,breaker&duration_points=24').json()['results']
+        by_kind = {(row['kind'], row['id']): row for row in results}
+        self.assertAlmostEqual(by_kind[('breaker', self.breaker.id)]['coincident_peak'], 1500)
+        source = next(row for row in results if row['kind'] == 'source')
+        self.assertAlmostEqual(source['coincident_peak'], 2500)
+        self.assertEqual(source['duration_curve'][0], source['coincident_peak'])
+        self.assertEqual(sorted(source['duration_curve'], reverse=True), source['duration_curve'])
+        self.assertEqual(self.client.get('/api/network/demand/?kind=load').status_code, 400)
+        self.assertEqual(self.client.get('/api/network/demand/?duration_points=25').status_code, 400)
+
+    def test_annual_profile_extends_horizon(self):
+        self.create_profile('Pump-year', [0.0] * 8759 + [1.0], load=Load.objects.get(name='Pump'))
+        study = self.client.get(f'/api/network/demand/?kind=panel&id={self.sub.id}').json()
+        self.assertEqual(study['horizon'], 8760)
+        sub = study['results'][0]
+        self.assertAlmostEqual(sub['energy_kwh'], 8 * 365 + 0.5)
+        self.assertAlmostEqual(sub['coincident_peak'], 1000)
+
+
+class DemandFactorTests(NetworkTestCase):
+    """
+    التحقق من الطلب المُخفَّض: معامل الطلب لكل نوع حمل يحدث مع باقي الإجماليات، ومعامل التباين لمستوى اللوحة
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.source = PowerSource.objects.create(name='Grid', voltage='380', total_ampacity=400)
+        self.panel = Panel.objects.create(
+            name='MDB', panel_type='main', power_source=self.source, voltage='380', ampacity=250
+        )
+        self.main_breaker = CircuitBreaker.objects.create(name='MB', panel=self.panel, rated_current=250)
+        self.panel.main_breaker = self.main_breaker
+        self.panel.save()
+        self.source_breaker = CircuitBreaker.objects.create(name='SB', rated_current=400)
+        self.source.main_breaker = self.source_breaker
+        self.source.save()
+        self.feeder = CircuitBreaker.objects.create(name='F1', panel=self.panel, rated_current=63)
+        self.sub = Panel.objects.create(
+            name='SDB', panel_type='sub', parent_panel=self.panel, feeder_breaker=self.feeder, voltage='220', ampacity=63
+        )
+        self.breaker = CircuitBreaker.objects.create(name='B1', panel=self.sub, rated_current=32)
+        Load.objects.create(name='Sockets', panel=self.sub, breaker=self.breaker, voltage='220', ampacity=20, load_type='outlet')
+        Load.objects.create(name='Lights', panel=self.sub, voltage='220', ampacity=10, load_type='lighting')
+        self.motor = Load.objects.create(name='Motor', panel=self.panel, voltage='380', ampacity=40, load_type='motor')
+
+    def test_demand_rollups(self):
+        # مآخذ 20 × 0.5 + إنارة 10 × 1.0 في اللوحة الفرعية، ومحرك 40 × 0.75 في الرئيسية
+        sub = Panel.objects.get(id=self.sub.id)
+        panel = Panel.objects.get(id=self.panel.id)
+        self.assertAlmostEqual(sub.rollup_demand_ampacity, 20)
+        self.assertAlmostEqual(panel.rollup_demand_ampacity, 50)
+        self.assertAlmostEqual(sub.get_diversified_demand(), 20 * Panel.diversity_factor(1))
+        self.assertAlmostEqual(panel.get_diversified_demand(), 50 * Panel.diversity_factor(0))
+        self.assertLess(panel.get_diversified_demand(), panel.rollup_ampacity)
+
+        self.motor.load_type = 'other'
+        self.motor.save()
+        self.sub.parent_panel = None
+        self.sub.panel_type = 'main'
+        self.sub.power_source = self.source
+        self.sub.save()
+        Load.objects.get(name='Lights').delete()
+        self.assertAlmostEqual(Panel.objects.get(id=self.panel.id).rollup_demand_ampacity, 40)
+        self.assertAlmostEqual(Panel.objects.get(id=self.sub.id).rollup_demand_ampacity, 10)
+        self.assertEqual(rebuild_rollups(), (0, 0))
+
+    def test_exposed_on_panels_breakers_and_sources(self):
+        info = self.client.get(f'/api/panels/{self.sub.id}/').json()['total_loads_info']
+        self.assertAlmostEqual(info['demand_ampacity'], 20)
+        self.assertAlmostEqual(info['diversified_demand'], 20 * info['diversity_factor'])
+
+        expected = {
+            self.breaker.id: 10,
+            self.feeder.id: 20 * Panel.diversity_factor(1),
+            self.main_breaker.id: 50 * Panel.diversity_factor(0),
+            self.source_breaker.id: 50 * Panel.diversity_factor(0),
+        }
+        listed = {row['id']: row['diversified_demand'] for row in self.client.get('/api/circuitbreakers/').json()['results']}
+        for breaker_id, demand in expected.items():
+            self.assertAlmostEqual(listed[breaker_id], demand)
+            detail = self.client.get(f'/api/circuitbreakers/{breaker_id}/').json()
+            self.assertAlmostEqual(detail['diversified_demand'], demand)
+
+        source = self.client.get(f'/api/powersources/{self.source.id}/').json()
+        self.assertAlmostEqual(source['diversified_demand'], 50 * Panel.diversity_factor(0))
+
+    def test_configurable_factors(self):
+        with self.settings(NETWORK_DEMAND_FACTORS={'outlet': 1.0}, NETWORK_PANEL_DIVERSITY_FACTORS=(1.0,)):
+            self.assertEqual(rebuild_rollups(), (2, 1))
+            panel = Panel.objects.get(id=self.panel.id)
+            self.assertAlmostEqual(panel.get_diversified_demand(), 60)
+
+
+
+class EnergyReportTests(NetworkTestCase):
+    """
+    التحقق من تقارير الطاقة والتكلفة المجمعة في قاعدة البيانات مقابل دوال الحمل لكل صف
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(2)
+        Load.objects.create(name='Heater', voltage='11KV', ampacity=2, estimated_usage_hours=5, load_type='heater')
+        Load.objects.filter(name='L-2-0-0-0').update(power_consumption=0, load_type='lighting')
+        Load.objects.filter(name='L-2-1-1-1').update(load_type='pump', estimated_usage_hours=12.5)
+
+    def test_report_matches_per_load_methods(self):
+        loads = list(Load.objects.select_related('panel'))
+        with CaptureQueriesContext(connection) as context:
+            report = self.client.get('/api/network/energy_report/?price_per_kwh=0.25').json()
+        # استعلام مراجعة الشبكة للطلبات الشرطية + أربعة استعلامات للتقرير مهما زاد عدد الأحمال
+        self.assertLessEqual(len(context.captured_queries), 5)
+
+        self.assertEqual(report['summary']['load_count'], len(loads))
+        self.assertAlmostEqual(report['summary']['daily_kwh'], sum(load.calculate_daily_consumption() for load in loads))
+        self.assertAlmostEqual(
+            report['summary']['monthly_cost'], sum(load.calculate_monthly_cost(price_per_kwh=0.25) for load in loads)
+        )
+
+        by_type = {row['load_type']: row for row in report['by_load_type']}
+        self.assertAlmostEqual(by_type['heater']['daily_kwh'], 11000 * 2 * 0.85 * 5 / 1000)
+        self.assertAlmostEqual(
+            by_type['pump']['daily_kwh'], Load.objects.get(name='L-2-1-1-1').calculate_daily_consumption()
+        )
+
+        for row in report['by_panel']:
+            panel = Panel.objects.get(id=row['id'])
+            subtree = [load for load in loads if load.panel_id and load.panel.tree_path.startswith(panel.tree_path)]
+            self.assertEqual(row['load_count'], len(subtree), panel.name)
+            self.assertAlmostEqual(row['daily_kwh'], sum(load.calculate_daily_consumption() for load in subtree))
+
+        source = report['by_source'][0]
+        self.assertEqual(source['load_count'], len(loads) - 1)
+
+    def test_group_filter(self):
+        report = self.client.get('/api/network/energy_report/?group=source').json()
+        self.assertEqual(set(report), {'summary', 'by_source'})
+        self.assertEqual(self.client.get('/api/network/energy_report/?group=breaker').status_code, 400)
+
+
+class TariffTests(NetworkTestCase):
+    """
+    التحقق من محرك التعرفة: السعر الافتراضي الثابت، والتعرفة الزمنية، وتعرفة نوع المصدر، والشرائح
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.grid = PowerSource.objects.create(name='Grid', source_type='Local Grid', voltage='380', total_ampacity=400)
+        self.generator = PowerSource.objects.create(name='Gen', source_type='Generator', voltage='380', total_ampacity=200)
+        self.grid_panel = Panel.objects.create(
+            name='MDB', panel_type='main', power_source=self.grid, voltage='380', ampacity=250
+        )
+        self.sub = Panel.objects.create(name='SDB', panel_type='sub', parent_panel=self.grid_panel, voltage='220', ampacity=63)
+        self.gen_panel = Panel.objects.create(
+            name='EDB', panel_type='main', power_source=self.generator, voltage='380', ampacity=100
+        )
+        # مكتب من الساعة 8 إلى 16، وإنارة ليلية من منحنى نوعها، وحمل على المولد، وحمل بدون لوحة
+        self.office = Load.objects.create(
+            name='Office', panel=self.sub, voltage='220', power_consumption=1000, estimated_usage_hours=8
+        )
+        self.lamp = Load.objects.create(
+            name='Lamp', panel=self.grid_panel, voltage='220', power_consumption=2000, load_type='lighting'
+        )
+        self.pump = Load.objects.create(
+            name='Pump', panel=self.gen_panel, voltage='220', power_consumption=500, estimated_usage_hours=4
+        )
+        self.spare = Load.objects.create(name='Spare', voltage='220', ampacity=5, estimated_usage_hours=2)
+        profile = LoadProfile(name='Night', load_type='lighting')
+        profile.values = [1.0 if hour >= 18 or hour < 6 else 0.0 for hour in range(24)]
+        profile.save()
+
+    def cost(self, load):
+        return study_costs().load_cost(load.id)
+
+    def test_flat_default_matches_fixed_price(self):
+        # بدون تعرفات ولا منحنيات تساوي التكلفة الحساب بسعر ثابت وساعات التشغيل
+        LoadProfile.objects.all().delete()
+        for load in Load.objects.all():
+            self.assertAlmostEqual(self.cost(load), load.calculate_monthly_cost())
+        detail = self.client.get(f'/api/loads/{self.office.id}/').json()
+        self.assertAlmostEqual(detail['monthly_cost'], Load.objects.get(id=self.office.id).calculate_monthly_cost())
+
+    def test_time_of_use_and_source_type_tariffs(self):
+        response = self.client.post('/api/tariffs/', {
+            'name': 'Grid TOU', 'power_source': self.grid.id, 'base_price': 0.1,
+            'bands': [{'name': 'peak', 'start_hour': 12, 'end_hour': 16, 'price': 0.3},
+                      {'name': 'night', 'start_hour': 22, 'end_hour': 6, 'price': 0.05}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.client.post('/api/tariffs/', {'name': 'Fuel', 'source_type': 'Generator', 'base_price': 0.5}, format='json')
+        self.assertEqual(
+            self.client.post('/api/tariffs/', {'name': 'Bad', 'base_price': 0.5}, format='json').status_code, 400
+        )
+
+        # المكتب: 4 ساعات بسعر 0.1 و 4 ساعات ذروة بسعر 0.3 يومياً
+        self.assertAlmostEqual(self.cost(self.office), 1.0 * (4 * 0.1 + 4 * 0.3) * 30)
+        # الإنارة: 4 ساعات بسعر 0.1 (18 إلى 22) و 8 ساعات ليلية بسعر 0.05
+        self.assertAlmostEqual(self.cost(self.lamp), 2.0 * (4 * 0.1 + 8 * 0.05) * 30)
+        self.assertAlmostEqual(self.cost(self.pump), 0.5 * 4 * 30 * 0.5)
+        # الحمل الواحد في الواجهة بنفس قيمة دراسة التكلفة، والدالة في النموذج بالسعر الثابت
+        self.assertAlmostEqual(self.client.get(f'/api/loads/{self.pump.id}/').json()['monthly_cost'], self.cost(self.pump))
+
+        report = self.client.get('/api/network/cost_report/').json()
+        by_source = {row['name']: row for row in report['by_source']}
+        self.assertEqual(by_source['Grid']['tariff'], 'Grid TOU')
+        self.assertEqual(by_source['Gen']['tariff'], 'Fuel')
+        self.assertAlmostEqual(by_source['Gen']['monthly_cost'], 30.0)
+        by_panel = {row['name']: row for row in report['by_panel']}
+        self.assertAlmostEqual(by_panel['MDB']['monthly_cost'], by_source['Grid']['monthly_cost'])
+        self.assertAlmostEqual(by_panel['SDB']['monthly_kwh'], 8 * 30)
+        self.assertAlmostEqual(
+            report['summary']['monthly_cost'], sum(self.cost(load) for load in Load.objects.all())
+        )
+        self.assertEqual(self.client.get('/api/network/cost_report/?group=breaker').status_code, 400)
+
+    def test_tiered_tariff(self):
+        tariff = Tariff.objects.create(name='Blocks', source_type='Local Grid', base_price=0.1)
+        TariffTier.objects.create(tariff=tariff, up_to_kwh=300, price=0.1)
+        TariffTier.objects.create(tariff=tariff, up_to_kwh=None, price=0.2)
+        # طاقة المصدر الشهرية: المكتب 240 + الإنارة 720 = 960 كيلو واط ساعة
+        source = {row['name']: row for row in study_costs().rows(groups=['source'])['by_source']}['Grid']
+        self.assertAlmostEqual(source['monthly_kwh'], 960)
+        self.assertAlmostEqual(source['monthly_cost'], 300 * 0.1 + 660 * 0.2)
+        self.assertAlmostEqual(self.cost(self.office), 240 * source['average_price'])
+
+
+class ScenarioTests(NetworkTestCase):
+    """
+    التحقق من سيناريوهات "ماذا لو": التقييم في الذاكرة دون كتابة، ومطابقة نتائجه للتعديل الفعلي
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.source = build_network(2)
+        self.sub = Panel.objects.get(name='SDB-2-0-1')
+        self.changes = [
+            {'action': 'add', 'kind': 'breaker', 'key': 'line-breaker', 'fields': {'panel': self.sub.id, 'rated_current': 40}},
+            {'action': 'add', 'kind': 'load', 'key': 'line', 'fields': {
+                'panel': self.sub.id, 'breaker': 'line-breaker', 'ampacity': 32, 'voltage': '380',
+                'load_type': 'machine', 'cable_length': 40, 'cable_cross_section': 6,
+            }},
+            {'action': 'modify', 'kind': 'panel', 'id': self.sub.id, 'fields': {'cable_length': 60, 'cable_cross_section': 16}},
+        ]
+
+    def preview(self, changes):
+        return self.client.post('/api/scenarios/preview/', {'changes': changes}, format='json')
+
+    def test_evaluation_writes_nothing(self):
+        counts = [model.objects.count() for model in (PowerSource, Panel, CircuitBreaker, Load)]
+        revision = NetworkRevision.current()
+        with CaptureQueriesContext(connection) as context:
+            response = self.preview(self.changes)
+        self.assertEqual(response.status_code, 200, response.content)
+        writes = [query['sql'] for query in context.captured_queries if not query['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertEqual(writes, [])
+        self.assertEqual(counts, [model.objects.count() for model in (PowerSource, Panel, CircuitBreaker, Load)])
+        self.assertEqual(revision, NetworkRevision.current())
+
+        report = response.json()
+        panels = {row['name']: row for row in report['panels']}
+        self.assertEqual(panels['SDB-2-0-1']['after']['rollup_ampacity'], panels['SDB-2-0-1']['before']['rollup_ampacity'] + 32)
+        self.assertEqual(panels['MDB-2-0']['after']['rollup_load_count'], panels['MDB-2-0']['before']['rollup_load_count'] + 1)
+        self.assertNotIn('MDB-2-1', panels)
+        added = {row['id']: row for row in report['loads'] if row['status'] == 'added'}
+        self.assertEqual(set(added), {'line'})
+        self.assertEqual(report['summary']['added'], 2)
+
+    def test_scenario_matches_applied_changes(self):
+        scenario = self.client.post('/api/scenarios/', {'name': 'New line', 'changes': self.changes}, format='json')
+        self.assertEqual(scenario.status_code, 201, scenario.content)
+        report = self.client.get(f"/api/scenarios/{scenario.json()['id']}/evaluate/").json()
+
+        # تطبيق نفس التغييرات فعلياً ثم مقارنة الإجماليات المخزنة وهبوط الجهد بنتائج السيناريو
+        breaker = CircuitBreaker.objects.create(name='line-breaker', panel=self.sub, rated_current=40)
+        load = Load.objects.create(
+            name='line', panel=self.sub, breaker=breaker, ampacity=32, voltage='380', load_type='machine',
+            cable_length=40, cable_cross_section=6,
+        )
+        Panel.objects.filter(id=self.sub.id).update(cable_length=60, cable_cross_section=16)
+        NetworkRevision.bump()
+
+        for row in report['panels']:
+            panel = Panel.objects.get(name=row['name'])
+            self.assertAlmostEqual(row['after']['rollup_ampacity'], panel.rollup_ampacity)
+            self.assertAlmostEqual(row['after']['rollup_demand_ampacity'], panel.rollup_demand_ampacity)
+            self.assertAlmostEqual(
+                row['after']['cumulative_voltage_drop_percentage'],
+                panel.get_cumulative_voltage_drop()['voltage_drop_percentage']
+            )
+        line = next(row for row in report['loads'] if row['id'] == 'line')
+        self.assertAlmostEqual(
+            line['after']['cumulative_voltage_drop_percentage'],
+            Load.objects.get(id=load.id).get_cumulative_voltage_drop()['voltage_drop_percentage']
+        )
+        line_breaker = next(row for row in report['breakers'] if row['id'] == 'line-breaker')
+        self.assertAlmostEqual(line_breaker['after']['utilization_percentage'], 32 / 40 * 100)
+
+    def test_remove_cascades_and_invalid_changes(self):
+        main = Panel.objects.get(name='MDB-2-0')
+        report = self.preview([{'action': 'remove', 'kind': 'panel', 'id': main.id}]).json()
+        removed_panels = {row['name'] for row in report['panels'] if row['status'] == 'removed'}
+        self.assertEqual(removed_panels, {'MDB-2-0', 'SDB-2-0-0', 'SDB-2-0-1'})
+        self.assertEqual(sum(1 for row in report['loads'] if row['status'] == 'removed'), 4)
+        sources = {row['name']: row for row in report['sources']}
+        self.assertEqual(sources['Grid-2']['after']['load_ampacity'], 40)
+
+        self.assertEqual(self.preview([{'action': 'modify', 'kind': 'panel', 'id': main.id, 'fields': {'tree_path': 'x'}}]).status_code, 400)
+        self.assertEqual(self.preview([{'action': 'remove', 'kind': 'load', 'id': 999999}]).status_code, 400)
+        response = self.client.post('/api/scenarios/', {'name': 'Bad', 'changes': [{'action': 'drop', 'kind': 'load'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        # القيم الفارغة للحقول الإلزامية والقيم خارج الاختيارات
+        load = Load.objects.get(name='L-2-1-0-0')
+        for fields in (
+            {'power_factor': None, 'power_consumption': 0}, {'phase': 'L9'}, {'load_type': 'zzz'}, {'cable_path': 'nope'}
+        ):
+            self.assertEqual(self.preview([{'action': 'modify', 'kind': 'load', 'id': load.id, 'fields': fields}]).status_code, 400)
+        response = self.client.post('/api/scenarios/', {'name': 'Bad', 'changes': [
+            {'action': 'modify', 'kind': 'load', 'id': load.id, 'fields': {'power_factor': None}}
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ContingencyTests(NetworkTestCase):
+    """
+    التحقق من دراسة الطوارئ N-1: الأحمال المفقودة عند فصل كل قاطع أو مصدر مع احتساب التغذية البديلة
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.source = build_network(2)
+        self.main = CircuitBreaker.objects.get(name='MB-2-0')
+        self.feeder = CircuitBreaker.objects.get(name='F-2-0-0')
+        # القاطع B-2-0-1-0 يغذى أيضاً من القاطع المغذي الآخر (تغذية بديلة)
+        self.dual = CircuitBreaker.objects.get(name='B-2-0-1-0')
+        self.dual.feeding_breakers.add(self.feeder)
+
+    def test_trips_with_alternative_feeds(self):
+        study = ContingencyStudy()
+        feeder = study.detail('breaker', self.feeder.id)
+        self.assertEqual({load['name'] for load in feeder['lost_loads']}, {'L-2-0-0-0', 'L-2-0-0-1'})
+        self.assertEqual(feeder['shed_ampacity'], 20)
+        self.assertEqual(feeder['rerouted_load_count'], 1)
+
+        other = study.detail('breaker', CircuitBreaker.objects.get(name='F-2-0-1').id)
+        self.assertEqual({load['name'] for load in other['lost_loads']}, {'L-2-0-1-1'})
+
+        self.assertEqual(study.detail('breaker', self.main.id)['lost_load_count'], 4)
+        self.assertEqual(study.detail('source', self.source.id)['lost_load_count'], 8)
+        self.assertEqual(study.detail('breaker', self.dual.id)['lost_load_count'], 1)
+        self.assertEqual(study.summary()['worst']['kind'], 'source')
+
+    def test_process_pool_matches_serial(self):
+        serial = ContingencyStudy(workers=1)
+        parallel = ContingencyStudy(workers=2, min_parallel=0)
+        self.assertEqual(serial.rows(), parallel.rows())
+        self.assertEqual(parallel.summary()['workers'], 2)
+
+    def test_endpoint(self):
+        response = self.client.get('/api/network/contingency/?kind=breaker&min_shed_ampacity=15')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertTrue(all(row['kind'] == 'breaker' and row['shed_ampacity'] >= 15 for row in results))
+        self.assertEqual(results[0]['name'], 'MB-2-0')
+        detail = self.client.get(f'/api/network/contingency/?kind=breaker&id={self.feeder.id}').json()
+        self.assertEqual(detail['lost_load_count'], 2)
+        self.assertEqual(self.client.get('/api/network/contingency/?kind=panel').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/network/contingency/?id={self.feeder.id}').status_code, 400)
+
+
+class ImpactIndexTests(NetworkTestCase):
+    """
+    التحقق من فهرس التأثير: قيم محفوظة لكل قاطع ولوحة تبطل فقط على مسار التغذية فوق العنصر المتغير
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(2)
+        read_cache.clear()
+        read_cache.reset_stats()
+        self.main = CircuitBreaker.objects.get(name='MB-2-0')
+        self.feeder = CircuitBreaker.objects.get(name='F-2-0-0')
+        self.other_feeder = CircuitBreaker.objects.get(name='F-2-0-1')
+        self.sub_panel = Panel.objects.get(name='SDB-2-0-0')
+
+    def test_entry_contents(self):
+        feeder = get_impact('breaker', self.feeder.id)
+        self.assertEqual([panel['name'] for panel in feeder['panels']], ['SDB-2-0-0'])
+        self.assertEqual({load['name'] for load in feeder['loads']}, {'L-2-0-0-0', 'L-2-0-0-1'})
+        self.assertEqual((feeder['load_count'], feeder['total_ampacity'], feeder['breaker_count']), (2, 20, 2))
+        self.assertEqual(feeder['load_types'], [{'load_type': 'other', 'count': 2, 'ampacity': 20.0}])
+
+        main_panel = get_impact('panel', Panel.objects.get(name='MDB-2-0').id)
+        self.assertEqual(main_panel['panel_count'], 3)
+        self.assertEqual(main_panel['total_ampacity'], 40)
+        self.assertIsNone(get_impact('panel', 0))
+
+    def test_lookup_is_cached_and_invalidated_along_the_chain(self):
+        entries = {
+            breaker.name: get_impact('breaker', breaker.id)
+            for breaker in (self.main, self.feeder, self.other_feeder)
+        }
+        with self.assertNumQueries(0):
+            self.assertEqual(get_impact('breaker', self.feeder.id), entries['F-2-0-0'])
+
+        Load.objects.create(name='L-new', panel=self.sub_panel, load_type='lighting', ampacity=5, voltage='220')
+        with self.assertNumQueries(0):
+            # فرع آخر من نفس اللوحة الرئيسية لم يتأثر
+            self.assertEqual(get_impact('breaker', self.other_feeder.id), entries['F-2-0-1'])
+        self.assertEqual(get_impact('breaker', self.feeder.id)['total_ampacity'], 25)
+        self.assertEqual(get_impact('breaker', self.main.id)['total_ampacity'], 45)
+
+        # التغذية البديلة تنقل الحمل من المفقود إلى ما بقي موصولاً
+        CircuitBreaker.objects.get(name='B-2-0-0-0').feeding_breakers.add(self.other_feeder)
+        feeder = get_impact('breaker', self.feeder.id)
+        self.assertEqual((feeder['load_count'], feeder['rerouted_load_count']), (2, 1))
+
+    def test_removing_alternate_feed_invalidates_other_feeders(self):
+        # حذف المغذي البديل يحذف علاقة التغذية دون إشارة m2m_changed، والمغذي الآخر لا يقع فوقه
+        breaker = CircuitBreaker.objects.get(name='B-2-0-0-0')
+        breaker.feeding_breakers.add(self.other_feeder)
+        feeder = get_impact('breaker', self.feeder.id)
+        self.assertEqual((feeder['load_count'], feeder['total_ampacity']), (1, 10))
+
+        self.other_feeder.delete()
+        feeder = get_impact('breaker', self.feeder.id)
+        self.assertEqual((feeder['load_count'], feeder['total_ampacity'], feeder['rerouted_load_count']), (2, 20, 0))
+
+    def test_upstream_change_invalidates_entries_below(self):
+        # فصل اللوحة الرئيسية عن مصدرها يغير حالة تغذية ما تحتها
+        feeder = CircuitBreaker.objects.get(name='F-2-1-1')
+        cached = get_impact('breaker', feeder.id)
+        self.assertEqual((cached['energized'], cached['load_count']), (True, 2))
+        panel = Panel.objects.get(name='MDB-2-1')
+        panel.power_source = None
+        panel.save()
+        entry = get_impact('breaker', feeder.id)
+        self.assertEqual(entry, impact_entry(SupplyNetwork(), 'breaker', feeder.id))
+        self.assertEqual((entry['energized'], entry['load_count']), (False, 0))
+
+    def test_losing_alternate_feed_upstream_invalidates_other_feeders(self):
+        # التغذية البديلة من شجرة أخرى تنقطع بفصل لوحتها الرئيسية
+        CircuitBreaker.objects.get(name='B-2-0-0-0').feeding_breakers.add(CircuitBreaker.objects.get(name='F-2-1-0'))
+        self.assertEqual(get_impact('breaker', self.feeder.id)['load_count'], 1)
+        panel = Panel.objects.get(name='MDB-2-1')
+        panel.power_source = None
+        panel.save()
+        self.assertEqual(get_impact('breaker', self.feeder.id)['load_count'], 2)
+
+    def test_endpoint(self):
+        response = self.client.get('/api/network/impact/?kind=panel&min_ampacity=20')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results[0]['name'], 'MDB-2-0')
+        self.assertTrue(all(row['total_ampacity'] >= 20 and 'loads' not in row for row in results))
+        detail = self.client.get(f'/api/network/impact/?id={self.feeder.id}').json()
+        self.assertEqual(detail['load_count'], 2)
+        self.assertEqual(self.client.get('/api/network/impact/?kind=load').status_code, 400)
+        self.assertEqual(self.client.get('/api/network/impact/?kind=panel&id=0').status_code, 404)
+
+
+class GeneratorBackupTests(NetworkTestCase):
+    """
+    التحقق من خطة المولدات: الأحمال المنقولة إلى كل مولد وترتيب فصلها حسب الأولوية عند تجاوز السعة
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.grid = build_network(2)
+        self.generator = PowerSource.objects.create(name='Gen', source_type='Generator', voltage='380', total_ampacity=25)
+        for name, priority in (
+            ('L-2-0-0-0', 'critical'), ('L-2-0-0-1', 'essential'), ('L-2-0-1-0', 'normal'), ('L-2-0-1-1', 'deferrable')
+        ):
+            Load.objects.filter(name=name).update(priority=priority)
+        Panel.objects.filter(name='MDB-2-0').update(backup_source=self.generator)
+        # لوحة منقولة داخل الشجرة السابقة إلى مولد آخر بدون سعة مسجلة
+        self.unrated = PowerSource.objects.create(name='Gen-2', source_type='Generator', voltage='380')
+        Panel.objects.filter(name='SDB-2-1-0').update(backup_source=self.unrated)
+
+    def test_priority_shedding(self):
+        plan = BackupPlan()
+        generator = plan.detail(self.generator.id)
+        self.assertEqual(generator['status'], 'overloaded')
+        self.assertEqual((generator['load_count'], generator['demand_ampacity']), (4, 40))
+        self.assertEqual((generator['carried_load_count'], generator['carried_ampacity']), (2, 20))
+        self.assertEqual(
+            [(step['name'], step['remaining_demand_ampacity']) for step in generator['shedding_order']],
+            [('L-2-0-1-1', 30), ('L-2-0-1-0', 20)]
+        )
+        critical = generator['by_priority'][0]
+        self.assertEqual((critical['priority'], critical['carried_load_count']), ('critical', 1))
+
+        unrated = plan.detail(self.unrated.id)
+        self.assertEqual((unrated['status'], unrated['load_count'], unrated['shed_load_count']), ('unrated', 2, 0))
+        self.assertIsNone(plan.detail(self.grid.id))
+
+    def test_endpoint(self):
+        response = self.client.get('/api/network/generator_backup/?status=overloaded')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([row['name'] for row in body['results']], ['Gen'])
+        self.assertEqual(body['summary']['shed_loads'], 2)
+        detail = self.client.get(f'/api/network/generator_backup/?id={self.generator.id}').json()
+        self.assertEqual(len(detail['shedding_order']), 2)
+        self.assertEqual(self.client.get('/api/network/generator_backup/?status=idle').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/network/generator_backup/?id={self.grid.id}').status_code, 404)
+
+        panel = Panel.objects.get(name='SDB-2-1-1')
+        response = self.client.patch(f'/api/panels/{panel.id}/', {'backup_source': self.grid.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkSaveTests(NetworkTestCase):
+    """
+    التحقق من الإنشاء والتعديل المجمع: آثار save() على الدفعة، وأخطاء كل عنصر، وعدد استعلامات لا يزيد مع عدد العناصر
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        build_network(1)
+        self.source = PowerSource.objects.create(name='Grid-bulk', voltage='380', total_ampacity=400)
+        self.panel = Panel.objects.create(name='MDB-bulk', panel_type='main', power_source=self.source, ampacity=250, voltage='380')
+
+    def breakers(self, count, start=0):
+        return [{'name': f'BB-{i}', 'rated_current': 16, 'position': i} for i in range(start, start + count)]
+
+    def test_panel_breakers_with_main_wiring(self):
+        items = [{'name': 'BB-main', 'breaker_role': 'main', 'rated_current': 250}] + self.breakers(3)
+        response = self.client.post(f'/api/panels/{self.panel.id}/breakers/', items, format='json')
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], [row['name'] for row in body['results']][:2]), (4, ['BB-main', 'BB-0']))
+        self.panel.refresh_from_db()
+        self.assertEqual(self.panel.main_breaker.name, 'BB-main')
+        self.assertEqual(CircuitBreaker.objects.filter(panel=self.panel).count(), 4)
+
+        # قاطع رئيسي ثانٍ للوحة نفسها خطأ في عنصره فقط
+        response = self.client.post(
+            '/api/circuitbreakers/bulk/',
+            [{'name': 'BB-x', 'panel': self.panel.id}, {'name': 'BB-main-2', 'panel': self.panel.id, 'breaker_role': 'main'}],
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertIsNone(errors[0])
+        self.assertIn('breaker_role', errors[1])
+        self.assertFalse(CircuitBreaker.objects.filter(name='BB-x').exists())
+
+    def test_main_breaker_of_fed_panel_gets_feeder_link(self):
+        # نفس Panel.save: القاطع المغذي من اللوحة الأم يغذي القاطع الرئيسي الجديد
+        feeder = CircuitBreaker.objects.create(name='BB-feeder', panel=self.panel, rated_current=63)
+        sub_panel = Panel.objects.create(
+            name='SDB-bulk', panel_type='sub', parent_panel=self.panel, feeder_breaker=feeder, ampacity=63, voltage='380'
+        )
+        breakers, errors = save_breakers([{'name': 'BB-sub-main', 'panel': sub_panel.id, 'breaker_role': 'main'}])
+        self.assertIsNone(errors)
+        sub_panel.refresh_from_db()
+        self.assertEqual(sub_panel.main_breaker_id, breakers[0].id)
+        self.assertEqual([breaker.name for breaker in breakers[0].feeding_breakers.all()], ['BB-feeder'])
+
+    def test_single_main_breaker_save_wires_panel(self):
+        # القاطع الجديد يحفظ قبل تعيينه قاطعاً رئيسياً للوحة
+        breaker = CircuitBreaker.objects.create(name='BB-single', panel=self.panel, breaker_role='main', rated_current=250)
+        self.panel.refresh_from_db()
+        self.assertEqual(self.panel.main_breaker_id, breaker.id)
+
+    def test_query_count_does_not_grow_with_items(self):
+        def count(items):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(f'/api/panels/{self.panel.id}/breakers/', items, format='json')
+            self.assertEqual(response.status_code, 201)
+            return len(queries)
+        self.assertEqual(count(self.breakers(3)), count(self.breakers(30, start=3)))
+
+    def test_loads_side_effects_and_errors(self):
+        breaker = CircuitBreaker.objects.create(name='BB-load', panel=self.panel, rated_current=32)
+        existing = Load.objects.get(name='L-1-0-0-0')
+        response = self.client.post('/api/loads/bulk/', {'items': [
+            {'name': 'LB-1', 'breaker': breaker.id, 'ampacity': 10, 'voltage': '380'},
+            {'name': 'LB-2', 'panel': self.panel.id, 'ampacity': 5},
+            {'id': existing.id, 'ampacity': 12},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['created'], response.json()['updated']), (2, 1))
+        first = Load.objects.get(name='LB-1')
+        self.assertEqual((first.panel_id, first.phase), (self.panel.id, '3P'))
+        self.assertAlmostEqual(first.power_consumption, 380 * 10 * 0.85)
+        self.panel.refresh_from_db()
+        breaker.refresh_from_db()
+        self.assertEqual((self.panel.rollup_load_count, self.panel.rollup_ampacity), (2, 15))
+        self.assertEqual(breaker.rollup_ampacity, 10)
+        existing.refresh_from_db()
+        self.assertEqual(existing.ampacity, 12)
+
+        response = self.client.post('/api/loads/bulk/', [
+            {'name': 'LB-3', 'panel': self.panel.id},
+            {'name': 'LB-1', 'panel': self.panel.id},
+            {'name': 'LB-4', 'panel': 0},
+            {'id': 0, 'ampacity': 1},
+            {'ampacity': 'x'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertIsNone(errors[0])
+        self.assertEqual([sorted(error) for error in errors[1:]], [['name'], ['panel'], ['id'], ['ampacity', 'name']])
+        self.assertFalse(Load.objects.filter(name='LB-3').exists())
+        self.assertEqual(self.client.post('/api/loads/bulk/', [], format='json').status_code, 400)
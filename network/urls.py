@@ -16,6 +16,10 @@ from .views import (
     PanelViewSet,              # فئة عرض اللوحات الكهربائية (رئيسية وفرعية)
     LoadViewSet,               # فئة عرض الأحمال الكهربائية
     CircuitBreakerViewSet,      # فئة عرض قواطع الدارة الكهربائية
+    LoadProfileViewSet,        # فئة عرض منحنيات التشغيل للأحمال
+    TariffViewSet,             # فئة عرض تعرفات الطاقة
+    ScenarioViewSet,           # فئة عرض سيناريوهات "ماذا لو"
+    NetworkViewSet,            # فئة عرض العمليات على مستوى الشبكة كاملة
     # Import the new view functions
     home_view,
     power_sources_view,
@@ -56,6 +60,10 @@ router.register(r'powersources', PowerSourceViewSet)  # مسار مصادر ال
 router.register(r'panels', PanelViewSet)  # مسار اللوحات (رئيسية وفرعية)
 router.register(r'loads', LoadViewSet)  # مسار الأحمال
 router.register(r'circuitbreakers', CircuitBreakerViewSet)  # مسار قواطع الدارة
+router.register(r'loadprofiles', LoadProfileViewSet)  # مسار منحنيات التشغيل
+router.register(r'tariffs', TariffViewSet)  # مسار تعرفات الطاقة
+router.register(r'scenarios', ScenarioViewSet)  # مسار سيناريوهات "ماذا لو"
+router.register(r'network', NetworkViewSet, basename='network')  # مسار عمليات الشبكة كاملة
 
 # تحديد قائمة المسارات النهائية للتطبيق
 urlpatterns = [
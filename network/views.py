@@ -4,21 +4,46 @@
 تم تحديثه ليدعم الهيكلية الشجرية للوحات وعلاقات التغذية المتعددة للقواطع
 """
 
+import zlib
+
 # استيراد الوظائف المطلوبة من Django REST framework
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import render, get_object_or_404
+from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 
 # استيراد النماذج وسيريلايزرز
-from .models import PowerSource, Panel, Load, CircuitBreaker
+from .models import PowerSource, Panel, Load, CircuitBreaker, LoadProfile, Tariff, Scenario, NetworkRevision
 from .serializers import (
     PowerSourceSerializer, PanelSerializer, LoadSerializer, 
     CircuitBreakerSerializer, CircuitBreakerBasicSerializer,
     PowerSourcePanelSerializer, PanelBreakerSerializer,
     BreakerLoadSerializer, ParentPanelChildSerializer,
-    BreakerFeedingSerializer, PanelBasicSerializer
+    BreakerFeedingSerializer, PanelBasicSerializer,
+    LoadProfileSerializer, TariffSerializer, ScenarioSerializer
 )
+from .pagination import LoadPagination, CircuitBreakerPagination
+from .services import read_cache
+from .services.backup import STATUSES as BACKUP_STATUSES, plan_generator_backup
+from .services.bulk import BulkError, save_breakers, save_loads
+from .services.cable_analysis import KINDS, RESULT_FIELDS, analyze_cables
+from .services.cable_sizing import DEFAULT_MAX_DROP_PERCENTAGE, DEFAULT_MAX_QUANTITY, apply_cable_sizing, size_cables
+from .services.contingency import KINDS as CONTINGENCY_KINDS, study_contingencies
+from .services.demand import KINDS as DEMAND_KINDS, study_demand
+from .services.energy import GROUPS as ENERGY_GROUPS, energy_report
+from .services.feed_graph import get_feed_graph
+from .services.impact import KINDS as IMPACT_KINDS, get_impact, impact_index
+from .services.load_flow import RESULT_FIELDS as LOAD_FLOW_FIELDS, solve_load_flow
+from .services.phase_balancing import MIN_IMPROVEMENT, apply_phase_balancing, plan_phase_balancing
+from .services.scenarios import ScenarioError, evaluate_scenario
+from .services.selectivity import STATUSES as SELECTIVITY_STATUSES, study_selectivity
+from .services.short_circuit import OK, INSUFFICIENT, UNRATED, UNKNOWN, study_short_circuit
+from .services.snapshot import build_network_snapshot
+from .services.tariffs import GROUPS as COST_GROUPS, study_costs
+from .services.tree import NetworkTree
 
 # View functions for HTML pages
 def home_view(request):
@@ -51,7 +76,132 @@ def panel_tree_visualizer_view(request):
 
 # ViewSets لكل نموذج - توفر CRUD operations بشكل تلقائي
 
-class PowerSourceViewSet(viewsets.ModelViewSet):
+class ConditionalGetMixin:
+    """
+    ميكسن يضيف ETag و Last-Modified لجميع طلبات القراءة اعتماداً على رقم مراجعة الشبكة
+    ويجيب بـ 304 (Not Modified) على If-None-Match / If-Modified-Since قبل تنفيذ أي مُسلسل
+    بحيث يكلف الطلب غير المتغير استعلاماً واحداً لقراءة رقم المراجعة
+    الإجراءات التي لا تعتمد استجابتها على بيانات الشبكة تستثنى في conditional_get_exempt_actions
+    """
+    conditional_get_exempt_actions = ()
+    
+    def get_network_etag(self, request, revision):
+        """ETag يعتمد على رقم المراجعة وعلى ترويسة Accept (لأن نفس المسار قد يعرض JSON أو الواجهة القابلة للتصفح)"""
+        accept = request.META.get('HTTP_ACCEPT', '')
+        return quote_etag(f"network-{revision}-{zlib.crc32(accept.encode('utf-8')):08x}")
+    
+    def dispatch(self, request, *args, **kwargs):
+        action_name = getattr(self, 'action_map', {}).get(request.method.lower())
+        if request.method not in ('GET', 'HEAD') or action_name in self.conditional_get_exempt_actions:
+            return super().dispatch(request, *args, **kwargs)
+        
+        revision, updated_at = NetworkRevision.current()
+        etag = self.get_network_etag(request, revision)
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+        
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # السماح للمتصفح بالاحتفاظ بالنسخة مع التحقق منها عند كل طلب
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+class ReadModelCacheMixin:
+    """
+    ميكسن يفعّل ذاكرة نموذج القراءة للمُسلسلات في طلبات القراءة
+    (المُسلسلات التي تستخدم CachedRepresentationMixin تعيد التمثيل المحفوظ إن وجد)
+    """
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        request = getattr(self, 'request', None)
+        context['read_cache'] = request is not None and request.method in ('GET', 'HEAD')
+        return context
+
+
+class EagerLoadingMixin:
+    """
+    ميكسن يجعل عدد الاستعلامات ثابتاً عند تسلسل القوائم
+    يطبق التحميل المسبق المعرف في المُسلسل (setup_eager_loading) على طلبات القراءة
+    ويضع شجرة الشبكة المحسوبة مسبقاً في سياق المُسلسل عند تسلسل قائمة
+    """
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # الإجراءات المخصصة على كائن واحد تحتاج الكائن نفسه فقط، لذلك لا نحمّل علاقاته مسبقاً
+        if self.request.method in ('GET', 'HEAD') and (not self.detail or self.action == 'retrieve'):
+            queryset = self.apply_eager_loading(self.get_serializer_class(), queryset)
+        return queryset
+    
+    def apply_eager_loading(self, serializer_class, queryset):
+        """
+        تطبيق التحميل المسبق الخاص بالمُسلسل على الاستعلام (إن وجد)
+        يقتصر التحميل على العلاقات التي تحتاجها الحقول المطلوبة عبر ?fields= و ?expand=
+        """
+        setup_eager_loading = getattr(serializer_class, 'setup_eager_loading', None)
+        if not setup_eager_loading:
+            return queryset
+        field_names = set(serializer_class(context=self.get_serializer_context()).fields)
+        return setup_eager_loading(queryset, field_names)
+    
+    def get_list_serializer_context(self):
+        """سياق المُسلسل عند تسلسل قائمة: يضيف شجرة الشبكة الخاصة بهذا الطلب"""
+        context = self.get_serializer_context()
+        context['network_tree'] = NetworkTree()
+        return context
+    
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many'):
+            kwargs.setdefault('context', self.get_list_serializer_context())
+        return super().get_serializer(*args, **kwargs)
+    
+    def serialize_list(self, serializer_class, queryset):
+        """تسلسل قائمة بمُسلسل غير المُسلسل الافتراضي للـ ViewSet بعدد ثابت من الاستعلامات"""
+        queryset = self.apply_eager_loading(serializer_class, queryset)
+        return serializer_class(queryset, many=True, context=self.get_list_serializer_context()).data
+    
+    def paginated_list_response(self, queryset):
+        """إرجاع قائمة مُرقّمة الصفحات (إن كان للـ ViewSet ترقيم صفحات) كما في إجراء list الافتراضي"""
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+    
+    def bulk_save_response(self, save, serializer_class, items, defaults=None):
+        """
+        تنفيذ إنشاء أو تعديل مجمع (services/bulk.py) وإرجاع العناصر المحفوظة بترتيب الطلب،
+        أو أخطاء كل عنصر بنفس الترتيب (None للعنصر الصالح) دون كتابة أي شيء
+        """
+        try:
+            objects, errors = save(items, defaults)
+        except BulkError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        model = serializer_class.Meta.model
+        saved = {
+            item['id']: item
+            for item in self.serialize_list(serializer_class, model.objects.filter(id__in=[obj.pk for obj in objects]))
+        }
+        created = sum(1 for item in items if 'id' not in item)
+        return Response({
+            'created': created,
+            'updated': len(objects) - created,
+            'results': [saved[obj.pk] for obj in objects],
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class PowerSourceViewSet(ConditionalGetMixin, ReadModelCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     واجهة برمجية لإدارة مصادر الطاقة (مثل الشبكة المحلية، المولدات)
     توفر عمليات إنشاء، قراءة، تحديث، وحذف لمصادر الطاقة
@@ -80,8 +230,7 @@ class PowerSourceViewSet(viewsets.ModelViewSet):
             if request.method == 'GET':
                 # جلب اللوحات المرتبطة بمصدر الطاقة
                 panels = Panel.objects.filter(power_source=powersource)
-                serializer = PanelSerializer(panels, many=True)
-                return Response(serializer.data)
+                return Response(self.serialize_list(PanelSerializer, panels))
             
             elif request.method == 'POST':
                 try:
@@ -195,8 +344,7 @@ class PowerSourceViewSet(viewsets.ModelViewSet):
             if request.method == 'GET':
                 # جلب القواطع المرتبطة بمصدر الطاقة
                 breakers = CircuitBreaker.objects.filter(power_source=powersource)
-                serializer = CircuitBreakerSerializer(breakers, many=True)
-                return Response(serializer.data)
+                return Response(self.serialize_list(CircuitBreakerSerializer, breakers))
             
             elif request.method == 'POST':
                 try:
@@ -257,7 +405,7 @@ class PowerSourceViewSet(viewsets.ModelViewSet):
             return Response({'error': f'حدث خطأ: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class PanelViewSet(viewsets.ModelViewSet):
+class PanelViewSet(ConditionalGetMixin, ReadModelCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     واجهة برمجية لإدارة اللوحات الكهربائية (رئيسية وفرعية)
     توفر عمليات إنشاء، قراءة، تحديث، وحذف للوحات
@@ -279,10 +427,12 @@ class PanelViewSet(viewsets.ModelViewSet):
             if request.method == 'GET':
                 # جلب القواطع المرتبطة باللوحة
                 breakers = CircuitBreaker.objects.filter(panel=panel)
-                serializer = CircuitBreakerSerializer(breakers, many=True)
-                return Response(serializer.data)
+                return Response(self.serialize_list(CircuitBreakerSerializer, breakers))
             
             elif request.method == 'POST':
+                if isinstance(request.data, list):
+                    # قائمة قواطع: إنشاء مجمع في معاملة واحدة مع أخطاء كل عنصر
+                    return self.bulk_save_response(save_breakers, CircuitBreakerSerializer, request.data, {'panel': panel.id})
                 try:
                     # استخدام السيريلايزر المخصص لإنشاء قاطع للوحة
                     serializer = PanelBreakerSerializer(
@@ -318,9 +468,8 @@ class PanelViewSet(viewsets.ModelViewSet):
             
             if request.method == 'GET':
                 # جلب اللوحات الفرعية المباشرة
-                child_panels = panel.child_panels.all()
-                serializer = PanelSerializer(child_panels, many=True)
-                return Response(serializer.data)
+                child_panels = Panel.objects.filter(parent_panel=panel)
+                return Response(self.serialize_list(PanelSerializer, child_panels))
             
             elif request.method == 'POST':
                 # استخدام السيريلايزر المخصص لإنشاء لوحة فرعية
@@ -464,15 +613,33 @@ class PanelViewSet(viewsets.ModelViewSet):
             
         except CircuitBreaker.DoesNotExist:
             return Response({'error': 'القاطع غير موجود'}, status=status.HTTP_404_NOT_FOUND)
+    
+    @action(detail=False, methods=['get'])
+    def by_utilization(self, request):
+        """
+        تصفية اللوحات التي تتجاوز نسبة استخدامها حداً معيناً (80% افتراضياً)
+        تعتمد على الإجماليات المخزنة لذلك تنفذ كشرط واحد في قاعدة البيانات
+        """
+        try:
+            min_percentage = float(request.query_params.get('min_percentage', 80))
+        except ValueError:
+            return Response({'error': 'نسبة الاستخدام يجب أن تكون رقماً'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        panels = self.get_queryset().filter(
+            ampacity__gt=0, rollup_ampacity__gte=F('ampacity') * (min_percentage / 100)
+        )
+        serializer = self.get_serializer(panels, many=True)
+        return Response(serializer.data)
 
 
-class LoadViewSet(viewsets.ModelViewSet):
+class LoadViewSet(ConditionalGetMixin, ReadModelCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     واجهة برمجية لإدارة الأحمال الكهربائية
     توفر عمليات إنشاء، قراءة، تحديث، وحذف للأحمال
     """
     queryset = Load.objects.all()  # جلب جميع كائنات الأحمال
     serializer_class = LoadSerializer  # تحديد السيريلايزر المستخدم
+    pagination_class = LoadPagination  # ترقيم الصفحات بالمؤشر حسب المعرف
     
     @action(detail=False, methods=['get'])
     def by_panel(self, request):
@@ -485,9 +652,8 @@ class LoadViewSet(viewsets.ModelViewSet):
         
         try:
             panel = Panel.objects.get(id=panel_id)
-            loads = Load.objects.filter(panel=panel)
-            serializer = self.get_serializer(loads, many=True)
-            return Response(serializer.data)
+            loads = self.get_queryset().filter(panel=panel)
+            return self.paginated_list_response(loads)
         except Panel.DoesNotExist:
             return Response({'error': 'اللوحة غير موجودة'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -502,9 +668,8 @@ class LoadViewSet(viewsets.ModelViewSet):
         
         try:
             breaker = CircuitBreaker.objects.get(id=breaker_id)
-            loads = Load.objects.filter(breaker=breaker)
-            serializer = self.get_serializer(loads, many=True)
-            return Response(serializer.data)
+            loads = self.get_queryset().filter(breaker=breaker)
+            return self.paginated_list_response(loads)
         except CircuitBreaker.DoesNotExist:
             return Response({'error': 'القاطع غير موجود'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -517,12 +682,21 @@ class LoadViewSet(viewsets.ModelViewSet):
         if not load_type:
             return Response({'error': 'يجب تحديد نوع الحمل'}, status=status.HTTP_400_BAD_REQUEST)
         
-        loads = Load.objects.filter(load_type=load_type)
-        serializer = self.get_serializer(loads, many=True)
-        return Response(serializer.data)
+        loads = self.get_queryset().filter(load_type=load_type)
+        return self.paginated_list_response(loads)
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        إنشاء وتعديل مجموعة أحمال في طلب واحد ومعاملة واحدة
+        الجسم قائمة عناصر (أو {"items": [...]})، والعنصر الذي يحمل id تعديل جزئي والباقي إنشاء
+        أي خطأ يعيد {"errors": [...]} بخطأ كل عنصر بترتيب القائمة دون حفظ أي عنصر
+        """
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        return self.bulk_save_response(save_loads, LoadSerializer, items)
 
 
-class CircuitBreakerViewSet(viewsets.ModelViewSet):
+class CircuitBreakerViewSet(ConditionalGetMixin, ReadModelCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     """
     واجهة برمجية لإدارة قواطع الدارة الكهربائية
     توفر عمليات إنشاء، قراءة، تحديث، وحذف للقواطع
@@ -530,6 +704,7 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
     """
     queryset = CircuitBreaker.objects.all()  # جلب جميع كائنات القواطع
     serializer_class = CircuitBreakerSerializer  # تحديد السيريلايزر المستخدم
+    pagination_class = CircuitBreakerPagination  # ترقيم الصفحات بالمؤشر حسب الموقع ثم المعرف
     
     @action(detail=True, methods=['get', 'post'])
     def loads(self, request, pk=None):
@@ -544,10 +719,12 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
             if request.method == 'GET':
                 # جلب الأحمال المرتبطة بالقاطع
                 loads = Load.objects.filter(breaker=breaker)
-                serializer = LoadSerializer(loads, many=True)
-                return Response(serializer.data)
+                return Response(self.serialize_list(LoadSerializer, loads))
             
             elif request.method == 'POST':
+                if isinstance(request.data, list):
+                    # قائمة أحمال: إنشاء مجمع في معاملة واحدة مع أخطاء كل عنصر (لوحة الحمل لوحة القاطع)
+                    return self.bulk_save_response(save_loads, LoadSerializer, request.data, {'breaker': breaker.id})
                 try:
                     # استخدام السيريلايزر المخصص لإنشاء حمل للقاطع
                     panel_id = request.data.get('panel_id', None)
@@ -583,6 +760,16 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': f'حدث خطأ: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        إنشاء وتعديل مجموعة قواطع في طلب واحد ومعاملة واحدة (دون علاقات التغذية)
+        الجسم قائمة عناصر (أو {"items": [...]})، والعنصر الذي يحمل id تعديل جزئي والباقي إنشاء
+        أي خطأ يعيد {"errors": [...]} بخطأ كل عنصر بترتيب القائمة دون حفظ أي عنصر
+        """
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        return self.bulk_save_response(save_breakers, CircuitBreakerSerializer, items)
+    
     @action(detail=True, methods=['get', 'put'])
     def feeding_breakers(self, request, pk=None):
         """
@@ -596,8 +783,7 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
             if request.method == 'GET':
                 # جلب القواطع المغذية
                 feeding_breakers = breaker.feeding_breakers.all()
-                serializer = CircuitBreakerBasicSerializer(feeding_breakers, many=True)
-                return Response(serializer.data)
+                return Response(self.serialize_list(CircuitBreakerBasicSerializer, feeding_breakers))
             
             elif request.method == 'PUT':
                 try:
@@ -624,13 +810,18 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
     def fed_breakers(self, request, pk=None):
         """
         طريقة للحصول على القواطع التي يغذيها قاطع محدد
+        ?include_indirect=true يعيد جميع القواطع المغذاة بشكل مباشر أو غير مباشر (الإغلاق الهابط)
         """
         try:
             breaker = self.get_object()
-            # جلب القواطع المغذاة
-            fed_breakers = breaker.fed_breakers.all()
-            serializer = CircuitBreakerBasicSerializer(fed_breakers, many=True)
-            return Response(serializer.data)
+            # جلب معرفات القواطع المغذاة من رسم التغذية في الذاكرة ثم القواطع نفسها باستعلام واحد
+            graph = get_feed_graph()
+            if request.query_params.get('include_indirect', '').lower() in ('1', 'true', 'yes'):
+                fed_ids = graph.downstream_ids(breaker.id)
+            else:
+                fed_ids = graph.fed_ids(breaker.id)
+            fed_breakers = CircuitBreaker.objects.filter(id__in=fed_ids)
+            return Response(self.serialize_list(CircuitBreakerBasicSerializer, fed_breakers))
         except CircuitBreaker.DoesNotExist:
             return Response({'error': 'القاطع غير موجود'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -647,9 +838,8 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
         
         try:
             panel = Panel.objects.get(id=panel_id)
-            breakers = CircuitBreaker.objects.filter(panel=panel)
-            serializer = self.get_serializer(breakers, many=True)
-            return Response(serializer.data)
+            breakers = self.get_queryset().filter(panel=panel)
+            return self.paginated_list_response(breakers)
         except Panel.DoesNotExist:
             return Response({'error': 'اللوحة غير موجودة'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -664,9 +854,8 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
         if not role:
             return Response({'error': 'يجب تحديد دور القاطع'}, status=status.HTTP_400_BAD_REQUEST)
         
-        breakers = CircuitBreaker.objects.filter(breaker_role=role)
-        serializer = self.get_serializer(breakers, many=True)
-        return Response(serializer.data)
+        breakers = self.get_queryset().filter(breaker_role=role)
+        return self.paginated_list_response(breakers)
     
     @action(detail=True, methods=['get'])
     def full_path(self, request, pk=None):
@@ -696,3 +885,482 @@ class CircuitBreakerViewSet(viewsets.ModelViewSet):
             'rated_current': breaker.rated_current,
             'utilization_percentage': utilization
         })
+
+
+class LoadProfileViewSet(viewsets.ModelViewSet):
+    """
+    واجهة برمجية لإدارة منحنيات التشغيل (24 قيمة يومية أو 8760 قيمة سنوية)
+    المنحنى يرتبط بحمل واحد أو بنوع حمل ليستخدم لجميع أحمال هذا النوع
+    """
+    queryset = LoadProfile.objects.all()
+    serializer_class = LoadProfileSerializer
+
+
+class TariffViewSet(viewsets.ModelViewSet):
+    """
+    واجهة برمجية لإدارة تعرفات الطاقة (لمصدر واحد أو لنوع مصدر) مع فتراتها الزمنية وشرائحها
+    """
+    queryset = Tariff.objects.prefetch_related('bands', 'tiers')
+    serializer_class = TariffSerializer
+
+
+class ScenarioViewSet(viewsets.ModelViewSet):
+    """
+    واجهة برمجية لإدارة سيناريوهات "ماذا لو" وتقييمها في الذاكرة دون تعديل الشبكة الحية
+    """
+    queryset = Scenario.objects.all()
+    serializer_class = ScenarioSerializer
+    
+    def evaluation_response(self, changes):
+        try:
+            return Response(evaluate_scenario(changes))
+        except ScenarioError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['get'])
+    def evaluate(self, request, pk=None):
+        """
+        طريقة لتقييم سيناريو محفوظ مقابل الشبكة الحالية: الإجماليات ونسب الاستخدام وهبوط الجهد
+        للكائنات المضافة والمحذوفة والتي تغيرت نتائجها، قبل السيناريو وبعده
+        """
+        return self.evaluation_response(self.get_object().changes)
+    
+    @action(detail=False, methods=['post'])
+    def preview(self, request):
+        """
+        طريقة لتقييم قائمة تغييرات دون حفظها كسيناريو
+        جسم الطلب: {"changes": [{"action": "add", "kind": "load", "key": "...", "fields": {...}}, ...]}
+        """
+        return self.evaluation_response(request.data.get('changes', []))
+
+
+class NetworkViewSet(ConditionalGetMixin, viewsets.ViewSet):
+    """
+    واجهة برمجية للعمليات التي تعمل على مستوى الشبكة كاملة
+    بدلاً من كائن واحد (لقطة الشبكة للمخطط التفاعلي وغيرها)
+    """
+    conditional_get_exempt_actions = ('cache_stats',)
+    
+    @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        طريقة للحصول على لقطة مسطحة للشبكة كاملة بعدد ثابت من الاستعلامات
+        تعيد قوائم المصادر واللوحات والقواطع والأحمال وروابط التغذية بين القواطع
+        """
+        return Response(build_network_snapshot())
+    
+    def parse_kinds(self, value):
+        """
+        قراءة أنواع الكائنات من معامل مثل 'load,panel' أو قائمة
+        Returns:
+            tuple: (قائمة الأنواع, استجابة خطأ 400 أو None)
+        """
+        if isinstance(value, (list, tuple)):
+            kinds = [str(kind).strip() for kind in value if str(kind).strip()]
+        else:
+            kinds = [kind.strip() for kind in (value or '').split(',') if kind.strip()]
+        unknown_kinds = [kind for kind in kinds if kind not in KINDS]
+        if unknown_kinds:
+            return kinds, Response(
+                {'error': f"نوع غير معروف: {', '.join(unknown_kinds)} (الأنواع المتاحة: {', '.join(KINDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return kinds, None
+    
+    @action(detail=False, methods=['get'])
+    def cable_analysis(self, request):
+        """
+        طريقة للحصول على التحليل الكهربائي لجميع كابلات الشبكة (المصادر واللوحات والأحمال) في تمريرة متجهة واحدة
+        يعيد لكل كابل هبوط الجهد ونسبته والفقد في الطاقة والسعة القصوى وهامش التيار ونسبة الاستخدام
+        وهبوط الجهد التراكمي من المصدر حتى نهاية الكابل (لجميع اللوحات والأحمال دفعة واحدة)
+        معاملات التصفية (اختيارية):
+        - kind=load,panel,source: أنواع الكائنات
+        - min_drop_percentage=3: الكابلات التي تتجاوز نسبة هبوط الجهد فيها الحد
+        - min_cumulative_drop_percentage=5: العناصر التي يتجاوز هبوط الجهد التراكمي من المصدر إليها الحد
+        - min_utilization=80: الكابلات التي تتجاوز نسبة استخدام سعتها الحد
+        - overloaded=true: الكابلات التي يتجاوز تيارها سعتها القصوى فقط
+        - ordering=-voltage_drop_percentage: الترتيب حسب أحد الحقول العددية
+        """
+        params = request.query_params
+        kinds, error = self.parse_kinds(params.get('kind'))
+        if error:
+            return error
+        
+        thresholds = {}
+        for name in ('min_drop_percentage', 'min_cumulative_drop_percentage', 'min_utilization'):
+            if params.get(name) not in (None, ''):
+                try:
+                    thresholds[name] = float(params[name])
+                except ValueError:
+                    return Response({'error': f'المعامل {name} يجب أن يكون رقماً'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ordering = params.get('ordering') or None
+        if ordering and ordering.lstrip('-') not in RESULT_FIELDS:
+            return Response(
+                {'error': f"لا يمكن الترتيب حسب {ordering} (الحقول المتاحة: {', '.join(RESULT_FIELDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        analysis = analyze_cables()
+        selected = analysis.mask(
+            kinds=kinds, overloaded=params.get('overloaded', '').lower() in ('1', 'true', 'yes'), **thresholds
+        )
+        return Response({
+            'summary': analysis.summary(selected),
+            'results': analysis.rows(selected, ordering=ordering),
+        })
+    
+    @action(detail=False, methods=['get', 'post'])
+    def cable_sizing(self, request):
+        """
+        طريقة لاقتراح أصغر مقطع كابل (وأقل عدد كابلات) يحقق تيار العنصر وحد هبوط الجهد لجميع الكابلات
+        GET: يعيد الفرق بين المقاطع الحالية والمقترحة دون أي تعديل
+        POST: يطبق الاقتراحات دفعة واحدة (جميعها أو العناصر المحددة في items) ويعيد التغييرات المطبقة
+        المعاملات (في الاستعلام لـ GET وفي جسم الطلب لـ POST):
+        - max_drop_percentage: الحد الأقصى لنسبة هبوط الجهد في الكابل (3 افتراضياً)
+        - max_quantity: أقصى عدد كابلات متوازية (4 افتراضياً)
+        - kind: أنواع الكائنات (source, panel, load)
+        - items (POST فقط): [{"kind": "load", "id": 5}, ...]
+        """
+        params = request.query_params if request.method == 'GET' else request.data
+        kinds, error = self.parse_kinds(params.get('kind'))
+        if error:
+            return error
+        try:
+            max_drop_percentage = float(params.get('max_drop_percentage') or DEFAULT_MAX_DROP_PERCENTAGE)
+            max_quantity = int(params.get('max_quantity') or DEFAULT_MAX_QUANTITY)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'max_drop_percentage و max_quantity يجب أن يكونا أرقاماً'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if max_drop_percentage <= 0 or not 1 <= max_quantity <= 10:
+            return Response(
+                {'error': 'max_drop_percentage يجب أن يكون موجباً و max_quantity بين 1 و 10'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        options = {'max_drop_percentage': max_drop_percentage, 'max_quantity': max_quantity, 'kinds': kinds}
+        
+        if request.method == 'GET':
+            return Response(size_cables(**options))
+        
+        items = params.get('items')
+        if items is not None:
+            try:
+                items = [(item['kind'], int(item['id'])) for item in items]
+            except (TypeError, KeyError, ValueError):
+                return Response(
+                    {'error': 'items يجب أن تكون قائمة من {"kind": ..., "id": ...}'}, status=status.HTTP_400_BAD_REQUEST
+                )
+        applied = apply_cable_sizing(items=items, **options)
+        return Response({'applied': len(applied), 'changes': applied})
+    
+    @action(detail=False, methods=['get'])
+    def load_flow(self, request):
+        """
+        طريقة لحل سريان الأحمال للشبكة كاملة (مسح خلفي/أمامي على شجرة التغذية)
+        يعيد لكل عقدة (مصدر أو لوحة أو حمل) الجهد الفعلي ونسبته للجهد الاسمي وزاويته،
+        وتيار الكابل المغذي لها والفقد فيه، مع ملخص التقارب والفقد الكلي وأدنى جهد
+        معاملات التصفية (اختيارية):
+        - kind=load,panel,source: أنواع الكائنات
+        - max_voltage_pu=0.95: العقد التي يقل جهدها النسبي عن الحد
+        - ordering=voltage_pu: الترتيب حسب أحد الحقول العددية
+        """
+        params = request.query_params
+        kinds, error = self.parse_kinds(params.get('kind'))
+        if error:
+            return error
+        
+        max_voltage_pu = None
+        if params.get('max_voltage_pu') not in (None, ''):
+            try:
+                max_voltage_pu = float(params['max_voltage_pu'])
+            except ValueError:
+                return Response({'error': 'المعامل max_voltage_pu يجب أن يكون رقماً'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        ordering = params.get('ordering') or None
+        if ordering and ordering.lstrip('-') not in LOAD_FLOW_FIELDS:
+            return Response(
+                {'error': f"لا يمكن الترتيب حسب {ordering} (الحقول المتاحة: {', '.join(LOAD_FLOW_FIELDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        solution = solve_load_flow()
+        selected = solution.mask(kinds=kinds, max_voltage_pu=max_voltage_pu)
+        return Response({
+            'summary': solution.summary(selected),
+            'results': solution.rows(selected, ordering=ordering),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def short_circuit(self, request):
+        """
+        طريقة لحساب تيار القصر المتوقع عند جميع المصادر واللوحات والأحمال وفحص قدرة القطع لجميع القواطع
+        يعيد تيار القصر (كيلو أمبير) لكل عقدة، ولكل قاطع تيار القصر في موقعه والهامش والحالة:
+        ok (قدرة القطع كافية) أو insufficient (أقل من تيار القصر) أو unrated (قدرة قطع غير مسجلة) أو unknown (موقع غير معروف)
+        معاملات التصفية (اختيارية):
+        - kind=panel,load: أنواع العقد في قائمة buses
+        - status=insufficient,unrated: حالات القواطع في قائمة breakers
+        """
+        params = request.query_params
+        kinds, error = self.parse_kinds(params.get('kind'))
+        if error:
+            return error
+        statuses = [value.strip() for value in params.get('status', '').split(',') if value.strip()]
+        unknown_statuses = [value for value in statuses if value not in (OK, INSUFFICIENT, UNRATED, UNKNOWN)]
+        if unknown_statuses:
+            return Response(
+                {'error': f"حالة غير معروفة: {', '.join(unknown_statuses)} (الحالات المتاحة: {OK}, {INSUFFICIENT}, {UNRATED}, {UNKNOWN})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        study = study_short_circuit()
+        return Response({
+            'summary': study.summary(),
+            'buses': study.buses(kinds=kinds),
+            'breakers': study.breakers(statuses=statuses),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def selectivity(self, request):
+        """
+        طريقة لفحص الانتقائية بين جميع أزواج القواطع (علاقات التغذية والقاطع المغذي مع القاطع الرئيسي للوحة)
+        يعيد لكل زوج حالته: selective أو not_selective أو not_applicable (قاطع بدون منحنى فصل)،
+        وحد الانتقائية (أقل تيار يفصل عنده القاطع الأعلى قبل الأسفل أو معه) وتيار القصر في موقع القاطع الأسفل
+        - status=not_selective: حالات الأزواج المطلوبة (جميعها افتراضياً)
+        """
+        statuses = [value.strip() for value in request.query_params.get('status', '').split(',') if value.strip()]
+        unknown_statuses = [value for value in statuses if value not in SELECTIVITY_STATUSES]
+        if unknown_statuses:
+            return Response(
+                {'error': f"حالة غير معروفة: {', '.join(unknown_statuses)} (الحالات المتاحة: {', '.join(SELECTIVITY_STATUSES)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        study = study_selectivity()
+        return Response({'summary': study.summary(), 'pairs': study.rows(statuses=statuses)})
+    
+    @action(detail=False, methods=['get'])
+    def demand(self, request):
+        """
+        طريقة لحساب أقصى طلب متزامن لكل مصدر ولوحة وقاطع من منحنيات التشغيل الساعية بدلاً من جمع القدرات الاسمية
+        يعيد لكل عقدة: القدرة المتصلة، أقصى طلب متزامن وساعته، مجموع ذروات الأحمال منفردة ومعامل التباين،
+        والطاقة خلال أفق المنحنيات ومعامل الحمل
+        معاملات اختيارية:
+        - kind=panel,breaker: أنواع العقد (source, panel, breaker)
+        - id=5: معرف عقدة واحدة (مع kind واحد)
+        - duration_points=24: عدد نقاط منحنى مدة الحمل لكل عقدة (بدون منحنى افتراضياً، وأقصاه أفق المنحنيات)
+        """
+        params = request.query_params
+        kinds = [value.strip() for value in params.get('kind', '').split(',') if value.strip()]
+        unknown_kinds = [kind for kind in kinds if kind not in DEMAND_KINDS]
+        if unknown_kinds:
+            return Response(
+                {'error': f"نوع غير معروف: {', '.join(unknown_kinds)} (الأنواع المتاحة: {', '.join(DEMAND_KINDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            ids = [int(params['id'])] if params.get('id') else None
+            duration_points = int(params.get('duration_points') or 0)
+        except (TypeError, ValueError):
+            return Response({'error': 'id و duration_points يجب أن يكونا أرقاماً'}, status=status.HTTP_400_BAD_REQUEST)
+        if duration_points < 0:
+            return Response({'error': 'duration_points يجب أن يكون موجباً'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        study = study_demand()
+        # النقاط بعد أفق المنحنيات تكرر نفس العينات
+        if duration_points > study.horizon:
+            return Response(
+                {'error': f'duration_points يجب ألا يزيد عن أفق المنحنيات ({study.horizon})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({
+            'horizon': study.horizon,
+            'results': study.rows(kinds=kinds, ids=ids, duration_points=duration_points),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def contingency(self, request):
+        """
+        طريقة لدراسة الطوارئ N-1: فصل كل قاطع وكل مصدر على حدة وتحديد الأحمال التي تفقد التغذية والأمبير المفقود
+        مع احتساب التغذية البديلة للقواطع متعددة المغذيات، مرتبة من الأكبر في الأمبير المفقود
+        معاملات اختيارية:
+        - kind=breaker,source: أنواع الحالات (جميعها افتراضياً)
+        - id=5: حالة واحدة (مع kind واحد) مع قائمة الأحمال التي تفقد التغذية
+        - min_shed_ampacity=10: الحالات التي يتجاوز أمبيرها المفقود الحد فقط
+        """
+        params = request.query_params
+        kinds = [value.strip() for value in params.get('kind', '').split(',') if value.strip()]
+        unknown_kinds = [kind for kind in kinds if kind not in CONTINGENCY_KINDS]
+        if unknown_kinds:
+            return Response(
+                {'error': f"نوع غير معروف: {', '.join(unknown_kinds)} (الأنواع المتاحة: {', '.join(CONTINGENCY_KINDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            object_id = int(params['id']) if params.get('id') else None
+            min_shed_ampacity = float(params['min_shed_ampacity']) if params.get('min_shed_ampacity') else None
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'id و min_shed_ampacity يجب أن يكونا أرقاماً'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        study = study_contingencies()
+        if object_id is not None:
+            if len(kinds) != 1:
+                return Response({'error': 'id يتطلب نوعاً واحداً في kind'}, status=status.HTTP_400_BAD_REQUEST)
+            result = study.detail(kinds[0], object_id)
+            if result is None:
+                return Response({'error': 'العنصر غير موجود'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(result)
+        return Response({
+            'summary': study.summary(),
+            'results': study.rows(kinds=kinds, min_shed_ampacity=min_shed_ampacity),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def impact(self, request):
+        """
+        طريقة لفهرس التأثير: ما يفقد التغذية عند فصل قاطع أو لوحة (اللوحات والأحمال والأمبير وأنواع الأحمال)
+        القيم محفوظة مسبقاً لكل عنصر وتبطل فقط عند تغيير ما تحته في مسار التغذية
+        معاملات:
+        - kind=breaker أو panel (breaker افتراضياً)
+        - id=5: عنصر واحد مع قائمة لوحاته وأحماله (بدونه يعاد الفهرس الكامل للنوع)
+        - min_ampacity=10: عناصر الفهرس الكامل التي يتجاوز أمبيرها المفقود الحد فقط
+        """
+        params = request.query_params
+        kind = params.get('kind') or read_cache.BREAKER
+        if kind not in IMPACT_KINDS:
+            return Response(
+                {'error': f"نوع غير معروف: {kind} (الأنواع المتاحة: {', '.join(IMPACT_KINDS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            object_id = int(params['id']) if params.get('id') else None
+            min_ampacity = float(params['min_ampacity']) if params.get('min_ampacity') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'id و min_ampacity يجب أن يكونا أرقاماً'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if object_id is not None:
+            result = get_impact(kind, object_id)
+            if result is None:
+                return Response({'error': 'العنصر غير موجود'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(result)
+        return Response({'kind': kind, 'results': impact_index(kind, min_ampacity=min_ampacity)})
+    
+    @action(detail=False, methods=['get'])
+    def generator_backup(self, request):
+        """
+        طريقة لخطة المولدات الاحتياطية: لكل مولد الأحمال التي يحملها عند التحويل (لوحاته واللوحات المنقولة إليه)
+        وأمبير طلبها مقابل سعته، والأحمال التي يجب فصلها حسب الأولوية عند تجاوز السعة
+        الحالة: ok أو overloaded (الطلب أكبر من السعة) أو unrated (سعة المولد غير مسجلة)
+        معاملات اختيارية:
+        - status=overloaded: حالات المولدات المطلوبة (جميعها افتراضياً)
+        - id=5: مولد واحد مع الإجماليات لكل فئة أولوية وترتيب الفصل
+        """
+        params = request.query_params
+        statuses = [value.strip() for value in params.get('status', '').split(',') if value.strip()]
+        unknown_statuses = [value for value in statuses if value not in BACKUP_STATUSES]
+        if unknown_statuses:
+            return Response(
+                {'error': f"حالة غير معروفة: {', '.join(unknown_statuses)} (الحالات المتاحة: {', '.join(BACKUP_STATUSES)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            generator_id = int(params['id']) if params.get('id') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'id يجب أن يكون رقماً'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        plan = plan_generator_backup()
+        if generator_id is not None:
+            result = plan.detail(generator_id)
+            if result is None:
+                return Response({'error': 'المولد غير موجود'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(result)
+        return Response({'summary': plan.summary(), 'results': plan.rows(statuses=statuses)})
+    
+    @action(detail=False, methods=['get'])
+    def energy_report(self, request):
+        """
+        طريقة لتقرير الاستهلاك اليومي (كيلو واط ساعة) والتكلفة الشهرية محسوبين في قاعدة البيانات
+        مجمعة حسب نوع الحمل والمصدر واللوحة (مع شجرتها الفرعية) بعدد ثابت من الاستعلامات
+        معاملات اختيارية:
+        - group=load_type,source,panel: التجميعات المطلوبة (جميعها افتراضياً)
+        - price_per_kwh=0.18: سعر الكيلو واط ساعة
+        """
+        params = request.query_params
+        groups = [value.strip() for value in params.get('group', '').split(',') if value.strip()]
+        unknown_groups = [group for group in groups if group not in ENERGY_GROUPS]
+        if unknown_groups:
+            return Response(
+                {'error': f"تجميع غير معروف: {', '.join(unknown_groups)} (التجميعات المتاحة: {', '.join(ENERGY_GROUPS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            price_per_kwh = float(params.get('price_per_kwh') or Load.DEFAULT_PRICE_PER_KWH)
+        except (TypeError, ValueError):
+            return Response({'error': 'price_per_kwh يجب أن يكون رقماً'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(energy_report(groups=groups, price_per_kwh=price_per_kwh))
+    
+    @action(detail=False, methods=['get'])
+    def cost_report(self, request):
+        """
+        طريقة لتقرير الطاقة والتكلفة الشهرية حسب التعرفات (الزمنية والشرائح ولكل مصدر أو نوع مصدر)
+        على منحنيات تشغيل الأحمال، مجمعة حسب المصدر واللوحة (مع شجرتها الفرعية) ونوع الحمل
+        معاملات اختيارية:
+        - group=source,panel,load_type: التجميعات المطلوبة (جميعها افتراضياً)
+        """
+        groups = [value.strip() for value in request.query_params.get('group', '').split(',') if value.strip()]
+        unknown_groups = [group for group in groups if group not in COST_GROUPS]
+        if unknown_groups:
+            return Response(
+                {'error': f"تجميع غير معروف: {', '.join(unknown_groups)} (التجميعات المتاحة: {', '.join(COST_GROUPS)})"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(study_costs().rows(groups=groups))
+    
+    @action(detail=False, methods=['get', 'post'])
+    def phase_balancing(self, request):
+        """
+        طريقة لاقتراح إعادة توزيع الأحمال أحادية الطور على الأطوار لتقليل عدم التوازن في جميع اللوحات
+        GET: يعيد تيارات الأطوار قبل الموازنة وبعدها لكل لوحة وقائمة نقلات الأحمال دون أي تعديل
+        POST: يطبق النقلات دفعة واحدة (جميعها أو الأحمال المحددة في loads) ويعيد النقلات المطبقة
+        المعاملات (في الاستعلام لـ GET وفي جسم الطلب لـ POST):
+        - panel: معرف لوحة لقصر الموازنة على شجرتها الفرعية
+        - min_improvement: أقل تحسن في نسبة عدم التوازن لاقتراح نقلات في لوحة (0.5 افتراضياً)
+        - loads (POST فقط): [5, 8, ...]
+        """
+        params = request.query_params if request.method == 'GET' else request.data
+        try:
+            panel_id = int(params['panel']) if params.get('panel') not in (None, '') else None
+            min_improvement = float(params.get('min_improvement') or MIN_IMPROVEMENT)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'panel و min_improvement يجب أن يكونا أرقاماً'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        options = {'panel_id': panel_id, 'min_improvement': min_improvement}
+        
+        if request.method == 'GET':
+            plan = plan_phase_balancing(**options)
+            if plan is None:
+                return Response({'error': 'اللوحة غير موجودة'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(plan)
+        
+        load_ids = params.get('loads')
+        if load_ids is not None:
+            try:
+                load_ids = [int(load_id) for load_id in load_ids]
+            except (TypeError, ValueError):
+                return Response({'error': 'loads يجب أن تكون قائمة معرفات'}, status=status.HTTP_400_BAD_REQUEST)
+        applied = apply_phase_balancing(load_ids=load_ids, **options)
+        if applied is None:
+            return Response({'error': 'اللوحة غير موجودة'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'applied': len(applied), 'moves': applied})
+    
+    @action(detail=False, methods=['get', 'delete'])
+    def cache_stats(self, request):
+        """
+        طريقة للحصول على عدادات الإصابة والإخفاق في ذاكرة نموذج القراءة (للعملية الحالية)
+        DELETE: يصفر العدادات لبدء فترة قياس جديدة دون حذف القيم المحفوظة
+        """
+        if request.method == 'DELETE':
+            read_cache.reset_stats()
+        return Response(read_cache.stats())
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -127,3 +128,31 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # ذاكرة نموذج القراءة للوحات والقواطع (انظر network/services/read_cache.py)
+    # القيم لا تنتهي صلاحيتها وتبطل فقط من الإشارات، لذلك يجب أن تكون الذاكرة مشتركة بين جميع عمليات الخادم
+    # حتى يصل الإبطال إليها كلها: مجلد ملفات مشترك يخلي الأقدم استخداماً (LRU) عند تجاوز MAX_ENTRIES
+    # (LocMemCache خاص بكل عملية فلا يصلح إلا مع عملية واحدة). المجلد خارج المشروع، والاختبارات تستبدله بذاكرة العملية
+    # TOUCH_INTERVAL: أقل مدة بالثواني بين تحديثين لوقت آخر استخدام الملف عند القراءة (كتابة على نظام الملفات)
+    'network_read_model': {
+        'BACKEND': 'network.cache_backends.LRUFileBasedCache',
+        'LOCATION': os.environ.get(
+            'NETWORK_READ_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'power-network-read-model')
+        ),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 4,
+            'TOUCH_INTERVAL': 60,
+        },
+    },
+}
+
+NETWORK_READ_CACHE = 'network_read_model'
@@ -71,6 +71,50 @@ async function apiRequest(url, method = 'GET', data = null) {
     }
 }
 
+/**
+ * جلب جميع صفحات قائمة مُرقّمة الصفحات بالمؤشر (الأحمال والقواطع)
+ * تتبع روابط next حتى آخر صفحة وتعيد الصفوف مجمعة في مصفوفة واحدة
+ * بنفس شكل استجابة apiRequest حتى لا تتغير الوحدات التي تستخدمها
+ * @param {string} url - مسار نقطة النهاية للصفحة الأولى
+ * @returns {Promise} وعد بالاستجابة
+ */
+async function apiRequestAllPages(url) {
+    const results = [];
+    let nextUrl = url;
+    
+    while (nextUrl) {
+        const response = await apiRequest(nextUrl);
+        if (!response.success) {
+            return response;
+        }
+        
+        // نقطة نهاية غير مُرقّمة الصفحات تعيد مصفوفة مباشرة
+        if (Array.isArray(response.data)) {
+            return response;
+        }
+        
+        results.push(...response.data.results);
+        nextUrl = response.data.next;
+    }
+    
+    return { success: true, data: results };
+}
+
+/**
+ * إضافة معاملات الاستعلام إلى مسار نقطة النهاية
+ * تستخدم مثلاً لطلب حقول محددة فقط عبر fields أو حقول محسوبة عبر expand
+ * @param {string} url - مسار نقطة النهاية
+ * @param {Object} params - معاملات الاستعلام (اختياري)
+ * @returns {string} المسار مع معاملات الاستعلام
+ */
+function withQueryParams(url, params = null) {
+    if (!params || Object.keys(params).length === 0) {
+        return url;
+    }
+    const query = new URLSearchParams(params).toString();
+    return `${url}${url.includes('?') ? '&' : '?'}${query}`;
+}
+
 /**
  * استخراج رمز CSRF من الكوكيز
  * @returns {string} رمز CSRF
@@ -91,10 +135,11 @@ function getCsrfToken() {
 export const PowerSourceAPI = {
     /**
      * الحصول على جميع مصادر الطاقة
+     * @param {Object} params - معاملات الاستعلام مثل { fields: 'id,name' } (اختياري)
      * @returns {Promise} وعد بالاستجابة
      */
-    getAll: async function() {
-        return await apiRequest(`${API_BASE_URL}/powersources/`);
+    getAll: async function(params = null) {
+        return await apiRequest(withQueryParams(`${API_BASE_URL}/powersources/`, params));
     },
     
     /**
@@ -198,10 +243,11 @@ export const PowerSourceAPI = {
 export const PanelAPI = {
     /**
      * الحصول على جميع اللوحات
+     * @param {Object} params - معاملات الاستعلام مثل { fields: 'id,name' } (اختياري)
      * @returns {Promise} وعد بالاستجابة
      */
-    getAll: async function() {
-        return await apiRequest(`${API_BASE_URL}/panels/`);
+    getAll: async function(params = null) {
+        return await apiRequest(withQueryParams(`${API_BASE_URL}/panels/`, params));
     },
     
     /**
@@ -315,10 +361,11 @@ export const PanelAPI = {
 export const CircuitBreakerAPI = {
     /**
      * الحصول على جميع القواطع
+     * @param {Object} params - معاملات الاستعلام مثل { fields: 'id,name' } (اختياري)
      * @returns {Promise} وعد بالاستجابة
      */
-    getAll: async function() {
-        return await apiRequest(`${API_BASE_URL}/circuitbreakers/`);
+    getAll: async function(params = null) {
+        return await apiRequestAllPages(withQueryParams(`${API_BASE_URL}/circuitbreakers/`, params));
     },
     
     /**
@@ -411,7 +458,7 @@ export const CircuitBreakerAPI = {
      * @returns {Promise} وعد بالاستجابة
      */
     getByPanel: async function(panelId) {
-        return await apiRequest(`${API_BASE_URL}/circuitbreakers/by_panel/?panel_id=${panelId}`);
+        return await apiRequestAllPages(`${API_BASE_URL}/circuitbreakers/by_panel/?panel_id=${panelId}`);
     },
     
     /**
@@ -420,7 +467,7 @@ export const CircuitBreakerAPI = {
      * @returns {Promise} وعد بالاستجابة
      */
     getByRole: async function(role) {
-        return await apiRequest(`${API_BASE_URL}/circuitbreakers/by_role/?role=${role}`);
+        return await apiRequestAllPages(`${API_BASE_URL}/circuitbreakers/by_role/?role=${role}`);
     },
     
     /**
@@ -448,10 +495,11 @@ export const CircuitBreakerAPI = {
 export const LoadAPI = {
     /**
      * الحصول على جميع الأحمال
+     * @param {Object} params - معاملات الاستعلام مثل { fields: 'id,name' } (اختياري)
      * @returns {Promise} وعد بالاستجابة
      */
-    getAll: async function() {
-        return await apiRequest(`${API_BASE_URL}/loads/`);
+    getAll: async function(params = null) {
+        return await apiRequestAllPages(withQueryParams(`${API_BASE_URL}/loads/`, params));
     },
     
     /**
@@ -497,7 +545,7 @@ export const LoadAPI = {
      * @returns {Promise} وعد بالاستجابة
      */
     getByPanel: async function(panelId) {
-        return await apiRequest(`${API_BASE_URL}/loads/by_panel/?panel_id=${panelId}`);
+        return await apiRequestAllPages(`${API_BASE_URL}/loads/by_panel/?panel_id=${panelId}`);
     },
     
     /**
@@ -506,7 +554,7 @@ export const LoadAPI = {
      * @returns {Promise} وعد بالاستجابة
      */
     getByBreaker: async function(breakerId) {
-        return await apiRequest(`${API_BASE_URL}/loads/by_breaker/?breaker_id=${breakerId}`);
+        return await apiRequestAllPages(`${API_BASE_URL}/loads/by_breaker/?breaker_id=${breakerId}`);
     },
     
     /**
@@ -515,6 +563,6 @@ export const LoadAPI = {
      * @returns {Promise} وعد بالاستجابة
      */
     getByType: async function(loadType) {
-        return await apiRequest(`${API_BASE_URL}/loads/by_type/?load_type=${loadType}`);
+        return await apiRequestAllPages(`${API_BASE_URL}/loads/by_type/?load_type=${loadType}`);
     }
 };
\ No newline at end of file
@@ -250,7 +250,7 @@ function showAlert(message, type = 'success') {
  */
 async function loadPanelsDropdown() {
     try {
-        const result = await PanelAPI.getAll();
+        const result = await PanelAPI.getAll({ fields: 'id,name,panel_type,power_source' });
         
         if (result.success) {
             updatePanelsDropdown(result.data);
@@ -645,7 +645,7 @@ async function confirmDelete() {
  */
 async function loadPowerSourcesDropdown() {
     try {
-        const result = await PowerSourceAPI.getAll();
+        const result = await PowerSourceAPI.getAll({ fields: 'id,name' });
         
         if (result.success) {
             updatePowerSourcesDropdown(result.data);
@@ -883,7 +883,7 @@ function updateModalDropdowns(powerSources = null, panels = null) {
  */
 async function loadModalPowerSources() {
     try {
-        const result = await PowerSourceAPI.getAll();
+        const result = await PowerSourceAPI.getAll({ fields: 'id,name' });
         
         if (result.success) {
             updateModalSourceDropdown(result.data);
@@ -900,7 +900,7 @@ async function loadModalPowerSources() {
  */
 async function loadModalPanels() {
     try {
-        const result = await PanelAPI.getAll();
+        const result = await PanelAPI.getAll({ fields: 'id,name,panel_type,power_source' });
         
         if (result.success) {
             updateModalPanelDropdown(result.data);
@@ -139,7 +139,8 @@ function showAlert(message, type = 'success') {
  */
 async function loadBreakersDropdown() {
     try {
-        const result = await CircuitBreakerAPI.getAll();
+        // القائمة المنسدلة تحتاج المعرف والاسم فقط
+        const result = await CircuitBreakerAPI.getAll({ fields: 'id,name,panel,panel_name' });
         
         if (result.success) {
             updateBreakersDropdown(result.data);
@@ -215,8 +216,8 @@ async function loadLoads(breakerId = null) {
             // تحميل الأحمال المرتبطة بقاطع محدد
             result = await CircuitBreakerAPI.getLoads(breakerId);
         } else {
-            // تحميل جميع الأحمال
-            result = await LoadAPI.getAll();
+            // تحميل جميع الأحمال مع تفاصيل اللوحة والقاطع فقط دون الحقول المحسوبة غير المعروضة
+            result = await LoadAPI.getAll({ expand: 'panel_details,breaker_details' });
         }
         
         if (result.success) {
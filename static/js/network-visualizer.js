@@ -1114,14 +1114,11 @@ function displayNodeDetails(node) {
  */
 async function countBreakersForPanel(panelId) {
     try {
-        const response = await NetworkAPI.getCircuitBreakers();
-        if (response.success) {
-            const breakers = response.data;
-            const panelBreakers = breakers.filter(breaker => breaker.panel == panelId);
-            const breakerCount = document.getElementById('breakerCount');
-            if (breakerCount) {
-                breakerCount.textContent = panelBreakers.length.toString();
-            }
+        // استخدام الهيكل المحمل مسبقاً من لقطة الشبكة بدلاً من جلب جميع القواطع
+        const panel = networkData.hierarchy && networkData.hierarchy.panels[panelId];
+        const breakerCount = document.getElementById('breakerCount');
+        if (breakerCount) {
+            breakerCount.textContent = (panel ? panel.breakers.length : 0).toString();
         }
     } catch (error) {
         console.error('خطأ في حساب عدد القواطع:', error);
@@ -1134,14 +1131,13 @@ async function countBreakersForPanel(panelId) {
  */
 async function loadConnectedLoadName(breakerId) {
     try {
-        const response = await NetworkAPI.getLoads();
-        if (response.success) {
-            const loads = response.data;
-            const load = loads.find(l => l.breaker == breakerId);
-            const loadName = document.getElementById('loadName');
-            if (loadName) {
-                loadName.textContent = load ? load.name : 'لا يوجد حمل متصل';
-            }
+        // استخدام الهيكل المحمل مسبقاً من لقطة الشبكة بدلاً من جلب جميع الأحمال
+        const breaker = networkData.hierarchy && networkData.hierarchy.breakers[breakerId];
+        const loadId = breaker && breaker.loads.length > 0 ? breaker.loads[0] : null;
+        const loadNode = loadId !== null ? findNodeById(`load-${loadId}`) : null;
+        const loadName = document.getElementById('loadName');
+        if (loadName) {
+            loadName.textContent = loadNode ? loadNode.data.label : 'لا يوجد حمل متصل';
         }
     } catch (error) {
         console.error('خطأ في تحميل اسم الحمل:', error);
@@ -1317,21 +1313,23 @@ window.showPanelBreakers = function(panelId) {
  */
 async function loadNetworkData() {
     try {
-        // جلب جميع العناصر
-        const powerSourcesResponse = await NetworkAPI.getPowerSources();
-        const panelsResponse = await NetworkAPI.getPanels();
-        const breakersResponse = await NetworkAPI.getCircuitBreakers();
-        const loadsResponse = await NetworkAPI.getLoads();
-        
-        if (!powerSourcesResponse.success || !panelsResponse.success || 
-            !breakersResponse.success || !loadsResponse.success) {
+        // جلب لقطة الشبكة كاملة في طلب واحد بدلاً من أربع قوائم كاملة
+        const snapshotResponse = await NetworkAPI.getNetworkSnapshot();
+        
+        if (!snapshotResponse.success) {
             throw new Error('فشل في جلب بيانات الشبكة');
         }
         
-        const powerSources = powerSourcesResponse.data;
-        const panels = panelsResponse.data;
-        const breakers = breakersResponse.data;
-        const loads = loadsResponse.data;
+        const { sources: powerSources, panels, breakers, loads, feeds } = snapshotResponse.data;
+        
+        // إعادة بناء قائمة القواطع المغذية لكل قاطع من روابط التغذية
+        const feedingByBreaker = {};
+        feeds.forEach(feed => {
+            (feedingByBreaker[feed.fed] = feedingByBreaker[feed.fed] || []).push(feed.feeder);
+        });
+        breakers.forEach(breaker => {
+            breaker.feeding_breakers = feedingByBreaker[breaker.id] || [];
+        });
         
         // تهيئة العلاقات والهيكل الشجري
         buildNetworkHierarchy(powerSources, panels, breakers, loads);